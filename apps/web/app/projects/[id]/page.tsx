@@ -18,12 +18,10 @@ export default function ProjectPage({ params }: { params: { id: string } }) {
         const p = data[projectId]
         setProject(p)
       })
-    fetch("/api/runs")
+    fetch(`/api/runs?project_id=${encodeURIComponent(projectId)}`)
       .then((r) => r.json())
       .then((data) => {
-        const list = data ? Object.values(data) : []
-        const filtered = list.filter((x: any) => x.project_id === projectId)
-        setRuns(filtered)
+        setRuns(data ? Object.values(data) : [])
       })
   }, [projectId])
 
@@ -1,105 +1,312 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, Form, HTTPException, Query, Request, Response
 from fastapi.responses import JSONResponse, FileResponse
-from typing import Dict, Any
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import hashlib
 import os
-import json
+import threading
 import uuid
 import datetime
 
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    import multipart
+    from multipart.multipart import parse_options_header
+
+from backend.api.workbench_store import WorkbenchStore
+
 router = APIRouter()
 
 WORKBENCH_ROOT = os.path.join("artifacts", "workbench")
 os.makedirs(WORKBENCH_ROOT, exist_ok=True)
-PROJECTS_PATH = os.path.join(WORKBENCH_ROOT, "projects.json")
-RUNS_PATH = os.path.join(WORKBENCH_ROOT, "runs.json")
 
-def _read_json(path: str) -> Dict[str, Any]:
-    if not os.path.exists(path):
-        return {}
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+# Uploads are written in fixed-size blocks; memory use does not grow with file size
+UPLOAD_CHUNK_BYTES = 1 << 20
+MAX_UPLOAD_BYTES = int(os.environ.get("WORKBENCH_MAX_UPLOAD_BYTES", str(4 << 30)))
+
+# The upload route reads the raw body, so its form schema is declared by hand
+_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {"file": {"type": "string", "format": "binary"}},
+            "required": ["file"],
+        }}},
+    }
+}
+
+_stores: Dict[str, WorkbenchStore] = {}
+_stores_lock = threading.Lock()
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def _store() -> WorkbenchStore:
+    """Store for the current WORKBENCH_ROOT (projects.json / runs.json are imported on first open)"""
+    db_path = os.path.join(WORKBENCH_ROOT, "workbench.db")
+    with _stores_lock:
+        store = _stores.get(db_path)
+        if store is None:
+            store = _stores[db_path] = WorkbenchStore(db_path)
+    return store
+
+
+async def _db(method: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Call a WorkbenchStore method on the threadpool.
+
+    Writes can wait up to the 30s busy timeout on BEGIN IMMEDIATE; that wait
+    must not block the event loop (and the first call opens the database).
+    """
+    return await run_in_threadpool(lambda: method(_store(), *args, **kwargs))
+
+
+def _now() -> str:
+    return datetime.datetime.utcnow().isoformat()
+
+
+class _UploadSink:
+    """One file part: size-checked and hashed as it arrives, written to a .part file in UPLOAD_CHUNK_BYTES blocks"""
+
+    def __init__(self, dest_path: str, max_bytes: int):
+        self.dest_path = dest_path
+        self.tmp_path = dest_path + ".part"
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._digest = hashlib.sha256()
+        self._buffer = bytearray()
+        self._file = open(self.tmp_path, "wb")
+
+    async def write(self, data: bytes):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(self.size)
+        self._digest.update(data)
+        self._buffer += data
+        if len(self._buffer) >= UPLOAD_CHUNK_BYTES:
+            await self._flush()
+
+    async def commit(self) -> Tuple[int, str]:
+        await self._flush()
+        await run_in_threadpool(self._publish)
+        return self.size, self._digest.hexdigest()
+
+    def discard(self):
+        self._file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    async def _flush(self):
+        block, self._buffer = self._buffer, bytearray()
+        if block:
+            await run_in_threadpool(self._file.write, block)
+
+    def _publish(self):
+        self._file.close()
+        os.replace(self.tmp_path, self.dest_path)
 
-def _write_json(path: str, data: Dict[str, Any]):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
 
-def _ensure_store():
-    if not os.path.exists(PROJECTS_PATH):
-        _write_json(PROJECTS_PATH, {})
-    if not os.path.exists(RUNS_PATH):
-        _write_json(RUNS_PATH, {})
+async def _receive_upload(
+    request: Request,
+    field: str,
+    dest_for: Callable[[str], str],
+    max_bytes: int
+) -> Tuple[str, str, int, str]:
+    """
+    Parse the multipart body straight off the request stream.
+
+    Only the `field` file part is written (to dest_for(filename)); the cap is
+    applied to the bytes received so far, so an oversized upload is rejected
+    before the rest of its body is read.
+
+    Returns:
+        (file_name, dest_path, size, sha256)
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="expected multipart/form-data")
+
+    events: List[Tuple[str, Any]] = []
+    header = {"field": b"", "value": b""}
+
+    def on_header_field(data: bytes, start: int, end: int):
+        header["field"] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int):
+        header["value"] += data[start:end]
+
+    def on_header_end():
+        events.append(("header", (header["field"].lower(), header["value"])))
+        header["field"] = header["value"] = b""
+
+    parser = multipart.MultipartParser(params[b"boundary"], {
+        "on_part_begin": lambda: events.append(("begin", None)),
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": lambda: events.append(("headers_done", None)),
+        "on_part_data": lambda data, start, end: events.append(("data", data[start:end])),
+        "on_part_end": lambda: events.append(("end", None)),
+    })
+
+    # Allowance for boundaries and part headers on top of the file itself
+    body_limit = max_bytes + UPLOAD_CHUNK_BYTES
+    received = 0
+    disposition: Dict[bytes, bytes] = {}
+    sink: Optional[_UploadSink] = None
+    in_file = False
+    result = None
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > body_limit:
+                raise UploadTooLarge(received)
+            parser.write(chunk)
+            for kind, value in events:
+                if kind == "begin":
+                    disposition = {}
+                elif kind == "header" and value[0] == b"content-disposition":
+                    disposition = parse_options_header(value[1])[1]
+                elif kind == "headers_done":
+                    in_file = sink is None and disposition.get(b"name") == field.encode()
+                    if in_file:
+                        raw_name = disposition.get(b"filename", b"").decode("utf-8", "replace")
+                        file_name = os.path.basename(raw_name.replace("\\", "/")) or "upload"
+                        sink = _UploadSink(dest_for(file_name), max_bytes)
+                elif kind == "data" and in_file:
+                    await sink.write(value)
+                elif kind == "end" and in_file:
+                    in_file = False
+                    size, sha256 = await sink.commit()
+                    result = (file_name, sink.dest_path, size, sha256)
+            events.clear()
+        parser.finalize()
+    except BaseException:
+        if sink is not None and result is None:
+            sink.discard()
+        raise
+    if result is None:
+        raise HTTPException(status_code=422, detail=f"missing file field '{field}'")
+    return result
 
 @router.post("/projects")
 async def create_project(name: str = Form(...)) -> Dict[str, Any]:
     """Create a new project"""
-    _ensure_store()
-    projects = _read_json(PROJECTS_PATH)
     project_id = str(uuid.uuid4())
-    projects[project_id] = {
+    project = await _db(WorkbenchStore.create_project, {
         "id": project_id,
         "name": name,
-        "created_at": datetime.datetime.utcnow().isoformat()
-    }
-    _write_json(PROJECTS_PATH, projects)
+        "created_at": _now()
+    })
     # create project artifacts dir
     os.makedirs(os.path.join(WORKBENCH_ROOT, "projects", project_id), exist_ok=True)
-    return projects[project_id]
+    return project
 
 
 @router.get("/projects")
 async def list_projects() -> Dict[str, Any]:
     """列出所有项目（返回 id -> project map）"""
-    _ensure_store()
-    return _read_json(PROJECTS_PATH)
+    return await _db(WorkbenchStore.list_projects)
 
 
 @router.get("/runs")
-async def list_runs() -> Dict[str, Any]:
-    """列出所有 runs（返回 id -> run map）"""
-    _ensure_store()
-    return _read_json(RUNS_PATH)
-
-@router.post("/projects/{project_id}/ingest")
-async def ingest_files(project_id: str, file: UploadFile = File(...)) -> Dict[str, Any]:
-    """Accept a single file upload and create an ingest run"""
-    _ensure_store()
-    projects = _read_json(PROJECTS_PATH)
-    if project_id not in projects:
+async def list_runs(
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    project_id: Optional[str] = None,
+    type: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    分页列出 runs（返回 id -> run map，按 created_at 倒序）
+
+    总数与下一页游标在响应头 X-Total-Count / X-Next-Cursor 中；
+    since / until 接受 epoch 秒或 ISO-8601。
+    """
+    try:
+        runs, next_cursor, total = await _db(
+            WorkbenchStore.list_runs,
+            limit=limit, cursor=cursor, status=status, project_id=project_id,
+            run_type=type, since=since, until=until
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"invalid filter: {e}")
+    response.headers["X-Total-Count"] = str(total)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return {run["id"]: run for run in runs}
+
+@router.post("/projects/{project_id}/ingest", openapi_extra=_UPLOAD_OPENAPI)
+async def ingest_files(request: Request, project_id: str) -> Dict[str, Any]:
+    """
+    Accept a single file upload (multipart field `file`) and create an ingest run.
+
+    The body is parsed from the request stream: the file is hashed and written
+    to disk once, in fixed-size blocks, and the size cap stops reading as soon
+    as it is exceeded (a larger Content-Length is refused before reading).
+    """
+    if await _db(WorkbenchStore.get_project, project_id) is None:
         raise HTTPException(status_code=404, detail="project not found")
-    runs = _read_json(RUNS_PATH)
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > MAX_UPLOAD_BYTES + UPLOAD_CHUNK_BYTES:
+        raise HTTPException(status_code=413, detail=f"upload exceeds {MAX_UPLOAD_BYTES} bytes")
     run_id = str(uuid.uuid4())
-    run = {
+    await _db(WorkbenchStore.create_run, {
         "id": run_id,
         "project_id": project_id,
         "type": "ingest",
         "status": "processing",
-        "created_at": datetime.datetime.utcnow().isoformat(),
-        "file_name": file.filename,
-        "logs": []
-    }
+        "created_at": _now(),
+        "file_name": None
+    })
     # save uploaded file
     proj_dir = os.path.join(WORKBENCH_ROOT, "projects", project_id)
     os.makedirs(proj_dir, exist_ok=True)
-    dest_path = os.path.join(proj_dir, f"{run_id}-{file.filename}")
-    with open(dest_path, "wb") as out_f:
-        content = await file.read()
-        out_f.write(content)
-    run["logs"].append(f"Saved file to {dest_path}")
+    try:
+        file_name, dest_path, size, sha256 = await _receive_upload(
+            request, "file", lambda name: os.path.join(proj_dir, f"{run_id}-{name}"), MAX_UPLOAD_BYTES
+        )
+    except UploadTooLarge:
+        await _db(
+            WorkbenchStore.update_run, run_id, {"status": "failed", "error": "upload_too_large", "completed_at": _now()},
+            log=f"Upload exceeded {MAX_UPLOAD_BYTES} bytes; partial file removed"
+        )
+        raise HTTPException(status_code=413, detail=f"upload exceeds {MAX_UPLOAD_BYTES} bytes")
+    except HTTPException as e:
+        await _db(WorkbenchStore.update_run, run_id, {"status": "failed", "error": e.detail, "completed_at": _now()})
+        raise
+    except OSError as e:
+        await _db(WorkbenchStore.update_run, run_id, {"status": "failed", "error": str(e), "completed_at": _now()})
+        raise HTTPException(status_code=500, detail="failed to save upload")
+    except BaseException:
+        # Client disconnects and cancellations
+        await _db(WorkbenchStore.update_run, run_id, {"status": "failed", "error": "upload_aborted", "completed_at": _now()})
+        raise
+    await _db(WorkbenchStore.append_log, run_id, f"Saved file to {dest_path} ({size} bytes, sha256 {sha256})")
     # Mark run complete (for MVP we do synchronous ingest)
-    run["status"] = "completed"
-    run["completed_at"] = datetime.datetime.utcnow().isoformat()
-    runs[run_id] = run
-    _write_json(RUNS_PATH, runs)
-    return run
+    await _db(WorkbenchStore.update_run, run_id, {
+        "status": "completed",
+        "completed_at": _now(),
+        "file_name": file_name,
+        "file_path": dest_path,
+        "size_bytes": size,
+        "sha256": sha256
+    })
+    return await _db(WorkbenchStore.get_run, run_id)
 
 @router.post("/projects/{project_id}/query")
 async def query_project(project_id: str, query: str = Form(...)) -> Dict[str, Any]:
     """Run a simple query against project and produce an answer + evidence (mocked)"""
-    _ensure_store()
-    projects = _read_json(PROJECTS_PATH)
-    if project_id not in projects:
+    if await _db(WorkbenchStore.get_project, project_id) is None:
         raise HTTPException(status_code=404, detail="project not found")
-    runs = _read_json(RUNS_PATH)
     run_id = str(uuid.uuid4())
     # Produce a minimal answer + evidence pack for MVP
     evidence = [
@@ -117,39 +324,33 @@ async def query_project(project_id: str, query: str = Form(...)) -> Dict[str, An
         "project_id": project_id,
         "type": "query",
         "status": "completed",
-        "created_at": datetime.datetime.utcnow().isoformat(),
+        "created_at": _now(),
         "query": query,
         "answer": "This is a mocked answer for the query.",
         "evidence": evidence,
         "latency_ms": 120,
         "cost": {"estimate": 0.001}
     }
-    runs[run_id] = run
-    _write_json(RUNS_PATH, runs)
-    return run
+    return await _db(WorkbenchStore.create_run, run)
 
 @router.get("/runs/{run_id}")
 async def get_run(run_id: str) -> Dict[str, Any]:
-    _ensure_store()
-    runs = _read_json(RUNS_PATH)
-    if run_id not in runs:
+    run = await _db(WorkbenchStore.get_run, run_id)
+    if run is None:
         raise HTTPException(status_code=404, detail="run not found")
-    return runs[run_id]
+    return run
 
 @router.get("/runs/{run_id}/logs")
 async def get_run_logs(run_id: str):
-    _ensure_store()
-    runs = _read_json(RUNS_PATH)
-    if run_id not in runs:
+    if await _db(WorkbenchStore.get_run, run_id, with_logs=False) is None:
         raise HTTPException(status_code=404, detail="run not found")
     # return logs as plain JSON
-    return JSONResponse(content={"logs": runs[run_id].get("logs", [])})
+    return JSONResponse(content={"logs": await _db(WorkbenchStore.get_logs, run_id)})
 
 @router.post("/runs/{run_id}/replay")
 async def replay_run(run_id: str):
-    _ensure_store()
-    runs = _read_json(RUNS_PATH)
-    if run_id not in runs:
+    run = await _db(WorkbenchStore.get_run, run_id, with_logs=False)
+    if run is None:
         raise HTTPException(status_code=404, detail="run not found")
     # replay relies on artifacts/rag_project/<task_id> previously recorded traces
     # For MVP attempt to call existing replay runner if artifacts exist
@@ -158,7 +359,7 @@ async def replay_run(run_id: str):
     except Exception:
         raise HTTPException(status_code=500, detail="Replay runner not available")
     # Map run_id to artifact task id if present; for MVP assume task-golden or run_id
-    task_id = runs[run_id].get("task_id", "task-golden")
+    task_id = run.get("task_id", "task-golden")
     artifact_dir = os.path.join("artifacts", "rag_project", task_id)
     if not os.path.isdir(artifact_dir):
         raise HTTPException(status_code=404, detail=f"artifact directory not found for task {task_id}")
@@ -0,0 +1,335 @@
+"""
+Workbench Store: projects, runs and run logs in one SQLite database.
+
+Replaces the projects.json / runs.json files that every request read and
+rewrote in full:
+- runs are indexed by (status, created_ts), (project_id, created_ts) and
+  created_ts, so listings page with a keyset cursor instead of loading history
+- every write is its own transaction (BEGIN IMMEDIATE), so concurrent requests
+  and processes serialize instead of overwriting each other
+- log lines are appended to run_logs rather than rewriting the run record
+
+Legacy JSON stores found next to the database are imported once.
+"""
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+
+MAX_PAGE_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id TEXT PRIMARY KEY,
+    created_ts REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    project_id TEXT,
+    type TEXT,
+    status TEXT,
+    created_ts REAL NOT NULL,
+    updated_ts REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_created ON runs (created_ts, id);
+CREATE INDEX IF NOT EXISTS runs_status_created ON runs (status, created_ts, id);
+CREATE INDEX IF NOT EXISTS runs_project_created ON runs (project_id, created_ts, id);
+CREATE TABLE IF NOT EXISTS run_logs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    line TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS run_logs_run ON run_logs (run_id, seq);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def to_timestamp(value: Any) -> Optional[float]:
+    """Epoch seconds from a number, a numeric string or an ISO-8601 string (naive = UTC)"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parsed = datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.timestamp()
+
+
+class WorkbenchStore:
+    """
+    Transactional project / run store.
+
+    Run records are kept as JSON documents; the columns that listings filter
+    and sort on are mirrored into indexed columns on every write.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: 数据库路径；同目录下的 projects.json / runs.json 会被一次性导入
+        """
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._connection()
+        self._import_legacy(directory)
+
+    # ---- projects ----
+
+    def create_project(self, project: Dict[str, Any]) -> Dict[str, Any]:
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO projects (id, created_ts, data) VALUES (?, ?, ?)",
+                (project["id"], _created_ts(project), _dumps(project)),
+            )
+        return project
+
+    def get_project(self, project_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connection().execute("SELECT data FROM projects WHERE id = ?", (project_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list_projects(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = self._connection().execute("SELECT id, data FROM projects ORDER BY created_ts, id").fetchall()
+        return {pid: json.loads(data) for pid, data in rows}
+
+    # ---- runs ----
+
+    def create_run(self, run: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert a run; a `logs` list on the record seeds its log"""
+        run = dict(run)
+        logs = run.pop("logs", None) or []
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO runs (id, project_id, type, status, created_ts, updated_ts, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (run["id"], run.get("project_id"), run.get("type"), run.get("status"),
+                 _created_ts(run), now, _dumps(run)),
+            )
+            conn.executemany(
+                "INSERT INTO run_logs (run_id, ts, line) VALUES (?, ?, ?)",
+                [(run["id"], now, str(line)) for line in logs],
+            )
+        run["logs"] = list(logs)
+        return run
+
+    def update_run(
+        self,
+        run_id: str,
+        fields: Optional[Dict[str, Any]] = None,
+        mutate: Optional[Callable[[Dict[str, Any]], None]] = None,
+        log: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Read-modify-write one run inside a single write transaction.
+
+        Args:
+            fields: 要合并进记录的字段
+            mutate: 在事务内就地修改记录的回调（基于最新版本）
+            log: 同一事务内追加的一行日志
+
+        Returns:
+            更新后的记录；run 不存在时返回 None
+        """
+        with self._transaction() as conn:
+            row = conn.execute("SELECT data FROM runs WHERE id = ?", (run_id,)).fetchone()
+            if row is None:
+                return None
+            run = json.loads(row[0])
+            if fields:
+                run.update(fields)
+            if mutate is not None:
+                mutate(run)
+            run.pop("logs", None)
+            now = time.time()
+            conn.execute(
+                "UPDATE runs SET project_id = ?, type = ?, status = ?, updated_ts = ?, data = ? WHERE id = ?",
+                (run.get("project_id"), run.get("type"), run.get("status"), now, _dumps(run), run_id),
+            )
+            if log is not None:
+                conn.execute("INSERT INTO run_logs (run_id, ts, line) VALUES (?, ?, ?)", (run_id, now, log))
+        return run
+
+    def append_log(self, run_id: str, line: str) -> bool:
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM runs WHERE id = ?", (run_id,)).fetchone() is None:
+                return False
+            conn.execute("INSERT INTO run_logs (run_id, ts, line) VALUES (?, ?, ?)", (run_id, time.time(), line))
+        return True
+
+    def get_run(self, run_id: str, with_logs: bool = True) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connection().execute("SELECT data FROM runs WHERE id = ?", (run_id,)).fetchone()
+            if row is None:
+                return None
+            run = json.loads(row[0])
+            if with_logs:
+                run["logs"] = self.get_logs(run_id)
+        return run
+
+    def get_logs(self, run_id: str) -> List[str]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT line FROM run_logs WHERE run_id = ? ORDER BY seq", (run_id,)
+            ).fetchall()
+        return [line for (line,) in rows]
+
+    def list_runs(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        status: Optional[str] = None,
+        project_id: Optional[str] = None,
+        run_type: Optional[str] = None,
+        since: Any = None,
+        until: Any = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str], int]:
+        """
+        One page of runs, newest first.
+
+        Args:
+            limit: 页大小（上限 MAX_PAGE_SIZE）
+            cursor: 上一页返回的 next_cursor
+            since / until: created_at 的闭区间下界 / 开区间上界（epoch 秒或 ISO-8601）
+
+        Returns:
+            (runs, next_cursor, total)；next_cursor 为 None 表示没有更多
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        where, params = [], []
+        for column, value in (("status", status), ("project_id", project_id), ("type", run_type)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        since_ts, until_ts = to_timestamp(since), to_timestamp(until)
+        if since_ts is not None:
+            where.append("created_ts >= ?")
+            params.append(since_ts)
+        if until_ts is not None:
+            where.append("created_ts < ?")
+            params.append(until_ts)
+        filters = " AND ".join(where) or "1"
+
+        page_where, page_params = filters, list(params)
+        if cursor:
+            cursor_ts, _, cursor_id = cursor.partition(":")
+            page_where += " AND (created_ts < ? OR (created_ts = ? AND id < ?))"
+            page_params += [float(cursor_ts), float(cursor_ts), cursor_id]
+
+        with self._lock:
+            conn = self._connection()
+            total = conn.execute(f"SELECT COUNT(*) FROM runs WHERE {filters}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT id, created_ts, data FROM runs WHERE {page_where} "
+                "ORDER BY created_ts DESC, id DESC LIMIT ?",
+                page_params + [limit + 1],
+            ).fetchall()
+        next_cursor = f"{rows[limit - 1][1]!r}:{rows[limit - 1][0]}" if len(rows) > limit else None
+        return [json.loads(data) for _, _, data in rows[:limit]], next_cursor, total
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+            self._pid = None
+
+    # ---- sqlite ----
+
+    def _import_legacy(self, directory: str):
+        """一次性导入旧的 projects.json / runs.json"""
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone():
+                return
+            projects = _read_legacy(os.path.join(directory, "projects.json"))
+            runs = _read_legacy(os.path.join(directory, "runs.json"))
+            conn.executemany(
+                "INSERT OR IGNORE INTO projects (id, created_ts, data) VALUES (?, ?, ?)",
+                [(pid, _created_ts(p), _dumps(p)) for pid, p in projects.items()],
+            )
+            now = time.time()
+            for run_id, run in runs.items():
+                run = dict(run, id=run.get("id", run_id))
+                logs = run.pop("logs", None) or []
+                inserted = conn.execute(
+                    "INSERT OR IGNORE INTO runs (id, project_id, type, status, created_ts, updated_ts, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (run["id"], run.get("project_id"), run.get("type"), run.get("status"),
+                     _created_ts(run), now, _dumps(run)),
+                ).rowcount
+                if inserted:
+                    conn.executemany(
+                        "INSERT INTO run_logs (run_id, ts, line) VALUES (?, ?, ?)",
+                        [(run["id"], now, str(line)) for line in logs],
+                    )
+            conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_imported', ?)", (str(now),))
+
+    def _connection(self) -> sqlite3.Connection:
+        """每个进程一个连接；fork 出的子进程不复用父进程的连接"""
+        pid = os.getpid()
+        if self._conn is None or self._pid != pid:
+            self._conn = sqlite3.connect(
+                self.db_path, timeout=30.0, isolation_level=None, check_same_thread=False
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._pid = pid
+        return self._conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """写事务 (BEGIN IMMEDIATE)：跨进程串行化"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+
+def _created_ts(record: Dict[str, Any]) -> float:
+    try:
+        ts = to_timestamp(record.get("created_at"))
+    except ValueError:
+        ts = None
+    return ts if ts is not None else time.time()
+
+
+def _dumps(record: Dict[str, Any]) -> str:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+
+
+def _read_legacy(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
@@ -1,10 +1,11 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from backend.api import delivery, task
 from backend.api import data_intel
 from backend.orchestration import orchestrator
 from backend.api import workbench
+from runtime.platform.metrics import CONTENT_TYPE, MetricsMiddleware, MetricsRegistry
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -16,8 +17,15 @@ async def lifespan(app: FastAPI):
     except Exception:
         pass
     await orchestrator.initialize()
+    # Keep the artifact catalog fresh in the background; writers report files directly
+    from runtime.observability.artifact_catalog import get_catalog
+    catalog = get_catalog("artifacts")
+    catalog.start_watcher()
     yield
-    # Shutdown (if needed)
+    # Shutdown: flush debounced learner / memory state
+    from learning.write_behind import flush_all
+    flush_all()
+    catalog.stop_watcher()
 
 app = FastAPI(
     title="Agentic AI Delivery OS API",
@@ -31,6 +39,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(delivery.router, prefix="/api/delivery", tags=["delivery"])
 app.include_router(task.router, prefix="/api/task", tags=["task"])
@@ -43,6 +52,10 @@ app.include_router(workbench.router, prefix="/api", tags=["workbench"])
 async def health():
     return {"status": "ok"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(MetricsRegistry.get_default().render(), media_type=CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
     # Use module path so imports resolve when launched via `python -m backend.main`
@@ -3,7 +3,9 @@ Online RAG pipeline components (Phase 8 P2).
 
 This package contains:
 - Risk-Tier engine (R0–R4) for online queries
-- Online pipeline skeleton that maps Risk-Tier to retrieval / rerank / verification / HITL plans
+- Query classifier (intent / language) that tunes hybrid retrieval
+- Online query engine: Risk-Tier plans executed against a hybrid index under
+  per-tier latency budgets, with degradation and an answer cache
 """
 
 
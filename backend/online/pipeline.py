@@ -1,107 +1,614 @@
 """
-Online RAG pipeline skeleton with Risk-Tier as first-class control variable.
+Online RAG pipeline with Risk-Tier as first-class control variable.
 
-This module does NOT execute retrieval/generation yet. It:
-- Determines Risk-Tier
-- Builds retrieval / rerank / verification / HITL plans
-- Emits an auditable trace-like dict that can be logged / stored.
+    query → Risk-Tier → classification → retrieval (hybrid index) → rerank
+          → evidence packing → generation (LLMAdapter) → light verification
+
+Every tier has a latency budget (risk_tier.TIER_LATENCY). Stage costs are
+tracked as EWMAs; before running, the engine walks the tier's degradation
+ladder (skip_rerank → shrink_top_k → answer_from_cache) until the projected
+cost fits the budget, and generation is bounded by what is left of it.
+Each response carries per-stage timings and the degradations applied.
+
+With an index_root (a delivery's index directory) the engine serves the
+version its CURRENT pointer names and hot-swaps to a newly published one;
+queries already running finish on the index they started with.
+
+Runs fully offline: without an index the engine answers conservatively, and
+unless LLM_MODE=real, generation goes through a deterministic extractive
+stand-in client.
 """
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import json
+import os
+import re
+import threading
+import time
 
+from runtime.concurrency.sync_bridge import run_sync
+from runtime.rag_delivery.index_builder import CURRENT, VERSIONS, resolve_index
+from runtime.retrieval.hybrid_index import HybridIndex, hashed_embedding, tokenize
+
+from .query_classifier import QueryClassification, classify_query
 from .risk_tier import RiskTierDecision, determine_risk_tier, build_online_plans
 
+# Prior per-stage cost estimates (ms) before any query has been observed
+STAGE_PRIORS_MS = {"retrieve": 15.0, "rerank": 10.0, "pack": 1.0, "generate": 150.0}
+EWMA_ALPHA = 0.2
+MIN_TOP_K = 2
 
-def run_online_query(
-    profile: str,
-    query: str,
-    language: str = "auto",
-    index_version: str = "latest",
-    mode: str = "auto",
-    explicit_risk_tier: Optional[str] = None,
-) -> Dict[str, Any]:
+# Evidence character budget per tier
+EVIDENCE_CHARS = {"R0": 1200, "R1": 2000, "R2": 3000, "R3": 4000}
+
+RERANK_DIM = 1024
+
+ANSWER_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "answer": {"type": "string"},
+        "citations": {"type": "array"},
+    },
+    "required": ["answer", "citations"],
+}
+SYSTEM_PROMPT = (
+    "Answer the question using only the numbered evidence. "
+    "Return JSON with `answer` and `citations` (the evidence numbers used). "
+    "If the evidence does not contain the answer, return an empty answer."
+)
+CONSERVATIVE_ANSWER = "No sufficient evidence was found to answer this question."
+
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)?%?")
+
+
+class OnlineQueryEngine:
     """
-    Minimal online pipeline entry for Phase 8 P2 tests.
+    Executes online queries against one hybrid index.
 
-    Returns a structured dict capturing:
-    - risk_tier decision (tier/source/confidence)
-    - retrieval / rerank / verification plans
-    - hitl_policy
-    - high-level response contract compatible with /api/query expectations.
+    Holds the state that has to outlive a single query: the loaded index,
+    the LLM adapter, per-stage cost estimates and the answer cache.
     """
-    rt_decision: RiskTierDecision = determine_risk_tier(
-        profile=profile,
-        query=query,
-        explicit_tier=explicit_risk_tier,
-    )
-    plans = build_online_plans(rt_decision)
-    tier = rt_decision.risk_tier
-
-    # For now we don't call real retrieval/generation; we shape the response.
-    if tier == "R4":
-        answer = ""
-        verification_result = {
-            "passed": False,
-            "reasons": ["R4_forced_refusal"],
-            "risk_level": "high",
-        }
-        hitl_triggered = True
-    else:
-        # Stub answer; later this will be produced by the true generation pipeline.
-        answer = "stub answer"
-        verification_result = {
-            "passed": True,
-            "reasons": [],
-            "risk_level": "low" if tier in ("R0", "R1") else "medium",
-        }
-        hitl_triggered = False
 
-    return {
-        "answer": answer,
-        "citations": [],  # will be populated once retrieval/generation are wired
-        "verification": verification_result,
-        "trace": {
+    def __init__(
+        self,
+        index: Optional[HybridIndex] = None,
+        index_dir: Optional[str] = None,
+        index_version: Optional[str] = None,
+        index_root: Optional[str] = None,
+        llm_adapter=None,
+        stage_estimates_ms: Optional[Dict[str, float]] = None,
+        budgets_ms: Optional[Dict[str, int]] = None,
+        cache_size: int = 512,
+        cache_ttl_s: float = 600.0
+    ):
+        """
+        Args:
+            index: 已加载的 HybridIndex
+            index_dir: HybridIndex.save 的目录（index 为空时加载）
+            index_version: 索引版本标识，默认取目录名；配合 index_root 时为要服务的版本，"latest" 跟随 CURRENT
+            index_root: 交付索引根目录（versions/ + CURRENT），支持热切换
+            llm_adapter: LLMAdapter；为空时使用离线确定性替身（LLM_MODE=real 除外）
+            stage_estimates_ms: 各阶段耗时先验，覆盖 STAGE_PRIORS_MS
+            budgets_ms: 按 tier 覆盖延迟预算
+            cache_size: 答案缓存容量
+            cache_ttl_s: 答案缓存新鲜期（秒）；过期条目只在降级时使用
+        """
+        self.index_root = index_root
+        self._follow_current = bool(index_root) and index_version in (None, "", "latest")
+        self._pointer_stamp: Optional[Tuple[int, int, int]] = None
+        if index_root and not self._follow_current:
+            resolved = resolve_index(index_root, index_version)
+            index_dir = resolved[1] if resolved else None
+        if index is None and index_dir and os.path.exists(os.path.join(index_dir, "index_meta.json")):
+            index = HybridIndex.load(index_dir)
+        self.index = index
+        self.index_version = index_version or (
+            os.path.basename(os.path.normpath(index_dir)) if index_dir else "none"
+        )
+        self.llm_adapter = llm_adapter or _default_adapter()
+        self.stage_ms = dict(STAGE_PRIORS_MS)
+        self.stage_ms.update(stage_estimates_ms or {})
+        self.budgets_ms = dict(budgets_ms or {})
+        self.cache_size = cache_size
+        self.cache_ttl_s = cache_ttl_s
+        self._cache: "OrderedDict[Tuple[str, ...], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        if self._follow_current:
+            self.index_version = "none"
+            self.refresh()
+
+    def refresh(self) -> bool:
+        """
+        Load the version CURRENT points at, if it changed; True when a new index was swapped in.
+        Costs one stat() when nothing changed, so it runs before every query.
+        """
+        if not self._follow_current:
+            return False
+        try:
+            st = os.stat(os.path.join(self.index_root, CURRENT))
+        except OSError:
+            return False
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if stamp == self._pointer_stamp:
+            return False
+        resolved = resolve_index(self.index_root)
+        if resolved is None:
+            return False
+        version, path = resolved
+        swapped = False
+        if version != self.index_version:
+            index = HybridIndex.load(path)
+            with self._lock:
+                self.index, self.index_version = index, version
+            swapped = True
+        self._pointer_stamp = stamp
+        return swapped
+
+    # ---- entry ----
+
+    async def aquery(
+        self,
+        profile: str,
+        query: str,
+        language: str = "auto",
+        mode: str = "auto",
+        explicit_risk_tier: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
+        self.refresh()
+        with self._lock:
+            index, index_version = self.index, self.index_version
+
+        rt_decision: RiskTierDecision = determine_risk_tier(
+            profile=profile,
+            query=query,
+            explicit_tier=explicit_risk_tier,
+        )
+        plans = build_online_plans(rt_decision)
+        tier = rt_decision.risk_tier
+
+        t = time.perf_counter()
+        classification = classify_query(query, language)
+        timings["classify"] = _ms(t)
+
+        trace = {
             "risk_tier": plans["risk_tier"],
             "retrieval_plan": plans["retrieval_plan"],
             "rerank_plan": plans["rerank_plan"],
             "verification_plan": plans["verification_plan"],
             "hitl_policy": plans["hitl_policy"],
-            "hitl_triggered": hitl_triggered,
+            "latency_plan": plans["latency_plan"],
+            "hitl_triggered": False,
             "index_version": index_version,
             "mode": mode,
-            "language": language,
-        },
-    }
-
-
-
-
-
-
-
-
-
-
-
+            "language": classification.language if language in (None, "", "auto") else language,
+            "classification": classification.to_dict(),
+            "degradations": [],
+            "cache": "miss",
+        }
 
+        if tier == "R4":
+            trace["hitl_triggered"] = True
+            return self._respond("", [], {
+                "passed": False,
+                "reasons": ["R4_forced_refusal"],
+                "risk_level": "high",
+            }, trace, timings, started)
+
+        latency_plan = dict(plans["latency_plan"])
+        if tier in self.budgets_ms:
+            latency_plan["budget_ms"] = self.budgets_ms[tier]
+            trace["latency_plan"] = latency_plan
+        key = _cache_key(profile, tier, query, language, mode, filters)
+
+        cached, fresh = self._cache_get(key, index_version)
+        if cached is not None and fresh:
+            trace["cache"] = "hit"
+            return self._respond(
+                cached["answer"], cached["citations"], cached["verification"], trace, timings, started
+            )
+
+        # ---- plan against the budget ----
+        budget = float(latency_plan["budget_ms"])
+        base_top_k = max(MIN_TOP_K, round(latency_plan["top_k"] * classification.top_k_scale))
+        top_k = base_top_k
+        rerank_mode = plans["rerank_plan"]["mode"]
+        for step in latency_plan["degradation_ladder"]:
+            if self._projected_ms(rerank_mode, top_k, base_top_k) <= budget:
+                break
+            if step == "skip_rerank" and rerank_mode != "none":
+                rerank_mode = "none"
+                trace["degradations"].append(step)
+            elif step == "shrink_top_k" and top_k > MIN_TOP_K:
+                while top_k > MIN_TOP_K and self._projected_ms(rerank_mode, top_k, base_top_k) > budget:
+                    top_k = max(MIN_TOP_K, top_k // 2)
+                trace["degradations"].append(step)
+            elif step == "answer_from_cache" and cached is not None:
+                trace["degradations"].append(step)
+                trace["cache"] = "stale"
+                return self._respond(
+                    cached["answer"], cached["citations"], cached["verification"], trace, timings, started
+                )
+        trace["top_k"] = top_k
+        trace["rerank_executed"] = rerank_mode
+
+        # ---- retrieve ----
+        t = time.perf_counter()
+        hits = _retrieve(index, query, plans["retrieval_plan"], classification, top_k, filters)
+        timings["retrieve"] = _ms(t)
+        self._observe("retrieve", timings["retrieve"])
+
+        # ---- rerank ----
+        if rerank_mode != "none" and hits:
+            t = time.perf_counter()
+            hits = _rerank(query, hits, rerank_mode)
+            timings["rerank"] = _ms(t)
+            self._observe("rerank", timings["rerank"] * base_top_k / top_k)
+            if "llm" in rerank_mode:
+                # The LLM rerank pass needs a real model; offline the rule+model order stands
+                trace["rerank_executed"] = rerank_mode.replace("+llm", "")
+        hits = hits[:top_k]
+
+        # ---- pack ----
+        t = time.perf_counter()
+        evidence = _pack_evidence(hits, EVIDENCE_CHARS.get(tier, 2000))
+        timings["pack"] = _ms(t)
+        self._observe("pack", timings["pack"])
+
+        if not evidence:
+            return self._insufficient(tier, plans, trace, timings, started)
+
+        # ---- generate ----
+        t = time.perf_counter()
+        remaining = budget - (time.perf_counter() - started) * 1000
+        answer, citations, generation = await self._generate(
+            query, evidence, remaining, cached, trace
+        )
+        timings["generate"] = _ms(t)
+        if generation != "stale_cache":
+            self._observe("generate", timings["generate"] * base_top_k / top_k)
+        trace["generation"] = generation
+        if generation == "stale_cache":
+            return self._respond(
+                cached["answer"], cached["citations"], cached["verification"], trace, timings, started
+            )
+
+        # ---- verify ----
+        t = time.perf_counter()
+        verification = _verify(answer, citations, evidence, plans["verification_plan"]["level"], tier)
+        timings["verify"] = _ms(t)
+
+        if not answer:
+            return self._insufficient(tier, plans, trace, timings, started)
+        if not verification["passed"]:
+            if plans["hitl_policy"].get("on_verification_fail") == "refuse_and_hitl":
+                trace["hitl_triggered"] = True
+                answer, citations = "", []
+            else:
+                answer, citations = CONSERVATIVE_ANSWER, []
+
+        cited = [
+            {"id": ev["id"], "chunk_id": ev["chunk_id"], "text": ev["text"], "metadata": ev["metadata"]}
+            for ev in evidence if ev["id"] in citations
+        ]
+        if verification["passed"]:
+            self._cache_put(key, index_version, {"answer": answer, "citations": cited, "verification": verification})
+        return self._respond(answer, cited, verification, trace, timings, started)
+
+    # ---- stages ----
+
+    async def _generate(
+        self,
+        query: str,
+        evidence: List[Dict[str, Any]],
+        remaining_ms: float,
+        cached: Optional[Dict[str, Any]],
+        trace: Dict[str, Any]
+    ) -> Tuple[str, List[int], str]:
+        """(answer, citation ids, how it was produced)"""
+        prompt = "\n".join(
+            [f"Question: {query}", "Evidence:"] + [f"[{ev['id']}] {ev['text']}" for ev in evidence]
+        )
+        try:
+            result, meta = await asyncio.wait_for(
+                self.llm_adapter.call(SYSTEM_PROMPT, prompt, ANSWER_SCHEMA, meta={"prompt_version": "online-1"}),
+                timeout=max(remaining_ms, 1.0) / 1000
+            )
+        except asyncio.TimeoutError:
+            result, meta = {}, {"fallback_used": True, "failure_code": "timeout"}
+
+        if not meta.get("fallback_used") and isinstance(result.get("answer"), str):
+            citations = [c for c in result.get("citations", []) if isinstance(c, int)]
+            return result["answer"].strip(), citations, "llm"
+
+        trace["degradations"].append(f"generation_{meta.get('failure_code') or 'fallback'}")
+        if cached is not None and "answer_from_cache" in trace["latency_plan"]["degradation_ladder"]:
+            trace["cache"] = "stale"
+            return "", [], "stale_cache"
+        # Extractive fallback: lead sentence of the best evidence
+        lead = re.split(r"(?<=[.!?。！？])\s*", evidence[0]["text"], maxsplit=1)[0]
+        return lead.strip(), [evidence[0]["id"]], "extractive"
+
+    def _insufficient(
+        self,
+        tier: str,
+        plans: Dict[str, Any],
+        trace: Dict[str, Any],
+        timings: Dict[str, float],
+        started: float
+    ) -> Dict[str, Any]:
+        reasons = ["insufficient_evidence"]
+        if plans["hitl_policy"].get("on_insufficient_evidence") == "force_human":
+            trace["hitl_triggered"] = True
+            return self._respond("", [], {"passed": False, "reasons": reasons, "risk_level": "high"},
+                                 trace, timings, started)
+        return self._respond(CONSERVATIVE_ANSWER, [], {
+            "passed": True,
+            "reasons": reasons,
+            "risk_level": "low" if tier in ("R0", "R1") else "medium",
+        }, trace, timings, started)
+
+    # ---- budget ----
+
+    def _projected_ms(self, rerank_mode: str, top_k: int, base_top_k: int) -> float:
+        """Retrieval is flat; rerank / pack / generate scale with the evidence count"""
+        scale = top_k / base_top_k
+        per_item = self.stage_ms["pack"] + self.stage_ms["generate"]
+        if rerank_mode != "none":
+            per_item += self.stage_ms["rerank"]
+        return self.stage_ms["retrieve"] + per_item * scale
+
+    def _observe(self, stage: str, ms: float):
+        with self._lock:
+            self.stage_ms[stage] = (1 - EWMA_ALPHA) * self.stage_ms[stage] + EWMA_ALPHA * ms
+
+    # ---- answer cache ----
+
+    def _cache_get(self, key: Tuple[str, ...], index_version: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """(entry, fresh); entries from another index version or past their TTL are stale"""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None, False
+            self._cache.move_to_end(key)
+        fresh = (
+            entry["index_version"] == index_version
+            and time.time() - entry["cached_at"] <= self.cache_ttl_s
+        )
+        return entry, fresh
+
+    def _cache_put(self, key: Tuple[str, ...], index_version: str, response: Dict[str, Any]):
+        entry = dict(response, index_version=index_version, cached_at=time.time())
+        with self._lock:
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _respond(
+        self,
+        answer: str,
+        citations: List[Dict[str, Any]],
+        verification: Dict[str, Any],
+        trace: Dict[str, Any],
+        timings: Dict[str, float],
+        started: float
+    ) -> Dict[str, Any]:
+        timings["total"] = _ms(started)
+        return {
+            "answer": answer,
+            "citations": citations,
+            "verification": verification,
+            "timings_ms": timings,
+            "trace": trace,
+        }
 
 
+def _retrieve(
+    index: Optional[HybridIndex],
+    query: str,
+    retrieval_plan: Dict[str, Any],
+    classification: QueryClassification,
+    top_k: int,
+    filters: Optional[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    if index is None or not len(index):
+        return []
+    mode = "dense" if retrieval_plan["mode"] == "dense" else "hybrid"
+    # hybrid_full casts a wider candidate net for the reranker
+    candidates = top_k * (8 if retrieval_plan["mode"] == "hybrid_full" else 4)
+    return index.search(
+        query,
+        top_k=top_k * 2,
+        mode=mode,
+        dense_weight=classification.dense_weight,
+        candidates=candidates,
+        filter_metadata=filters if retrieval_plan.get("metadata_filter") else None,
+    )
 
 
+def _rerank(query: str, hits: List[Dict[str, Any]], mode: str) -> List[Dict[str, Any]]:
+    """
+    rule:  query-term coverage + exact phrase bonus
+    model: + cosine of wider hashed n-gram vectors
+    """
+    terms = set(tokenize(query))
+    phrase = _normalize(query)
+    q_vec = hashed_embedding(query, RERANK_DIM) if "model" in mode else None
+    scored = []
+    for hit in hits:
+        content = hit["content"]
+        score = len(terms & set(tokenize(content))) / max(len(terms), 1)
+        if phrase and phrase in _normalize(content):
+            score += 0.5
+        if q_vec is not None:
+            score += float(q_vec @ hashed_embedding(content, RERANK_DIM))
+        scored.append((-score, hit["rank"], hit))
+    scored.sort(key=lambda s: (s[0], s[1]))
+    return [dict(hit, rerank_score=-neg) for neg, _, hit in scored]
+
+
+def _pack_evidence(hits: List[Dict[str, Any]], max_chars: int) -> List[Dict[str, Any]]:
+    """Dedupe by normalized text, number from 1, stop at the character budget"""
+    evidence, seen, used = [], set(), 0
+    for hit in hits:
+        text = " ".join(hit["content"].split())
+        norm = _normalize(text)
+        if not norm or norm in seen:
+            continue
+        if used and used + len(text) > max_chars:
+            break
+        text = text[:max_chars]
+        seen.add(norm)
+        used += len(text)
+        evidence.append({
+            "id": len(evidence) + 1,
+            "chunk_id": hit["chunk_id"],
+            "text": text,
+            "metadata": hit.get("metadata", {}),
+            "score": hit["score"],
+        })
+    return evidence
+
+
+def _verify(
+    answer: str,
+    citations: List[int],
+    evidence: List[Dict[str, Any]],
+    level: str,
+    tier: str
+) -> Dict[str, Any]:
+    """
+    basic:   cited ids exist
+    claim:   + answer is cited
+    span:    + answer tokens appear in the cited evidence
+    numeric: + every number in the answer appears in the cited evidence
+    """
+    reasons = []
+    by_id = {ev["id"]: ev for ev in evidence}
+    if any(c not in by_id for c in citations):
+        reasons.append("unknown_citation")
+    cited_text = " ".join(by_id[c]["text"] for c in citations if c in by_id)
+    if answer and "claim" in level and not citations:
+        reasons.append("uncited_claim")
+    if answer and "span" in level and cited_text:
+        answer_tokens = set(tokenize(answer))
+        support = len(answer_tokens & set(tokenize(cited_text))) / max(len(answer_tokens), 1)
+        if support < 0.6:
+            reasons.append("span_unsupported")
+    if answer and "numeric" in level:
+        if any(num not in cited_text for num in _NUMBER.findall(answer)):
+            reasons.append("numeric_mismatch")
+    return {
+        "passed": not reasons,
+        "reasons": reasons,
+        "risk_level": "low" if tier in ("R0", "R1") else ("medium" if tier == "R2" else "high"),
+    }
 
 
+def _default_adapter():
+    from runtime.llm.adapter import LLMAdapter
+    if os.getenv("LLM_MODE", "").lower() == "real":
+        return LLMAdapter()
+    from runtime.llm.mock_client import ExtractiveMockLLMClient
+    return LLMAdapter(client=ExtractiveMockLLMClient())
 
 
+def _cache_key(
+    profile: str,
+    tier: str,
+    query: str,
+    language: str,
+    mode: str,
+    filters: Optional[Dict[str, Any]]
+) -> Tuple[str, ...]:
+    """Every request input that can change the answer; filters in canonical JSON so tenants never share entries"""
+    return (
+        profile or "", tier, _normalize(query), language or "auto", mode or "auto",
+        json.dumps(filters or {}, sort_keys=True, ensure_ascii=False, default=str),
+    )
 
 
+def _normalize(text: str) -> str:
+    return " ".join((text or "").lower().split())
 
 
+def _ms(since: float) -> float:
+    return round((time.perf_counter() - since) * 1000, 3)
 
 
+_engines: Dict[Tuple[Optional[str], str], OnlineQueryEngine] = {}
+_engines_lock = threading.Lock()
 
 
+def get_engine(index_dir: Optional[str] = None, index_version: str = "latest") -> OnlineQueryEngine:
+    """
+    One engine per (index directory, version), so the answer cache and cost estimates persist.
+    A delivery index root (versions/ + CURRENT) is served by version; any other
+    directory is loaded as a single HybridIndex.
+    """
+    key = (index_dir, index_version or "latest")
+    with _engines_lock:
+        if key not in _engines:
+            if index_dir and (
+                os.path.isdir(os.path.join(index_dir, VERSIONS)) or os.path.exists(os.path.join(index_dir, CURRENT))
+            ):
+                _engines[key] = OnlineQueryEngine(index_root=index_dir, index_version=key[1])
+            else:
+                _engines[key] = OnlineQueryEngine(index_dir=index_dir)
+        return _engines[key]
+
+
+async def arun_online_query(
+    profile: str,
+    query: str,
+    language: str = "auto",
+    index_version: str = "latest",
+    mode: str = "auto",
+    explicit_risk_tier: Optional[str] = None,
+    index_dir: Optional[str] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    engine: Optional[OnlineQueryEngine] = None,
+) -> Dict[str, Any]:
+    engine = engine or get_engine(index_dir, index_version)
+    result = await engine.aquery(
+        profile, query, language=language, mode=mode,
+        explicit_risk_tier=explicit_risk_tier, filters=filters
+    )
+    if engine.index is None:
+        result["trace"]["index_version"] = index_version
+    return result
 
 
+def run_online_query(
+    profile: str,
+    query: str,
+    language: str = "auto",
+    index_version: str = "latest",
+    mode: str = "auto",
+    explicit_risk_tier: Optional[str] = None,
+    index_dir: Optional[str] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    engine: Optional[OnlineQueryEngine] = None,
+) -> Dict[str, Any]:
+    """
+    Synchronous online pipeline entry.
 
+    Returns a structured dict capturing:
+    - answer / citations / verification (the /api/query response contract)
+    - timings_ms per stage and total
+    - trace: risk_tier decision, retrieval / rerank / verification / latency plans,
+      hitl_policy, classification, degradations applied and cache outcome.
 
+    Safe to call from inside a running event loop (runs on a helper thread).
+    """
+    coro = arun_online_query(
+        profile, query, language=language, index_version=index_version, mode=mode,
+        explicit_risk_tier=explicit_risk_tier, index_dir=index_dir, filters=filters, engine=engine
+    )
+    return run_sync(coro, thread_name="online-query")
@@ -0,0 +1,78 @@
+"""
+Query classification for the online pipeline (Phase 8 · P2)
+
+Rule-based, deterministic. Decides how a query is retrieved, independent of
+its Risk-Tier:
+  lookup      – short factual question       → sparse-leaning hybrid
+  numeric     – asks for numbers / rates     → sparse-leaning hybrid
+  procedural  – how-to / steps               → balanced hybrid
+  comparison  – compares options             → dense-leaning, wider top_k
+  open        – everything else              → dense-leaning hybrid
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, asdict, field
+from typing import Any, Dict, List
+
+from runtime.retrieval.hybrid_index import tokenize
+
+
+QUERY_INTENTS = ("lookup", "numeric", "procedural", "comparison", "open")
+
+NUMERIC_KEYWORDS = ("how much", "how many", "rate", "percent", "price", "多少", "几", "比例", "利率", "收益率", "金额")
+PROCEDURAL_KEYWORDS = ("how to", "how do", "steps", "procedure", "如何", "怎么", "怎样", "步骤", "流程")
+COMPARISON_KEYWORDS = (" vs ", "versus", "compare", "difference", "better", "区别", "对比", "比较", "哪个好")
+LOOKUP_PREFIXES = ("what is", "what's", "who ", "when ", "where ", "which ")
+LOOKUP_KEYWORDS = ("什么是", "是什么", "是谁", "何时", "哪里", "哪个")
+
+# intent -> (dense_weight, top_k multiplier)
+INTENT_RETRIEVAL = {
+    "lookup": (0.35, 1.0),
+    "numeric": (0.3, 1.0),
+    "procedural": (0.5, 1.0),
+    "comparison": (0.65, 1.5),
+    "open": (0.6, 1.0),
+}
+
+
+@dataclass
+class QueryClassification:
+    intent: str
+    language: str
+    terms: List[str] = field(default_factory=list)
+
+    @property
+    def dense_weight(self) -> float:
+        return INTENT_RETRIEVAL[self.intent][0]
+
+    @property
+    def top_k_scale(self) -> float:
+        return INTENT_RETRIEVAL[self.intent][1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["dense_weight"] = self.dense_weight
+        return data
+
+
+def detect_language(query: str) -> str:
+    """zh if the query contains any CJK character, else en"""
+    return "zh" if any("\u4e00" <= ch <= "\u9fff" for ch in query or "") else "en"
+
+
+def classify_query(query: str, language: str = "auto") -> QueryClassification:
+    q = f" {(query or '').lower().strip()} "
+    lang = detect_language(query) if language in (None, "", "auto") else language
+
+    if any(k in q for k in COMPARISON_KEYWORDS):
+        intent = "comparison"
+    elif any(k in q for k in PROCEDURAL_KEYWORDS):
+        intent = "procedural"
+    elif any(k in q for k in NUMERIC_KEYWORDS):
+        intent = "numeric"
+    elif q.lstrip().startswith(LOOKUP_PREFIXES) or any(k in q for k in LOOKUP_KEYWORDS):
+        intent = "lookup"
+    else:
+        intent = "open"
+
+    return QueryClassification(intent=intent, language=lang, terms=sorted(set(tokenize(query))))
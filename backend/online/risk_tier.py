@@ -16,6 +16,18 @@ from typing import Any, Dict, Optional
 
 RISK_TIERS = ("R0", "R1", "R2", "R3", "R4")
 
+# Latency budget (ms), evidence top_k and degradation ladder per tier.
+# Ladder steps are applied in order while the projected latency exceeds the budget:
+#   skip_rerank → shrink_top_k → answer_from_cache
+# R3 keeps its rerank (strong verification depends on it); R4 never runs.
+TIER_LATENCY = {
+    "R0": {"budget_ms": 300, "top_k": 3, "degradation_ladder": ["skip_rerank", "shrink_top_k", "answer_from_cache"]},
+    "R1": {"budget_ms": 800, "top_k": 5, "degradation_ladder": ["skip_rerank", "shrink_top_k", "answer_from_cache"]},
+    "R2": {"budget_ms": 1500, "top_k": 6, "degradation_ladder": ["skip_rerank", "shrink_top_k", "answer_from_cache"]},
+    "R3": {"budget_ms": 3000, "top_k": 8, "degradation_ladder": ["shrink_top_k", "answer_from_cache"]},
+    "R4": {"budget_ms": 0, "top_k": 0, "degradation_ladder": []},
+}
+
 
 @dataclass
 class RiskTierDecision:
@@ -95,7 +107,7 @@ def determine_risk_tier(
 
 def build_online_plans(decision: RiskTierDecision) -> Dict[str, Any]:
     """
-    Map Risk-Tier to retrieval / rerank / verification / HITL behaviour.
+    Map Risk-Tier to retrieval / rerank / verification / HITL / latency behaviour.
     This does not execute the behaviour; it emits a structured, auditable plan.
     """
     tier = decision.risk_tier
@@ -152,12 +164,20 @@ def build_online_plans(decision: RiskTierDecision) -> Dict[str, Any]:
             "on_verification_fail": "conservative_answer",
         }
 
+    latency = TIER_LATENCY[tier]
+    latency_plan = {
+        "budget_ms": latency["budget_ms"],
+        "top_k": latency["top_k"],
+        "degradation_ladder": list(latency["degradation_ladder"]),
+    }
+
     return {
         "risk_tier": decision.to_dict(),
         "retrieval_plan": retrieval_plan,
         "rerank_plan": rerank_plan,
         "verification_plan": verification_plan,
         "hitl_policy": hitl_policy,
+        "latency_plan": latency_plan,
     }
 
 
@@ -1,13 +1,35 @@
 """
 Generation Reranker - Rerank candidates based on multiple criteria
 L5 Core Component: Intelligent candidate selection
+
+Scoring is vectorized: features of every candidate of every request in a batch
+are computed as arrays in one pass, and totals come from a pluggable linear
+scoring model (default weights, or weights trained locally from feedback).
+Results go to a buffered append-only log (rerank_log.jsonl).
 """
 
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
 from datetime import datetime
 import json
 import os
+import time
+
+import numpy as np
+
+from learning.write_behind import WriteBehindBuffer
+
+FEATURES = ("evidence_coverage", "consistency", "cost_efficiency", "confidence")
+
+DEFAULT_WEIGHTS = {
+    "evidence_coverage": 0.35,
+    "consistency": 0.25,
+    "cost_efficiency": 0.20,
+    "confidence": 0.20
+}
+
+REASONING_WORDS = ("because", "therefore", "since")
+MAX_REASONABLE_COST = 0.10
 
 
 class RankingScore(BaseModel):
@@ -38,6 +60,75 @@ class RerankerResult(BaseModel):
     created_at: datetime = Field(default_factory=datetime.now)
 
 
+class LinearScoringModel:
+    """
+    total_score = bias + Σ weight_f · feature_f over FEATURES.
+    Hand-set weights are normalized to sum to 1; fitted weights are used as-is.
+    """
+    
+    def __init__(
+        self,
+        weights: Optional[Dict[str, float]] = None,
+        bias: float = 0.0,
+        normalize: bool = True,
+        version: str = "default"
+    ):
+        weights = dict(weights or DEFAULT_WEIGHTS)
+        missing = [f for f in FEATURES if f not in weights]
+        if missing:
+            raise ValueError(f"missing weights for {missing}")
+        if normalize:
+            total = sum(weights[f] for f in FEATURES)
+            weights = {f: weights[f] / total for f in FEATURES}
+        self.weights = {f: float(weights[f]) for f in FEATURES}
+        self.bias = float(bias)
+        self.version = version
+        self._vector = np.array([self.weights[f] for f in FEATURES], dtype=np.float64)
+    
+    def score(self, features: np.ndarray) -> np.ndarray:
+        """(n, len(FEATURES)) feature matrix -> (n,) total scores"""
+        return features @ self._vector + self.bias
+    
+    @classmethod
+    def fit(
+        cls,
+        features: np.ndarray,
+        targets: Sequence[float],
+        l2: float = 1e-3,
+        version: Optional[str] = None
+    ) -> "LinearScoringModel":
+        """
+        Ridge regression of observed quality (e.g. feedback / evaluation scores)
+        on reranker features; closed form, runs locally in milliseconds.
+        """
+        X = np.asarray(features, dtype=np.float64)
+        y = np.asarray(targets, dtype=np.float64)
+        X1 = np.hstack([X, np.ones((len(X), 1))])
+        reg = l2 * np.eye(X1.shape[1])
+        reg[-1, -1] = 0.0  # bias is not regularized
+        coef = np.linalg.solve(X1.T @ X1 + reg, X1.T @ y)
+        return cls(
+            weights=dict(zip(FEATURES, coef[:-1].tolist())),
+            bias=float(coef[-1]),
+            normalize=False,
+            version=version or f"fit_{int(time.time())}"
+        )
+    
+    def save(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"weights": self.weights, "bias": self.bias, "version": self.version}, f, indent=2)
+    
+    @classmethod
+    def load(cls, path: str) -> "LinearScoringModel":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(weights=data["weights"], bias=data.get("bias", 0.0), normalize=False,
+                   version=data.get("version", os.path.basename(path)))
+
+
 class GenerationReranker:
     """
     Reranks generated candidates based on multiple criteria
@@ -47,22 +138,28 @@ class GenerationReranker:
     def __init__(
         self,
         artifacts_path: str = "artifacts/reranking",
-        weights: Optional[Dict[str, float]] = None
+        weights: Optional[Dict[str, float]] = None,
+        scoring_model: Optional[Union[LinearScoringModel, str]] = None,
+        log_flush_interval_s: float = 5.0
     ):
+        """
+        Args:
+            artifacts_path: 重排日志目录
+            weights: 手工权重（归一化）；scoring_model 为空时使用
+            scoring_model: LinearScoringModel 或其 JSON 路径（本地训练的权重）
+            log_flush_interval_s: 追加日志的最大落盘延迟
+        """
         self.artifacts_path = artifacts_path
         os.makedirs(artifacts_path, exist_ok=True)
         
-        # Default weights for scoring
-        self.weights = weights or {
-            "evidence_coverage": 0.35,
-            "consistency": 0.25,
-            "cost_efficiency": 0.20,
-            "confidence": 0.20
-        }
+        if isinstance(scoring_model, str):
+            scoring_model = LinearScoringModel.load(scoring_model)
+        self.scoring_model = scoring_model or LinearScoringModel(weights)
+        self.weights = dict(self.scoring_model.weights)
         
-        # Ensure weights sum to 1.0
-        total = sum(self.weights.values())
-        self.weights = {k: v/total for k, v in self.weights.items()}
+        # Buffered append-only result log; I/O happens on the shared flusher thread
+        self.log_path = os.path.join(artifacts_path, "rerank_log.jsonl")
+        self._log = WriteBehindBuffer(flush_interval_s=log_flush_interval_s, inline_flush=False)
     
     def rerank(
         self,
@@ -79,141 +176,91 @@ class GenerationReranker:
         Returns:
             RerankerResult with chosen and rejected candidates
         """
-        # Score all candidates
-        scored_candidates = []
-        
-        for candidate in candidates:
-            score = self._compute_score(candidate, context)
-            
-            ranked = RankedCandidate(
-                candidate_id=candidate.candidate_id,
-                content=candidate.content,
-                rank=0,  # Will be assigned after sorting
-                score=score,
-                rationale=self._generate_rationale(score)
-            )
-            scored_candidates.append(ranked)
-        
-        # Sort by total score
-        scored_candidates.sort(key=lambda x: x.score.total_score, reverse=True)
-        
-        # Assign ranks
-        for i, candidate in enumerate(scored_candidates):
-            candidate.rank = i + 1
-        
-        # Select best and separate rejected
-        chosen = scored_candidates[0]
-        rejected = scored_candidates[1:]
-        
-        # Generate selection rationale
-        selection_rationale = self._generate_selection_rationale(chosen, rejected)
-        
-        result = RerankerResult(
-            request_id=f"rerank_{chosen.candidate_id}",
-            chosen_candidate=chosen,
-            rejected_candidates=rejected,
-            selection_rationale=selection_rationale,
-            reranking_strategy=strategy
-        )
-        
-        # Save result
-        self._save_result(result)
-        
-        return result
+        return self.rerank_batch([(candidates, context)], strategy=strategy).result(0)
     
-    def _compute_score(self, candidate: Any, context: Dict[str, Any]) -> RankingScore:
-        """Compute comprehensive score for a candidate"""
-        # 1. Evidence Coverage Score
-        evidence_coverage = self._score_evidence_coverage(candidate, context)
-        
-        # 2. Consistency Score
-        consistency = self._score_consistency(candidate, context)
-        
-        # 3. Cost Efficiency Score
-        cost_efficiency = self._score_cost_efficiency(candidate)
-        
-        # 4. Confidence Score
-        confidence = self._score_confidence(candidate)
-        
-        # Compute weighted total
-        total_score = (
-            self.weights["evidence_coverage"] * evidence_coverage +
-            self.weights["consistency"] * consistency +
-            self.weights["cost_efficiency"] * cost_efficiency +
-            self.weights["confidence"] * confidence
-        )
-        
-        return RankingScore(
-            evidence_coverage=evidence_coverage,
-            consistency=consistency,
-            cost_efficiency=cost_efficiency,
-            confidence=confidence,
-            total_score=total_score
+    def rerank_batch(
+        self,
+        requests: Sequence[Tuple[List[Any], Dict[str, Any]]],
+        strategy: str = "multi_criteria"
+    ) -> "BatchRerankResult":
+        """
+        Rerank many requests at once.
+        Args:
+            requests: (candidates, context) per request; every request needs at least one candidate
+            strategy: Reranking strategy
+        Returns:
+            BatchRerankResult (arrays; RerankerResult objects are built on demand)
+        """
+        candidates = [c for cands, _ in requests for c in cands]
+        counts = np.fromiter((len(cands) for cands, _ in requests), dtype=np.int64, count=len(requests))
+        if (counts == 0).any():
+            raise ValueError("every request needs at least one candidate")
+        request_idx = np.repeat(np.arange(len(requests)), counts)
+        contexts = [ctx for _, ctx in requests]
+        
+        features = self.extract_features(candidates, [contexts[i] for i in request_idx])
+        totals = self.scoring_model.score(features)
+        
+        # Best first within each request; ties keep generation order (lexsort is stable)
+        order = np.lexsort((-totals, request_idx))
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        batch = BatchRerankResult(self, candidates, features, totals, order, offsets, strategy)
+        self._log_batch(batch)
+        return batch
+    
+    def extract_features(self, candidates: Sequence[Any], contexts: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """
+        (n, len(FEATURES)) feature matrix; `contexts[i]` is the context of `candidates[i]`.
+        Text signals are collected in a single pass, the scores are array arithmetic.
+        """
+        n = len(candidates)
+        length = np.empty(n)
+        long_enough = np.empty(n, dtype=bool)
+        cited = np.empty(n, dtype=bool)
+        reasoning = np.empty(n, dtype=bool)
+        cost = np.empty(n)
+        quality = np.empty(n)
+        has_docs = np.empty(n, dtype=bool)
+        for i, (candidate, context) in enumerate(zip(candidates, contexts)):
+            content = candidate.content
+            lower = content.lower()
+            length[i] = len(lower)
+            long_enough[i] = len(content.split()) > 10
+            cited[i] = "[" in lower or "based on" in lower
+            reasoning[i] = any(word in lower for word in REASONING_WORDS)
+            cost[i] = candidate.estimated_cost
+            quality[i] = candidate.estimated_quality
+            has_docs[i] = "documents" in context
+        
+        # Evidence coverage: longer, cited responses likely cover more evidence
+        coverage = np.where(
+            has_docs,
+            (np.minimum(1.0, length / 200) + np.where(cited, 1.0, 0.7)) / 2,
+            0.5
         )
+        # Consistency: base 0.6, reasoning markers and non-trivial length add 0.2 each
+        consistency = np.minimum(1.0, 0.6 + 0.2 * reasoning + 0.2 * long_enough)
+        # Cost efficiency: cheapness and quality per dollar
+        cost_score = 1.0 - np.minimum(1.0, cost / MAX_REASONABLE_COST)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            efficiency = np.where(cost > 0, np.minimum(1.0, quality / np.where(cost > 0, cost, 1.0) / 50), 1.0)
+        cost_efficiency = (cost_score + efficiency) / 2
+        
+        return np.column_stack([coverage, consistency, cost_efficiency, quality])
     
-    def _score_evidence_coverage(self, candidate: Any, context: Dict[str, Any]) -> float:
-        """Score based on evidence coverage"""
-        # Simplified: check if candidate references context
-        if "documents" not in context:
-            return 0.5  # Default score if no documents
-        
-        doc_count = len(context.get("documents", []))
-        content_lower = candidate.content.lower()
-        
-        # Simple heuristic: longer responses likely cover more evidence
-        content_length_score = min(1.0, len(content_lower) / 200)
-        
-        # Check for citation markers (simplified)
-        has_citations = "[" in content_lower or "based on" in content_lower
-        citation_score = 1.0 if has_citations else 0.7
-        
-        return (content_length_score + citation_score) / 2
+    def flush(self):
+        """Write buffered log records now"""
+        self._log.flush()
     
-    def _score_consistency(self, candidate: Any, context: Dict[str, Any]) -> float:
-        """Score based on consistency with evidence"""
-        # Simplified consistency check
-        # In production, would use semantic similarity or LLM judge
-        
-        # Check if candidate content contradicts obvious facts
-        content_lower = candidate.content.lower()
-        
-        # Positive indicators
-        has_reasoning = any(word in content_lower for word in ["because", "therefore", "since"])
-        is_coherent = len(candidate.content.split()) > 10  # Not too short
-        
-        score = 0.6  # Base score
-        if has_reasoning:
-            score += 0.2
-        if is_coherent:
-            score += 0.2
-        
-        return min(1.0, score)
+    def score(self, candidate: Any, context: Dict[str, Any]) -> RankingScore:
+        """Score a single candidate (used for early termination while candidates stream in)"""
+        return self._compute_score(candidate, context)
     
-    def _score_cost_efficiency(self, candidate: Any) -> float:
-        """Score based on cost efficiency"""
-        # Normalize cost (assuming max reasonable cost is $0.10)
-        max_cost = 0.10
-        cost = candidate.estimated_cost
-        
-        # Lower cost = higher score
-        cost_score = 1.0 - min(1.0, cost / max_cost)
-        
-        # Factor in quality
-        quality = candidate.estimated_quality
-        
-        # Efficiency: quality per dollar
-        if cost > 0:
-            efficiency = quality / cost
-            efficiency_score = min(1.0, efficiency / 50)  # Normalize
-        else:
-            efficiency_score = 1.0
-        
-        return (cost_score + efficiency_score) / 2
-    
-    def _score_confidence(self, candidate: Any) -> float:
-        """Score based on model confidence"""
-        # Use estimated quality as proxy for confidence
-        return candidate.estimated_quality
+    def _compute_score(self, candidate: Any, context: Dict[str, Any]) -> RankingScore:
+        """Compute comprehensive score for a candidate"""
+        features = self.extract_features([candidate], [context])
+        row = features[0].tolist()
+        return RankingScore(**dict(zip(FEATURES, row)), total_score=float(self.scoring_model.score(features)[0]))
     
     def _generate_rationale(self, score: RankingScore) -> str:
         """Generate human-readable rationale for score"""
@@ -269,11 +316,92 @@ class GenerationReranker:
         
         return " ".join(rationale_parts)
     
-    def _save_result(self, result: RerankerResult):
-        """Save reranking result to artifacts"""
-        path = os.path.join(self.artifacts_path, f"{result.request_id}.json")
-        with open(path, 'w') as f:
-            f.write(result.model_dump_json(indent=2))
+    def _log_batch(self, batch: "BatchRerankResult"):
+        """Append one compact record per request to the buffered log"""
+        ts = time.time()
+        ids = [c.candidate_id for c in batch.candidates]
+        ranked_ids = [ids[i] for i in batch.order.tolist()]
+        ranked_scores = np.round(batch.totals[batch.order], 6).tolist()
+        bounds = batch.offsets.tolist()
+        for r in range(len(batch)):
+            start, end = bounds[r], bounds[r + 1]
+            self._log.append(self.log_path, {
+                "request_id": f"rerank_{ranked_ids[start]}",
+                "strategy": batch.strategy,
+                "model_version": self.scoring_model.version,
+                "chosen": ranked_ids[start],
+                "ranking": ranked_ids[start:end],
+                "scores": ranked_scores[start:end],
+                "ts": ts,
+            })
+
+
+class BatchRerankResult:
+    """
+    Reranked batch as arrays over the flattened candidates:
+        features  (n, len(FEATURES))
+        totals    (n,)
+        order     candidate indices, best first within each request
+        offsets   request r owns order[offsets[r]:offsets[r + 1]]
+    """
+    
+    def __init__(
+        self,
+        reranker: GenerationReranker,
+        candidates: List[Any],
+        features: np.ndarray,
+        totals: np.ndarray,
+        order: np.ndarray,
+        offsets: np.ndarray,
+        strategy: str
+    ):
+        self.reranker = reranker
+        self.candidates = candidates
+        self.features = features
+        self.totals = totals
+        self.order = order
+        self.offsets = offsets
+        self.strategy = strategy
+        self.created_at = datetime.now()
+    
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+    
+    @property
+    def chosen_indices(self) -> np.ndarray:
+        """Index (into candidates) of the chosen candidate of each request"""
+        return self.order[self.offsets[:-1]]
+    
+    def chosen(self, r: int) -> Any:
+        return self.candidates[int(self.order[self.offsets[r]])]
+    
+    def ranking(self, r: int) -> List[Any]:
+        return [self.candidates[i] for i in self.order[self.offsets[r]:self.offsets[r + 1]].tolist()]
+    
+    def result(self, r: int) -> RerankerResult:
+        """Full RerankerResult of request r"""
+        ranked = []
+        for rank, i in enumerate(self.order[self.offsets[r]:self.offsets[r + 1]].tolist(), start=1):
+            score = RankingScore(**dict(zip(FEATURES, self.features[i].tolist())), total_score=float(self.totals[i]))
+            ranked.append(RankedCandidate(
+                candidate_id=self.candidates[i].candidate_id,
+                content=self.candidates[i].content,
+                rank=rank,
+                score=score,
+                rationale=self.reranker._generate_rationale(score)
+            ))
+        chosen, rejected = ranked[0], ranked[1:]
+        return RerankerResult(
+            request_id=f"rerank_{chosen.candidate_id}",
+            chosen_candidate=chosen,
+            rejected_candidates=rejected,
+            selection_rationale=self.reranker._generate_selection_rationale(chosen, rejected),
+            reranking_strategy=self.strategy,
+            created_at=self.created_at
+        )
+    
+    def results(self) -> List[RerankerResult]:
+        return [self.result(r) for r in range(len(self))]
 
 
 # Singleton instance
@@ -4,7 +4,8 @@ L5 Core Component: Generation Layer Enhancement
 
 Features:
 - Real LLM-based candidate generation
-- Multiple generation strategies
+- Multiple generation strategies, all fanned out concurrently
+- Shared concurrency / per-request cost caps, hedged requests, early stop
 - Quality scoring integration
 - Cost tracking per candidate
 """
@@ -17,6 +18,10 @@ import os
 import uuid
 import asyncio
 import time
+import weakref
+from collections import deque
+
+from runtime.concurrency.sync_bridge import run_sync
 
 # Import LLM adapter
 try:
@@ -51,7 +56,11 @@ class MultiCandidateResult(BaseModel):
     candidates: List[GenerationCandidate]
     generation_strategy: str
     total_cost: float
-    total_latency_ms: float
+    total_latency_ms: float  # Sum over candidates
+    wall_clock_ms: float = 0.0
+    hedged_requests: int = 0
+    skipped_candidates: int = 0
+    early_stopped: bool = False
     created_at: datetime = Field(default_factory=datetime.now)
 
 
@@ -61,10 +70,34 @@ class MultiCandidateGenerator:
     Generates multiple candidate responses using real LLM calls.
     """
     
-    def __init__(self, artifacts_path: str = "artifacts/generation"):
+    def __init__(
+        self,
+        artifacts_path: str = "artifacts/generation",
+        max_concurrency: int = 8,
+        max_cost_per_request: Optional[float] = None,
+        hedge_after_ms: Optional[float] = None,
+        estimated_call_cost: Optional[float] = None
+    ):
+        """
+        Args:
+            artifacts_path: 生成结果保存目录
+            max_concurrency: 同一事件循环内并发 LLM 调用上限（所有请求共享）
+            max_cost_per_request: 单次请求的成本上限（USD），达到后不再发起新调用
+            hedge_after_ms: 调用超过该时长未返回时发起对冲请求；为空时使用近期延迟 p90，0 关闭对冲
+            estimated_call_cost: 单次调用的预估成本，用于发起前预留成本；为空时使用近期调用成本均值
+        """
         self.artifacts_path = artifacts_path
         os.makedirs(artifacts_path, exist_ok=True)
         
+        # Shared caps
+        self.max_concurrency = max_concurrency
+        self.max_cost_per_request = max_cost_per_request
+        self.hedge_after_ms = hedge_after_ms
+        self.estimated_call_cost = estimated_call_cost
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+        self._latencies: deque = deque(maxlen=200)
+        self._call_costs: deque = deque(maxlen=200)
+        
         # Initialize LLM adapter
         self.llm_adapter = get_llm_adapter() if LLM_AVAILABLE else None
         
@@ -99,10 +132,16 @@ Your response should be:
         context: Dict[str, Any],
         num_candidates: int = 3,
         strategy: str = "temperature_sampling",
-        task_id: Optional[str] = None
+        task_id: Optional[str] = None,
+        reranker: Optional[Any] = None,
+        confidence_threshold: Optional[float] = None
     ) -> MultiCandidateResult:
         """
-        Generate multiple candidates asynchronously using real LLM.
+        Generate multiple candidates concurrently using real LLM.
+        
+        Every strategy fans out all of its candidates at once, bounded by the
+        generator's concurrency and per-request cost caps. Slow calls are
+        hedged with a duplicate request; the first response wins.
         
         Args:
             query: User query
@@ -110,6 +149,8 @@ Your response should be:
             num_candidates: Number of candidates to generate
             strategy: Generation strategy
             task_id: Optional task ID for tracking
+            reranker: Optional GenerationReranker used for early termination
+            confidence_threshold: Stop once a candidate's reranker score reaches it
             
         Returns:
             MultiCandidateResult with all candidates
@@ -118,15 +159,16 @@ Your response should be:
         start_time = time.time()
         
         # Select strategy
-        generator_func = self.strategies.get(strategy, self._generate_temperature_variants)
+        spec_builder = self.strategies.get(strategy, self._generate_temperature_variants)
+        specs = spec_builder(query, context, num_candidates, task_id)
         
-        # Generate candidates (async)
-        candidates = await generator_func(query, context, num_candidates, task_id)
+        # Generate candidates (concurrently)
+        candidates, stats = await self._fan_out(specs, context, reranker, confidence_threshold)
         
         total_time = (time.time() - start_time) * 1000
         
         # Compute totals
-        total_cost = sum(c.estimated_cost for c in candidates)
+        total_cost = sum(c.estimated_cost for c in candidates) + stats["hedge_cost"]
         total_latency = sum(c.generation_latency_ms for c in candidates)
         
         result = MultiCandidateResult(
@@ -136,7 +178,11 @@ Your response should be:
             candidates=candidates,
             generation_strategy=strategy,
             total_cost=total_cost,
-            total_latency_ms=total_latency
+            total_latency_ms=total_latency,
+            wall_clock_ms=total_time,
+            hedged_requests=stats["hedged"],
+            skipped_candidates=stats["skipped"],
+            early_stopped=stats["early_stopped"]
         )
         
         # Save result
@@ -149,34 +195,31 @@ Your response should be:
         query: str,
         context: Dict[str, Any],
         num_candidates: int = 3,
-        strategy: str = "temperature_sampling"
+        strategy: str = "temperature_sampling",
+        **kwargs
     ) -> MultiCandidateResult:
         """
         Synchronous wrapper for generate_candidates_async.
+        Safe to call from inside a running event loop (runs on a helper thread).
         """
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-        
-        return loop.run_until_complete(
-            self.generate_candidates_async(query, context, num_candidates, strategy)
+        return run_sync(
+            self.generate_candidates_async(query, context, num_candidates, strategy, **kwargs),
+            thread_name="multi-candidate-generation"
         )
     
-    async def _generate_temperature_variants(
+    # ---- strategies: each returns the call specs of its candidates ----
+    
+    def _generate_temperature_variants(
         self,
         query: str,
         context: Dict[str, Any],
         num_candidates: int,
         task_id: Optional[str] = None
-    ) -> List[GenerationCandidate]:
-        """Generate candidates with different temperature settings using real LLM"""
-        candidates = []
+    ) -> List[Dict[str, Any]]:
+        """Candidates with different temperature settings"""
         temperatures = [0.2, 0.5, 0.8, 1.0][:num_candidates]
-        
-        for i, temp in enumerate(temperatures):
-            candidate = await self._generate_single_candidate(
+        return [
+            dict(
                 query=query,
                 context=context,
                 temperature=temp,
@@ -184,20 +227,17 @@ Your response should be:
                 method="temperature_sampling",
                 task_id=task_id
             )
-            candidates.append(candidate)
-        
-        return candidates
+            for i, temp in enumerate(temperatures)
+        ]
     
-    async def _generate_prompt_variants(
+    def _generate_prompt_variants(
         self,
         query: str,
         context: Dict[str, Any],
         num_candidates: int,
         task_id: Optional[str] = None
-    ) -> List[GenerationCandidate]:
-        """Generate candidates with different prompt styles"""
-        candidates = []
-        
+    ) -> List[Dict[str, Any]]:
+        """Candidates with different prompt styles"""
         prompt_styles = {
             "concise": "Be brief and direct. Provide a concise answer.",
             "detailed": "Provide a comprehensive, detailed answer with examples.",
@@ -207,34 +247,29 @@ Your response should be:
         
         styles = list(prompt_styles.items())[:num_candidates]
         
-        for i, (style_name, style_instruction) in enumerate(styles):
-            # Modify system prompt based on style
-            styled_system = f"{self.system_prompt}\n\nStyle instruction: {style_instruction}"
-            
-            candidate = await self._generate_single_candidate(
+        # Modify system prompt based on style
+        return [
+            dict(
                 query=query,
                 context=context,
                 temperature=0.7,
                 candidate_id=f"prompt_{style_name}_{i}",
                 method="prompt_variations",
-                system_prompt_override=styled_system,
+                system_prompt_override=f"{self.system_prompt}\n\nStyle instruction: {style_instruction}",
                 extra_metadata={"style": style_name},
                 task_id=task_id
             )
-            candidates.append(candidate)
-        
-        return candidates
+            for i, (style_name, style_instruction) in enumerate(styles)
+        ]
     
-    async def _generate_model_ensemble(
+    def _generate_model_ensemble(
         self,
         query: str,
         context: Dict[str, Any],
         num_candidates: int,
         task_id: Optional[str] = None
-    ) -> List[GenerationCandidate]:
-        """Generate candidates using different model configurations"""
-        candidates = []
-        
+    ) -> List[Dict[str, Any]]:
+        """Candidates using different model configurations"""
         # Different model configs (in practice, these would be different models)
         configs = [
             {"temperature": 0.3, "max_tokens": 256, "name": "fast"},
@@ -242,8 +277,8 @@ Your response should be:
             {"temperature": 0.7, "max_tokens": 1024, "name": "quality"}
         ][:num_candidates]
         
-        for i, config in enumerate(configs):
-            candidate = await self._generate_single_candidate(
+        return [
+            dict(
                 query=query,
                 context=context,
                 temperature=config["temperature"],
@@ -253,38 +288,188 @@ Your response should be:
                 extra_metadata={"model_config": config["name"]},
                 task_id=task_id
             )
-            candidates.append(candidate)
-        
-        return candidates
+            for i, config in enumerate(configs)
+        ]
     
-    async def _generate_parallel_diverse(
+    def _generate_parallel_diverse(
         self,
         query: str,
         context: Dict[str, Any],
         num_candidates: int,
         task_id: Optional[str] = None
-    ) -> List[GenerationCandidate]:
-        """Generate diverse candidates in parallel"""
-        # Create tasks for parallel generation
-        tasks = []
-        for i in range(num_candidates):
-            temp = 0.3 + (i * 0.3)  # Varying temperatures
-            task = self._generate_single_candidate(
+    ) -> List[Dict[str, Any]]:
+        """Diverse candidates with varying temperatures"""
+        return [
+            dict(
                 query=query,
                 context=context,
-                temperature=min(temp, 1.0),
+                temperature=min(0.3 + (i * 0.3), 1.0),
                 candidate_id=f"diverse_{i}",
                 method="parallel_diverse",
                 task_id=task_id
             )
-            tasks.append(task)
-        
-        # Execute in parallel
-        candidates = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Filter out exceptions
-        valid_candidates = [c for c in candidates if isinstance(c, GenerationCandidate)]
-        return valid_candidates
+            for i in range(num_candidates)
+        ]
+    
+    # ---- concurrent execution ----
+    
+    async def _fan_out(
+        self,
+        specs: List[Dict[str, Any]],
+        context: Dict[str, Any],
+        reranker: Optional[Any],
+        confidence_threshold: Optional[float]
+    ) -> Tuple[List[GenerationCandidate], Dict[str, Any]]:
+        """
+        Run all specs concurrently; candidates are returned in spec order.
+        With a reranker and threshold, pending candidates are cancelled as
+        soon as a finished one scores at or above the threshold.
+        """
+        state = {"spent": 0.0, "in_flight": 0, "hedged": 0, "hedge_cost": 0.0, "skipped": 0, "early_stopped": False}
+        # Only launch as many calls as the cost cap can pay for
+        affordable = self._affordable_calls(len(specs))
+        state["skipped"] += len(specs) - affordable
+        tasks = [asyncio.ensure_future(self._hedged_candidate(spec, state)) for spec in specs[:affordable]]
+        order = {task: i for i, task in enumerate(tasks)}
+        results: Dict[int, GenerationCandidate] = {}
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    candidate = None if task.cancelled() or task.exception() else task.result()
+                    if candidate is None:
+                        continue
+                    results[order[task]] = candidate
+                    if reranker is not None and confidence_threshold is not None and not state["early_stopped"]:
+                        if reranker.score(candidate, context).total_score >= confidence_threshold:
+                            state["early_stopped"] = True
+                if state["early_stopped"]:
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        return [results[i] for i in sorted(results)], state
+    
+    async def _hedged_candidate(self, spec: Dict[str, Any], state: Dict[str, Any]) -> Optional[GenerationCandidate]:
+        """
+        Generate one candidate; if it has not answered after the hedge delay,
+        race a duplicate request and keep whichever finishes first. The delay
+        counts from when the primary gets a concurrency slot, so queueing is
+        never mistaken for a slow provider. The loser is cancelled and
+        awaited; a loser that still completed counts as hedge cost.
+        None when the per-request cost cap is already spent.
+        """
+        started = asyncio.Event()
+        primary = asyncio.ensure_future(self._capped_candidate(spec, state, started=started))
+        delay = self._hedge_delay_s()
+        if delay is None:
+            return await primary
+        
+        racers = [primary]
+        winner = None
+        try:
+            slot = asyncio.ensure_future(started.wait())
+            try:
+                await asyncio.wait({primary, slot}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                slot.cancel()
+                await asyncio.gather(slot, return_exceptions=True)
+            done, _ = await asyncio.wait(racers, timeout=delay)
+            if done or not self._within_cost_cap(state):
+                winner = primary
+                return await primary
+            
+            state["hedged"] += 1
+            hedge = asyncio.ensure_future(self._capped_candidate(spec, state, hedge=True))
+            racers.append(hedge)
+            pending = set(racers)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if _produced(task):
+                        winner = task
+                        candidate = task.result()
+                        if task is hedge:
+                            candidate.metadata["hedged"] = True
+                        return candidate
+            return None
+        finally:
+            losers = [task for task in racers if task is not winner]
+            for task in losers:
+                task.cancel()
+            if losers:
+                await asyncio.gather(*losers, return_exceptions=True)
+            if len(racers) > 1:
+                state["hedge_cost"] += sum(task.result().estimated_cost for task in losers if _produced(task))
+    
+    async def _capped_candidate(
+        self,
+        spec: Dict[str, Any],
+        state: Dict[str, Any],
+        hedge: bool = False,
+        started: Optional[asyncio.Event] = None
+    ) -> Optional[GenerationCandidate]:
+        async with self._limiter():
+            if started is not None:
+                started.set()
+            if not self._within_cost_cap(state):
+                if not hedge:
+                    state["skipped"] += 1
+                return None
+            state["in_flight"] += 1
+            try:
+                candidate = await self._generate_single_candidate(**spec)
+            finally:
+                state["in_flight"] -= 1
+        state["spent"] += candidate.estimated_cost
+        self._observe_latency(candidate.generation_latency_ms)
+        self._call_costs.append(candidate.estimated_cost)
+        return candidate
+    
+    def _within_cost_cap(self, state: Dict[str, Any]) -> bool:
+        """Whether one more call fits: spent plus the projected cost of calls still in flight stays under the cap"""
+        if self.max_cost_per_request is None:
+            return True
+        projected = state["in_flight"] * (self._expected_call_cost() or 0.0)
+        return state["spent"] + projected < self.max_cost_per_request
+    
+    def _affordable_calls(self, n: int) -> int:
+        """How many of n concurrent calls the per-request cost cap allows before any of them has run"""
+        if self.max_cost_per_request is None:
+            return n
+        per_call = self._expected_call_cost() or 0.0
+        return sum(1 for i in range(n) if i * per_call < self.max_cost_per_request)
+    
+    def _expected_call_cost(self) -> Optional[float]:
+        """Fixed estimated_call_cost, or the mean cost of recent calls"""
+        if self.estimated_call_cost is not None:
+            return self.estimated_call_cost
+        if not self._call_costs:
+            return None
+        return sum(self._call_costs) / len(self._call_costs)
+    
+    def _limiter(self) -> asyncio.Semaphore:
+        """Concurrency cap shared by all requests running on the current event loop"""
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+    
+    def _hedge_delay_s(self) -> Optional[float]:
+        """Fixed hedge_after_ms, or the p90 of recent latencies once enough have been seen"""
+        if self.hedge_after_ms is not None:
+            return self.hedge_after_ms / 1000 if self.hedge_after_ms > 0 else None
+        if len(self._latencies) < 10:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[int(0.9 * (len(ordered) - 1))] / 1000
+    
+    def _observe_latency(self, latency_ms: float):
+        self._latencies.append(latency_ms)
     
     async def _generate_single_candidate(
         self,
@@ -423,6 +608,11 @@ Please provide a high-quality response based on the context above."""
             f.write(result.model_dump_json(indent=2))
 
 
+def _produced(task: "asyncio.Future") -> bool:
+    """Finished with a candidate (not cancelled, no exception, not skipped)"""
+    return task.done() and not task.cancelled() and task.exception() is None and task.result() is not None
+
+
 # Singleton instance
 _generator = None
 
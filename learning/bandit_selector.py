@@ -12,6 +12,7 @@ import math
 
 from learning.abstract_policy import AbstractPolicy
 from learning.semantic_task_success import compute_semantic_reward
+from learning.write_behind import WriteBehindBuffer
 
 
 class BanditArm(BaseModel):
@@ -45,11 +46,16 @@ class BanditSelector(AbstractPolicy):
         state_path: str = "artifacts/learning/bandit_state.json",
         algorithm: str = "ucb1",
         exploration_rate: float = 0.1,
+        max_staleness_s: float = 1.0,
+        fsync: bool = False,
     ):
         self.state_path = state_path
         self.algorithm = algorithm
         self.exploration_rate = exploration_rate
 
+        # Debounced persistence: state reaches disk within max_staleness_s
+        self._persistence = WriteBehindBuffer(flush_interval_s=max_staleness_s, fsync=fsync)
+
         # Load or initialize state
         self.state = self._load_state()
     
@@ -187,9 +193,12 @@ class BanditSelector(AbstractPolicy):
         return 1.0 / math.sqrt(arm.pulls)
     
     def _save_state(self):
-        """Persist bandit state"""
-        with open(self.state_path, 'w') as f:
-            f.write(self.state.model_dump_json(indent=2))
+        """Persist bandit state (debounced, atomic rename)"""
+        self._persistence.mark_dirty(self.state_path, lambda: self.state.model_dump())
+
+    def flush(self):
+        """Write pending bandit state to disk immediately"""
+        self._persistence.flush()
     
     def get_best_arm(self) -> str:
         """Get current best performing arm"""
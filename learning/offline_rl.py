@@ -1,6 +1,10 @@
 """
 Offline RL - Safe reinforcement learning from replay buffer
 Upgraded to implement AbstractPolicy and use semantic reward.
+
+Experiences live in a columnar NumPy ring buffer and training applies
+vectorized per-batch updates; historical runs can be bulk-loaded from the
+trace store index, optionally across worker processes.
 """
 
 from typing import Dict, List, Any, Optional, Tuple
@@ -8,12 +12,46 @@ import numpy as np
 import json
 import os
 from datetime import datetime
-from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 from learning.abstract_policy import AbstractPolicy
+from learning.replay_buffer import ReplayBuffer
 from learning.semantic_task_success import compute_semantic_reward
 
 
+def extract_state_vector(run_info: Dict[str, Any], state_dim: int = 15) -> np.ndarray:
+    """Extract state vector from run information"""
+    state = np.zeros(state_dim)
+    
+    # Goal type (first 5 dims)
+    goal_types = ["retrieve", "analyze", "build", "qa", "summarize"]
+    goal_type = run_info.get("goal_type", "unknown")
+    if goal_type in goal_types:
+        state[goal_types.index(goal_type)] = 1.0
+    
+    # Complexity (dim 5)
+    complexity_map = {"simple": 0.25, "moderate": 0.5, "complex": 0.75, "expert": 1.0}
+    state[5] = complexity_map.get(run_info.get("complexity", "moderate"), 0.5)
+    
+    # Cost constraint (dim 6)
+    state[6] = min(1.0, run_info.get("max_cost", 1.0) / 2.0)
+    
+    # Risk level (dim 7)
+    risk_map = {"low": 0.25, "medium": 0.5, "high": 0.75, "critical": 1.0}
+    state[7] = risk_map.get(run_info.get("risk_level", "medium"), 0.5)
+    
+    # Historical metrics (dims 8-14)
+    state[8] = run_info.get("historical_success_rate", 0.5)
+    state[9] = run_info.get("historical_avg_cost", 0.5)
+    state[10] = run_info.get("historical_avg_latency", 0.5)
+    state[11] = run_info.get("failure_rate", 0.1)
+    state[12] = run_info.get("retry_count", 0.0) / 5.0  # Normalize
+    state[13] = run_info.get("evidence_quality", 0.8)
+    state[14] = run_info.get("hour_of_day", datetime.now().hour) / 24.0  # Time of day
+    
+    return state
+
+
 class OfflineRLAgent(AbstractPolicy):
     """
     Offline Reinforcement Learning
@@ -38,10 +76,13 @@ class OfflineRLAgent(AbstractPolicy):
         self.artifacts_path = artifacts_path
         os.makedirs(artifacts_path, exist_ok=True)
         
-        # Replay buffer: (state, action, reward, next_state, done)
-        self.replay_buffer: deque = deque(maxlen=buffer_size)
+        # Replay buffer: columnar (state, action_idx, reward, next_state, done)
+        self.replay_buffer = ReplayBuffer(buffer_size, state_dim)
+        self.action_index: Dict[str, int] = {a: i for i, a in enumerate(self.action_space)}
         
         # Q-function approximation (simple: action -> Q-value estimate)
+        self._q = np.zeros(len(self.action_space))
+        self._q_counts = np.zeros(len(self.action_space), dtype=np.int64)
         self.q_values: Dict[str, float] = {action: 0.0 for action in self.action_space}
         self.q_counts: Dict[str, int] = {action: 0 for action in self.action_space}
         
@@ -62,35 +103,7 @@ class OfflineRLAgent(AbstractPolicy):
     
     def extract_state(self, run_info: Dict[str, Any]) -> np.ndarray:
         """Extract state vector from run information"""
-        state = np.zeros(self.state_dim)
-        
-        # Goal type (first 5 dims)
-        goal_types = ["retrieve", "analyze", "build", "qa", "summarize"]
-        goal_type = run_info.get("goal_type", "unknown")
-        if goal_type in goal_types:
-            state[goal_types.index(goal_type)] = 1.0
-        
-        # Complexity (dim 5)
-        complexity_map = {"simple": 0.25, "moderate": 0.5, "complex": 0.75, "expert": 1.0}
-        state[5] = complexity_map.get(run_info.get("complexity", "moderate"), 0.5)
-        
-        # Cost constraint (dim 6)
-        state[6] = min(1.0, run_info.get("max_cost", 1.0) / 2.0)
-        
-        # Risk level (dim 7)
-        risk_map = {"low": 0.25, "medium": 0.5, "high": 0.75, "critical": 1.0}
-        state[7] = risk_map.get(run_info.get("risk_level", "medium"), 0.5)
-        
-        # Historical metrics (dims 8-14)
-        state[8] = run_info.get("historical_success_rate", 0.5)
-        state[9] = run_info.get("historical_avg_cost", 0.5)
-        state[10] = run_info.get("historical_avg_latency", 0.5)
-        state[11] = run_info.get("failure_rate", 0.1)
-        state[12] = run_info.get("retry_count", 0.0) / 5.0  # Normalize
-        state[13] = run_info.get("evidence_quality", 0.8)
-        state[14] = datetime.now().hour / 24.0  # Time of day
-        
-        return state
+        return extract_state_vector(run_info, self.state_dim)
     
     def compute_reward(self, run_result: Dict[str, Any]) -> float:
         """Compute unified semantic reward."""
@@ -112,64 +125,113 @@ class OfflineRLAgent(AbstractPolicy):
         done: bool = False
     ):
         """Add experience to replay buffer"""
-        self.replay_buffer.append((state, action, reward, next_state, done))
+        if action not in self.action_index:
+            raise ValueError(f"Unknown action: {action}")
+        self.replay_buffer.append(state, self.action_index[action], reward, next_state, done)
         self.stats["buffer_size"] = len(self.replay_buffer)
     
-    def train(self, batch_size: int = 32, num_epochs: int = 10) -> Dict[str, float]:
+    def add_experiences(
+        self,
+        states: np.ndarray,
+        actions: np.ndarray,
+        rewards: np.ndarray,
+        next_states: Optional[np.ndarray] = None,
+        dones: Optional[np.ndarray] = None
+    ):
+        """Add a batch of experiences (actions as indices into action_space)"""
+        self.replay_buffer.extend(states, actions, rewards, next_states, dones)
+        self.stats["buffer_size"] = len(self.replay_buffer)
+    
+    def load_from_trace_index(
+        self,
+        trace_dir: str = "artifacts/trace_store",
+        action_map: Optional[Dict[str, str]] = None,
+        num_workers: int = 0
+    ) -> int:
+        """
+        Bulk-load experiences from the trace store index.
+        Returns number of experiences added.
+        """
+        states, actions, rewards = load_trace_experiences(
+            trace_dir=trace_dir,
+            action_space=self.action_space,
+            state_dim=self.state_dim,
+            action_map=action_map,
+            num_workers=num_workers
+        )
+        self.add_experiences(states, actions, rewards)
+        return len(actions)
+    
+    def train(
+        self,
+        batch_size: int = 32,
+        num_epochs: int = 10,
+        full_pass: bool = False,
+        seed: Optional[int] = None
+    ) -> Dict[str, float]:
         """
         Train Q-function from replay buffer
         Uses conservative updates to avoid overestimation
+        
+        Each epoch applies one sampled minibatch, or every shuffled minibatch
+        of the buffer when full_pass is set. A minibatch is applied as a single
+        vectorized update: per-action targets are averaged and the Q-value is
+        moved by the effective EMA step 1 - (1 - lr)^n for its n samples.
         """
-        if len(self.replay_buffer) < batch_size:
+        buffer = self.replay_buffer
+        if len(buffer) < batch_size:
             return {"error": "Insufficient data"}
         
-        losses = []
+        rng = np.random.default_rng(seed)
+        n_actions = len(self.action_space)
+        q = self._q
+        loss_sum = 0.0
+        updates = 0
         
         for epoch in range(num_epochs):
-            # Sample batch
-            indices = np.random.choice(len(self.replay_buffer), batch_size, replace=False)
-            batch = [self.replay_buffer[i] for i in indices]
+            if full_pass:
+                batches = buffer.iter_minibatches(batch_size, rng)
+            else:
+                batches = [buffer.sample_indices(batch_size, rng)]
             
-            # Update Q-values
-            for state, action, reward, next_state, done in batch:
-                # Conservative Q-Learning update
-                current_q = self.q_values[action]
+            for idx in batches:
+                actions = buffer.actions[idx]
                 
-                # Compute target (simplified: use reward + discounted next best Q)
-                if not done:
-                    next_max_q = max(self.q_values.values())
-                    target_q = reward + self.discount_factor * next_max_q
-                else:
-                    target_q = reward
+                # Target: reward + discounted next best Q (non-terminal only)
+                target_q = buffer.rewards[idx] + self.discount_factor * q.max() * ~buffer.dones[idx]
                 
                 # Conservative penalty (underestimate Q-values for safety)
                 target_q -= self.conservative_penalty
                 
-                # Update Q-value (exponential moving average)
-                self.q_values[action] = (
-                    (1 - self.learning_rate) * current_q +
-                    self.learning_rate * target_q
-                )
-                self.q_counts[action] += 1
-                
                 # Track loss
-                losses.append(abs(target_q - current_q))
+                loss_sum += float(np.abs(target_q - q[actions]).sum())
+                updates += len(idx)
+                
+                # Batched EMA update per action
+                counts = np.bincount(actions, minlength=n_actions)
+                target_sums = np.bincount(actions, weights=target_q, minlength=n_actions)
+                seen = counts > 0
+                step = 1.0 - (1.0 - self.learning_rate) ** counts[seen]
+                q[seen] += step * (target_sums[seen] / counts[seen] - q[seen])
+                self._q_counts += counts
             
             self.stats["total_updates"] += 1
         
+        self.q_values = dict(zip(self.action_space, q.tolist()))
+        self.q_counts = dict(zip(self.action_space, self._q_counts.tolist()))
+        
         # Update statistics
-        all_rewards = [exp[2] for exp in self.replay_buffer]
-        self.stats["avg_reward"] = sum(all_rewards) / len(all_rewards) if all_rewards else 0
+        self.stats["avg_reward"] = float(buffer.valid_rewards.mean())
         
         # Compute policy entropy (diversity measure)
-        q_array = np.array(list(self.q_values.values()))
-        probs = np.exp(q_array) / np.sum(np.exp(q_array))
-        self.stats["policy_entropy"] = -np.sum(probs * np.log(probs + 1e-10))
+        probs = np.exp(q - q.max())
+        probs /= probs.sum()
+        self.stats["policy_entropy"] = float(-np.sum(probs * np.log(probs + 1e-10)))
         
         return {
-            "avg_loss": sum(losses) / len(losses) if losses else 0,
-            "updates": num_epochs * batch_size,
-            "buffer_size": len(self.replay_buffer)
+            "avg_loss": loss_sum / updates if updates else 0,
+            "updates": updates,
+            "buffer_size": len(buffer)
         }
     
     def select_action_policy(self, state: np.ndarray, epsilon: float = 0.0) -> str:
@@ -274,6 +336,113 @@ class OfflineRLAgent(AbstractPolicy):
         }
 
 
+def _hour_of_day(ts: Optional[str]) -> int:
+    try:
+        return datetime.fromisoformat(ts).hour
+    except (TypeError, ValueError):
+        return 12
+
+
+def _load_trace_shard(
+    summaries_dir: str,
+    task_ids: List[str],
+    state_dim: int,
+    action_space: List[str],
+    action_map: Optional[Dict[str, str]]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Convert a shard of trace summaries into columnar experiences"""
+    action_index = {a: i for i, a in enumerate(action_space)}
+    states, actions, rewards = [], [], []
+    
+    for task_id in task_ids:
+        path = os.path.join(summaries_dir, f"{task_id}.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            continue
+        
+        result = summary.get("result_summary") or {}
+        path_type = result.get("planner_mode") or summary.get("current_plan_path_type")
+        action = (action_map or {}).get(path_type, path_type)
+        if action not in action_index:
+            continue
+        
+        success = summary.get("state") == "COMPLETED"
+        cost = float((summary.get("cost_summary") or {}).get("total", 0.0))
+        run_info = {
+            "max_cost": cost,
+            "risk_level": "high" if result.get("has_degraded") else "medium",
+            "hour_of_day": _hour_of_day(summary.get("created_at")),
+        }
+        reward, _ = compute_semantic_reward(
+            quality_score=1.0 if success else 0.0,
+            grounding_score=0.5,
+            cost_efficiency=1.0 / (1.0 + cost),
+            user_intent_match=1.0 if success else 0.0,
+        )
+        
+        states.append(extract_state_vector(run_info, state_dim))
+        actions.append(action_index[action])
+        rewards.append(reward)
+    
+    return (
+        np.array(states, dtype=np.float32).reshape(-1, state_dim),
+        np.array(actions, dtype=np.int32),
+        np.array(rewards, dtype=np.float32),
+    )
+
+
+def load_trace_experiences(
+    trace_dir: str = "artifacts/trace_store",
+    action_space: Optional[List[str]] = None,
+    state_dim: int = 15,
+    action_map: Optional[Dict[str, str]] = None,
+    num_workers: int = 0,
+    shard_size: int = 2000
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Read one-step experiences (state, action_idx, reward) for every run in
+    the trace store index. Each run's action is its planner mode / plan path
+    type (optionally renamed via action_map); runs whose action is outside
+    action_space are skipped. With num_workers > 1 shards are parsed in a
+    process pool.
+    """
+    action_space = action_space or ["sequential", "parallel", "hierarchical"]
+    summaries_dir = os.path.join(trace_dir, "summaries")
+    index_file = os.path.join(trace_dir, "index", "tasks_index.jsonl")
+    
+    task_ids: List[str] = []
+    if os.path.exists(index_file):
+        with open(index_file, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    task_ids.append(json.loads(line)["task_id"])
+        task_ids = list(dict.fromkeys(task_ids))
+    elif os.path.exists(summaries_dir):
+        task_ids = [name[:-5] for name in os.listdir(summaries_dir) if name.endswith(".json")]
+    
+    shards = [task_ids[i:i + shard_size] for i in range(0, len(task_ids), shard_size)]
+    args = (state_dim, action_space, action_map)
+    
+    if num_workers > 1 and len(shards) > 1:
+        with ProcessPoolExecutor(max_workers=num_workers) as pool:
+            results = list(pool.map(_load_trace_shard, [summaries_dir] * len(shards), shards, *[[a] * len(shards) for a in args]))
+    else:
+        results = [_load_trace_shard(summaries_dir, shard, *args) for shard in shards]
+    
+    if not results:
+        return (
+            np.zeros((0, state_dim), dtype=np.float32),
+            np.zeros(0, dtype=np.int32),
+            np.zeros(0, dtype=np.float32),
+        )
+    
+    states, actions, rewards = zip(*results)
+    return np.concatenate(states), np.concatenate(actions), np.concatenate(rewards)
+
+
 # Global offline RL agent
 _rl_agent: Optional[OfflineRLAgent] = None
 
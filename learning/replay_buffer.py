@@ -0,0 +1,112 @@
+"""
+Replay Buffer - Columnar, fixed-capacity experience storage for offline RL
+
+Experiences are stored as preallocated NumPy columns in a ring buffer so that
+sampling and batch updates never materialize per-transition Python tuples.
+"""
+
+from typing import Iterator, Optional, Tuple
+import numpy as np
+
+
+class ReplayBuffer:
+    """
+    Ring buffer of (state, action, reward, next_state, done) transitions.
+    Actions are stored as integer indices into the owning agent's action space.
+    """
+
+    def __init__(self, capacity: int, state_dim: int):
+        self.capacity = capacity
+        self.state_dim = state_dim
+
+        self.states = np.zeros((capacity, state_dim), dtype=np.float32)
+        self.actions = np.zeros(capacity, dtype=np.int32)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros((capacity, state_dim), dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=bool)
+
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(
+        self,
+        state: np.ndarray,
+        action: int,
+        reward: float,
+        next_state: np.ndarray,
+        done: bool
+    ):
+        """Add a single transition, overwriting the oldest when full"""
+        i = self._next
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        self._next = (i + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def extend(
+        self,
+        states: np.ndarray,
+        actions: np.ndarray,
+        rewards: np.ndarray,
+        next_states: Optional[np.ndarray] = None,
+        dones: Optional[np.ndarray] = None
+    ):
+        """Add a batch of transitions with vectorized slice assignment"""
+        n = len(actions)
+        if n == 0:
+            return
+        if next_states is None:
+            next_states = np.zeros((n, self.state_dim), dtype=np.float32)
+        if dones is None:
+            dones = np.ones(n, dtype=bool)
+
+        # Only the newest `capacity` transitions can survive
+        if n > self.capacity:
+            states, actions, rewards = states[-self.capacity:], actions[-self.capacity:], rewards[-self.capacity:]
+            next_states, dones = next_states[-self.capacity:], dones[-self.capacity:]
+            n = self.capacity
+
+        idx = (self._next + np.arange(n)) % self.capacity
+        self.states[idx] = states
+        self.actions[idx] = actions
+        self.rewards[idx] = rewards
+        self.next_states[idx] = next_states
+        self.dones[idx] = dones
+        self._next = int((self._next + n) % self.capacity)
+        self._size = min(self._size + n, self.capacity)
+
+    def sample_indices(self, batch_size: int, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """Sample distinct buffer indices uniformly"""
+        rng = rng or np.random.default_rng()
+        return rng.choice(self._size, size=min(batch_size, self._size), replace=False)
+
+    def iter_minibatches(
+        self,
+        batch_size: int,
+        rng: Optional[np.random.Generator] = None
+    ) -> Iterator[np.ndarray]:
+        """Yield shuffled index minibatches covering the whole buffer once"""
+        rng = rng or np.random.default_rng()
+        order = rng.permutation(self._size)
+        for start in range(0, self._size, batch_size):
+            yield order[start:start + batch_size]
+
+    def __getitem__(self, i: int) -> Tuple[np.ndarray, int, float, np.ndarray, bool]:
+        """Transition at logical position i (0 = oldest)"""
+        if not -self._size <= i < self._size:
+            raise IndexError(i)
+        i %= self._size
+        start = self._next - self._size
+        j = (start + i) % self.capacity
+        return (self.states[j], int(self.actions[j]), float(self.rewards[j]), self.next_states[j], bool(self.dones[j]))
+
+    @property
+    def valid_rewards(self) -> np.ndarray:
+        """Rewards of all stored transitions (physical order)"""
+        return self.rewards[:self._size]
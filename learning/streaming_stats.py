@@ -0,0 +1,124 @@
+"""
+Streaming Statistics: fixed-size reward summaries for online learners
+
+Replaces unbounded per-key reward lists with O(1) memory accumulators:
+1. Count / mean / variance (Welford's algorithm)
+2. Exponentially decayed moving average (recency-weighted signal)
+3. Reservoir sample (bounded, uniform sample for percentiles and audits)
+"""
+
+import math
+import random
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+
+_rng = random.Random()
+
+
+@dataclass
+class StreamingStats:
+    """Constant-memory summary of a stream of scalar observations"""
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0                 # Sum of squared deviations (Welford)
+    ema: Optional[float] = None     # Decayed moving average
+    ema_alpha: float = 0.1
+    min_value: Optional[float] = None
+    max_value: Optional[float] = None
+    reservoir_size: int = 32
+    reservoir: List[float] = field(default_factory=list)
+
+    def update(self, value: float) -> None:
+        """Fold a single observation into the summary (O(1))"""
+        value = float(value)
+        self.count += 1
+
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        if self.ema is None:
+            self.ema = value
+        else:
+            self.ema = (1 - self.ema_alpha) * self.ema + self.ema_alpha * value
+
+        if self.min_value is None or value < self.min_value:
+            self.min_value = value
+        if self.max_value is None or value > self.max_value:
+            self.max_value = value
+
+        # Reservoir sampling (Algorithm R)
+        if len(self.reservoir) < self.reservoir_size:
+            self.reservoir.append(value)
+        else:
+            slot = _rng.randrange(self.count)
+            if slot < self.reservoir_size:
+                self.reservoir[slot] = value
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (0.0 with fewer than two observations)"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    @property
+    def recent(self) -> float:
+        """Recency-weighted value (EMA), falling back to the mean"""
+        return self.ema if self.ema is not None else self.mean
+
+    def percentile(self, q: float) -> float:
+        """Approximate percentile (0-100) from the reservoir sample"""
+        if not self.reservoir:
+            return 0.0
+        ordered = sorted(self.reservoir)
+        rank = min(len(ordered) - 1, max(0, int(round(q / 100.0 * (len(ordered) - 1)))))
+        return ordered[rank]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "m2": self.m2,
+            "ema": self.ema,
+            "ema_alpha": self.ema_alpha,
+            "min_value": self.min_value,
+            "max_value": self.max_value,
+            "reservoir_size": self.reservoir_size,
+            "reservoir": list(self.reservoir),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StreamingStats":
+        return cls(
+            count=int(data.get("count", 0)),
+            mean=float(data.get("mean", 0.0)),
+            m2=float(data.get("m2", 0.0)),
+            ema=data.get("ema"),
+            ema_alpha=float(data.get("ema_alpha", 0.1)),
+            min_value=data.get("min_value"),
+            max_value=data.get("max_value"),
+            reservoir_size=int(data.get("reservoir_size", 32)),
+            reservoir=list(data.get("reservoir", [])),
+        )
+
+    @classmethod
+    def from_values(cls, values: Iterable[float], **kwargs: Any) -> "StreamingStats":
+        """Build a summary from a raw value list (legacy state migration)"""
+        stats = cls(**kwargs)
+        for value in values:
+            stats.update(value)
+        return stats
+
+    @classmethod
+    def load(cls, data: Any) -> "StreamingStats":
+        """Load either a serialized summary or a legacy list of raw values"""
+        if isinstance(data, dict):
+            return cls.from_dict(data)
+        return cls.from_values(data or [])
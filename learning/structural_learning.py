@@ -19,6 +19,9 @@ from dataclasses import dataclass, field, asdict
 from enum import Enum
 from collections import defaultdict
 
+from learning.streaming_stats import StreamingStats
+from learning.write_behind import WriteBehindBuffer
+
 
 class StructuralFeature(str, Enum):
     """Features of DAG structure for learning"""
@@ -408,13 +411,20 @@ class StructuralLearner:
     3. When to use complex vs simple structures
     """
     
-    def __init__(self, artifacts_dir: str = "artifacts/learning/structural"):
+    def __init__(
+        self,
+        artifacts_dir: str = "artifacts/learning/structural",
+        flush_interval_s: float = 5.0
+    ):
         self.artifacts_dir = artifacts_dir
         os.makedirs(artifacts_dir, exist_ok=True)
         
-        # Learning state
-        self.topology_rewards: Dict[str, List[float]] = defaultdict(list)  # topology_hash -> rewards
-        self.agent_combo_rewards: Dict[str, List[float]] = defaultdict(list)  # sorted agents -> rewards
+        # Write-behind persistence (state, policy files, execution records)
+        self._persistence = WriteBehindBuffer(flush_interval_s=flush_interval_s)
+        
+        # Learning state (constant memory per key)
+        self.topology_rewards: Dict[str, StreamingStats] = defaultdict(StreamingStats)  # topology_hash -> reward stats
+        self.agent_combo_rewards: Dict[str, StreamingStats] = defaultdict(StreamingStats)  # sorted agents -> reward stats
         self.task_type_structure_map: Dict[str, Dict[str, float]] = defaultdict(dict)  # task_type -> {topology_hash -> avg_reward}
         
         # Feature importance (learned)
@@ -433,11 +443,11 @@ class StructuralLearner:
         """Record an execution for learning"""
         
         # Update topology rewards
-        self.topology_rewards[structure_vector.topology_hash].append(reward.total_reward)
+        self.topology_rewards[structure_vector.topology_hash].update(reward.total_reward)
         
         # Update agent combo rewards
         agent_combo = tuple(sorted(structure_vector.agent_sequence))
-        self.agent_combo_rewards[str(agent_combo)].append(reward.total_reward)
+        self.agent_combo_rewards[str(agent_combo)].update(reward.total_reward)
         
         # Update task type -> structure mapping
         if structure_vector.topology_hash not in self.task_type_structure_map[task_type]:
@@ -450,11 +460,15 @@ class StructuralLearner:
         # Update feature importance based on credit assignment
         self._update_feature_importance(structure_vector, reward)
         
-        # Persist
+        # Persist (write-behind: coalesced and flushed on interval/shutdown)
         self._save_state()
         self._save_execution_record(task_type, structure_vector, reward, credit_assignment)
         self._export_policy_files()
     
+    def flush(self):
+        """Write any buffered state, policy files and execution records to disk"""
+        self._persistence.flush()
+    
     def recommend_structure(
         self,
         task_type: str,
@@ -490,14 +504,15 @@ class StructuralLearner:
         # Find best agent combo
         best_combo = None
         best_combo_reward = 0.0
-        for combo, rewards in self.agent_combo_rewards.items():
-            avg_reward = np.mean(rewards)
+        for combo, stats in self.agent_combo_rewards.items():
+            avg_reward = stats.mean
             if avg_reward > best_combo_reward:
                 best_combo = combo
                 best_combo_reward = avg_reward
         
         # Compute confidence
-        sample_count = len(self.topology_rewards.get(best_topology[0], []))
+        best_stats = self.topology_rewards.get(best_topology[0])
+        sample_count = best_stats.count if best_stats else 0
         confidence = min(1.0, sample_count / 100)  # Full confidence at 100 samples
         
         # Generate rationale
@@ -599,19 +614,20 @@ Feature importance: {json.dumps({k: f'{v:.3f}' for k, v in sorted(self.feature_i
         if total > 0:
             self.feature_importance = {k: v/total for k, v in self.feature_importance.items()}
     
-    def _save_state(self):
-        """Persist learning state"""
-        state = {
-            "topology_rewards": {k: list(v) for k, v in self.topology_rewards.items()},
-            "agent_combo_rewards": {k: list(v) for k, v in self.agent_combo_rewards.items()},
+    def _state_snapshot(self) -> Dict[str, Any]:
+        """Serializable learning state"""
+        return {
+            "topology_rewards": {k: v.to_dict() for k, v in self.topology_rewards.items()},
+            "agent_combo_rewards": {k: v.to_dict() for k, v in self.agent_combo_rewards.items()},
             "task_type_structure_map": dict(self.task_type_structure_map),
             "feature_importance": self.feature_importance,
             "updated_at": datetime.now().isoformat()
         }
-        
+    
+    def _save_state(self):
+        """Persist learning state (buffered)"""
         path = os.path.join(self.artifacts_dir, "structural_learning_state.json")
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(state, f, indent=2, ensure_ascii=False)
+        self._persistence.mark_dirty(path, self._state_snapshot)
     
     def _load_state(self):
         """Load learning state"""
@@ -623,8 +639,9 @@ Feature importance: {json.dumps({k: f'{v:.3f}' for k, v in sorted(self.feature_i
             with open(path, "r", encoding="utf-8") as f:
                 state = json.load(f)
             
-            self.topology_rewards = defaultdict(list, {k: list(v) for k, v in state.get("topology_rewards", {}).items()})
-            self.agent_combo_rewards = defaultdict(list, {k: list(v) for k, v in state.get("agent_combo_rewards", {}).items()})
+            # Accepts both streaming summaries and legacy raw reward lists
+            self.topology_rewards = defaultdict(StreamingStats, {k: StreamingStats.load(v) for k, v in state.get("topology_rewards", {}).items()})
+            self.agent_combo_rewards = defaultdict(StreamingStats, {k: StreamingStats.load(v) for k, v in state.get("agent_combo_rewards", {}).items()})
             self.task_type_structure_map = defaultdict(dict, state.get("task_type_structure_map", {}))
             self.feature_importance = state.get("feature_importance", self.feature_importance)
         except Exception:
@@ -637,7 +654,7 @@ Feature importance: {json.dumps({k: f'{v:.3f}' for k, v in sorted(self.feature_i
         reward: StructuralReward,
         credit_assignment: StructuralCreditAssignment
     ):
-        """Save individual execution record for audit"""
+        """Append individual execution record for audit (batched JSONL)"""
         record = {
             "task_type": task_type,
             "structure_vector": structure_vector.to_dict(),
@@ -646,12 +663,8 @@ Feature importance: {json.dumps({k: f'{v:.3f}' for k, v in sorted(self.feature_i
             "recorded_at": datetime.now().isoformat()
         }
         
-        records_dir = os.path.join(self.artifacts_dir, "execution_records")
-        os.makedirs(records_dir, exist_ok=True)
-        
-        path = os.path.join(records_dir, f"{reward.run_id}_structural.json")
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(record, f, indent=2, ensure_ascii=False)
+        path = os.path.join(self.artifacts_dir, "execution_records.jsonl")
+        self._persistence.append(path, record)
     
     def get_learning_report(self) -> Dict[str, Any]:
         """Generate learning report"""
@@ -661,12 +674,12 @@ Feature importance: {json.dumps({k: f'{v:.3f}' for k, v in sorted(self.feature_i
             "task_types_with_data": list(self.task_type_structure_map.keys()),
             "feature_importance": self.feature_importance,
             "top_topologies": sorted(
-                [(k, np.mean(v)) for k, v in self.topology_rewards.items()],
+                [(k, v.mean) for k, v in self.topology_rewards.items()],
                 key=lambda x: x[1],
                 reverse=True
             )[:5],
             "top_agent_combos": sorted(
-                [(k, np.mean(v)) for k, v in self.agent_combo_rewards.items()],
+                [(k, v.mean) for k, v in self.agent_combo_rewards.items()],
                 key=lambda x: x[1],
                 reverse=True
             )[:5],
@@ -678,8 +691,23 @@ Feature importance: {json.dumps({k: f'{v:.3f}' for k, v in sorted(self.feature_i
         Export structural policy and preference stats for consumption by execution engine.
         - structural_policy.json: best topology per task type
         - dag_preference_stats.json: summary stats
+        Files are rendered lazily when the write-behind buffer flushes.
         """
-        # Structural policy: best topology + suggested agents per task type
+        self._persistence.mark_dirty(
+            os.path.join(self.artifacts_dir, "structural_policy.json"),
+            self._structural_policy
+        )
+        self._persistence.mark_dirty(
+            os.path.join(self.artifacts_dir, "dag_preference_stats.json"),
+            self.get_learning_report
+        )
+        self._persistence.mark_dirty(
+            os.path.join("artifacts", "structural_learning_report.json"),
+            self.get_learning_report
+        )
+
+    def _structural_policy(self) -> Dict[str, Any]:
+        """Structural policy: best topology + expected reward per task type"""
         policy = {}
         for task_type, topo_map in self.task_type_structure_map.items():
             if not topo_map:
@@ -689,23 +717,7 @@ Feature importance: {json.dumps({k: f'{v:.3f}' for k, v in sorted(self.feature_i
                 "topology_hash": best_topo[0],
                 "expected_reward": best_topo[1],
             }
-
-        policy_path = os.path.join(self.artifacts_dir, "structural_policy.json")
-        with open(policy_path, "w", encoding="utf-8") as f:
-            json.dump(policy, f, indent=2, ensure_ascii=False)
-
-        stats = self.get_learning_report()
-        stats_path = os.path.join(self.artifacts_dir, "dag_preference_stats.json")
-        with open(stats_path, "w", encoding="utf-8") as f:
-            json.dump(stats, f, indent=2, ensure_ascii=False)
-
-        report_path = os.path.join("artifacts", "structural_learning_report.json")
-        try:
-            os.makedirs(os.path.dirname(report_path), exist_ok=True)
-            with open(report_path, "w", encoding="utf-8") as f:
-                json.dump(stats, f, indent=2, ensure_ascii=False)
-        except Exception:
-            pass
+        return policy
 
 
 # Global structural learner
@@ -18,6 +18,9 @@ from dataclasses import dataclass, field, asdict
 from enum import Enum
 from collections import defaultdict
 
+from learning.streaming_stats import StreamingStats
+from learning.write_behind import WriteBehindBuffer
+
 
 class LearningIntensity(str, Enum):
     """Learning intensity levels"""
@@ -96,8 +99,8 @@ class TenantLocalKnowledge:
     agent_success_rates: Dict[str, float] = field(default_factory=dict)
     agent_avg_costs: Dict[str, float] = field(default_factory=dict)
     
-    # Strategy performance
-    strategy_rewards: Dict[str, List[float]] = field(default_factory=lambda: defaultdict(list))
+    # Strategy performance (constant-memory reward summaries)
+    strategy_rewards: Dict[str, StreamingStats] = field(default_factory=lambda: defaultdict(StreamingStats))
     
     # Learned preferences
     preferred_strategies: Dict[str, str] = field(default_factory=dict)  # task_type -> strategy
@@ -120,7 +123,7 @@ class TenantLocalKnowledge:
             "task_type_avg_latencies": self.task_type_avg_latencies,
             "agent_success_rates": self.agent_success_rates,
             "agent_avg_costs": self.agent_avg_costs,
-            "strategy_rewards": {k: list(v) for k, v in self.strategy_rewards.items()},
+            "strategy_rewards": {k: v.to_dict() for k, v in self.strategy_rewards.items()},
             "preferred_strategies": self.preferred_strategies,
             "preferred_agents": self.preferred_agents,
             "learned_cost_threshold": self.learned_cost_threshold,
@@ -170,10 +173,17 @@ class TenantLearningController:
     - Budget-learning linkage
     """
     
-    def __init__(self, artifacts_dir: str = "artifacts/learning/tenants"):
+    def __init__(
+        self,
+        artifacts_dir: str = "artifacts/learning/tenants",
+        flush_interval_s: float = 5.0
+    ):
         self.artifacts_dir = artifacts_dir
         os.makedirs(artifacts_dir, exist_ok=True)
         
+        # Write-behind persistence for profiles, knowledge and patterns
+        self._persistence = WriteBehindBuffer(flush_interval_s=flush_interval_s)
+        
         # Tenant data stores
         self.profiles: Dict[str, TenantLearningProfile] = {}
         self.local_knowledge: Dict[str, TenantLocalKnowledge] = {}
@@ -253,10 +263,14 @@ class TenantLearningController:
                 task_type, strategy_id, success, cost, quality_score
             )
         
-        # Persist
+        # Persist (write-behind: coalesced and flushed on interval/shutdown)
         self._save_profile(profile)
         self._save_knowledge(knowledge)
     
+    def flush(self):
+        """Write any buffered profiles, knowledge and patterns to disk"""
+        self._persistence.flush()
+    
     def get_recommended_strategy(
         self,
         tenant_id: str,
@@ -450,14 +464,14 @@ class TenantLearningController:
         
         # Update strategy rewards
         reward = self._compute_reward(success, cost, quality_score)
-        knowledge.strategy_rewards[strategy_id].append(reward)
+        knowledge.strategy_rewards[strategy_id].update(reward)
         
-        # Update preferred strategy if this one is better
+        # Update preferred strategy if this one is better (recency-weighted)
         current_preferred = knowledge.preferred_strategies.get(task_type)
         if current_preferred:
-            current_rewards = knowledge.strategy_rewards.get(current_preferred, [0])
-            new_rewards = knowledge.strategy_rewards.get(strategy_id, [0])
-            if np.mean(new_rewards[-10:]) > np.mean(current_rewards[-10:]):
+            current_stats = knowledge.strategy_rewards.get(current_preferred)
+            current_recent = current_stats.recent if current_stats else 0.0
+            if knowledge.strategy_rewards[strategy_id].recent > current_recent:
                 knowledge.preferred_strategies[task_type] = strategy_id
                 knowledge.preferred_agents[task_type] = agents_used
         else:
@@ -619,23 +633,21 @@ class TenantLearningController:
         return similar_tenants[0][0]
     
     def _save_profile(self, profile: TenantLearningProfile):
-        """Save tenant profile"""
+        """Save tenant profile (buffered)"""
         path = os.path.join(self.artifacts_dir, f"{profile.tenant_id}_profile.json")
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(profile.to_dict(), f, indent=2, ensure_ascii=False)
+        self._persistence.mark_dirty(path, profile.to_dict)
     
     def _save_knowledge(self, knowledge: TenantLocalKnowledge):
-        """Save tenant local knowledge"""
+        """Save tenant local knowledge (buffered)"""
         path = os.path.join(self.artifacts_dir, f"{knowledge.tenant_id}_knowledge.json")
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(knowledge.to_dict(), f, indent=2, ensure_ascii=False)
+        self._persistence.mark_dirty(path, knowledge.to_dict)
     
     def _save_cross_tenant_patterns(self):
-        """Save cross-tenant patterns"""
+        """Save cross-tenant patterns (buffered)"""
         path = os.path.join(self.artifacts_dir, "cross_tenant_patterns.json")
-        patterns = {k: v.to_dict() for k, v in self.cross_tenant_patterns.items()}
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(patterns, f, indent=2, ensure_ascii=False)
+        self._persistence.mark_dirty(
+            path, lambda: {k: v.to_dict() for k, v in self.cross_tenant_patterns.items()}
+        )
     
     def _load_all(self):
         """Load all stored data"""
@@ -683,7 +695,7 @@ class TenantLearningController:
                         task_type_avg_latencies=data.get("task_type_avg_latencies", {}),
                         agent_success_rates=data.get("agent_success_rates", {}),
                         agent_avg_costs=data.get("agent_avg_costs", {}),
-                        strategy_rewards=defaultdict(list, {k: list(v) for k, v in data.get("strategy_rewards", {}).items()}),
+                        strategy_rewards=defaultdict(StreamingStats, {k: StreamingStats.load(v) for k, v in data.get("strategy_rewards", {}).items()}),
                         preferred_strategies=data.get("preferred_strategies", {}),
                         preferred_agents=data.get("preferred_agents", {}),
                         learned_cost_threshold=data.get("learned_cost_threshold", 1.0),
@@ -491,7 +491,16 @@ class UnifiedBanditPolicy(AbstractPolicy):
 
 
 class UnifiedContextualBanditPolicy(AbstractPolicy):
-    """Unified contextual bandit with linear UCB"""
+    """
+    Unified contextual bandit with linear UCB.
+    
+    Per-arm state is kept as stacked arrays so every decision is a single
+    batched NumPy operation:
+    - A_inv: (K, d, d) inverse design matrices, maintained with
+      Sherman-Morrison rank-one updates (O(d^2) per update, no inversion)
+    - b: (K, d) reward-weighted context sums
+    - theta: (K, d) ridge estimates, refreshed for the updated arm only
+    """
     
     def __init__(
         self,
@@ -501,52 +510,95 @@ class UnifiedContextualBanditPolicy(AbstractPolicy):
         alpha: float = 1.0,
         artifacts_dir: str = "artifacts/policies"
     ):
-        super().__init__(policy_id, PolicyParadigm.CONTEXTUAL_BANDIT, action_space, artifacts_dir)
+        super().__init__(policy_id, PolicyParadigm.CONTEXTUAL_BANDIT, list(action_space), artifacts_dir)
         self.context_dim = context_dim
         self.alpha = alpha
         
-        # LinUCB parameters
-        self.A: Dict[str, np.ndarray] = {
-            a: np.eye(context_dim) for a in action_space
-        }
-        self.b: Dict[str, np.ndarray] = {
-            a: np.zeros(context_dim) for a in action_space
-        }
+        # LinUCB parameters (arm k <-> action_space[k])
+        self.arm_index: Dict[str, int] = {a: i for i, a in enumerate(self.action_space)}
+        n_arms = len(self.action_space)
+        self.A = np.tile(np.eye(context_dim), (n_arms, 1, 1))
+        self.A_inv = np.tile(np.eye(context_dim), (n_arms, 1, 1))
+        self.b = np.zeros((n_arms, context_dim))
+        self.theta = np.zeros((n_arms, context_dim))
+    
+    def score_contexts(self, contexts: np.ndarray) -> np.ndarray:
+        """
+        Compute UCB scores for a batch of contexts against all arms.
+        
+        Args:
+            contexts: (n, d) context matrix
+        Returns:
+            (n, K) matrix of expected reward + confidence bound
+        """
+        expected = contexts @ self.theta.T
+        # x^T A_inv_k x for every (context, arm) pair
+        variance = np.einsum("nd,kde,ne->nk", contexts, self.A_inv, contexts)
+        return expected + self.alpha * np.sqrt(np.maximum(variance, 0.0))
     
     def select_action(self, state: State) -> Action:
         """Select action using LinUCB"""
-        context = state.to_vector(self.context_dim)
-        
-        ucb_values = {}
-        for action_id in self.action_space:
-            A_inv = np.linalg.inv(self.A[action_id])
-            theta = A_inv @ self.b[action_id]
-            
-            # Expected reward
-            expected = context @ theta
-            
-            # Confidence bound
-            confidence = self.alpha * np.sqrt(context @ A_inv @ context)
-            
-            ucb_values[action_id] = expected + confidence
+        return self.select_actions([state])[0]
+    
+    def select_actions(self, states: List[State]) -> List[Action]:
+        """Select actions for a batch of states (e.g. offline replay) in one pass"""
+        if not states:
+            return []
         
-        strategy_id = max(ucb_values, key=ucb_values.get)
+        contexts = np.stack([s.to_vector(self.context_dim) for s in states])
+        best = np.argmax(self.score_contexts(contexts), axis=1)
         
-        return Action(
-            action_id=f"action_{datetime.now().strftime('%Y%m%d%H%M%S%f')}",
-            strategy_id=strategy_id
-        )
+        return [
+            Action(
+                action_id=f"action_{datetime.now().strftime('%Y%m%d%H%M%S%f')}",
+                strategy_id=self.action_space[k]
+            )
+            for k in best
+        ]
     
     def update(self, state: State, action: Action, reward: Reward):
-        """Update LinUCB parameters"""
+        """Update LinUCB parameters with a Sherman-Morrison rank-one update"""
         context = state.to_vector(self.context_dim)
         strategy_id = action.strategy_id
+        k = self._ensure_arm(strategy_id)
         
-        self.A[strategy_id] += np.outer(context, context)
-        self.b[strategy_id] += reward.total_reward * context
+        A_inv = self.A_inv[k]
+        u = A_inv @ context
+        A_inv -= np.outer(u, u) / (1.0 + context @ u)
+        
+        self.A[k] += np.outer(context, context)
+        self.b[k] += reward.total_reward * context
+        self.theta[k] = A_inv @ self.b[k]
         
         self.record_selection(action, reward)
     
+    def set_reward_prior(self, action_id: str, b: np.ndarray):
+        """Seed an arm's reward vector (used by paradigm migration)"""
+        k = self._ensure_arm(action_id)
+        self.b[k] = b
+        self.theta[k] = self.A_inv[k] @ self.b[k]
+    
+    def recompute_inverses(self):
+        """Re-derive A_inv and theta from A and b (load / drift correction)"""
+        self.A_inv = np.linalg.inv(self.A)
+        self.theta = np.einsum("kde,ke->kd", self.A_inv, self.b)
+    
+    def _ensure_arm(self, action_id: str) -> int:
+        """Return the arm index, growing the stacked state for unseen actions"""
+        if action_id in self.arm_index:
+            return self.arm_index[action_id]
+        
+        k = len(self.arm_index)
+        self.arm_index[action_id] = k
+        if action_id not in self.action_space:
+            self.action_space.append(action_id)
+        eye = np.eye(self.context_dim)[None]
+        self.A = np.concatenate([self.A, eye])
+        self.A_inv = np.concatenate([self.A_inv, eye])
+        self.b = np.concatenate([self.b, np.zeros((1, self.context_dim))])
+        self.theta = np.concatenate([self.theta, np.zeros((1, self.context_dim))])
+        return k
+    
     def get_policy_state(self) -> Dict[str, Any]:
         return {
             "policy_id": self.policy_id,
@@ -554,16 +606,17 @@ class UnifiedContextualBanditPolicy(AbstractPolicy):
             "action_space": self.action_space,
             "context_dim": self.context_dim,
             "alpha": self.alpha,
-            "A": {k: v.tolist() for k, v in self.A.items()},
-            "b": {k: v.tolist() for k, v in self.b.items()}
+            "A": {a: self.A[k].tolist() for a, k in self.arm_index.items()},
+            "b": {a: self.b[k].tolist() for a, k in self.arm_index.items()}
         }
     
     def load_policy_state(self, state: Dict[str, Any]):
         self.alpha = state.get("alpha", self.alpha)
-        if "A" in state:
-            self.A = {k: np.array(v) for k, v in state["A"].items()}
-        if "b" in state:
-            self.b = {k: np.array(v) for k, v in state["b"].items()}
+        for action_id, A in state.get("A", {}).items():
+            self.A[self._ensure_arm(action_id)] = np.array(A)
+        for action_id, b in state.get("b", {}).items():
+            self.b[self._ensure_arm(action_id)] = np.array(b)
+        self.recompute_inverses()
 
 
 class UnifiedRLPolicy(AbstractPolicy):
@@ -679,7 +732,7 @@ class PolicyMigrator:
             )
             # Initialize b vectors to bias toward good actions
             for action_id, avg_reward in action_avg_rewards.items():
-                target.b[action_id] = np.ones(target.context_dim) * avg_reward
+                target.set_reward_prior(action_id, np.ones(target.context_dim) * avg_reward)
             
         elif target_paradigm == PolicyParadigm.OFFLINE_RL:
             target = UnifiedRLPolicy(
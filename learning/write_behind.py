@@ -0,0 +1,245 @@
+"""
+Write-Behind Buffer: coalesced persistence for hot learning state and memories
+
+Components mark files dirty instead of rewriting them on every update:
+1. Snapshot writes are coalesced per path (last writer wins, rendered at flush time)
+2. Append-only records are batched into JSONL files
+3. Debounced with bounded staleness: the first write after a quiet period goes
+   out immediately, later writes within `flush_interval_s` are folded into one
+   trailing write issued by a shared background flusher thread
+4. Snapshots are written to a temp file and atomically renamed into place,
+   optionally fsync'ed
+5. All live buffers are flushed at interpreter shutdown (atexit) and via
+   flush_all() from application lifespan hooks
+6. Background-only mode (inline_flush=False) for hot paths that must never
+   touch the filesystem: every write, including the leading edge and
+   backlog flushes, is handed to the flusher thread
+7. A failed write is logged and its snapshot / record batch is put back for
+   the next flush; while writes keep failing, retries wait a full
+   flush_interval_s instead of being forced by the backlog
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """Dirty-tracking write buffer shared by a component's persisted files"""
+
+    def __init__(
+        self,
+        flush_interval_s: float = 5.0,
+        max_pending_records: int = 1000,
+        fsync: bool = False,
+        inline_flush: bool = True,
+    ):
+        """
+        Args:
+            flush_interval_s: Staleness bound; buffered data reaches disk at most
+                this long after it was marked dirty
+            max_pending_records: Append backlog that forces an immediate flush
+            fsync: fsync files before the atomic rename / after appends
+            inline_flush: Allow the calling thread to write when a flush is due;
+                False leaves all I/O to the background flusher
+        """
+        self.flush_interval_s = flush_interval_s
+        self.max_pending_records = max_pending_records
+        self.fsync = fsync
+        self.inline_flush = inline_flush
+
+        self._snapshots: Dict[str, Callable[[], Any]] = {}
+        self._records: Dict[str, List[Dict[str, Any]]] = {}
+        self._pending_records = 0
+        self._last_flush = float("-inf")
+        # The last flush failed to write something; retries wait for the interval
+        self._failing = False
+        self._lock = threading.RLock()
+        self._io_lock = threading.Lock()
+
+        _register(self)
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._snapshots or self._records)
+
+    def next_deadline(self) -> Optional[float]:
+        """Monotonic time by which pending data must be flushed (None if clean)"""
+        if not self.dirty:
+            return None
+        if self._pending_records >= self.max_pending_records and not self._failing:
+            return float("-inf")
+        return self._last_flush + self.flush_interval_s
+
+    def mark_dirty(self, path: str, render: Callable[[], Any]) -> None:
+        """Schedule a JSON snapshot of `render()` to be written to `path`"""
+        with self._lock:
+            was_dirty = self.dirty
+            self._snapshots[path] = render
+        if not self.inline_flush:
+            if not was_dirty:
+                _wake_flusher()
+        elif not self.maybe_flush() and not was_dirty:
+            _wake_flusher()
+
+    def append(self, path: str, record: Dict[str, Any]) -> None:
+        """Schedule a record to be appended to the JSONL file at `path`"""
+        with self._lock:
+            was_dirty = self.dirty
+            self._records.setdefault(path, []).append(record)
+            self._pending_records += 1
+            backlog_full = self._pending_records >= self.max_pending_records
+        if not self.inline_flush:
+            if not was_dirty or backlog_full:
+                _wake_flusher()
+        elif backlog_full and not self._failing:
+            self.flush()
+        elif not self.maybe_flush() and not was_dirty:
+            _wake_flusher()
+
+    def maybe_flush(self) -> bool:
+        """Flush if the flush interval has elapsed; returns True if flushed"""
+        if time.monotonic() - self._last_flush < self.flush_interval_s:
+            return False
+        self.flush()
+        return True
+
+    def flush(self) -> None:
+        """Write all pending snapshots and records to disk"""
+        # Writers only contend for the buffer swap; file I/O is serialized
+        # separately so producers never wait on the disk
+        with self._io_lock:
+            with self._lock:
+                snapshots, self._snapshots = self._snapshots, {}
+                records, self._records = self._records, {}
+                self._pending_records = 0
+                self._last_flush = time.monotonic()
+
+            failed = False
+            for path, render in snapshots.items():
+                try:
+                    data = render()
+                except RuntimeError:
+                    # Owner mutated state mid-render (flusher thread); retry next tick
+                    with self._lock:
+                        self._snapshots.setdefault(path, render)
+                    continue
+                except Exception:
+                    logger.exception("write-behind: rendering snapshot %s failed", path)
+                    continue
+                try:
+                    self._write_snapshot(path, data)
+                except Exception as exc:
+                    logger.warning("write-behind: writing snapshot %s failed, will retry: %s", path, exc)
+                    failed = True
+                    with self._lock:
+                        # A newer render marked meanwhile supersedes this one
+                        self._snapshots.setdefault(path, render)
+
+            for path, batch in records.items():
+                try:
+                    self._append_records(path, batch)
+                except Exception as exc:
+                    logger.warning(
+                        "write-behind: appending %d records to %s failed, will retry: %s",
+                        len(batch), path, exc
+                    )
+                    failed = True
+                    with self._lock:
+                        # Keep file order: the failed batch goes before newer records
+                        self._records[path] = batch + self._records.get(path, [])
+                        self._pending_records += len(batch)
+
+            self._failing = failed
+
+    def close(self) -> None:
+        """Flush and stop tracking this buffer"""
+        self.flush()
+        _buffers.discard(self)
+
+    def _write_snapshot(self, path: str, data: Any) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _append_records(self, path: str, batch: List[Dict[str, Any]]) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in batch))
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+
+
+# ============================================================================
+# Shared background flusher
+# ============================================================================
+
+_buffers: "weakref.WeakSet[WriteBehindBuffer]" = weakref.WeakSet()
+_wakeup = threading.Event()
+_flusher_thread: Optional[threading.Thread] = None
+_flusher_lock = threading.Lock()
+
+_MAX_IDLE_WAIT_S = 1.0
+
+
+def _register(buffer: WriteBehindBuffer) -> None:
+    global _flusher_thread
+    _buffers.add(buffer)
+    with _flusher_lock:
+        if _flusher_thread is None:
+            _flusher_thread = threading.Thread(
+                target=_flusher_loop, name="write-behind-flusher", daemon=True
+            )
+            _flusher_thread.start()
+
+
+def _wake_flusher() -> None:
+    _wakeup.set()
+
+
+def _flusher_loop() -> None:
+    """Flush each dirty buffer once its staleness deadline passes"""
+    while True:
+        now = time.monotonic()
+        wait = _MAX_IDLE_WAIT_S
+        for buffer in list(_buffers):
+            deadline = buffer.next_deadline()
+            if deadline is None:
+                continue
+            if deadline <= now:
+                buffer.flush()
+                deadline = buffer.next_deadline()
+                if deadline is None:
+                    continue
+            wait = min(wait, max(0.0, deadline - now))
+        _wakeup.wait(timeout=max(wait, 0.005))
+        _wakeup.clear()
+
+
+def flush_all() -> None:
+    """Flush every live buffer (shutdown / lifespan hook)"""
+    for buffer in list(_buffers):
+        try:
+            buffer.flush()
+        except Exception:
+            pass
+
+
+atexit.register(flush_all)
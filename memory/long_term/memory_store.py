@@ -1,15 +1,25 @@
 """
 Long-term Memory Store: Hybrid vector + structured storage.
 Persists across sessions for continuous learning.
+
+1. SQLite table as the source of truth, over one persistent WAL connection
+2. In-memory cosine index over embeddings (normalized NumPy matrix), kept in
+   sync with the table on store / decay / prune
+3. memory_tags table (memory_id, tag) for exact, case-sensitive tag lookup
+4. FTS5 index over tags and content for keyword search
+5. Similarity recall combined with type / tag / importance filters
 """
 import os
 import json
 import hashlib
+import threading
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 from dataclasses import dataclass, asdict, field
 import sqlite3
 
+import numpy as np
+
 
 @dataclass
 class MemoryEntry:
@@ -55,11 +65,132 @@ class MemoryEntry:
         self.importance_score *= self.decay_factor
 
 
+class _EmbeddingIndex:
+    """
+    Dense cosine index: unit-normalized embeddings in a growable matrix.
+
+    Rows are removed by swapping in the last row, so the live region is always
+    contiguous and a query is one matrix-vector product.
+    """
+
+    def __init__(self):
+        self.dim: Optional[int] = None
+        self.ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.importance = np.zeros(0, dtype=np.float32)
+        self.type_codes = np.zeros(0, dtype=np.int32)
+        self._type_lookup: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def type_code(self, memory_type: str) -> int:
+        return self._type_lookup.setdefault(memory_type, len(self._type_lookup))
+
+    def upsert(self, memory_id: str, embedding: List[float], memory_type: str, importance: float) -> None:
+        vector = np.asarray(embedding, dtype=np.float32)
+        if self.dim is None:
+            self.dim = vector.shape[0]
+            self.vectors = np.zeros((16, self.dim), dtype=np.float32)
+            self.importance = np.zeros(16, dtype=np.float32)
+            self.type_codes = np.zeros(16, dtype=np.int32)
+        if vector.shape != (self.dim,):
+            raise ValueError(
+                f"Embedding dimension {vector.shape[0]} does not match index dimension {self.dim}"
+            )
+        norm = float(np.linalg.norm(vector))
+        if norm > 0:
+            vector = vector / norm
+
+        pos = self.positions.get(memory_id)
+        if pos is None:
+            pos = len(self.ids)
+            if pos == self.vectors.shape[0]:
+                self._grow()
+            self.ids.append(memory_id)
+            self.positions[memory_id] = pos
+        self.vectors[pos] = vector
+        self.importance[pos] = importance
+        self.type_codes[pos] = self.type_code(memory_type)
+
+    def remove(self, memory_id: str) -> None:
+        pos = self.positions.pop(memory_id, None)
+        if pos is None:
+            return
+        last = len(self.ids) - 1
+        if pos != last:
+            moved = self.ids[last]
+            self.ids[pos] = moved
+            self.positions[moved] = pos
+            self.vectors[pos] = self.vectors[last]
+            self.importance[pos] = self.importance[last]
+            self.type_codes[pos] = self.type_codes[last]
+        self.ids.pop()
+
+    def scale_importance(self, factor: float) -> None:
+        self.importance[:len(self.ids)] *= factor
+
+    def query(
+        self,
+        embedding: List[float],
+        limit: int,
+        memory_type: Optional[str] = None,
+        min_importance: float = 0.0,
+        allowed_ids: Optional[set] = None,
+        min_similarity: Optional[float] = None
+    ) -> List[Tuple[str, float]]:
+        n = len(self.ids)
+        if n == 0 or limit <= 0:
+            return []
+        vector = np.asarray(embedding, dtype=np.float32)
+        if vector.shape != (self.dim,):
+            raise ValueError(
+                f"Query dimension {vector.shape[0]} does not match index dimension {self.dim}"
+            )
+        norm = float(np.linalg.norm(vector))
+        if norm > 0:
+            vector = vector / norm
+
+        scores = self.vectors[:n] @ vector
+        mask = self.importance[:n] >= min_importance
+        if memory_type is not None:
+            code = self._type_lookup.get(memory_type)
+            if code is None:
+                return []
+            mask &= self.type_codes[:n] == code
+        if allowed_ids is not None:
+            allowed = np.zeros(n, dtype=bool)
+            rows = [self.positions[i] for i in allowed_ids if i in self.positions]
+            allowed[rows] = True
+            mask &= allowed
+        if min_similarity is not None:
+            mask &= scores >= min_similarity
+
+        candidates = np.flatnonzero(mask)
+        if candidates.size == 0:
+            return []
+        if candidates.size > limit:
+            top = np.argpartition(-scores[candidates], limit - 1)[:limit]
+            candidates = candidates[top]
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self.ids[i], float(scores[i])) for i in order]
+
+    def _grow(self) -> None:
+        capacity = self.vectors.shape[0] * 2
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[:len(self.ids)] = self.vectors[:len(self.ids)]
+        self.vectors = vectors
+        self.importance = np.resize(self.importance, capacity)
+        self.type_codes = np.resize(self.type_codes, capacity)
+
+
 class LongTermMemoryStore:
     """
     Long-term memory with hybrid storage.
     
-    Uses SQLite for structured queries and optional vector indexing.
+    Uses SQLite for structured queries, FTS5 for tag/content search and an
+    in-memory cosine index for embedding similarity recall.
     """
     
     def __init__(self, memory_dir: str = "memory/long_term"):
@@ -67,12 +198,18 @@ class LongTermMemoryStore:
         os.makedirs(memory_dir, exist_ok=True)
         
         self.db_path = os.path.join(memory_dir, "memories.db")
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._fts_enabled = False
+        self._index = _EmbeddingIndex()
         self._init_db()
+        self._load_index()
     
     def _init_db(self) -> None:
         """Initialize SQLite database."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
         
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS memories (
@@ -100,9 +237,85 @@ class LongTermMemoryStore:
         cursor.execute("""
             CREATE INDEX IF NOT EXISTS idx_source_session ON memories(source_session_id)
         """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_created_at ON memories(created_at DESC)
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS memory_tags (
+                tag TEXT NOT NULL,
+                memory_id TEXT NOT NULL,
+                PRIMARY KEY (tag, memory_id)
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_memory_tags_memory ON memory_tags(memory_id)
+        """)
+        tagged = cursor.execute(
+            "SELECT COUNT(*) FROM memories WHERE tags IS NOT NULL AND tags != '[]'"
+        ).fetchone()[0]
+        if tagged != cursor.execute("SELECT COUNT(DISTINCT memory_id) FROM memory_tags").fetchone()[0]:
+            self._rebuild_tags(cursor)
         
-        conn.commit()
-        conn.close()
+        try:
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(
+                    memory_id UNINDEXED,
+                    tags,
+                    content,
+                    tokenize = "unicode61 tokenchars '_-.:'"
+                )
+            """)
+            self._fts_enabled = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: fall back to LIKE scans
+            self._fts_enabled = False
+        
+        if self._fts_enabled:
+            indexed = cursor.execute("SELECT COUNT(*) FROM memories_fts").fetchone()[0]
+            total = cursor.execute("SELECT COUNT(*) FROM memories").fetchone()[0]
+            if indexed != total:
+                self._rebuild_fts(cursor)
+        
+        self._conn.commit()
+    
+    def _rebuild_fts(self, cursor: sqlite3.Cursor) -> None:
+        """Re-derive the FTS index from the memories table."""
+        cursor.execute("DELETE FROM memories_fts")
+        rows = cursor.execute("SELECT memory_id, content, tags FROM memories").fetchall()
+        cursor.executemany(
+            "INSERT INTO memories_fts (memory_id, tags, content) VALUES (?, ?, ?)",
+            [
+                (memory_id, self._tags_text(json.loads(tags) if tags else []),
+                 self._content_text(json.loads(content)))
+                for memory_id, content, tags in rows
+            ]
+        )
+    
+    def _rebuild_tags(self, cursor: sqlite3.Cursor) -> None:
+        """Re-derive memory_tags from the memories table."""
+        cursor.execute("DELETE FROM memory_tags")
+        rows = cursor.execute("SELECT memory_id, tags FROM memories WHERE tags IS NOT NULL").fetchall()
+        cursor.executemany(
+            "INSERT OR IGNORE INTO memory_tags (tag, memory_id) VALUES (?, ?)",
+            [(str(tag), memory_id) for memory_id, tags in rows for tag in json.loads(tags)]
+        )
+    
+    def _load_index(self) -> None:
+        """Load stored embeddings into the in-memory cosine index."""
+        rows = self._conn.execute("""
+            SELECT memory_id, memory_type, embedding, importance_score
+            FROM memories WHERE embedding IS NOT NULL
+        """).fetchall()
+        for memory_id, memory_type, embedding, importance in rows:
+            try:
+                self._index.upsert(memory_id, json.loads(embedding), memory_type, importance)
+            except ValueError:
+                continue
+    
+    def close(self) -> None:
+        """Close the underlying connection."""
+        with self._lock:
+            self._conn.close()
     
     def store(self, entry: MemoryEntry) -> str:
         """
@@ -111,45 +324,58 @@ class LongTermMemoryStore:
         Returns:
             memory_id
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT OR REPLACE INTO memories
-            (memory_id, memory_type, content, embedding, source_run_id,
-             source_session_id, created_at, last_accessed, access_count,
-             importance_score, tags)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            entry.memory_id,
-            entry.memory_type,
-            json.dumps(entry.content),
-            json.dumps(entry.embedding) if entry.embedding else None,
-            entry.source_run_id,
-            entry.source_session_id,
-            entry.created_at,
-            entry.last_accessed,
-            entry.access_count,
-            entry.importance_score,
-            json.dumps(entry.tags)
-        ))
-        
-        conn.commit()
-        conn.close()
+        with self._lock:
+            if entry.embedding:
+                # Validate before touching the table so index and rows never diverge
+                self._index.upsert(
+                    entry.memory_id, entry.embedding, entry.memory_type, entry.importance_score
+                )
+            else:
+                self._index.remove(entry.memory_id)
+            
+            cursor = self._conn.cursor()
+            cursor.execute("""
+                INSERT OR REPLACE INTO memories
+                (memory_id, memory_type, content, embedding, source_run_id,
+                 source_session_id, created_at, last_accessed, access_count,
+                 importance_score, tags)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                entry.memory_id,
+                entry.memory_type,
+                json.dumps(entry.content),
+                json.dumps(entry.embedding) if entry.embedding else None,
+                entry.source_run_id,
+                entry.source_session_id,
+                entry.created_at,
+                entry.last_accessed,
+                entry.access_count,
+                entry.importance_score,
+                json.dumps(entry.tags)
+            ))
+            cursor.execute("DELETE FROM memory_tags WHERE memory_id = ?", (entry.memory_id,))
+            cursor.executemany(
+                "INSERT OR IGNORE INTO memory_tags (tag, memory_id) VALUES (?, ?)",
+                [(str(tag), entry.memory_id) for tag in entry.tags]
+            )
+            
+            if self._fts_enabled:
+                cursor.execute("DELETE FROM memories_fts WHERE memory_id = ?", (entry.memory_id,))
+                cursor.execute(
+                    "INSERT INTO memories_fts (memory_id, tags, content) VALUES (?, ?, ?)",
+                    (entry.memory_id, self._tags_text(entry.tags), self._content_text(entry.content))
+                )
+            
+            self._conn.commit()
         
         return entry.memory_id
     
     def get(self, memory_id: str) -> Optional[MemoryEntry]:
         """Get a memory by ID."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
+        row = self._fetchone(
             "SELECT * FROM memories WHERE memory_id = ?",
             (memory_id,)
         )
-        row = cursor.fetchone()
-        conn.close()
         
         if row:
             entry = self._row_to_entry(row)
@@ -165,42 +391,132 @@ class LongTermMemoryStore:
         min_importance: float = 0.0
     ) -> List[MemoryEntry]:
         """Search memories by type."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
+        rows = self._fetchall("""
             SELECT * FROM memories
             WHERE memory_type = ? AND importance_score >= ?
             ORDER BY importance_score DESC
             LIMIT ?
         """, (memory_type, min_importance, limit))
         
-        rows = cursor.fetchall()
-        conn.close()
-        
         return [self._row_to_entry(row) for row in rows]
     
     def search_by_tags(
         self,
         tags: List[str],
-        limit: int = 10
+        limit: int = 10,
+        memory_type: Optional[str] = None,
+        min_importance: float = 0.0,
+        match_all: bool = True
     ) -> List[MemoryEntry]:
-        """Search memories by tags."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        """
+        Search memories by tags, most important first.
         
-        # Simple tag matching (could be improved with FTS)
-        cursor.execute("""
-            SELECT * FROM memories
-            WHERE tags LIKE ?
-            ORDER BY importance_score DESC
-            LIMIT ?
-        """, (f'%{tags[0]}%' if tags else '%', limit))
+        Args:
+            tags: Tags to match exactly
+            match_all: Require every tag (AND) instead of any tag (OR)
+        """
+        if not tags:
+            rows = self._fetchall(
+                "SELECT * FROM memories WHERE importance_score >= ?"
+                + (" AND memory_type = ?" if memory_type else "")
+                + " ORDER BY importance_score DESC LIMIT ?",
+                (min_importance, memory_type, limit) if memory_type else (min_importance, limit)
+            )
+            return [self._row_to_entry(row) for row in rows]
         
-        rows = cursor.fetchall()
-        conn.close()
+        tag_sql, tag_params = self._tag_filter(tags, match_all)
+        sql = f"SELECT m.* FROM memories m WHERE m.memory_id IN ({tag_sql}) AND m.importance_score >= ?"
+        params: List[Any] = tag_params + [min_importance]
         
-        return [self._row_to_entry(row) for row in rows]
+        if memory_type:
+            sql += " AND m.memory_type = ?"
+            params.append(memory_type)
+        sql += " ORDER BY m.importance_score DESC LIMIT ?"
+        params.append(limit)
+        
+        return [self._row_to_entry(row) for row in self._fetchall(sql, tuple(params))]
+    
+    def search_text(
+        self,
+        query: str,
+        limit: int = 10,
+        memory_type: Optional[str] = None
+    ) -> List[MemoryEntry]:
+        """Keyword search over tags and content, ranked by BM25."""
+        terms = [t for t in query.split() if t]
+        if not terms:
+            return []
+        
+        if self._fts_enabled:
+            sql = """
+                SELECT m.* FROM memories_fts f
+                JOIN memories m ON m.memory_id = f.memory_id
+                WHERE memories_fts MATCH ?
+            """
+            params: List[Any] = [" OR ".join(self._fts_phrase(t) for t in terms)]
+            if memory_type:
+                sql += " AND m.memory_type = ?"
+                params.append(memory_type)
+            sql += " ORDER BY bm25(memories_fts), m.importance_score DESC LIMIT ?"
+        else:
+            sql = "SELECT m.* FROM memories m WHERE ("
+            sql += " OR ".join("m.content LIKE ? OR m.tags LIKE ?" for _ in terms) + ")"
+            params = []
+            for t in terms:
+                params.extend([f"%{t}%", f"%{t}%"])
+            if memory_type:
+                sql += " AND m.memory_type = ?"
+                params.append(memory_type)
+            sql += " ORDER BY m.importance_score DESC LIMIT ?"
+        params.append(limit)
+        
+        return [self._row_to_entry(row) for row in self._fetchall(sql, tuple(params))]
+    
+    def search_similar(
+        self,
+        embedding: List[float],
+        limit: int = 10,
+        memory_type: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        min_importance: float = 0.0,
+        min_similarity: Optional[float] = None
+    ) -> List[Tuple[MemoryEntry, float]]:
+        """
+        Cosine-similarity recall over stored embeddings.
+        
+        Filters are applied inside the vectorized scan, so `limit` results are
+        returned whenever enough matching memories exist.
+        
+        Returns:
+            (entry, similarity) pairs, most similar first
+        """
+        with self._lock:
+            if len(self._index) == 0:
+                return []
+            allowed_ids = None
+            if tags:
+                allowed_ids = set(self._ids_with_tags(tags))
+                if not allowed_ids:
+                    return []
+            hits = self._index.query(
+                embedding,
+                limit,
+                memory_type=memory_type,
+                min_importance=min_importance,
+                allowed_ids=allowed_ids,
+                min_similarity=min_similarity
+            )
+            if not hits:
+                return []
+            
+            placeholders = ",".join("?" for _ in hits)
+            rows = self._conn.execute(
+                f"SELECT * FROM memories WHERE memory_id IN ({placeholders})",
+                tuple(memory_id for memory_id, _ in hits)
+            ).fetchall()
+        
+        by_id = {row[0]: self._row_to_entry(row) for row in rows}
+        return [(by_id[memory_id], score) for memory_id, score in hits if memory_id in by_id]
     
     def search_by_session(
         self,
@@ -208,19 +524,13 @@ class LongTermMemoryStore:
         limit: int = 50
     ) -> List[MemoryEntry]:
         """Get memories from a session."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
+        rows = self._fetchall("""
             SELECT * FROM memories
             WHERE source_session_id = ?
             ORDER BY created_at DESC
             LIMIT ?
         """, (session_id, limit))
         
-        rows = cursor.fetchall()
-        conn.close()
-        
         return [self._row_to_entry(row) for row in rows]
     
     def get_recent(
@@ -229,26 +539,20 @@ class LongTermMemoryStore:
         memory_type: Optional[str] = None
     ) -> List[MemoryEntry]:
         """Get recent memories."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         if memory_type:
-            cursor.execute("""
+            rows = self._fetchall("""
                 SELECT * FROM memories
                 WHERE memory_type = ?
                 ORDER BY created_at DESC
                 LIMIT ?
             """, (memory_type, limit))
         else:
-            cursor.execute("""
+            rows = self._fetchall("""
                 SELECT * FROM memories
                 ORDER BY created_at DESC
                 LIMIT ?
             """, (limit,))
         
-        rows = cursor.fetchall()
-        conn.close()
-        
         return [self._row_to_entry(row) for row in rows]
     
     def get_most_important(
@@ -257,104 +561,142 @@ class LongTermMemoryStore:
         memory_type: Optional[str] = None
     ) -> List[MemoryEntry]:
         """Get most important memories."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         if memory_type:
-            cursor.execute("""
+            rows = self._fetchall("""
                 SELECT * FROM memories
                 WHERE memory_type = ?
                 ORDER BY importance_score DESC
                 LIMIT ?
             """, (memory_type, limit))
         else:
-            cursor.execute("""
+            rows = self._fetchall("""
                 SELECT * FROM memories
                 ORDER BY importance_score DESC
                 LIMIT ?
             """, (limit,))
         
-        rows = cursor.fetchall()
-        conn.close()
-        
         return [self._row_to_entry(row) for row in rows]
     
     def apply_decay(self, decay_factor: float = 0.99) -> int:
         """Apply decay to all memories."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            UPDATE memories
-            SET importance_score = importance_score * ?
-        """, (decay_factor,))
-        
-        affected = cursor.rowcount
-        conn.commit()
-        conn.close()
+        with self._lock:
+            cursor = self._conn.execute("""
+                UPDATE memories
+                SET importance_score = importance_score * ?
+            """, (decay_factor,))
+            affected = cursor.rowcount
+            self._conn.commit()
+            self._index.scale_importance(decay_factor)
         
         return affected
     
     def prune(self, min_importance: float = 0.01, max_age_days: int = 90) -> int:
         """Prune old/unimportant memories."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cutoff = datetime.now().isoformat()[:10]  # Simple date comparison
-        
-        cursor.execute("""
-            DELETE FROM memories
-            WHERE importance_score < ?
-        """, (min_importance,))
-        
-        deleted = cursor.rowcount
-        conn.commit()
-        conn.close()
-        
-        return deleted
+        with self._lock:
+            cursor = self._conn.cursor()
+            doomed = [
+                row[0] for row in cursor.execute(
+                    "SELECT memory_id FROM memories WHERE importance_score < ?",
+                    (min_importance,)
+                ).fetchall()
+            ]
+            if not doomed:
+                return 0
+            
+            cursor.executemany(
+                "DELETE FROM memories WHERE memory_id = ?",
+                [(memory_id,) for memory_id in doomed]
+            )
+            cursor.executemany(
+                "DELETE FROM memory_tags WHERE memory_id = ?",
+                [(memory_id,) for memory_id in doomed]
+            )
+            if self._fts_enabled:
+                cursor.executemany(
+                    "DELETE FROM memories_fts WHERE memory_id = ?",
+                    [(memory_id,) for memory_id in doomed]
+                )
+            self._conn.commit()
+            
+            for memory_id in doomed:
+                self._index.remove(memory_id)
+        
+        return len(doomed)
     
     def count(self, memory_type: Optional[str] = None) -> int:
         """Count memories."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         if memory_type:
-            cursor.execute(
+            row = self._fetchone(
                 "SELECT COUNT(*) FROM memories WHERE memory_type = ?",
                 (memory_type,)
             )
         else:
-            cursor.execute("SELECT COUNT(*) FROM memories")
-        
-        count = cursor.fetchone()[0]
-        conn.close()
+            row = self._fetchone("SELECT COUNT(*) FROM memories")
         
-        return count
+        return row[0]
     
     def export_all(self) -> List[Dict[str, Any]]:
         """Export all memories."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM memories ORDER BY created_at DESC")
-        rows = cursor.fetchall()
-        conn.close()
+        rows = self._fetchall("SELECT * FROM memories ORDER BY created_at DESC")
         
         return [self._row_to_entry(row).to_dict() for row in rows]
     
     def _update_access(self, memory_id: str, access_count: int, last_accessed: str) -> None:
         """Update access stats."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            UPDATE memories
-            SET access_count = ?, last_accessed = ?
-            WHERE memory_id = ?
-        """, (access_count, last_accessed, memory_id))
-        
-        conn.commit()
-        conn.close()
+        with self._lock:
+            self._conn.execute("""
+                UPDATE memories
+                SET access_count = ?, last_accessed = ?
+                WHERE memory_id = ?
+            """, (access_count, last_accessed, memory_id))
+            self._conn.commit()
+    
+    def _ids_with_tags(self, tags: List[str]) -> List[str]:
+        """IDs of memories carrying every tag."""
+        sql, params = self._tag_filter(tags, match_all=True)
+        return [row[0] for row in self._conn.execute(sql, tuple(params)).fetchall()]
+    
+    @staticmethod
+    def _tag_filter(tags: List[str], match_all: bool) -> Tuple[str, List[Any]]:
+        """Subquery selecting memory_ids by exact tag equality (all or any of `tags`)."""
+        wanted = list(dict.fromkeys(str(tag) for tag in tags))
+        sql = f"SELECT memory_id FROM memory_tags WHERE tag IN ({', '.join('?' * len(wanted))})"
+        if match_all and len(wanted) > 1:
+            sql += " GROUP BY memory_id HAVING COUNT(*) = ?"
+            return sql, wanted + [len(wanted)]
+        return sql, wanted
+    
+    def _fetchone(self, sql: str, params: tuple = ()) -> Optional[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+    
+    def _fetchall(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+    
+    @staticmethod
+    def _fts_phrase(term: str) -> str:
+        """Quote a term as an FTS5 phrase so it is matched literally."""
+        return '"' + str(term).replace('"', '""') + '"'
+    
+    @staticmethod
+    def _tags_text(tags: List[str]) -> str:
+        return " ".join(str(tag) for tag in tags)
+    
+    @staticmethod
+    def _content_text(content: Any) -> str:
+        """Flatten scalar leaves of a content dict into searchable text."""
+        parts: List[str] = []
+        stack = [content]
+        while stack:
+            value = stack.pop()
+            if isinstance(value, dict):
+                stack.extend(value.values())
+            elif isinstance(value, (list, tuple)):
+                stack.extend(value)
+            elif value is not None:
+                parts.append(str(value))
+        return " ".join(parts)
     
     def _row_to_entry(self, row: tuple) -> MemoryEntry:
         """Convert DB row to MemoryEntry."""
@@ -388,7 +730,8 @@ class PatternMemory:
         outcome: str,  # success, failure
         importance: float = 1.0,
         run_id: Optional[str] = None,
-        session_id: Optional[str] = None
+        session_id: Optional[str] = None,
+        embedding: Optional[List[float]] = None
     ) -> str:
         """Store a task pattern."""
         memory_id = f"pattern_{hashlib.sha256(pattern_signature.encode()).hexdigest()[:12]}"
@@ -403,6 +746,7 @@ class PatternMemory:
             },
             source_run_id=run_id,
             source_session_id=session_id,
+            embedding=embedding,
             importance_score=importance,
             tags=[outcome, pattern_data.get("task_type", "unknown")]
         )
@@ -412,14 +756,33 @@ class PatternMemory:
     def get_similar_patterns(
         self,
         task_type: str,
-        limit: int = 5
+        limit: int = 5,
+        embedding: Optional[List[float]] = None,
+        min_importance: float = 0.0
     ) -> List[MemoryEntry]:
-        """Get similar patterns for a task type."""
-        return self.store.search_by_tags([task_type], limit=limit)
+        """
+        Get similar patterns for a task type.
+        
+        With an embedding, patterns of the task type are ranked by cosine
+        similarity; otherwise the most important ones are returned.
+        """
+        if embedding is not None:
+            return [
+                entry for entry, _ in self.store.search_similar(
+                    embedding,
+                    limit=limit,
+                    memory_type="pattern",
+                    tags=[task_type],
+                    min_importance=min_importance
+                )
+            ]
+        return self.store.search_by_tags(
+            [task_type], limit=limit, memory_type="pattern", min_importance=min_importance
+        )
     
     def get_success_patterns(self, limit: int = 10) -> List[MemoryEntry]:
         """Get successful patterns."""
-        return self.store.search_by_tags(["success"], limit=limit)
+        return self.store.search_by_tags(["success"], limit=limit, memory_type="pattern")
 
 
 class BehaviorMemory:
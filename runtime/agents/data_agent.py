@@ -6,9 +6,17 @@ Real implementation with:
 - PII scanning
 - Data quality checks
 - Retrieval integration
+
+Files are validated as a stream: fixed-size chunks are read off the event
+loop, hashed incrementally, PII-scanned and quality-checked per chunk, and
+only a head sample is kept for schema detection. Results are cached by
+(path, size, mtime).
 """
 from runtime.agents.base_agent import BaseAgent
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import codecs
 import os
 import json
 import hashlib
@@ -16,6 +24,7 @@ import re
 from datetime import datetime
 from runtime.llm import get_llm_adapter
 from runtime.llm.prompt_loader import PromptLoader
+from runtime.governance.pattern_scanner import PatternScanner, ScanHit, ScanRule
 
 
 class DataValidationResult:
@@ -71,6 +80,18 @@ class PIIScanner:
         "passport": r'\b[A-Z]{1,2}\d{6,9}\b',
     }
     
+    _scanner: Optional[PatternScanner] = None
+    
+    @classmethod
+    def get_scanner(cls) -> PatternScanner:
+        """Single-pass scanner compiled from PATTERNS (built once)."""
+        if cls._scanner is None:
+            cls._scanner = PatternScanner([
+                ScanRule(pii_type, pattern, "pii")
+                for pii_type, pattern in cls.PATTERNS.items()
+            ])
+        return cls._scanner
+    
     @classmethod
     def scan(cls, text: str) -> Tuple[bool, List[str]]:
         """
@@ -79,12 +100,27 @@ class PIIScanner:
         Returns:
             Tuple of (pii_detected, list_of_pii_types)
         """
-        detected_types = []
-        
-        for pii_type, pattern in cls.PATTERNS.items():
-            if re.search(pattern, text, re.IGNORECASE):
-                detected_types.append(pii_type)
-        
+        return cls._summarize(cls.get_scanner().scan(text))
+    
+    @classmethod
+    def scan_hits(cls, text: str) -> List[ScanHit]:
+        """All PII hits with offsets."""
+        return cls.get_scanner().scan(text)
+    
+    @classmethod
+    def scan_file(cls, path: str, chunk_size: int = PatternScanner.DEFAULT_CHUNK_SIZE) -> Tuple[bool, List[str]]:
+        """Scan a text file chunk by chunk without loading it whole."""
+        return cls._summarize(cls.get_scanner().scan_file(path, chunk_size=chunk_size))
+    
+    @classmethod
+    def scan_chunks(cls, chunks: Iterable[str]) -> Tuple[bool, List[str]]:
+        """Scan a stream of text chunks."""
+        return cls._summarize(cls.get_scanner().scan_chunks(chunks))
+    
+    @classmethod
+    def _summarize(cls, hits: List[ScanHit]) -> Tuple[bool, List[str]]:
+        found = {h.rule_id for h in hits}
+        detected_types = [pii_type for pii_type in cls.PATTERNS if pii_type in found]
         return len(detected_types) > 0, detected_types
 
 
@@ -108,11 +144,7 @@ class DataQualityChecker:
         
         # Check for empty data
         if isinstance(data, str):
-            if len(data.strip()) == 0:
-                return 0.0, ["Data is empty"], []
-            if len(data) < 10:
-                warnings.append("Data is very short")
-                score -= 0.1
+            return cls.check_text_stats(len(data), bool(data.strip()))
         
         elif isinstance(data, dict):
             if len(data) == 0:
@@ -138,6 +170,47 @@ class DataQualityChecker:
                 pass
         
         return max(0.0, min(1.0, score)), issues, warnings
+    
+    @classmethod
+    def check_text_stats(cls, length: int, has_content: bool) -> Tuple[float, List[str], List[str]]:
+        """
+        Quality of a text source from streamed statistics.
+        
+        Args:
+            length: Total character count
+            has_content: Whether any non-whitespace character was seen
+        """
+        if not has_content:
+            return 0.0, ["Data is empty"], []
+        if length < 10:
+            return 0.9, [], ["Data is very short"]
+        return 1.0, [], []
+
+
+class _FileScanState:
+    """Accumulates hash, sample and quality stats while a file streams by"""
+    
+    def __init__(self, sample_chars: int):
+        self.hasher = hashlib.sha256()
+        self.sample_chars = sample_chars
+        self.sample_parts: List[str] = []
+        self.sampled = 0
+        self.length = 0
+        self.has_content = False
+    
+    def update(self, raw: bytes, text: str) -> None:
+        self.hasher.update(raw)
+        self.length += len(text)
+        if not self.has_content and not text.isspace() and text:
+            self.has_content = True
+        if self.sampled < self.sample_chars:
+            part = text[:self.sample_chars - self.sampled]
+            self.sample_parts.append(part)
+            self.sampled += len(part)
+    
+    @property
+    def sample(self) -> str:
+        return "".join(self.sample_parts)
 
 
 class DataAgent(BaseAgent):
@@ -152,12 +225,21 @@ class DataAgent(BaseAgent):
     - Integrate with retrieval layer
     """
     
+    # Streaming validation settings
+    CHUNK_SIZE = 1 << 20           # bytes read per chunk
+    SCHEMA_SAMPLE_CHARS = 1 << 16  # head sample kept for schema detection
+    SCAN_BLOCK_CHARS = 1 << 16     # serialized inline data is scanned in blocks
+    FILE_CACHE_SIZE = 256
+    
     def __init__(self):
         super().__init__("Data")
         self.llm_adapter = get_llm_adapter()
         self.prompt_loader = PromptLoader()
         self.pii_scanner = PIIScanner()
         self.quality_checker = DataQualityChecker()
+        
+        # (realpath, size, mtime_ns) -> validation result
+        self._file_cache: "OrderedDict[Tuple[str, int, int], DataValidationResult]" = OrderedDict()
     
     async def execute(self, context: Dict[str, Any], task_id: str) -> Dict[str, Any]:
         """
@@ -330,11 +412,10 @@ class DataAgent(BaseAgent):
         path: str,
         task_id: str
     ) -> DataValidationResult:
-        """Validate a file data source"""
-        issues = []
-        warnings = []
-        
-        if not os.path.exists(path):
+        """Validate a file data source (streamed off the event loop, cached)"""
+        try:
+            stat = os.stat(path)
+        except OSError:
             return DataValidationResult(
                 valid=False,
                 source=path,
@@ -342,37 +423,39 @@ class DataAgent(BaseAgent):
                 issues=[f"File not found: {path}"]
             )
         
-        try:
-            # Read file content
-            with open(path, "r", encoding="utf-8") as f:
-                content = f.read()
-            
-            # Calculate hash
-            data_hash = hashlib.sha256(content.encode()).hexdigest()[:16]
-            
-            # Detect schema
-            schema = self._detect_schema(content, path)
-            
-            # Scan for PII
-            pii_detected, pii_types = self.pii_scanner.scan(content)
-            
-            # Check quality
-            quality_score, qual_issues, qual_warnings = self.quality_checker.check(content)
-            issues.extend(qual_issues)
-            warnings.extend(qual_warnings)
-            
-            return DataValidationResult(
-                valid=len(issues) == 0,
-                source=path,
-                data_hash=data_hash,
-                pii_detected=pii_detected,
-                pii_types=pii_types,
-                schema_detected=schema,
-                quality_score=quality_score,
-                issues=issues,
-                warnings=warnings
-            )
+        cache_key = (os.path.realpath(path), stat.st_size, stat.st_mtime_ns)
+        cached = self._file_cache.get(cache_key)
+        if cached is not None:
+            self._file_cache.move_to_end(cache_key)
+            return DataValidationResult(**cached.to_dict())
+        
+        result = await asyncio.to_thread(self._scan_file_source, path)
         
+        if result.data_hash:
+            self._file_cache[cache_key] = result
+            while len(self._file_cache) > self.FILE_CACHE_SIZE:
+                self._file_cache.popitem(last=False)
+        return DataValidationResult(**result.to_dict())
+    
+    def _scan_file_source(self, path: str) -> DataValidationResult:
+        """Single streaming pass: hash, sample, PII and quality per chunk"""
+        state = _FileScanState(self.SCHEMA_SAMPLE_CHARS)
+        
+        def text_chunks(f) -> Iterator[str]:
+            decoder = codecs.getincrementaldecoder("utf-8")()
+            while True:
+                raw = f.read(self.CHUNK_SIZE)
+                final = not raw
+                text = decoder.decode(raw, final=final)
+                state.update(raw, text)
+                if text:
+                    yield text
+                if final:
+                    return
+        
+        try:
+            with open(path, "rb") as f:
+                pii_detected, pii_types = self.pii_scanner.scan_chunks(text_chunks(f))
         except Exception as e:
             return DataValidationResult(
                 valid=False,
@@ -380,6 +463,25 @@ class DataAgent(BaseAgent):
                 data_hash="",
                 issues=[f"Error reading file: {str(e)}"]
             )
+        
+        sample = state.sample
+        schema = self._detect_schema(sample, path, total_length=state.length)
+        
+        quality_score, issues, warnings = self.quality_checker.check_text_stats(
+            state.length, state.has_content
+        )
+        
+        return DataValidationResult(
+            valid=len(issues) == 0,
+            source=path,
+            data_hash=state.hasher.hexdigest()[:16],
+            pii_detected=pii_detected,
+            pii_types=pii_types,
+            schema_detected=schema,
+            quality_score=quality_score,
+            issues=issues,
+            warnings=warnings
+        )
     
     async def _validate_url_source(
         self,
@@ -421,20 +523,26 @@ class DataAgent(BaseAgent):
         task_id: str
     ) -> DataValidationResult:
         """Validate inline data"""
-        # Convert to string for analysis
+        hasher = hashlib.sha256()
+        
         if isinstance(data, dict) or isinstance(data, list):
-            content = json.dumps(data, ensure_ascii=False)
+            # Stream the JSON encoding once into both the hash and the PII scan
+            def encoded_blocks() -> Iterator[str]:
+                encoder = json.JSONEncoder(ensure_ascii=False)
+                for block in self._coalesce(encoder.iterencode(data), self.SCAN_BLOCK_CHARS):
+                    hasher.update(block.encode())
+                    yield block
+            
+            pii_detected, pii_types = self.pii_scanner.scan_chunks(encoded_blocks())
+            schema = self._detect_object_schema(data)
         else:
             content = str(data)
+            hasher.update(content.encode())
+            pii_detected, pii_types = self.pii_scanner.scan(content)
+            schema = self._detect_schema(content, "inline")
         
         # Calculate hash
-        data_hash = hashlib.sha256(content.encode()).hexdigest()[:16]
-        
-        # Detect schema
-        schema = self._detect_schema(content, "inline")
-        
-        # Scan for PII
-        pii_detected, pii_types = self.pii_scanner.scan(content)
+        data_hash = hasher.hexdigest()[:16]
         
         # Check quality
         quality_score, issues, warnings = self.quality_checker.check(data)
@@ -451,23 +559,59 @@ class DataAgent(BaseAgent):
             warnings=warnings
         )
     
-    def _detect_schema(self, content: str, source: str) -> Dict[str, Any]:
-        """Detect data schema"""
+    @staticmethod
+    def _coalesce(pieces: Iterable[str], block_chars: int) -> Iterator[str]:
+        """Join many small string pieces into blocks of ~block_chars"""
+        buffer: List[str] = []
+        size = 0
+        for piece in pieces:
+            buffer.append(piece)
+            size += len(piece)
+            if size >= block_chars:
+                yield "".join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield "".join(buffer)
+    
+    @staticmethod
+    def _detect_object_schema(data: Any) -> Dict[str, Any]:
+        """Schema of already-parsed JSON data"""
+        schema = {"type": "json", "format": "unknown"}
+        if isinstance(data, dict):
+            schema["format"] = "object"
+            schema["keys"] = list(data.keys())[:10]
+        elif isinstance(data, list):
+            schema["format"] = "array"
+            schema["length"] = len(data)
+        return schema
+    
+    def _detect_schema(
+        self,
+        content: str,
+        source: str,
+        total_length: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Detect data schema.
+        
+        Args:
+            content: Full content, or a head sample of it
+            total_length: Full length when `content` is only a sample
+        """
         schema = {"type": "unknown", "format": "unknown"}
+        sampled = total_length is not None and total_length > len(content)
         
         # Try JSON
         try:
-            data = json.loads(content)
-            schema["type"] = "json"
-            if isinstance(data, dict):
-                schema["format"] = "object"
-                schema["keys"] = list(data.keys())[:10]
-            elif isinstance(data, list):
-                schema["format"] = "array"
-                schema["length"] = len(data)
-            return schema
+            return self._detect_object_schema(json.loads(content))
         except json.JSONDecodeError:
-            pass
+            head = content.lstrip()[:1]
+            if sampled and head in ("{", "["):
+                # Truncated sample of a large JSON document
+                schema["type"] = "json"
+                schema["format"] = "object" if head == "{" else "array"
+                schema["sampled"] = True
+                return schema
         
         # Check file extension
         if "." in source:
@@ -489,7 +633,10 @@ class DataAgent(BaseAgent):
         if schema["type"] == "unknown":
             schema["type"] = "text"
             schema["format"] = "plain"
-            schema["length"] = len(content)
+            schema["length"] = total_length if total_length is not None else len(content)
+        
+        if sampled:
+            schema["sampled"] = True
         
         return schema
     
@@ -1,12 +1,18 @@
 """
 ArtifactDataSource: Read-only abstraction layer for artifacts
 Only reads local artifacts, no ExecutionEngine/LLM calls
+
+Task and file listings are served from the artifact catalog index; per-task
+JSON/JSONL files are parsed once and reused until their size or mtime changes
 """
 import os
 import json
-from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 
+from runtime.observability.artifact_catalog import ArtifactCatalog, get_catalog
+
 
 class ArtifactDataSource:
     """
@@ -17,47 +23,43 @@ class ArtifactDataSource:
     - Load task summaries, traces, costs, governance
     - Diff two tasks
     - Compatible with multiple artifact naming patterns
+    
+    Parsed files are shared with the cache; callers treat results as read-only.
     """
     
+    # Parsed JSON/JSONL files kept in memory
+    FILE_CACHE_SIZE = 256
+    
     def __init__(self, artifacts_root: str = "artifacts"):
         self.artifacts_root = artifacts_root
         self.rag_project_dir = os.path.join(artifacts_root, "rag_project")
         self.trace_store_dir = os.path.join(artifacts_root, "trace_store")
         self.tenants_dir = os.path.join(artifacts_root, "tenants")
         self.execution_dir = os.path.join(artifacts_root, "execution")
+        
+        self._catalog: Optional[ArtifactCatalog] = None
+        # path -> ((mtime_ns, size), parsed content)
+        self._file_cache: "OrderedDict[str, Tuple[Tuple[int, int], Any]]" = OrderedDict()
     
-    def list_tasks(self) -> List[str]:
+    @property
+    def catalog(self) -> ArtifactCatalog:
+        """Shared catalog for this root; built on first use, then kept fresh by its watcher"""
+        if self._catalog is None:
+            self._catalog = get_catalog(self.artifacts_root).start()
+        return self._catalog
+    
+    def list_tasks(self, limit: Optional[int] = None, offset: int = 0) -> List[str]:
         """
-        List all task IDs from artifacts
+        List task IDs from artifacts (sorted, optionally paged)
         
         Searches multiple locations:
         - artifacts/rag_project/{task_id}/
         - artifacts/trace_store/summaries/{task_id}.json
         """
-        task_ids = set()
-        
-        # From rag_project
-        if os.path.exists(self.rag_project_dir):
-            try:
-                for item in os.listdir(self.rag_project_dir):
-                    item_path = os.path.join(self.rag_project_dir, item)
-                    if os.path.isdir(item_path):
-                        task_ids.add(item)
-            except Exception:
-                pass
-        
-        # From trace_store summaries
-        summaries_dir = os.path.join(self.trace_store_dir, "summaries")
-        if os.path.exists(summaries_dir):
-            try:
-                for filename in os.listdir(summaries_dir):
-                    if filename.endswith(".json"):
-                        task_id = filename.replace(".json", "")
-                        task_ids.add(task_id)
-            except Exception:
-                pass
-        
-        return sorted(list(task_ids))
+        try:
+            return self.catalog.list_task_ids(limit=limit, offset=offset)
+        except Exception:
+            return []
     
     def load_task_summary(self, task_id: str) -> Dict[str, Any]:
         """
@@ -78,31 +80,29 @@ class ArtifactDataSource:
         
         # Try delivery_manifest.json
         manifest_path = os.path.join(self.rag_project_dir, task_id, "delivery_manifest.json")
-        if os.path.exists(manifest_path):
+        manifest = self._load_json(manifest_path)
+        if manifest is not None:
             try:
-                with open(manifest_path, "r", encoding="utf-8") as f:
-                    manifest = json.load(f)
-                    summary.update({
-                        "status": "failed" if manifest.get("failed") else "completed",
-                        "created_at": manifest.get("created_at"),
-                        "spec": manifest.get("spec", {}),
-                        "agents_executed": manifest.get("executed_agents", []),
-                        "error": manifest.get("error")
-                    })
+                summary.update({
+                    "status": "failed" if manifest.get("failed") else "completed",
+                    "created_at": manifest.get("created_at"),
+                    "spec": manifest.get("spec", {}),
+                    "agents_executed": manifest.get("executed_agents", []),
+                    "error": manifest.get("error")
+                })
             except Exception:
                 pass
         
         # Try trace_store summary
         trace_summary_path = os.path.join(self.trace_store_dir, "summaries", f"{task_id}.json")
-        if os.path.exists(trace_summary_path):
+        trace_summary = self._load_json(trace_summary_path)
+        if trace_summary is not None:
             try:
-                with open(trace_summary_path, "r", encoding="utf-8") as f:
-                    trace_summary = json.load(f)
-                    summary.update({
-                        "status": trace_summary.get("state", "unknown"),
-                        "created_at": trace_summary.get("created_at"),
-                        "result_summary": trace_summary.get("result_summary", {})
-                    })
+                summary.update({
+                    "status": trace_summary.get("state", "unknown"),
+                    "created_at": trace_summary.get("created_at"),
+                    "result_summary": trace_summary.get("result_summary", {})
+                })
             except Exception:
                 pass
         
@@ -121,73 +121,65 @@ class ArtifactDataSource:
         
         # From system_trace.json (agent executions)
         system_trace_path = os.path.join(self.rag_project_dir, task_id, "system_trace.json")
-        if os.path.exists(system_trace_path):
+        trace = self._load_json(system_trace_path)
+        if trace is not None:
             try:
-                with open(system_trace_path, "r", encoding="utf-8") as f:
-                    trace = json.load(f)
-                    
-                    # Agent executions
-                    for agent_exec in trace.get("agent_executions", []):
-                        events.append({
-                            "timestamp": agent_exec.get("timestamp"),
-                            "type": "agent_execution",
-                            "agent": agent_exec.get("agent"),
-                            "status": agent_exec.get("status", "success"),
-                            "details": {
-                                "decision": agent_exec.get("output", {}).get("decision"),
-                                "llm_used": agent_exec.get("llm_info", {}).get("llm_used", False)
-                            }
-                        })
-                    
-                    # Governance decisions
-                    for gov_decision in trace.get("governance_decisions", []):
-                        events.append({
-                            "timestamp": gov_decision.get("timestamp"),
-                            "type": "governance_decision",
-                            "checkpoint": gov_decision.get("checkpoint"),
-                            "execution_mode": gov_decision.get("execution_mode"),
-                            "details": {
-                                "reasoning": gov_decision.get("reasoning", "")[:200]
-                            }
-                        })
+                # Agent executions
+                for agent_exec in trace.get("agent_executions", []):
+                    events.append({
+                        "timestamp": agent_exec.get("timestamp"),
+                        "type": "agent_execution",
+                        "agent": agent_exec.get("agent"),
+                        "status": agent_exec.get("status", "success"),
+                        "details": {
+                            "decision": agent_exec.get("output", {}).get("decision"),
+                            "llm_used": agent_exec.get("llm_info", {}).get("llm_used", False)
+                        }
+                    })
+                
+                # Governance decisions
+                for gov_decision in trace.get("governance_decisions", []):
+                    events.append({
+                        "timestamp": gov_decision.get("timestamp"),
+                        "type": "governance_decision",
+                        "checkpoint": gov_decision.get("checkpoint"),
+                        "execution_mode": gov_decision.get("execution_mode"),
+                        "details": {
+                            "reasoning": gov_decision.get("reasoning", "")[:200]
+                        }
+                    })
             except Exception:
                 pass
         
         # From tool traces
         tool_trace_path = os.path.join(self.artifacts_root, "execution", "tool_traces", f"{task_id}.jsonl")
-        if os.path.exists(tool_trace_path):
-            try:
-                with open(tool_trace_path, "r", encoding="utf-8") as f:
-                    for line in f:
-                        tool_trace = json.loads(line.strip())
-                        events.append({
-                            "timestamp": tool_trace.get("timestamp"),
-                            "type": "tool_execution",
-                            "tool_name": tool_trace.get("tool_name"),
-                            "status": "success" if tool_trace.get("success") else "failed",
-                            "details": {
-                                "execution_time_ms": tool_trace.get("execution_time_ms"),
-                                "error": tool_trace.get("error")
-                            }
-                        })
-            except Exception:
-                pass
+        try:
+            for tool_trace in self._load_jsonl(tool_trace_path):
+                events.append({
+                    "timestamp": tool_trace.get("timestamp"),
+                    "type": "tool_execution",
+                    "tool_name": tool_trace.get("tool_name"),
+                    "status": "success" if tool_trace.get("success") else "failed",
+                    "details": {
+                        "execution_time_ms": tool_trace.get("execution_time_ms"),
+                        "error": tool_trace.get("error")
+                    }
+                })
+        except Exception:
+            pass
         
         # From trace_store events
         events_path = os.path.join(self.trace_store_dir, "events", f"{task_id}.jsonl")
-        if os.path.exists(events_path):
-            try:
-                with open(events_path, "r", encoding="utf-8") as f:
-                    for line in f:
-                        event = json.loads(line.strip())
-                        events.append({
-                            "timestamp": event.get("ts"),
-                            "type": event.get("type"),
-                            "event_id": event.get("event_id"),
-                            "details": event.get("payload", {})
-                        })
-            except Exception:
-                pass
+        try:
+            for event in self._load_jsonl(events_path):
+                events.append({
+                    "timestamp": event.get("ts"),
+                    "type": event.get("type"),
+                    "event_id": event.get("event_id"),
+                    "details": event.get("payload", {})
+                })
+        except Exception:
+            pass
         
         # Sort by timestamp
         events.sort(key=lambda e: e.get("timestamp") or "")
@@ -210,32 +202,28 @@ class ArtifactDataSource:
         
         # From cost_report.json
         cost_report_path = os.path.join(self.rag_project_dir, task_id, "cost_report.json")
-        if os.path.exists(cost_report_path):
+        cost_entries = self._load_json(cost_report_path)
+        if cost_entries is not None:
             try:
-                with open(cost_report_path, "r", encoding="utf-8") as f:
-                    cost_entries = json.load(f)
-                    if isinstance(cost_entries, list):
-                        total = sum(e.get("estimated_cost", 0.0) for e in cost_entries)
-                        cost_info["total_cost"] = total
-                        
-                        # Breakdown by provider
-                        breakdown = {}
-                        for entry in cost_entries:
-                            provider = entry.get("provider", "unknown")
-                            cost = entry.get("estimated_cost", 0.0)
-                            breakdown[provider] = breakdown.get(provider, 0.0) + cost
-                        cost_info["cost_breakdown"] = breakdown
+                if isinstance(cost_entries, list):
+                    total = sum(e.get("estimated_cost", 0.0) for e in cost_entries)
+                    cost_info["total_cost"] = total
+                    
+                    # Breakdown by provider
+                    breakdown = {}
+                    for entry in cost_entries:
+                        provider = entry.get("provider", "unknown")
+                        cost = entry.get("estimated_cost", 0.0)
+                        breakdown[provider] = breakdown.get(provider, 0.0) + cost
+                    cost_info["cost_breakdown"] = breakdown
             except Exception:
                 pass
         
         # From cost_decision.json
         cost_decision_path = os.path.join(self.rag_project_dir, task_id, "cost_decision.json")
-        if os.path.exists(cost_decision_path):
-            try:
-                with open(cost_decision_path, "r", encoding="utf-8") as f:
-                    cost_info["cost_decision"] = json.load(f)
-            except Exception:
-                pass
+        cost_decision = self._load_json(cost_decision_path)
+        if cost_decision is not None:
+            cost_info["cost_decision"] = cost_decision
         
         return cost_info
     
@@ -255,27 +243,25 @@ class ArtifactDataSource:
         
         # From system_trace.json
         system_trace_path = os.path.join(self.rag_project_dir, task_id, "system_trace.json")
-        if os.path.exists(system_trace_path):
+        trace = self._load_json(system_trace_path)
+        if trace is not None:
             try:
-                with open(system_trace_path, "r", encoding="utf-8") as f:
-                    trace = json.load(f)
-                    governance_info["decisions"] = trace.get("governance_decisions", [])
-                    
-                    # Check if any degraded mode
-                    for decision in governance_info["decisions"]:
-                        if decision.get("execution_mode") in ["degraded", "minimal"]:
-                            governance_info["degraded"] = True
+                governance_info["decisions"] = list(trace.get("governance_decisions", []))
+                
+                # Check if any degraded mode
+                for decision in governance_info["decisions"]:
+                    if decision.get("execution_mode") in ["degraded", "minimal"]:
+                        governance_info["degraded"] = True
             except Exception:
                 pass
         
         # From governance_logs
         gov_log_path = os.path.join(self.artifacts_root, "governance_logs", f"{task_id}.json")
-        if os.path.exists(gov_log_path):
+        gov_log = self._load_json(gov_log_path)
+        if gov_log is not None:
             try:
-                with open(gov_log_path, "r", encoding="utf-8") as f:
-                    gov_log = json.load(f)
-                    if isinstance(gov_log, list):
-                        governance_info["decisions"].extend(gov_log)
+                if isinstance(gov_log, list):
+                    governance_info["decisions"].extend(gov_log)
             except Exception:
                 pass
         
@@ -293,25 +279,22 @@ class ArtifactDataSource:
         
         # From system_trace.json
         system_trace_path = os.path.join(self.rag_project_dir, task_id, "system_trace.json")
-        if os.path.exists(system_trace_path):
+        trace = self._load_json(system_trace_path)
+        if trace is not None:
             try:
-                with open(system_trace_path, "r", encoding="utf-8") as f:
-                    trace = json.load(f)
-                    execution_plan = trace.get("execution_plan")
-                    if execution_plan:
-                        plan_info = execution_plan
+                execution_plan = trace.get("execution_plan")
+                if execution_plan:
+                    plan_info = execution_plan
             except Exception:
                 pass
         
         # From DAG mutations
         dag_mutations_path = os.path.join(self.artifacts_root, "learning", "dag_mutations", f"{task_id}.json")
-        if os.path.exists(dag_mutations_path):
+        dag_mutations = self._load_json(dag_mutations_path)
+        if dag_mutations is not None:
             try:
-                with open(dag_mutations_path, "r", encoding="utf-8") as f:
-                    dag_mutations = json.load(f)
-                    if plan_info is None:
-                        plan_info = {}
-                    plan_info["dag_mutations"] = dag_mutations
+                plan_info = {} if plan_info is None else dict(plan_info)
+                plan_info["dag_mutations"] = dag_mutations
             except Exception:
                 pass
         
@@ -368,15 +351,47 @@ class ArtifactDataSource:
     
     def _list_artifacts(self, task_id: str) -> List[str]:
         """List all artifact files for a task"""
-        artifacts = []
-        
-        task_dir = os.path.join(self.rag_project_dir, task_id)
-        if os.path.exists(task_dir):
+        try:
+            return self.catalog.list_dir(os.path.join("rag_project", task_id))
+        except Exception:
+            return []
+    
+    def _load_json(self, path: str) -> Any:
+        """Parsed JSON file, or None if missing/invalid (cached by size and mtime)"""
+        return self._load_cached(path, json.load)
+    
+    def _load_jsonl(self, path: str) -> List[Dict[str, Any]]:
+        """Records of a JSONL file up to the first unparsable line"""
+        return self._load_cached(path, self._parse_jsonl) or []
+    
+    @staticmethod
+    def _parse_jsonl(f) -> List[Dict[str, Any]]:
+        records = []
+        for line in f:
             try:
-                for filename in os.listdir(task_dir):
-                    artifacts.append(filename)
-            except Exception:
-                pass
-        
-        return artifacts
+                records.append(json.loads(line.strip()))
+            except ValueError:
+                break
+        return records
+    
+    def _load_cached(self, path: str, parse: Callable[[Any], Any]) -> Any:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        version = (st.st_mtime_ns, st.st_size)
+        cached = self._file_cache.get(path)
+        if cached is not None and cached[0] == version:
+            self._file_cache.move_to_end(path)
+            return cached[1]
+        
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = parse(f)
+        except (OSError, ValueError):
+            data = None
+        self._file_cache[path] = (version, data)
+        if len(self._file_cache) > self.FILE_CACHE_SIZE:
+            self._file_cache.popitem(last=False)
+        return data
 
@@ -0,0 +1,42 @@
+"""
+Sync Bridge - Run a coroutine to completion from synchronous code
+L6 Component: Scale Layer - Async Interop
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+def run_sync(coro: Awaitable[T], thread_name: str = "run-sync") -> T:
+    """
+    asyncio.run，调用方已处在运行中的事件循环内时改在辅助线程上运行
+
+    Args:
+        coro: 待执行的协程
+        thread_name: 辅助线程名称（便于排查）
+
+    Returns:
+        协程的返回值；协程抛出的异常原样向上抛出
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    box: Dict[str, Any] = {}
+
+    def runner():
+        try:
+            box["result"] = asyncio.run(coro)
+        except BaseException as exc:
+            box["error"] = exc
+
+    worker = threading.Thread(target=runner, name=thread_name, daemon=True)
+    worker.start()
+    worker.join()
+    if "error" in box:
+        raise box["error"]
+    return box["result"]
@@ -1,17 +1,35 @@
 """
 TaskQueue: 分布式任务队列
-支持 in-memory 和 Redis 两种实现
+支持 in-memory、SQLite（单机多进程）和 Redis 实现
 """
 import asyncio
+import heapq
 import json
 import os
+import sqlite3
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Optional, List, Tuple
 from dataclasses import dataclass, asdict
 from datetime import datetime
 from enum import Enum
 import uuid
 
+from runtime.platform.metrics import MetricsRegistry
+
+_metrics = MetricsRegistry.get_default()
+QUEUE_EVENTS = _metrics.counter(
+    "task_queue_events_total", "Task queue transitions", ("event",)
+)
+QUEUE_DEPTH = _metrics.gauge("task_queue_depth", "Tasks waiting in in-memory queues")
+QUEUE_WAIT_SECONDS = _metrics.histogram(
+    "task_queue_wait_seconds",
+    "Time from enqueue to dequeue",
+    ("priority",),
+    buckets=(0.001, 0.01, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+)
 
 class TaskPriority(int, Enum):
     """任务优先级"""
@@ -39,6 +57,8 @@ class QueuedTask:
     scheduled_at: Optional[str] = None
     started_at: Optional[str] = None
     completed_at: Optional[str] = None
+    # 租约令牌：SQLiteTaskQueue 每次投递时设置，ack/nack 时原样传回
+    lease_token: Optional[int] = None
     
     def __post_init__(self):
         if not self.created_at:
@@ -66,13 +86,15 @@ class TaskQueue(ABC):
         pass
     
     @abstractmethod
-    async def ack(self, task_id: str, result: Dict[str, Any]) -> bool:
-        """确认任务完成"""
+    async def ack(self, task_id: str, result: Dict[str, Any], lease_token: Optional[int] = None) -> bool:
+        """确认任务完成（lease_token 为出队任务上的令牌）"""
         pass
     
     @abstractmethod
-    async def nack(self, task_id: str, error: str, retry: bool = True) -> bool:
-        """标记任务失败"""
+    async def nack(
+        self, task_id: str, error: str, retry: bool = True, lease_token: Optional[int] = None
+    ) -> bool:
+        """标记任务失败（lease_token 为出队任务上的令牌）"""
         pass
     
     @abstractmethod
@@ -87,70 +109,99 @@ class TaskQueue(ABC):
 
 
 class InMemoryTaskQueue(TaskQueue):
-    """内存任务队列（适用于单机）"""
+    """
+    内存任务队列（适用于单机）
+    
+    1. 待处理任务保存在按 (priority, seq) 排序的二叉堆中，
+       入队/出队 O(log n)，同优先级内 FIFO
+    2. 每次状态变更只向 queue.wal 追加一条记录（append-only WAL），
+       不再整体重写队列状态
+    3. WAL 记录数达到 max(checkpoint_every, 存活任务数) 时写一次
+       checkpoint（queue_state.json）并截断 WAL，checkpoint 成本按操作摊还为 O(1)
+    4. 启动时加载 checkpoint 并重放 WAL；崩溃前处于 in_progress 的任务
+       重新入队（至少一次语义）
+    """
     
-    def __init__(self, artifacts_dir: str = "artifacts/execution"):
+    WAL_FILE = "queue.wal"
+    STATE_FILE = "queue_state.json"
+    
+    def __init__(
+        self,
+        artifacts_dir: str = "artifacts/execution",
+        checkpoint_every: int = 10000,
+        fsync: bool = False
+    ):
         self.artifacts_dir = artifacts_dir
         os.makedirs(artifacts_dir, exist_ok=True)
+        self.checkpoint_every = checkpoint_every
+        self.fsync = fsync
         
-        # Priority queues (sorted by priority)
-        self._pending_queues: Dict[int, List[QueuedTask]] = {p.value: [] for p in TaskPriority}
+        # Pending heap of (priority, seq, task_id); seq keeps FIFO order within a priority
+        self._heap: List[Tuple[int, int, str]] = []
+        self._pending: Dict[str, QueuedTask] = {}
         self._in_progress: Dict[str, QueuedTask] = {}
         self._completed: Dict[str, Dict[str, Any]] = {}
         self._failed: Dict[str, Dict[str, Any]] = {}
+        self._seq = 0
+        
+        # WAL position: last record seq written, records since the last checkpoint
+        self._wal_seq = 0
+        self._wal_records = 0
+        
+        # task_id -> monotonic enqueue time (wait histogram)
+        self._enqueued_at: Dict[str, float] = {}
         
         self._lock = asyncio.Lock()
         self._has_tasks = asyncio.Event()
+        
+        self._wal_path = os.path.join(artifacts_dir, self.WAL_FILE)
+        self._state_path = os.path.join(artifacts_dir, self.STATE_FILE)
+        self._wal = None
+        self._recover()
     
     async def enqueue(self, task: QueuedTask) -> bool:
-        """入队"""
+        """入队；task_id 已在队列中或执行中时返回 False"""
         async with self._lock:
-            priority = task.priority
-            if priority not in self._pending_queues:
-                priority = TaskPriority.NORMAL
-            
-            self._pending_queues[priority].append(task)
-            self._has_tasks.set()
-            
-            # Save to disk for persistence
-            await self._persist_queue_state()
+            if task.task_id in self._pending or task.task_id in self._in_progress:
+                return False
             
+            self._push(task)
+            self._log({"op": "enqueue", "task": task.to_dict()})
+            self._record_enqueued(task.task_id, "enqueued")
             return True
     
     async def dequeue(self, worker_id: str, timeout: float = 30.0) -> Optional[QueuedTask]:
         """
         出队（阻塞直到有任务或超时）
         
-        优先级策略：从高优先级队列依次尝试
+        优先级策略：堆顶即最高优先级中最早入队的任务
         """
-        try:
-            # Wait for tasks with timeout
-            await asyncio.wait_for(self._has_tasks.wait(), timeout=timeout)
-        except asyncio.TimeoutError:
-            return None
+        if not self._heap:
+            try:
+                # Wait for tasks with timeout
+                await asyncio.wait_for(self._has_tasks.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return None
         
         async with self._lock:
-            # Try to get task from highest priority queue first
-            for priority in sorted(self._pending_queues.keys()):
-                if self._pending_queues[priority]:
-                    task = self._pending_queues[priority].pop(0)
-                    task.started_at = datetime.now().isoformat()
-                    self._in_progress[task.task_id] = task
-                    
-                    # Update event state
-                    total_pending = sum(len(q) for q in self._pending_queues.values())
-                    if total_pending == 0:
-                        self._has_tasks.clear()
-                    
-                    await self._persist_queue_state()
-                    return task
+            if not self._heap:
+                # No tasks found (race condition)
+                self._has_tasks.clear()
+                return None
             
-            # No tasks found (race condition)
-            self._has_tasks.clear()
-            return None
+            priority, _, task_id = heapq.heappop(self._heap)
+            if not self._heap:
+                self._has_tasks.clear()
+            
+            task = self._pending.pop(task_id)
+            task.started_at = datetime.now().isoformat()
+            self._in_progress[task_id] = task
+            self._log({"op": "dequeue", "task_id": task_id, "started_at": task.started_at})
+            self._record_dequeued(task_id, priority)
+            return task
     
-    async def ack(self, task_id: str, result: Dict[str, Any]) -> bool:
-        """确认任务完成"""
+    async def ack(self, task_id: str, result: Dict[str, Any], lease_token: Optional[int] = None) -> bool:
+        """确认任务完成（单进程队列无租约，lease_token 忽略）"""
         async with self._lock:
             if task_id not in self._in_progress:
                 return False
@@ -163,12 +214,16 @@ class InMemoryTaskQueue(TaskQueue):
                 "result": result,
                 "completed_at": task.completed_at
             }
+            self._log({"op": "ack", "task_id": task_id})
+            QUEUE_EVENTS.labels("acked").inc()
             
             await self._persist_task_result(task_id, result, success=True)
             return True
     
-    async def nack(self, task_id: str, error: str, retry: bool = True) -> bool:
-        """标记任务失败"""
+    async def nack(
+        self, task_id: str, error: str, retry: bool = True, lease_token: Optional[int] = None
+    ) -> bool:
+        """标记任务失败（单进程队列无租约，lease_token 忽略）"""
         async with self._lock:
             if task_id not in self._in_progress:
                 return False
@@ -180,8 +235,9 @@ class InMemoryTaskQueue(TaskQueue):
             if retry and task.retry_count < task.max_retries:
                 # Re-enqueue with lower priority
                 task.priority = min(task.priority + 1, TaskPriority.BATCH)
-                self._pending_queues[task.priority].append(task)
-                self._has_tasks.set()
+                self._push(task)
+                self._log({"op": "enqueue", "task": task.to_dict()})
+                self._record_enqueued(task_id, "retried")
             else:
                 # Mark as failed
                 self._failed[task_id] = {
@@ -190,69 +246,190 @@ class InMemoryTaskQueue(TaskQueue):
                     "retry_count": task.retry_count,
                     "failed_at": datetime.now().isoformat()
                 }
+                self._log({"op": "fail", "task_id": task_id})
+                QUEUE_EVENTS.labels("failed").inc()
                 
                 await self._persist_task_result(task_id, {"error": error}, success=False)
             
-            await self._persist_queue_state()
             return True
     
     async def get_queue_size(self) -> int:
         """获取队列大小"""
-        async with self._lock:
-            return sum(len(q) for q in self._pending_queues.values())
+        return len(self._pending)
     
     async def get_task_status(self, task_id: str) -> Optional[Dict[str, Any]]:
         """获取任务状态"""
-        async with self._lock:
-            # Check in-progress
-            if task_id in self._in_progress:
-                return {
-                    "status": "in_progress",
-                    "task": self._in_progress[task_id].to_dict()
-                }
-            
-            # Check completed
-            if task_id in self._completed:
-                return {
-                    "status": "completed",
-                    **self._completed[task_id]
-                }
-            
-            # Check failed
-            if task_id in self._failed:
-                return {
-                    "status": "failed",
-                    **self._failed[task_id]
-                }
-            
-            # Check pending
-            for queue in self._pending_queues.values():
-                for task in queue:
-                    if task.task_id == task_id:
-                        return {
-                            "status": "pending",
-                            "task": task.to_dict()
-                        }
-            
-            return None
+        # Check in-progress
+        if task_id in self._in_progress:
+            return {
+                "status": "in_progress",
+                "task": self._in_progress[task_id].to_dict()
+            }
+        
+        # Check completed
+        if task_id in self._completed:
+            return {
+                "status": "completed",
+                **self._completed[task_id]
+            }
+        
+        # Check failed
+        if task_id in self._failed:
+            return {
+                "status": "failed",
+                **self._failed[task_id]
+            }
+        
+        # Check pending
+        if task_id in self._pending:
+            return {
+                "status": "pending",
+                "task": self._pending[task_id].to_dict()
+            }
+        
+        return None
     
-    async def _persist_queue_state(self):
-        """持久化队列状态"""
+    def checkpoint(self):
+        """写入完整队列快照并截断 WAL"""
         state = {
-            "pending": {
-                priority: [task.to_dict() for task in tasks]
-                for priority, tasks in self._pending_queues.items()
-            },
+            "wal_seq": self._wal_seq,
+            "pending": {},
             "in_progress": {
                 task_id: task.to_dict()
                 for task_id, task in self._in_progress.items()
             },
             "last_updated": datetime.now().isoformat()
         }
+        for priority, _, task_id in sorted(self._heap):
+            state["pending"].setdefault(str(int(priority)), []).append(self._pending[task_id].to_dict())
+        
+        tmp_path = self._state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._state_path)
+        
+        # Records up to wal_seq are now in the checkpoint; replay skips them
+        # if the process dies before the truncate below
+        if self._wal is not None:
+            self._wal.close()
+        self._wal = open(self._wal_path, "w", encoding="utf-8")
+        self._wal_records = 0
+    
+    def close(self):
+        """写 checkpoint 并关闭 WAL"""
+        if self._wal is None:
+            return
+        self.checkpoint()
+        self._wal.close()
+        self._wal = None
+    
+    def _push(self, task: QueuedTask):
+        self._seq += 1
+        heapq.heappush(self._heap, (task.priority, self._seq, task.task_id))
+        self._pending[task.task_id] = task
+        self._has_tasks.set()
+    
+    def _log(self, record: Dict[str, Any]):
+        """追加一条 WAL 记录，必要时触发 checkpoint"""
+        self._wal_seq += 1
+        record["seq"] = self._wal_seq
+        self._wal.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._wal.flush()
+        if self.fsync:
+            os.fsync(self._wal.fileno())
+        
+        self._wal_records += 1
+        live = len(self._pending) + len(self._in_progress)
+        if self._wal_records >= max(self.checkpoint_every, live):
+            self.checkpoint()
+    
+    def _recover(self):
+        """加载 checkpoint、重放 WAL，并把未完成的 in_progress 任务重新入队"""
+        replayed = 0
+        if os.path.exists(self._state_path):
+            with open(self._state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self._wal_seq = state.get("wal_seq", 0)
+            for priority in sorted(state.get("pending", {}), key=int):
+                for data in state["pending"][priority]:
+                    self._push(QueuedTask.from_dict(data))
+            for task_id, data in state.get("in_progress", {}).items():
+                self._in_progress[task_id] = QueuedTask.from_dict(data)
+        
+        if os.path.exists(self._wal_path):
+            with open(self._wal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn tail from a crash mid-append
+                        break
+                    if record["seq"] <= self._wal_seq:
+                        continue
+                    self._replay(record)
+                    self._wal_seq = record["seq"]
+                    replayed += 1
+        
+        # Replayed dequeues leave stale heap entries; keep each pending task's latest push
+        latest = {
+            task_id: (priority, seq, task_id)
+            for priority, seq, task_id in sorted(self._heap, key=lambda e: e[1])
+            if task_id in self._pending
+        }
+        self._heap = list(latest.values())
+        heapq.heapify(self._heap)
+        if not self._heap:
+            self._has_tasks.clear()
+        
+        # Workers holding these tasks died with the previous process; they were
+        # dequeued before everything still pending, so they go back in front
+        for seq, task in enumerate(self._in_progress.values(), start=-len(self._in_progress)):
+            task.started_at = None
+            heapq.heappush(self._heap, (task.priority, seq, task.task_id))
+            self._pending[task.task_id] = task
+            self._has_tasks.set()
+        self._in_progress.clear()
         
-        state_path = os.path.join(self.artifacts_dir, "queue_state.json")
-        with open(state_path, "w", encoding="utf-8") as f:
-            json.dump(state, f, indent=2, ensure_ascii=False)
+        now = time.monotonic()
+        for task_id in self._pending:
+            self._enqueued_at[task_id] = now
+        QUEUE_DEPTH.inc(len(self._pending))
+        
+        if replayed or self._pending:
+            self.checkpoint()
+        else:
+            self._wal = open(self._wal_path, "a", encoding="utf-8")
+    
+    def _replay(self, record: Dict[str, Any]):
+        op = record["op"]
+        if op == "enqueue":
+            task = QueuedTask.from_dict(record["task"])
+            self._in_progress.pop(task.task_id, None)
+            self._push(task)
+        elif op == "dequeue":
+            task = self._pending.pop(record["task_id"], None)
+            if task is not None:
+                task.started_at = record.get("started_at")
+                self._in_progress[task.task_id] = task
+        else:
+            # ack / fail
+            self._in_progress.pop(record["task_id"], None)
+    
+    def _record_enqueued(self, task_id: str, event: str):
+        """入队指标：事件计数、队列深度、等待起点"""
+        self._enqueued_at[task_id] = time.monotonic()
+        QUEUE_EVENTS.labels(event).inc()
+        QUEUE_DEPTH.inc()
+    
+    def _record_dequeued(self, task_id: str, priority: int):
+        """出队指标：事件计数、队列深度、排队等待时长"""
+        QUEUE_EVENTS.labels("dequeued").inc()
+        QUEUE_DEPTH.dec()
+        enqueued_at = self._enqueued_at.pop(task_id, None)
+        if enqueued_at is not None:
+            QUEUE_WAIT_SECONDS.labels(str(int(priority))).observe(time.monotonic() - enqueued_at)
     
     async def _persist_task_result(self, task_id: str, result: Dict[str, Any], success: bool):
         """持久化任务结果"""
@@ -268,6 +445,339 @@ class InMemoryTaskQueue(TaskQueue):
             json.dump(result_data, f, indent=2, ensure_ascii=False)
 
 
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue_tasks (
+    task_id TEXT PRIMARY KEY,
+    priority INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    deliveries INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_token INTEGER NOT NULL DEFAULT 0,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_queue_ready ON queue_tasks (status, priority, seq);
+CREATE INDEX IF NOT EXISTS idx_queue_leases ON queue_tasks (status, lease_expires);
+CREATE INDEX IF NOT EXISTS idx_queue_seq ON queue_tasks (seq);
+"""
+
+
+def _require_token(lease_token: Optional[int]) -> int:
+    if lease_token is None:
+        raise ValueError("lease_token is required: pass the lease_token of the dequeued QueuedTask")
+    return lease_token
+
+
+class SQLiteTaskQueue(TaskQueue):
+    """
+    SQLite 任务队列（适用于单机多进程）
+    
+    多个进程（例如各自运行 WorkerPool）打开同一个数据库文件即可共享队列：
+    1. 优先级 + FIFO：按 (priority, seq) 索引出队
+    2. 可见性超时：出队即租约，租约到期未 ack/nack 的任务视为 worker 崩溃，
+       计一次失败后重新可见
+    3. 租约令牌：每次投递递增 lease_token 并写入出队的 QueuedTask，ack/nack
+       必须带回该令牌；租约过期后重新投递的任务只接受新令牌，过期 worker
+       （无论在哪个进程）的迟到 ack 不会覆盖重新投递后的结果
+    4. 死信：重试次数耗尽或 nack(retry=False) 的任务进入 failed 状态，
+       可通过 dead_letters() 查看、requeue_dead_letter() 重新入队
+    
+    所有状态变更在 BEGIN IMMEDIATE 事务中完成，跨进程串行化。
+    """
+    
+    def __init__(
+        self,
+        db_path: str = "artifacts/execution/task_queue.db",
+        visibility_timeout: Optional[float] = None,
+        poll_interval: float = 0.05
+    ):
+        """
+        Args:
+            db_path: 共享队列数据库路径
+            visibility_timeout: 租约时长（秒），默认使用任务自身的 timeout_sec
+            poll_interval: 阻塞出队时的最短轮询间隔（秒），空队列时指数退避
+        """
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._connection()
+    
+    async def enqueue(self, task: QueuedTask) -> bool:
+        """入队；task_id 已存在时返回 False"""
+        return await asyncio.to_thread(self._enqueue, task)
+    
+    async def dequeue(self, worker_id: str, timeout: float = 30.0) -> Optional[QueuedTask]:
+        """出队并取得租约（轮询直到有任务或超时）"""
+        deadline = time.monotonic() + timeout
+        delay = self.poll_interval
+        while True:
+            task = await asyncio.to_thread(self._dequeue, worker_id)
+            if task is not None:
+                return task
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, 1.0)
+    
+    async def ack(self, task_id: str, result: Dict[str, Any], lease_token: Optional[int] = None) -> bool:
+        """确认任务完成；令牌不是当前租约（已过期并重新投递）时返回 False"""
+        return await asyncio.to_thread(self._ack, task_id, result, _require_token(lease_token))
+    
+    async def nack(
+        self, task_id: str, error: str, retry: bool = True, lease_token: Optional[int] = None
+    ) -> bool:
+        """标记任务失败：重试（降低优先级）或进入死信；令牌规则同 ack"""
+        return await asyncio.to_thread(self._nack, task_id, error, retry, _require_token(lease_token))
+    
+    async def get_queue_size(self) -> int:
+        """待处理任务数（含租约已过期、等待重新投递的任务）"""
+        with self._lock:
+            row = self._connection().execute(
+                """
+                SELECT
+                    (SELECT COUNT(*) FROM queue_tasks WHERE status = 'pending') +
+                    (SELECT COUNT(*) FROM queue_tasks
+                     WHERE status = 'in_progress' AND lease_expires < ?)
+                """,
+                (time.time(),)
+            ).fetchone()
+        return row[0]
+    
+    async def get_task_status(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务状态"""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT status, payload, deliveries, result, error FROM queue_tasks WHERE task_id = ?",
+                (task_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        status, payload, deliveries, result, error = row
+        status_info = {"status": status, "task": json.loads(payload), "deliveries": deliveries}
+        if result is not None:
+            status_info["result"] = json.loads(result)
+        if error is not None:
+            status_info["error"] = error
+        return status_info
+    
+    def dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """死信任务（最近失败的在前）"""
+        with self._lock:
+            rows = self._connection().execute(
+                """
+                SELECT payload, error, deliveries, updated_at FROM queue_tasks
+                WHERE status = 'failed' ORDER BY updated_at DESC LIMIT ?
+                """,
+                (limit,)
+            ).fetchall()
+        return [
+            {
+                "task": json.loads(payload),
+                "error": error,
+                "deliveries": deliveries,
+                "failed_at": datetime.fromtimestamp(updated_at).isoformat()
+            }
+            for payload, error, deliveries, updated_at in rows
+        ]
+    
+    def requeue_dead_letter(self, task_id: str) -> bool:
+        """把死信任务重置重试次数后重新入队"""
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT payload FROM queue_tasks WHERE task_id = ? AND status = 'failed'",
+                (task_id,)
+            ).fetchone()
+            if row is None:
+                return False
+            task = QueuedTask.from_dict(json.loads(row[0]))
+            task.retry_count = 0
+            task.started_at = task.completed_at = None
+            conn.execute(
+                """
+                UPDATE queue_tasks
+                SET status = 'pending', payload = ?, seq = ?, error = NULL, updated_at = ?
+                WHERE task_id = ?
+                """,
+                (json.dumps(task.to_dict(), ensure_ascii=False), self._next_seq(conn), time.time(), task_id)
+            )
+        QUEUE_EVENTS.labels("retried").inc()
+        return True
+    
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+    
+    def _enqueue(self, task: QueuedTask) -> bool:
+        with self._transaction() as conn:
+            try:
+                conn.execute(
+                    """
+                    INSERT INTO queue_tasks (task_id, priority, seq, status, payload, updated_at)
+                    VALUES (?, ?, ?, 'pending', ?, ?)
+                    """,
+                    (
+                        task.task_id, int(task.priority), self._next_seq(conn),
+                        json.dumps(task.to_dict(), ensure_ascii=False), time.time()
+                    )
+                )
+            except sqlite3.IntegrityError:
+                return False
+        QUEUE_EVENTS.labels("enqueued").inc()
+        return True
+    
+    def _dequeue(self, worker_id: str) -> Optional[QueuedTask]:
+        now = time.time()
+        with self._transaction() as conn:
+            self._expire_leases(conn, now)
+            row = conn.execute(
+                """
+                SELECT task_id, payload, lease_token FROM queue_tasks
+                WHERE status = 'pending' ORDER BY priority, seq LIMIT 1
+                """
+            ).fetchone()
+            if row is None:
+                return None
+            
+            task_id, payload, token = row
+            task = QueuedTask.from_dict(json.loads(payload))
+            task.started_at = datetime.now().isoformat()
+            token += 1
+            task.lease_token = token
+            lease = self.visibility_timeout or task.timeout_sec
+            conn.execute(
+                """
+                UPDATE queue_tasks
+                SET status = 'in_progress', payload = ?, deliveries = deliveries + 1,
+                    lease_owner = ?, lease_token = ?, lease_expires = ?, updated_at = ?
+                WHERE task_id = ?
+                """,
+                (json.dumps(task.to_dict(), ensure_ascii=False), worker_id, token, now + lease, now, task_id)
+            )
+        QUEUE_EVENTS.labels("dequeued").inc()
+        return task
+    
+    def _ack(self, task_id: str, result: Dict[str, Any], token: int) -> bool:
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT payload FROM queue_tasks WHERE task_id = ? AND status = 'in_progress' AND lease_token = ?",
+                (task_id, token)
+            ).fetchone()
+            if row is None:
+                return False
+            task = json.loads(row[0])
+            task["completed_at"] = datetime.now().isoformat()
+            conn.execute(
+                """
+                UPDATE queue_tasks
+                SET status = 'completed', payload = ?, result = ?, lease_expires = NULL, updated_at = ?
+                WHERE task_id = ?
+                """,
+                (
+                    json.dumps(task, ensure_ascii=False),
+                    json.dumps(result, ensure_ascii=False, default=str), now, task_id
+                )
+            )
+        QUEUE_EVENTS.labels("acked").inc()
+        return True
+    
+    def _nack(self, task_id: str, error: str, retry: bool, token: int) -> bool:
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT payload FROM queue_tasks WHERE task_id = ? AND status = 'in_progress' AND lease_token = ?",
+                (task_id, token)
+            ).fetchone()
+            if row is None:
+                return False
+            self._fail(conn, QueuedTask.from_dict(json.loads(row[0])), error, retry, time.time())
+        return True
+    
+    def _expire_leases(self, conn: sqlite3.Connection, now: float):
+        """租约过期的任务计一次失败：重新入队或进入死信"""
+        rows = conn.execute(
+            "SELECT payload, lease_owner FROM queue_tasks WHERE status = 'in_progress' AND lease_expires < ?",
+            (now,)
+        ).fetchall()
+        for payload, owner in rows:
+            task = QueuedTask.from_dict(json.loads(payload))
+            self._fail(conn, task, f"Lease expired (worker {owner})", True, now)
+            QUEUE_EVENTS.labels("expired").inc()
+    
+    def _fail(self, conn: sqlite3.Connection, task: QueuedTask, error: str, retry: bool, now: float):
+        task.retry_count += 1
+        if retry and task.retry_count < task.max_retries:
+            # Re-enqueue with lower priority
+            task.priority = min(task.priority + 1, TaskPriority.BATCH)
+            task.started_at = None
+            conn.execute(
+                """
+                UPDATE queue_tasks
+                SET status = 'pending', priority = ?, seq = ?, payload = ?, error = ?,
+                    lease_expires = NULL, updated_at = ?
+                WHERE task_id = ?
+                """,
+                (
+                    int(task.priority), self._next_seq(conn),
+                    json.dumps(task.to_dict(), ensure_ascii=False), error, now, task.task_id
+                )
+            )
+            QUEUE_EVENTS.labels("retried").inc()
+        else:
+            conn.execute(
+                """
+                UPDATE queue_tasks
+                SET status = 'failed', payload = ?, error = ?, lease_expires = NULL, updated_at = ?
+                WHERE task_id = ?
+                """,
+                (json.dumps(task.to_dict(), ensure_ascii=False), error, now, task.task_id)
+            )
+            QUEUE_EVENTS.labels("failed").inc()
+    
+    @staticmethod
+    def _next_seq(conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM queue_tasks").fetchone()[0]
+    
+    def _connection(self) -> sqlite3.Connection:
+        """每个进程一个连接；fork 出的子进程不复用父进程的连接"""
+        pid = os.getpid()
+        if self._conn is None or self._pid != pid:
+            self._conn = sqlite3.connect(
+                self.db_path, timeout=30.0, isolation_level=None, check_same_thread=False
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SQLITE_SCHEMA)
+            self._pid = pid
+        return self._conn
+    
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """写事务 (BEGIN IMMEDIATE)：跨进程串行化"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+
 class RedisTaskQueue(TaskQueue):
     """
     Redis 任务队列（适用于分布式）
@@ -280,7 +790,10 @@ class RedisTaskQueue(TaskQueue):
         self.key_prefix = key_prefix
         # TODO: Initialize Redis connection
         # self.redis = await aioredis.from_url(redis_url)
-        raise NotImplementedError("RedisTaskQueue requires redis-py or aioredis. Use InMemoryTaskQueue for now.")
+        raise NotImplementedError(
+            "RedisTaskQueue requires redis-py or aioredis. "
+            "Use SQLiteTaskQueue to share a queue between processes on one host."
+        )
     
     async def enqueue(self, task: QueuedTask) -> bool:
         """入队到 Redis"""
@@ -292,12 +805,14 @@ class RedisTaskQueue(TaskQueue):
         # TODO: BZPOPMIN with timeout
         pass
     
-    async def ack(self, task_id: str, result: Dict[str, Any]) -> bool:
+    async def ack(self, task_id: str, result: Dict[str, Any], lease_token: Optional[int] = None) -> bool:
         """ACK 到 Redis"""
         # TODO: Move from in-progress to completed
         pass
     
-    async def nack(self, task_id: str, error: str, retry: bool = True) -> bool:
+    async def nack(
+        self, task_id: str, error: str, retry: bool = True, lease_token: Optional[int] = None
+    ) -> bool:
         """NACK 到 Redis"""
         # TODO: Move from in-progress to failed or retry queue
         pass
@@ -318,7 +833,7 @@ def create_task_queue(queue_type: str = "memory", **kwargs) -> TaskQueue:
     创建任务队列
     
     Args:
-        queue_type: "memory" or "redis"
+        queue_type: "memory", "sqlite" or "redis"
         **kwargs: 队列配置参数
         
     Returns:
@@ -326,6 +841,8 @@ def create_task_queue(queue_type: str = "memory", **kwargs) -> TaskQueue:
     """
     if queue_type == "memory":
         return InMemoryTaskQueue(**kwargs)
+    elif queue_type == "sqlite":
+        return SQLiteTaskQueue(**kwargs)
     elif queue_type == "redis":
         return RedisTaskQueue(**kwargs)
     else:
@@ -118,7 +118,7 @@ class Worker:
             )
             
             # ACK
-            await self.task_queue.ack(task.task_id, result)
+            await self.task_queue.ack(task.task_id, result, lease_token=task.lease_token)
             
             trace_entry["status"] = "completed"
             trace_entry["completed_at"] = datetime.now().isoformat()
@@ -131,7 +131,7 @@ class Worker:
             
         except asyncio.TimeoutError:
             error = f"Task timeout after {task.timeout_sec}s"
-            await self.task_queue.nack(task.task_id, error, retry=True)
+            await self.task_queue.nack(task.task_id, error, retry=True, lease_token=task.lease_token)
             
             trace_entry["status"] = "timeout"
             trace_entry["error"] = error
@@ -141,7 +141,7 @@ class Worker:
             
         except Exception as e:
             error = f"Execution error: {str(e)}"
-            await self.task_queue.nack(task.task_id, error, retry=True)
+            await self.task_queue.nack(task.task_id, error, retry=True, lease_token=task.lease_token)
             
             trace_entry["status"] = "failed"
             trace_entry["error"] = error
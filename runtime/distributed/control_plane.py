@@ -1,16 +1,59 @@
 """
 Control Plane - Distributed execution scheduler
 L6 Component: Distributed Architecture
+
+1. Workers, leases and pending tasks are persisted in SQLite (WAL) and
+   reloaded on restart
+2. Every lease carries a fencing token from a persisted, strictly increasing
+   counter; start/complete calls with a superseded token are rejected, and
+   once a task has been re-granted (requeued or stolen) calls must present
+   the token
+3. Available workers are indexed per capability in lazy min-heaps keyed by
+   load, so selecting the least-loaded capable worker is O(log n)
+4. Heartbeats renew a worker's leases; missed heartbeats or expired leases
+   requeue the task at the front of the pending queue
+5. Idle workers steal leased-but-not-started tasks from overloaded workers
 """
 
 from pydantic import BaseModel
-from typing import Dict, List, Optional, Any
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from datetime import datetime, timedelta
+from collections import deque
+from contextlib import contextmanager
+import heapq
+import sqlite3
+import threading
 import uuid
 import json
 import os
 
 
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cp_workers (
+    worker_id TEXT PRIMARY KEY,
+    body TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cp_leases (
+    lease_id TEXT PRIMARY KEY,
+    task_id TEXT NOT NULL,
+    worker_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cp_leases_status ON cp_leases (status);
+CREATE TABLE IF NOT EXISTS cp_pending (
+    seq INTEGER PRIMARY KEY,
+    body TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cp_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+ACTIVE_LEASE_STATUSES = ("leased", "executing")
+
+
 class WorkerNode(BaseModel):
     """Worker node registration"""
     worker_id: str
@@ -33,7 +76,66 @@ class TaskLease(BaseModel):
     leased_at: datetime
     expires_at: datetime
     heartbeat_interval: int = 30  # seconds
-    status: str  # leased | executing | completed | failed | expired
+    status: str  # leased | executing | completed | failed | expired | stolen
+    fencing_token: int = 0
+    attempt: int = 1  # grants of this task so far; > 1 means re-granted
+    task: Dict[str, Any] = {}
+    required_capabilities: List[str] = []
+
+
+class _WorkerIndex:
+    """
+    Available workers per capability ("" indexes every worker).
+
+    Each heap holds (load, version, worker_id); updating a worker bumps its
+    version and pushes fresh entries, stale ones are dropped when they
+    surface or when the heap is compacted.
+    """
+
+    ALL = ""
+
+    def __init__(self):
+        self._heaps: Dict[str, List[Tuple[int, int, str]]] = {}
+        self._versions: Dict[str, int] = {}
+        self._caps: Dict[str, frozenset] = {}
+
+    def update(self, worker: WorkerNode, available: bool) -> None:
+        version = self._versions.get(worker.worker_id, 0) + 1
+        self._versions[worker.worker_id] = version
+        self._caps[worker.worker_id] = frozenset(worker.capabilities)
+        if not available:
+            return
+        entry = (len(worker.current_tasks), version, worker.worker_id)
+        for cap in (self.ALL, *worker.capabilities):
+            heap = self._heaps.setdefault(cap, [])
+            heapq.heappush(heap, entry)
+            if len(heap) > 4 * len(self._versions) + 64:
+                self._heaps[cap] = heap = [e for e in heap if self._versions.get(e[2]) == e[1]]
+                heapq.heapify(heap)
+
+    def select(self, required_capabilities: List[str]) -> Optional[str]:
+        """Least-loaded available worker having every required capability"""
+        caps = required_capabilities or [self.ALL]
+        heaps = [self._heaps.get(cap) for cap in caps]
+        if not all(heaps):
+            return None
+        # Scan the smallest candidate set; the other capabilities are filters
+        heap = min(heaps, key=len)
+        required = frozenset(required_capabilities)
+        skipped = []
+        chosen = None
+        while heap:
+            load, version, worker_id = heap[0]
+            if self._versions.get(worker_id) != version:
+                heapq.heappop(heap)
+                continue
+            if required <= self._caps[worker_id]:
+                chosen = worker_id
+                break
+            skipped.append(heapq.heappop(heap))
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+        return chosen
 
 
 class ControlPlane:
@@ -41,31 +143,49 @@ class ControlPlane:
     Distributed execution control plane
     Manages worker registration, task scheduling, lease management
     """
-    
+
     def __init__(
         self,
-        lease_duration: int = 300,  # 5 minutes
-        heartbeat_timeout: int = 60,  # 1 minute
-        artifacts_path: str = "artifacts/distributed"
+        lease_duration: float = 300,  # 5 minutes
+        heartbeat_timeout: float = 60,  # 1 minute
+        artifacts_path: str = "artifacts/distributed",
+        db_path: Optional[str] = None
     ):
         self.lease_duration = lease_duration
         self.heartbeat_timeout = heartbeat_timeout
         self.artifacts_path = artifacts_path
         os.makedirs(artifacts_path, exist_ok=True)
-        
+        self.db_path = db_path or os.path.join(artifacts_path, "control_plane.db")
+
         # State
         self.workers: Dict[str, WorkerNode] = {}
-        self.leases: Dict[str, TaskLease] = {}
-        self.pending_tasks: List[Dict[str, Any]] = []
-        
+        self.leases: Dict[str, TaskLease] = {}  # active leases only
+        self.pending_tasks: deque = deque()
+        self._index = _WorkerIndex()
+        # worker_id -> active lease ids
+        self._by_worker: Dict[str, set] = {}
+        # worker_id -> lease ids granted but not started (stealable), oldest first
+        self._queued: Dict[str, List[str]] = {}
+        self._fencing_token = 0
+
         # Statistics
         self.stats = {
             "total_tasks_scheduled": 0,
             "total_leases_granted": 0,
             "total_lease_expirations": 0,
+            "total_tasks_stolen": 0,
             "active_workers": 0
         }
-    
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(
+            self.db_path, timeout=30.0, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._load()
+
     def register_worker(
         self,
         host: str,
@@ -74,34 +194,56 @@ class ControlPlane:
         max_concurrent_tasks: int = 5,
         worker_id: Optional[str] = None
     ) -> str:
-        """Register a new worker node"""
+        """Register a new worker node (re-registering an id updates it)"""
         if worker_id is None:
             worker_id = f"worker_{uuid.uuid4().hex[:8]}"
-        
-        worker = WorkerNode(
-            worker_id=worker_id,
-            host=host,
-            port=port,
-            capabilities=capabilities,
-            max_concurrent_tasks=max_concurrent_tasks,
-            registered_at=datetime.now(),
-            last_heartbeat=datetime.now(),
-            status="idle"
-        )
-        
-        self.workers[worker_id] = worker
-        self.stats["active_workers"] = len([w for w in self.workers.values() if w.status != "offline"])
-        
+
+        with self._transaction() as conn:
+            now = datetime.now()
+            existing = self.workers.get(worker_id)
+            worker = WorkerNode(
+                worker_id=worker_id,
+                host=host,
+                port=port,
+                capabilities=capabilities,
+                max_concurrent_tasks=max_concurrent_tasks,
+                registered_at=existing.registered_at if existing else now,
+                last_heartbeat=now,
+                status="idle",
+                current_tasks=existing.current_tasks if existing else []
+            )
+            self.workers[worker_id] = worker
+            self._update_worker(conn, worker)
+            self._count_active_workers(conn)
+            self._dispatch_pending(conn)
+
         return worker_id
-    
+
     def heartbeat(self, worker_id: str) -> bool:
-        """Process worker heartbeat"""
-        if worker_id not in self.workers:
-            return False
-        
-        self.workers[worker_id].last_heartbeat = datetime.now()
-        return True
-    
+        """Process worker heartbeat and renew the worker's leases"""
+        with self._transaction() as conn:
+            worker = self.workers.get(worker_id)
+            if worker is None:
+                return False
+
+            now = datetime.now()
+            worker.last_heartbeat = now
+            if worker.status == "offline":
+                # Its leases were requeued when it went offline
+                worker.status = "idle"
+                self._update_worker(conn, worker)
+                self._count_active_workers(conn)
+                self._dispatch_pending(conn)
+            else:
+                self._save_worker(conn, worker)
+
+            expires_at = now + timedelta(seconds=self.lease_duration)
+            for lease_id in self._by_worker.get(worker_id, ()):
+                lease = self.leases[lease_id]
+                lease.expires_at = expires_at
+                self._save_lease(conn, lease)
+            return True
+
     def schedule_task(
         self,
         task: Dict[str, Any],
@@ -110,112 +252,409 @@ class ControlPlane:
     ) -> Optional[str]:
         """
         Schedule a task for execution
-        Returns: lease_id if scheduled, None if no workers available
+        Returns: lease_id if scheduled, None if queued (no worker available)
         """
         if required_capabilities is None:
             required_capabilities = []
-        
-        # Find available worker
-        available_workers = [
-            w for w in self.workers.values()
-            if w.status in ["idle", "active"] and
-            len(w.current_tasks) < w.max_concurrent_tasks and
-            all(cap in w.capabilities for cap in required_capabilities)
-        ]
-        
-        if not available_workers:
-            # Queue task
-            self.pending_tasks.append({
-                "task": task,
-                "tenant_id": tenant_id,
-                "required_capabilities": required_capabilities
-            })
-            return None
-        
-        # Select worker (simple: least loaded)
-        worker = min(available_workers, key=lambda w: len(w.current_tasks))
-        
-        # Create lease
-        lease_id = f"lease_{uuid.uuid4().hex[:12]}"
-        task_id = task.get("task_id", f"task_{uuid.uuid4().hex[:8]}")
-        
-        lease = TaskLease(
-            lease_id=lease_id,
-            task_id=task_id,
-            worker_id=worker.worker_id,
-            tenant_id=tenant_id,
-            leased_at=datetime.now(),
-            expires_at=datetime.now() + timedelta(seconds=self.lease_duration),
-            status="leased"
-        )
-        
-        self.leases[lease_id] = lease
-        worker.current_tasks.append(task_id)
-        worker.status = "busy" if len(worker.current_tasks) >= worker.max_concurrent_tasks else "active"
-        
-        self.stats["total_tasks_scheduled"] += 1
-        self.stats["total_leases_granted"] += 1
-        
-        return lease_id
-    
-    def complete_task(self, lease_id: str, result: Any):
-        """Mark task as completed"""
-        if lease_id not in self.leases:
-            return False
-        
-        lease = self.leases[lease_id]
-        lease.status = "completed"
-        
-        # Update worker
-        if lease.worker_id in self.workers:
-            worker = self.workers[lease.worker_id]
-            if lease.task_id in worker.current_tasks:
-                worker.current_tasks.remove(lease.task_id)
-            worker.status = "idle" if len(worker.current_tasks) == 0 else "active"
-        
-        return True
-    
-    def check_expired_leases(self):
-        """Check and mark expired leases"""
+        task = dict(task)
+        task.setdefault("task_id", f"task_{uuid.uuid4().hex[:8]}")
+
+        with self._transaction() as conn:
+            self.stats["total_tasks_scheduled"] += 1
+            worker_id = self._index.select(required_capabilities)
+            if worker_id is None:
+                self._enqueue_pending(conn, task, tenant_id, required_capabilities)
+                self._save_stats(conn)
+                return None
+            lease = self._grant(conn, self.workers[worker_id], task, tenant_id, required_capabilities)
+            return lease.lease_id
+
+    def start_task(
+        self,
+        lease_id: str,
+        fencing_token: Optional[int] = None,
+        worker_id: Optional[str] = None
+    ) -> bool:
+        """Worker began executing the lease; it can no longer be stolen"""
+        with self._transaction() as conn:
+            lease = self._current_lease(lease_id, fencing_token, worker_id)
+            if lease is None:
+                return False
+            if lease.status == "leased":
+                lease.status = "executing"
+                queued = self._queued.get(lease.worker_id)
+                if queued and lease_id in queued:
+                    queued.remove(lease_id)
+                self._save_lease(conn, lease)
+            return True
+
+    def complete_task(
+        self,
+        lease_id: str,
+        result: Any,
+        fencing_token: Optional[int] = None,
+        worker_id: Optional[str] = None
+    ) -> bool:
+        """Mark task as completed; stale leases or superseded tokens are rejected"""
+        with self._transaction() as conn:
+            lease = self._current_lease(lease_id, fencing_token, worker_id)
+            if lease is None:
+                return False
+            self._release(conn, lease, "completed")
+            self._dispatch_pending(conn)
+            return True
+
+    def check_expired_leases(self) -> List[str]:
+        """Expire overdue leases and requeue their tasks; returns requeued task ids"""
         now = datetime.now()
-        
-        for lease_id, lease in self.leases.items():
-            if lease.status == "leased" and lease.expires_at < now:
-                lease.status = "expired"
-                self.stats["total_lease_expirations"] += 1
-                
-                # Release worker
-                if lease.worker_id in self.workers:
-                    worker = self.workers[lease.worker_id]
-                    if lease.task_id in worker.current_tasks:
-                        worker.current_tasks.remove(lease.task_id)
-                    worker.status = "idle" if len(worker.current_tasks) == 0 else "active"
-    
-    def check_dead_workers(self):
-        """Check for workers that haven't sent heartbeats"""
+        with self._transaction() as conn:
+            expired = [
+                lease for lease in self.leases.values()
+                if lease.expires_at < now
+            ]
+            for lease in expired:
+                self._release(conn, lease, "expired", requeue=True)
+            if expired:
+                self._dispatch_pending(conn)
+            return [lease.task_id for lease in expired]
+
+    def check_dead_workers(self) -> List[str]:
+        """Mark workers without recent heartbeats offline and requeue their leases"""
         now = datetime.now()
         timeout = timedelta(seconds=self.heartbeat_timeout)
-        
-        for worker_id, worker in self.workers.items():
-            if worker.status != "offline" and (now - worker.last_heartbeat) > timeout:
+
+        with self._transaction() as conn:
+            dead = [
+                worker for worker in self.workers.values()
+                if worker.status != "offline" and (now - worker.last_heartbeat) > timeout
+            ]
+            for worker in dead:
                 worker.status = "offline"
-                self.stats["active_workers"] = len([w for w in self.workers.values() if w.status != "offline"])
-    
+                for lease_id in list(self._by_worker.get(worker.worker_id, ())):
+                    self._release(conn, self.leases[lease_id], "expired", requeue=True)
+                self._update_worker(conn, worker)
+            if dead:
+                self._count_active_workers(conn)
+                self._dispatch_pending(conn)
+            return [worker.worker_id for worker in dead]
+
+    def steal_work(self, worker_id: str, max_tasks: Optional[int] = None) -> List[str]:
+        """
+        Move leased-but-not-started tasks from the most loaded workers to
+        `worker_id` while the load gap is at least 2; returns new lease ids.
+        The victims' old leases become "stolen" and their tokens stale.
+        """
+        with self._transaction() as conn:
+            thief = self.workers.get(worker_id)
+            if thief is None or thief.status == "offline":
+                return []
+            thief_caps = set(thief.capabilities)
+            victims = sorted(
+                (self.workers[wid] for wid, queued in self._queued.items() if queued and wid != worker_id),
+                key=lambda w: len(w.current_tasks),
+                reverse=True
+            )
+
+            stolen = []
+            for victim in victims:
+                queued = self._queued[victim.worker_id]
+                # Newest first: the victim would reach those last
+                for lease_id in reversed(list(queued)):
+                    if max_tasks is not None and len(stolen) >= max_tasks:
+                        break
+                    if len(thief.current_tasks) >= thief.max_concurrent_tasks:
+                        break
+                    if len(victim.current_tasks) - len(thief.current_tasks) < 2:
+                        break
+                    lease = self.leases[lease_id]
+                    if not set(lease.required_capabilities) <= thief_caps:
+                        continue
+                    self._release(conn, lease, "stolen")
+                    new_lease = self._grant(
+                        conn, thief, lease.task, lease.tenant_id, lease.required_capabilities,
+                        attempt=lease.attempt + 1
+                    )
+                    stolen.append(new_lease.lease_id)
+                    self.stats["total_tasks_stolen"] += 1
+            if stolen:
+                self._save_stats(conn)
+            return stolen
+
+    def rebalance(self) -> int:
+        """Let every idle worker steal from overloaded ones; returns tasks moved"""
+        idle = [w.worker_id for w in self.workers.values() if w.status == "idle"]
+        return sum(len(self.steal_work(worker_id)) for worker_id in idle)
+
+    def dispatch_pending(self) -> List[str]:
+        """Assign queued tasks to available workers; returns new lease ids"""
+        with self._transaction() as conn:
+            return self._dispatch_pending(conn)
+
+    def tick(self) -> Dict[str, Any]:
+        """One scheduling round: liveness, lease expiry, pending dispatch, stealing"""
+        offline = self.check_dead_workers()
+        requeued = self.check_expired_leases()
+        dispatched = self.dispatch_pending()
+        stolen = self.rebalance()
+        return {
+            "offline_workers": offline,
+            "requeued_tasks": requeued,
+            "dispatched_leases": dispatched,
+            "stolen_tasks": stolen
+        }
+
+    def leases_for_worker(self, worker_id: str) -> List[TaskLease]:
+        """Active leases held by a worker"""
+        with self._lock:
+            lease_ids = self._by_worker.get(worker_id, ())
+            return sorted((self.leases[l] for l in lease_ids), key=lambda l: l.fencing_token)
+
+    def get_lease(self, lease_id: str) -> Optional[TaskLease]:
+        """Lease by id, including finished ones"""
+        with self._lock:
+            if lease_id in self.leases:
+                return self.leases[lease_id]
+            row = self._conn.execute(
+                "SELECT body FROM cp_leases WHERE lease_id = ?", (lease_id,)
+            ).fetchone()
+        return TaskLease.model_validate_json(row[0]) if row else None
+
     def get_stats(self) -> Dict[str, Any]:
         """Get control plane statistics"""
-        return {
-            "statistics": dict(self.stats),
-            "workers": {
-                "total": len(self.workers),
-                "active": len([w for w in self.workers.values() if w.status != "offline"]),
-                "busy": len([w for w in self.workers.values() if w.status == "busy"]),
-                "idle": len([w for w in self.workers.values() if w.status == "idle"])
-            },
-            "tasks": {
-                "pending": len(self.pending_tasks),
-                "active_leases": len([l for l in self.leases.values() if l.status in ["leased", "executing"]])
+        with self._lock:
+            return {
+                "statistics": dict(self.stats),
+                "workers": {
+                    "total": len(self.workers),
+                    "active": len([w for w in self.workers.values() if w.status != "offline"]),
+                    "busy": len([w for w in self.workers.values() if w.status == "busy"]),
+                    "idle": len([w for w in self.workers.values() if w.status == "idle"])
+                },
+                "tasks": {
+                    "pending": len(self.pending_tasks),
+                    "active_leases": len(self.leases)
+                },
+                "fencing_token": self._fencing_token
             }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _grant(
+        self,
+        conn: sqlite3.Connection,
+        worker: WorkerNode,
+        task: Dict[str, Any],
+        tenant_id: str,
+        required_capabilities: List[str],
+        attempt: int = 1
+    ) -> TaskLease:
+        now = datetime.now()
+        self._fencing_token += 1
+        lease = TaskLease(
+            lease_id=f"lease_{uuid.uuid4().hex[:12]}",
+            task_id=task["task_id"],
+            worker_id=worker.worker_id,
+            tenant_id=tenant_id,
+            leased_at=now,
+            expires_at=now + timedelta(seconds=self.lease_duration),
+            status="leased",
+            fencing_token=self._fencing_token,
+            attempt=attempt,
+            task=task,
+            required_capabilities=required_capabilities
+        )
+        self.leases[lease.lease_id] = lease
+        self._by_worker.setdefault(worker.worker_id, set()).add(lease.lease_id)
+        self._queued.setdefault(worker.worker_id, []).append(lease.lease_id)
+        worker.current_tasks.append(lease.task_id)
+        self._update_worker(conn, worker)
+        self._save_lease(conn, lease)
+        conn.execute(
+            "INSERT OR REPLACE INTO cp_meta (key, value) VALUES ('fencing_token', ?)",
+            (str(self._fencing_token),)
+        )
+        self.stats["total_leases_granted"] += 1
+        self._save_stats(conn)
+        return lease
+
+    def _release(self, conn: sqlite3.Connection, lease: TaskLease, status: str, requeue: bool = False):
+        """End an active lease, free the worker slot and optionally requeue the task"""
+        lease.status = status
+        self.leases.pop(lease.lease_id, None)
+        self._by_worker.get(lease.worker_id, set()).discard(lease.lease_id)
+        queued = self._queued.get(lease.worker_id)
+        if queued and lease.lease_id in queued:
+            queued.remove(lease.lease_id)
+        self._save_lease(conn, lease)
+
+        worker = self.workers.get(lease.worker_id)
+        if worker is not None and lease.task_id in worker.current_tasks:
+            worker.current_tasks.remove(lease.task_id)
+            self._update_worker(conn, worker)
+
+        if requeue:
+            self.stats["total_lease_expirations"] += 1
+            self._enqueue_pending(
+                conn, lease.task, lease.tenant_id, lease.required_capabilities,
+                front=True, attempt=lease.attempt + 1
+            )
+        self._save_stats(conn)
+
+    def _dispatch_pending(self, conn: sqlite3.Connection) -> List[str]:
+        granted = []
+        remaining = deque()
+        while self.pending_tasks:
+            entry = self.pending_tasks.popleft()
+            worker_id = self._index.select(entry["required_capabilities"])
+            if worker_id is None:
+                remaining.append(entry)
+                if self._index.select([]) is None:
+                    # Every worker is full; nothing further can be placed
+                    break
+                continue
+            lease = self._grant(
+                conn, self.workers[worker_id], entry["task"], entry["tenant_id"],
+                entry["required_capabilities"], attempt=entry.get("attempt", 1)
+            )
+            conn.execute("DELETE FROM cp_pending WHERE seq = ?", (entry["seq"],))
+            granted.append(lease.lease_id)
+        remaining.extend(self.pending_tasks)
+        self.pending_tasks = remaining
+        return granted
+
+    def _enqueue_pending(
+        self,
+        conn: sqlite3.Connection,
+        task: Dict[str, Any],
+        tenant_id: str,
+        required_capabilities: List[str],
+        front: bool = False,
+        attempt: int = 1
+    ):
+        if front:
+            seq = (self.pending_tasks[0]["seq"] if self.pending_tasks else 0) - 1
+        else:
+            seq = (self.pending_tasks[-1]["seq"] if self.pending_tasks else 0) + 1
+        entry = {
+            "seq": seq,
+            "task": task,
+            "tenant_id": tenant_id,
+            "required_capabilities": required_capabilities,
+            "attempt": attempt
         }
+        if front:
+            self.pending_tasks.appendleft(entry)
+        else:
+            self.pending_tasks.append(entry)
+        conn.execute(
+            "INSERT INTO cp_pending (seq, body) VALUES (?, ?)",
+            (seq, json.dumps(entry, ensure_ascii=False, default=str))
+        )
+
+    def _current_lease(
+        self,
+        lease_id: str,
+        fencing_token: Optional[int],
+        worker_id: Optional[str] = None
+    ) -> Optional[TaskLease]:
+        """
+        The active lease if the caller may act on it. A missing token is only
+        tolerated on a task's first grant: after a requeue or steal an earlier
+        holder could otherwise overwrite the new holder's result.
+        """
+        lease = self.leases.get(lease_id)
+        if lease is None:
+            return None
+        if worker_id is not None and worker_id != lease.worker_id:
+            return None
+        if fencing_token is None:
+            return lease if lease.attempt == 1 else None
+        if fencing_token != lease.fencing_token:
+            return None
+        return lease
+
+    def _update_worker(self, conn: sqlite3.Connection, worker: WorkerNode):
+        """Recompute status from load, refresh the index entry and persist"""
+        if worker.status != "offline":
+            load = len(worker.current_tasks)
+            if load >= worker.max_concurrent_tasks:
+                worker.status = "busy"
+            else:
+                worker.status = "idle" if load == 0 else "active"
+        available = worker.status in ("idle", "active")
+        self._index.update(worker, available)
+        self._save_worker(conn, worker)
+
+    def _count_active_workers(self, conn: sqlite3.Connection):
+        self.stats["active_workers"] = len([w for w in self.workers.values() if w.status != "offline"])
+        self._save_stats(conn)
+
+    def _save_worker(self, conn: sqlite3.Connection, worker: WorkerNode):
+        conn.execute(
+            "INSERT OR REPLACE INTO cp_workers (worker_id, body) VALUES (?, ?)",
+            (worker.worker_id, worker.model_dump_json())
+        )
+
+    def _save_lease(self, conn: sqlite3.Connection, lease: TaskLease):
+        conn.execute(
+            "INSERT OR REPLACE INTO cp_leases (lease_id, task_id, worker_id, status, body) VALUES (?, ?, ?, ?, ?)",
+            (lease.lease_id, lease.task_id, lease.worker_id, lease.status, lease.model_dump_json())
+        )
+
+    def _save_stats(self, conn: sqlite3.Connection):
+        conn.execute(
+            "INSERT OR REPLACE INTO cp_meta (key, value) VALUES ('stats', ?)",
+            (json.dumps(self.stats),)
+        )
+
+    def _load(self):
+        """Rebuild in-memory state and indexes from the database"""
+        with self._lock:
+            meta = dict(self._conn.execute("SELECT key, value FROM cp_meta").fetchall())
+            self._fencing_token = int(meta.get("fencing_token", 0))
+            if "stats" in meta:
+                self.stats.update(json.loads(meta["stats"]))
+
+            # Liveness restarts with the control plane: downtime here says
+            # nothing about the workers
+            now = datetime.now()
+            for (body,) in self._conn.execute("SELECT body FROM cp_workers"):
+                worker = WorkerNode.model_validate_json(body)
+                worker.last_heartbeat = now
+                self.workers[worker.worker_id] = worker
+
+            placeholders = ",".join("?" * len(ACTIVE_LEASE_STATUSES))
+            rows = self._conn.execute(
+                f"SELECT body FROM cp_leases WHERE status IN ({placeholders})",
+                ACTIVE_LEASE_STATUSES
+            ).fetchall()
+            for (body,) in sorted(rows, key=lambda r: json.loads(r[0])["fencing_token"]):
+                lease = TaskLease.model_validate_json(body)
+                self.leases[lease.lease_id] = lease
+                self._by_worker.setdefault(lease.worker_id, set()).add(lease.lease_id)
+                if lease.status == "leased":
+                    self._queued.setdefault(lease.worker_id, []).append(lease.lease_id)
+
+            for (body,) in self._conn.execute("SELECT body FROM cp_pending ORDER BY seq"):
+                self.pending_tasks.append(json.loads(body))
+
+            for worker in self.workers.values():
+                available = worker.status in ("idle", "active")
+                self._index.update(worker, available)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction (BEGIN IMMEDIATE) covering one state change"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
 
 
 # Global control plane
@@ -227,6 +666,3 @@ def get_control_plane() -> ControlPlane:
     if _control_plane is None:
         _control_plane = ControlPlane()
     return _control_plane
-
-
-
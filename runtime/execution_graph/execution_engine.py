@@ -17,6 +17,7 @@ from runtime.execution_plan.plan_selector import PlanSelector
 from runtime.execution_plan.plan_definition import ExecutionPlan, PlanNode
 from runtime.tools.tool_dispatcher import ToolDispatcher
 from runtime.platform.trace_store import TraceStore, TraceEvent
+from runtime.observability.artifact_catalog import record_artifact
 from runtime.decision_agents.intent_agent import IntentUnderstandingAgent
 from runtime.decision_agents.query_transformation_agent import QueryTransformationAgent
 from runtime.decision_agents.candidate_ranking_agent import CandidateRankingAgent
@@ -31,6 +32,7 @@ from learning.structural_learning import get_structural_learner, StructuralFeatu
 from learning.tenant_learning import get_tenant_learning_controller
 from learning.unified_policy import TaskSuccessRewardComputer
 from datetime import datetime
+import time
 import uuid
 
 class ExecutionEngine:
@@ -483,6 +485,7 @@ class ExecutionEngine:
             "timestamp": None
         }
         
+        started = time.perf_counter()
         try:
             result = await agent.execute(context, task_id)
             
@@ -527,6 +530,8 @@ class ExecutionEngine:
             trace_entry["output"] = {"error": str(e)}
             trace_entry["status"] = "failed"
             raise
+        finally:
+            self._record_agent_metrics(agent_name, trace_entry.get("status", "failed"), started)
         
         from datetime import datetime
         trace_entry["timestamp"] = datetime.now().isoformat()
@@ -534,6 +539,21 @@ class ExecutionEngine:
         
         return result
     
+    def _record_agent_metrics(self, agent_name: str, status: str, started: float) -> None:
+        """Agent 执行次数与耗时分布（metrics 不可用时跳过）"""
+        if self.metrics is None:
+            return
+        try:
+            self.metrics.counter("agent_executions_total").inc()
+            self.metrics.histogram(
+                "agent_execution_duration_seconds",
+                "ExecutionEngine._execute_agent latency",
+                ("agent", "status"),
+                buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+            ).labels(agent_name, status).observe(time.perf_counter() - started)
+        except Exception:
+            pass
+    
     async def _governance_checkpoint(
         self,
         task_id: str,
@@ -686,6 +706,9 @@ class ExecutionEngine:
         trace_path = os.path.join(artifact_dir, "system_trace.json")
         with open(trace_path, "w", encoding="utf-8") as f:
             json.dump(trace_data, f, indent=2, ensure_ascii=False)
+        
+        for path in (manifest_path, readme_path, trace_path):
+            record_artifact(path)
     
     def _extract_conditions_evidence(self) -> Dict[str, Any]:
         """提取条件命中证据（用于审计）"""
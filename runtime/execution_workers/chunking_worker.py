@@ -1,26 +1,45 @@
 """
 Chunking Worker: deterministic chunking based on provided strategy id.
+
+Blocks are packed greedily into chunks of at most `chunk_size` characters
+(execution_plan["chunk_size"], default 512); consecutive chunks share up to
+`chunk_overlap` characters (default 50) cut at a word boundary. Blocks longer
+than a chunk are split on whitespace first.
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 import time
 import os
 from runtime.execution_workers.common import evidence_record, write_json, ensure_dir
 import hashlib
 
+DEFAULT_CHUNK_SIZE = 512
+DEFAULT_CHUNK_OVERLAP = 50
+
 
 def _chunk_id(content: str, idx: int) -> str:
     return hashlib.sha256(f"{content}|{idx}".encode()).hexdigest()[:16]
 
 
 def run_chunk(execution_input: Dict[str, Any], structured_input: Dict[str, Any]) -> Dict[str, Any]:
+    output, ev = chunk_document(execution_input, structured_input)
+    _persist(execution_input.get("run_id"), execution_input.get("file_id"), output, ev)
+    return ev
+
+
+def chunk_document(
+    execution_input: Dict[str, Any],
+    structured_input: Dict[str, Any]
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Chunk without persisting; returns (output, evidence)."""
     start = time.time()
-    run_id = execution_input.get("run_id")
     file_id = execution_input.get("file_id")
     plan = execution_input.get("execution_plan", {})
     resource_profile = plan.get("resource_profile", {})
     strategy_id = plan.get("chunking_strategy_id")
+    chunk_size = plan.get("chunk_size", DEFAULT_CHUNK_SIZE)
+    chunk_overlap = plan.get("chunk_overlap", DEFAULT_CHUNK_OVERLAP)
 
-    if not strategy_id:
+    if not strategy_id or chunk_size <= 0 or not 0 <= chunk_overlap < chunk_size:
         output = {}
         ev = evidence_record(
             "CHUNKING",
@@ -32,20 +51,19 @@ def run_chunk(execution_input: Dict[str, Any], structured_input: Dict[str, Any])
             resource_usage=resource_profile,
             start_time=start,
         )
-        _persist(run_id, file_id, output, ev)
-        return ev
+        return output, ev
 
     blocks: List[str] = []
     for b in structured_input.get("structured_blocks", []):
         blocks.append(b if isinstance(b, str) else str(b))
 
     chunks = []
-    for idx, content in enumerate(blocks):
+    for idx, (content, first_block, last_block) in enumerate(split_blocks(blocks, chunk_size, chunk_overlap)):
         chunks.append(
             {
                 "chunk_id": _chunk_id(content, idx),
                 "content": content,
-                "source_ref": {"file_id": file_id, "block_idx": idx},
+                "source_ref": {"file_id": file_id, "block_idx": first_block, "block_end": last_block},
             }
         )
 
@@ -59,8 +77,75 @@ def run_chunk(execution_input: Dict[str, Any], structured_input: Dict[str, Any])
         resource_usage=resource_profile,
         start_time=start,
     )
-    _persist(run_id, file_id, output, ev)
-    return ev
+    return output, ev
+
+
+def split_blocks(blocks: List[str], chunk_size: int, chunk_overlap: int) -> List[Tuple[str, int, int]]:
+    """(content, first block idx, last block idx) for each chunk"""
+    chunks: List[Tuple[str, int, int]] = []
+    buf = ""
+    first = last = 0
+    for idx, block in enumerate(blocks):
+        # Leave room for the overlap carried into the next chunk
+        for piece in _pieces(block.strip(), chunk_size - chunk_overlap):
+            if not buf:
+                buf, first, last = piece, idx, idx
+                continue
+            # Pieces of one block rejoin with a space, blocks with a blank line
+            sep = " " if idx == last else "\n\n"
+            if len(buf) + len(sep) + len(piece) <= chunk_size:
+                buf, last = f"{buf}{sep}{piece}", idx
+                continue
+            chunks.append((buf, first, last))
+            tail = _tail(buf, min(chunk_overlap, chunk_size - len(piece) - len(sep)))
+            if tail:
+                buf, first = f"{tail}{sep}{piece}", last
+            else:
+                buf, first = piece, idx
+            last = idx
+    if buf:
+        chunks.append((buf, first, last))
+    return chunks
+
+
+def _pieces(text: str, size: int) -> List[str]:
+    """Split `text` into whitespace-delimited pieces of at most `size` chars"""
+    if len(text) <= size:
+        return [text] if text else []
+    pieces = []
+    current = ""
+    for word in text.split():
+        while len(word) > size:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(word[:size])
+            word = word[size:]
+        if not word:
+            continue
+        if not current:
+            current = word
+        elif len(current) + 1 + len(word) <= size:
+            current = f"{current} {word}"
+        else:
+            pieces.append(current)
+            current = word
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _tail(text: str, size: int) -> str:
+    """Last `size` chars of `text`, starting at a word boundary"""
+    if size <= 0:
+        return ""
+    if len(text) <= size:
+        return text
+    cut = len(text) - size
+    if not text[cut - 1].isspace():
+        rest = text[cut:].split(None, 1)
+        return rest[1].strip() if len(rest) == 2 else ""
+    return text[cut:].strip()
 
 
 def _persist(run_id: str, file_id: str, output: Dict[str, Any], evidence: Dict[str, Any]):
@@ -68,5 +153,3 @@ def _persist(run_id: str, file_id: str, output: Dict[str, Any], evidence: Dict[s
     ensure_dir(base)
     write_json(os.path.join(base, "chunk_output.json"), output)
     write_json(os.path.join(base, "chunk_evidence.json"), evidence)
-
-
@@ -5,7 +5,7 @@ import os
 import json
 import hashlib
 import time
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 FAIL_TYPES = {
     "TOOL_UNAVAILABLE",
@@ -54,3 +54,15 @@ def evidence_record(
     }
 
 
+def append_jsonl(path: str, records: List[Any]):
+    """Append records as JSON lines in a single write."""
+    append_lines(path, [json.dumps(r, ensure_ascii=False, default=str) for r in records])
+
+
+def append_lines(path: str, lines: List[str]):
+    """Append already serialized JSON lines in a single write."""
+    if not lines:
+        return
+    ensure_dir(os.path.dirname(path))
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("".join(line + "\n" for line in lines))
@@ -1,16 +1,28 @@
 """
 Embedding Worker: deterministic embedding execution without fallback.
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 import time
 import os
 from runtime.execution_workers.common import evidence_record, write_json, ensure_dir, sha256_json
 
 
 def run_embedding(execution_input: Dict[str, Any], chunks: Dict[str, Any]) -> Dict[str, Any]:
+    output, ev = embed_chunks(execution_input, chunks)
+    _persist(execution_input.get("run_id"), execution_input.get("file_id"), output, ev)
+    return ev
+
+
+def embed_chunks(
+    execution_input: Dict[str, Any],
+    chunks: Dict[str, Any],
+    cached: Optional[Dict[int, str]] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Embed without persisting; returns (output, evidence).
+    `cached` maps chunk positions to embeddings that are reused as-is.
+    """
     start = time.time()
-    run_id = execution_input.get("run_id")
-    file_id = execution_input.get("file_id")
     plan = execution_input.get("execution_plan", {})
     resource_profile = plan.get("resource_profile", {})
     model_id = plan.get("embedding_model_id")
@@ -27,13 +39,13 @@ def run_embedding(execution_input: Dict[str, Any], chunks: Dict[str, Any]) -> Di
             resource_usage=resource_profile,
             start_time=start,
         )
-        _persist(run_id, file_id, output, ev)
-        return ev
+        return output, ev
 
     # Deterministic mock embeddings (hash-based)
+    cached = cached or {}
     embeddings: List[str] = []
-    for ch in chunks.get("chunks", []):
-        embeddings.append(sha256_json(ch)[:32])
+    for idx, ch in enumerate(chunks.get("chunks", [])):
+        embeddings.append(cached[idx] if idx in cached else sha256_json(ch)[:32])
 
     output = {
         "embeddings": embeddings,
@@ -49,8 +61,7 @@ def run_embedding(execution_input: Dict[str, Any], chunks: Dict[str, Any]) -> Di
         resource_usage=resource_profile,
         start_time=start,
     )
-    _persist(run_id, file_id, output, ev)
-    return ev
+    return output, ev
 
 
 def _persist(run_id: str, file_id: str, output: Dict[str, Any], evidence: Dict[str, Any]):
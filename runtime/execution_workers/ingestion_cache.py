@@ -0,0 +1,293 @@
+"""
+Ingestion Cache: content-addressed stage outputs for incremental re-ingestion.
+
+Every stage output is stored under a key derived from exactly what produced it:
+    PARSING    file content hash + mime + parser tool_version
+    CHUNKING   parse output hash + file_id + strategy + chunk_size/overlap
+    EMBEDDING  chunk output hash + embedding model (the chunks.jsonl record)
+
+The chunks of a CHUNKING entry are stored once, inside the EMBEDDING record
+they were first embedded into; the entry itself points at that record.
+
+Downstream keys are built from the `output_hash` that evidence_record already
+computes, so a version or config change only invalidates the stages whose input
+actually changed: a new chunking config re-chunks from the cached parse output,
+a new embedding model leaves parsing and chunking untouched.
+
+When a document has to be re-embedded, its previous record for the same model
+(tracked per file_id) supplies embeddings for the chunks that did not change.
+
+File content hashes are memoized by (path, size, mtime_ns), so unchanged files
+are not even re-read.
+
+Storage: one SQLite database shared by the runner and its worker processes
+(WAL; one write transaction per batch).
+"""
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from runtime.execution_workers.chunking_worker import DEFAULT_CHUNK_OVERLAP, DEFAULT_CHUNK_SIZE
+from runtime.execution_workers.common import sha256_json
+from runtime.execution_workers.parsing_worker import PARSER_BINDINGS
+
+STAGES = ("PARSING", "CHUNKING", "EMBEDDING")
+
+# Stay below SQLITE_MAX_VARIABLE_NUMBER on old builds
+_MAX_PARAMS = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_hashes (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stage_outputs (
+    stage TEXT NOT NULL,
+    key TEXT NOT NULL,
+    output_hash TEXT NOT NULL,
+    evidence TEXT NOT NULL,
+    item_count INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    output TEXT NOT NULL,
+    PRIMARY KEY (stage, key)
+);
+CREATE TABLE IF NOT EXISTS latest_records (
+    file_id TEXT NOT NULL,
+    model_id TEXT NOT NULL,
+    embedding_key TEXT NOT NULL,
+    PRIMARY KEY (file_id, model_id)
+);
+"""
+
+
+class IngestionCache:
+    """
+    Content-addressed cache of parse / chunk / embedding outputs.
+
+    Entries are immutable: a key fully determines its output, so concurrent
+    writers storing the same key store the same value.
+    """
+
+    def __init__(self, db_path: str = os.path.join("artifacts", "execution_workers", "ingestion_cache.db")):
+        """
+        Args:
+            db_path: 缓存数据库路径（runner 与 worker 进程共享）
+        """
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._connection()
+
+    # ---- keys ----
+
+    @staticmethod
+    def parse_key(execution_input: Dict[str, Any], content_hash: str) -> str:
+        mime = execution_input.get("input_file_ref", {}).get("mime", "")
+        return sha256_json(["PARSING", content_hash, mime, PARSER_BINDINGS.get(mime, "")])
+
+    @staticmethod
+    def chunk_key(execution_input: Dict[str, Any], parse_output_hash: str) -> str:
+        plan = execution_input.get("execution_plan", {})
+        return sha256_json([
+            "CHUNKING",
+            parse_output_hash,
+            execution_input.get("file_id"),
+            plan.get("chunking_strategy_id"),
+            plan.get("chunk_size", DEFAULT_CHUNK_SIZE),
+            plan.get("chunk_overlap", DEFAULT_CHUNK_OVERLAP),
+        ])
+
+    @staticmethod
+    def embedding_key(execution_input: Dict[str, Any], chunk_output_hash: str) -> str:
+        model_id = execution_input.get("execution_plan", {}).get("embedding_model_id")
+        return sha256_json(["EMBEDDING", chunk_output_hash, model_id])
+
+    # ---- file hashes ----
+
+    def content_hashes(self, file_refs: Sequence[Dict[str, Any]]) -> List[Optional[str]]:
+        """
+        sha256 of each file's content (inline `content` or the bytes at `path`).
+        None for files that cannot be read; those are never served from cache.
+        """
+        hashes: List[Optional[str]] = [None] * len(file_refs)
+        stats: Dict[str, Tuple[int, int]] = {}
+        for i, ref in enumerate(file_refs):
+            if "content" in ref:
+                content = ref["content"]
+                data = content.encode() if isinstance(content, str) else json.dumps(content, default=str).encode()
+                hashes[i] = hashlib.sha256(data).hexdigest()
+            elif ref.get("path"):
+                try:
+                    st = os.stat(ref["path"])
+                except OSError:
+                    continue
+                stats[ref["path"]] = (st.st_size, st.st_mtime_ns)
+        if not stats:
+            return hashes
+
+        known = {}
+        for path, size, mtime_ns, digest in self._select_in(
+            "SELECT path, size, mtime_ns, sha256 FROM file_hashes WHERE path IN ({})", list(stats)
+        ):
+            if stats[path] == (size, mtime_ns):
+                known[path] = digest
+
+        updated = []
+        for path, (size, mtime_ns) in stats.items():
+            if path in known:
+                continue
+            try:
+                known[path] = _hash_file(path)
+            except OSError:
+                continue
+            updated.append((path, size, mtime_ns, known[path]))
+        if updated:
+            with self._transaction() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO file_hashes (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+                    updated
+                )
+
+        for i, ref in enumerate(file_refs):
+            if hashes[i] is None and "content" not in ref:
+                hashes[i] = known.get(ref.get("path"))
+        return hashes
+
+    # ---- stage outputs ----
+
+    def lookup(self, stage: str, keys: Iterable[str], with_output: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        key -> {"output_hash", "evidence", "item_count"[, "output"]} for the keys present.
+        `output` is the stored JSON text; it is only read when `with_output` is set.
+        """
+        columns = "key, output_hash, evidence, item_count" + (", output" if with_output else "")
+        found = {}
+        for row in self._select_in(
+            f"SELECT {columns} FROM stage_outputs WHERE stage = ? AND key IN ({{}})", list(set(keys)), (stage,)
+        ):
+            entry = {"output_hash": row[1], "evidence": json.loads(row[2]), "item_count": row[3]}
+            if with_output:
+                entry["output"] = row[4]
+            found[row[0]] = entry
+        return found
+
+    def previous_records(self, documents: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], str]:
+        """(file_id, model_id) -> JSON text of the last EMBEDDING record stored for that document"""
+        pairs = list(set(documents))
+        found = {}
+        for i in range(0, len(pairs), _MAX_PARAMS // 2):
+            part = pairs[i:i + _MAX_PARAMS // 2]
+            where = " OR ".join("(r.file_id = ? AND r.model_id = ?)" for _ in part)
+            with self._lock:
+                rows = self._connection().execute(
+                    "SELECT r.file_id, r.model_id, s.output FROM latest_records r "
+                    "JOIN stage_outputs s ON s.stage = 'EMBEDDING' AND s.key = r.embedding_key "
+                    f"WHERE {where}",
+                    [value for pair in part for value in pair]
+                ).fetchall()
+            for file_id, model_id, output in rows:
+                found[(file_id, model_id)] = output
+        return found
+
+    def store(
+        self,
+        entries: Iterable[Tuple[str, str, Dict[str, Any], str, int]],
+        latest: Iterable[Tuple[str, str, str]] = ()
+    ):
+        """
+        Store (stage, key, evidence, output_json, item_count) entries and
+        (file_id, model_id, embedding_key) record pointers in one transaction.
+        """
+        now = time.time()
+        rows = [
+            (stage, key, evidence.get("output_hash", ""), json.dumps(evidence, default=str), item_count, now, output)
+            for stage, key, evidence, output, item_count in entries
+        ]
+        latest = list(latest)
+        if not rows and not latest:
+            return
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO stage_outputs "
+                "(stage, key, output_hash, evidence, item_count, created_at, output) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO latest_records (file_id, model_id, embedding_key) VALUES (?, ?, ?)",
+                latest
+            )
+
+    def stats(self) -> Dict[str, int]:
+        """Number of cached entries per stage"""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT stage, COUNT(*) FROM stage_outputs GROUP BY stage"
+            ).fetchall()
+        counts = {stage: 0 for stage in STAGES}
+        counts.update(dict(rows))
+        return counts
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+            self._pid = None
+
+    # ---- sqlite ----
+
+    def _select_in(self, sql: str, values: List[Any], params: Tuple = ()) -> List[Tuple]:
+        """Run `sql` with its IN (...) list filled from `values`, in bounded slices"""
+        rows: List[Tuple] = []
+        with self._lock:
+            conn = self._connection()
+            for i in range(0, len(values), _MAX_PARAMS):
+                part = values[i:i + _MAX_PARAMS]
+                rows.extend(conn.execute(sql.format(", ".join("?" * len(part))), params + tuple(part)))
+        return rows
+
+    def _connection(self) -> sqlite3.Connection:
+        """每个进程一个连接；fork 出的子进程不复用父进程的连接"""
+        pid = os.getpid()
+        if self._conn is None or self._pid != pid:
+            self._conn = sqlite3.connect(
+                self.db_path, timeout=30.0, isolation_level=None, check_same_thread=False
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._pid = pid
+        return self._conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """写事务 (BEGIN IMMEDIATE)：跨进程串行化"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,416 @@
+"""
+Ingestion Runner: pipelined, batched parsing → chunking → embedding.
+
+1. Documents are grouped into batches; the CPU-bound stages run in a process
+   pool (parse+chunk per batch, then embed per batch)
+2. Stages are connected by bounded queues, so a slow stage applies
+   backpressure instead of buffering the whole corpus in memory
+3. Each stage keeps at most `max_inflight` batches submitted to the pool
+4. Outputs and evidence of a run go to two append-only JSONL files
+   (one write per batch) instead of one pretty-printed file per stage and
+   document:
+       artifacts/execution_workers/{run_id}/chunks.jsonl
+       artifacts/execution_workers/{run_id}/evidence.jsonl
+5. With an IngestionCache, documents whose outputs are all cached skip the
+   pool entirely and partially cached ones resume at the first stale stage;
+   cached evidence is replayed with "cache_hit": true
+"""
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import json
+import os
+import queue
+import threading
+import time
+
+from runtime.execution_workers.chunking_worker import chunk_document
+from runtime.execution_workers.common import append_jsonl, append_lines, evidence_record, sha256_json
+from runtime.execution_workers.embedding_worker import embed_chunks
+from runtime.execution_workers.ingestion_cache import STAGES, IngestionCache
+from runtime.execution_workers.parsing_worker import parse_document
+from runtime.platform.metrics import MetricsRegistry
+
+_DONE = object()
+
+CACHE_LOOKUPS = MetricsRegistry.get_default().counter(
+    "ingestion_cache_lookups_total", "Ingestion cache lookups by stage", ("stage", "result")
+)
+
+# db_path -> cache opened by this worker process
+_worker_caches: Dict[str, IngestionCache] = {}
+
+
+def _open_cache(cache_path: Optional[str]) -> Optional[IngestionCache]:
+    if not cache_path:
+        return None
+    if cache_path not in _worker_caches:
+        _worker_caches[cache_path] = IngestionCache(cache_path)
+    return _worker_caches[cache_path]
+
+
+def parse_and_chunk_batch(items: List[Dict[str, Any]], cache_path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Pool task: parse and chunk each document of a batch (skipping stages restored from cache)."""
+    cache = _open_cache(cache_path)
+    entries = []
+    for item in items:
+        execution_input = item["execution_input"]
+        parsed = item.pop("parsed", None)
+        try:
+            if parsed is None and "chunks" not in item:
+                parsed, parse_ev = parse_document(execution_input)
+                item["evidence"].append(parse_ev)
+                parse_key = item["cache_keys"].get("PARSING")
+                if cache and parse_key and parse_ev["status"] == "SUCCESS":
+                    entries.append(("PARSING", parse_key, parse_ev, json.dumps(parsed, default=str), 0))
+            if "chunks" not in item and item["evidence"][-1]["status"] == "SUCCESS":
+                # Stored with the record by embed_batch: chunks are kept only once, inside it
+                item["cache_keys"]["CHUNKING"] = IngestionCache.chunk_key(
+                    execution_input, item["evidence"][-1]["output_hash"]
+                )
+                item["chunks"], chunk_ev = chunk_document(execution_input, parsed)
+                item["evidence"].append(chunk_ev)
+        except Exception:
+            item["evidence"].append(_crash_evidence("PARSING", execution_input))
+        if item["evidence"][-1]["status"] != "SUCCESS":
+            item["status"] = "FAIL"
+            item.pop("chunks", None)
+    if cache:
+        cache.store(entries)
+    return items
+
+
+def embed_batch(items: List[Dict[str, Any]], cache_path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Pool task: embed the chunks of every successfully chunked document and
+    serialize its chunks.jsonl record. Chunks that are unchanged since the
+    document's previous record for the same model keep their embeddings.
+    """
+    cache = _open_cache(cache_path)
+    todo = [item for item in items if item["status"] == "SUCCESS"]
+    previous: Dict[Tuple[str, str], str] = {}
+    if cache:
+        previous = cache.previous_records(
+            (item["execution_input"].get("file_id"), _model_id(item["execution_input"])) for item in todo
+        )
+
+    entries = []
+    latest = []
+    for item in todo:
+        execution_input = item["execution_input"]
+        file_id = execution_input.get("file_id")
+        model_id = _model_id(execution_input)
+        cached = _reusable_embeddings(item["chunks"]["chunks"], previous.get((file_id, model_id)))
+        try:
+            embedding, embed_ev = embed_chunks(execution_input, item["chunks"], cached)
+        except Exception:
+            embedding, embed_ev = None, _crash_evidence("EMBEDDING", execution_input)
+        item["evidence"].append(embed_ev)
+        chunks = item.pop("chunks")["chunks"]
+        if embed_ev["status"] != "SUCCESS":
+            item["status"] = "FAIL"
+            continue
+        item["reused_embeddings"] = len(cached)
+        item["chunk_count"] = len(chunks)
+        item["record"] = json.dumps({
+            "file_id": file_id,
+            "chunks": [dict(ch, embedding=emb) for ch, emb in zip(chunks, embedding["embeddings"])],
+            "model_id": embedding["model_id"],
+        }, ensure_ascii=False, default=str)
+        if cache:
+            chunk_ev = item["evidence"][-2]
+            key = IngestionCache.embedding_key(execution_input, chunk_ev["output_hash"])
+            entries.append(("EMBEDDING", key, embed_ev, item["record"], len(chunks)))
+            if "CHUNKING" in item["cache_keys"]:
+                entries.append(("CHUNKING", item["cache_keys"]["CHUNKING"], chunk_ev, json.dumps(key), len(chunks)))
+            latest.append((file_id, model_id, key))
+    if cache:
+        cache.store(entries, latest)
+    return items
+
+
+def _model_id(execution_input: Dict[str, Any]) -> str:
+    return execution_input.get("execution_plan", {}).get("embedding_model_id") or ""
+
+
+def _reusable_embeddings(chunks: List[Dict[str, Any]], previous_record: Optional[str]) -> Dict[int, str]:
+    """Chunk position -> embedding of the identical chunk in the previous record"""
+    if not previous_record:
+        return {}
+    known = {}
+    for ch in json.loads(previous_record)["chunks"]:
+        emb = ch.pop("embedding")
+        known[sha256_json(ch)] = emb
+    reused = {}
+    for idx, ch in enumerate(chunks):
+        emb = known.get(sha256_json(ch))
+        if emb is not None:
+            reused[idx] = emb
+    return reused
+
+
+def _crash_evidence(worker_type: str, execution_input: Dict[str, Any]) -> Dict[str, Any]:
+    return evidence_record(
+        worker_type,
+        tool_version="",
+        input_obj=execution_input,
+        output_obj=None,
+        status="FAIL",
+        failure_type="DATA_CORRUPTED",
+    )
+
+
+class _InlineExecutor(Executor):
+    """Runs pool tasks synchronously (processes=0)."""
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+class IngestionRunner:
+    """
+    Pipelined ingestion of a document corpus.
+
+    Each document is an execution input as accepted by the single-file
+    workers: {"file_id", "input_file_ref": {"mime", "path" | "content"}};
+    `run_id` and `execution_plan` are filled in from the runner.
+    """
+
+    def __init__(
+        self,
+        run_id: str,
+        execution_plan: Dict[str, Any],
+        artifacts_dir: str = os.path.join("artifacts", "execution_workers"),
+        processes: Optional[int] = None,
+        batch_size: int = 64,
+        queue_size: int = 8,
+        max_inflight: Optional[int] = None,
+        cache: Optional[IngestionCache] = None
+    ):
+        """
+        Args:
+            run_id: 运行 ID，决定输出目录
+            execution_plan: 传给各 worker 的执行计划
+            artifacts_dir: 输出根目录
+            processes: 进程池大小，默认 CPU 核数；0 表示在当前进程内顺序执行
+            batch_size: 每个进程池任务处理的文档数
+            queue_size: 阶段间队列容量（批次数）
+            max_inflight: 每个阶段同时提交到进程池的批次上限，默认 2 × processes
+            cache: 内容寻址缓存；未变化的文件与 chunk 复用已存储的输出
+        """
+        self.run_id = run_id
+        self.execution_plan = execution_plan
+        self.output_dir = os.path.join(artifacts_dir, run_id)
+        self.processes = (os.cpu_count() or 1) if processes is None else processes
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.max_inflight = max_inflight or max(2, 2 * self.processes)
+        self.cache = cache
+
+        self.chunks_path = os.path.join(self.output_dir, "chunks.jsonl")
+        self.evidence_path = os.path.join(self.output_dir, "evidence.jsonl")
+        self._errors: List[BaseException] = []
+
+    def run(self, documents: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """Ingest `documents`; returns a summary of the run."""
+        start = time.time()
+        summary = {
+            "documents": 0, "succeeded": 0, "failed": 0, "chunks": 0,
+            "cache_hits": {stage: 0 for stage in STAGES}, "reused_embeddings": 0,
+        }
+        self._errors = []
+
+        parse_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        embed_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        write_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+
+        cache_path = self.cache.db_path if self.cache else None
+        executor = ProcessPoolExecutor(self.processes) if self.processes > 0 else _InlineExecutor()
+        with executor:
+            threads = [
+                threading.Thread(
+                    target=self._stage,
+                    args=(executor, partial(parse_and_chunk_batch, cache_path=cache_path), parse_q, embed_q)
+                ),
+                threading.Thread(
+                    target=self._stage,
+                    args=(executor, partial(embed_batch, cache_path=cache_path), embed_q, write_q)
+                ),
+                threading.Thread(target=self._write, args=(write_q, summary)),
+            ]
+            for t in threads:
+                t.daemon = True
+                t.start()
+            try:
+                for batch in self._batches(documents):
+                    items = self._restore(batch) if self.cache else batch
+                    # Fully cached documents go straight to the writer
+                    cached = [item for item in items if "record" in item]
+                    if cached:
+                        write_q.put(cached)
+                    if len(cached) < len(items):
+                        # Blocks while the pipeline is full
+                        parse_q.put([item for item in items if "record" not in item])
+            finally:
+                parse_q.put(_DONE)
+                for t in threads:
+                    t.join()
+
+        if self._errors:
+            raise self._errors[0]
+
+        elapsed = time.time() - start
+        summary.update({
+            "run_id": self.run_id,
+            "processes": self.processes,
+            "elapsed_s": elapsed,
+            "docs_per_s": summary["documents"] / elapsed if elapsed > 0 else 0.0,
+            "chunks_path": self.chunks_path,
+            "evidence_path": self.evidence_path,
+        })
+        return summary
+
+    def _batches(self, documents: Iterable[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        batch = []
+        for doc in documents:
+            execution_input = dict(doc)
+            execution_input.setdefault("run_id", self.run_id)
+            execution_input.setdefault("execution_plan", self.execution_plan)
+            batch.append({"execution_input": execution_input, "evidence": [], "status": "SUCCESS", "cache_keys": {}})
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _restore(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Resolve each document's stage keys against the cache, following the
+        chain PARSING → CHUNKING → EMBEDDING; stops at the first miss and loads
+        only the output the next stage needs.
+        """
+        inputs = [item["execution_input"] for item in items]
+        hashes = self.cache.content_hashes([ei.get("input_file_ref", {}) for ei in inputs])
+        keys: Dict[int, str] = {
+            i: IngestionCache.parse_key(ei, h) for i, (ei, h) in enumerate(zip(inputs, hashes)) if h
+        }
+        for i, key in keys.items():
+            items[i]["cache_keys"]["PARSING"] = key
+
+        stage_keys: Dict[str, Dict[int, str]] = {}
+        hits: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        for stage, next_key in (
+            ("PARSING", IngestionCache.chunk_key),
+            ("CHUNKING", IngestionCache.embedding_key),
+            ("EMBEDDING", None),
+        ):
+            found = self.cache.lookup(stage, keys.values(), with_output=stage == "EMBEDDING")
+            stage_keys[stage] = keys
+            hits[stage] = {i: found[key] for i, key in keys.items() if key in found}
+            CACHE_LOOKUPS.labels(stage, "hit").inc(len(hits[stage]))
+            CACHE_LOOKUPS.labels(stage, "miss").inc(len(keys) - len(hits[stage]))
+            if next_key:
+                keys = {i: next_key(inputs[i], entry["output_hash"]) for i, entry in hits[stage].items()}
+
+        # Deepest hit per document: only its output is needed downstream
+        resume: Dict[str, List[int]] = {"PARSING": [], "CHUNKING": []}
+        for i in hits["PARSING"]:
+            if i in hits["EMBEDDING"]:
+                items[i]["record"] = hits["EMBEDDING"][i]["output"]
+                items[i]["chunk_count"] = hits["EMBEDDING"][i]["item_count"]
+            else:
+                resume["CHUNKING" if i in hits["CHUNKING"] else "PARSING"].append(i)
+            for stage in STAGES:
+                if i in hits[stage]:
+                    items[i]["evidence"].append(dict(hits[stage][i]["evidence"], cache_hit=True))
+
+        if resume["PARSING"]:
+            found = self.cache.lookup("PARSING", (stage_keys["PARSING"][i] for i in resume["PARSING"]), True)
+            for i in resume["PARSING"]:
+                items[i]["parsed"] = json.loads(found[stage_keys["PARSING"][i]]["output"])
+        if resume["CHUNKING"]:
+            found = self.cache.lookup("CHUNKING", (stage_keys["CHUNKING"][i] for i in resume["CHUNKING"]), True)
+            record_keys = {i: json.loads(found[stage_keys["CHUNKING"][i]]["output"]) for i in resume["CHUNKING"]}
+            records = self.cache.lookup("EMBEDDING", record_keys.values(), True)
+            for i, record_key in record_keys.items():
+                # The chunks as embedded under another model
+                chunks = json.loads(records[record_key]["output"])["chunks"]
+                for ch in chunks:
+                    ch.pop("embedding")
+                items[i]["chunks"] = {"chunks": chunks}
+        return items
+
+    def _stage(
+        self,
+        executor: Executor,
+        fn: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]],
+        inbox: queue.Queue,
+        outbox: queue.Queue
+    ):
+        """Feed batches from `inbox` to the pool, forward results as they finish."""
+        inflight: Set[Future] = set()
+
+        def forward(done: Set[Future]):
+            for future in done:
+                inflight.discard(future)
+                try:
+                    outbox.put(future.result())
+                except BaseException as e:
+                    self._errors.append(e)
+
+        try:
+            while True:
+                batch = inbox.get()
+                if batch is _DONE:
+                    break
+                if self._errors:
+                    # Keep draining so the producer never blocks on a dead pipeline
+                    continue
+                inflight.add(executor.submit(fn, batch))
+                if len(inflight) >= self.max_inflight:
+                    done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                    forward(done)
+            while inflight:
+                done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                forward(done)
+        except BaseException as e:
+            self._errors.append(e)
+        finally:
+            outbox.put(_DONE)
+
+    def _write(self, inbox: queue.Queue, summary: Dict[str, Any]):
+        """Single writer: one append per batch to each JSONL file."""
+        while True:
+            items = inbox.get()
+            if items is _DONE:
+                return
+            if self._errors:
+                continue
+            chunk_lines = []
+            evidence_lines = []
+            hits = summary["cache_hits"]
+            for item in items:
+                file_id = item["execution_input"].get("file_id")
+                summary["documents"] += 1
+                for ev in item["evidence"]:
+                    evidence_lines.append({"run_id": self.run_id, "file_id": file_id, "cache_hit": False, **ev})
+                    if ev.get("cache_hit"):
+                        hits[ev["worker_type"]] += 1
+                summary["reused_embeddings"] += item.get("reused_embeddings", 0)
+                if item["status"] != "SUCCESS":
+                    summary["failed"] += 1
+                    continue
+                summary["succeeded"] += 1
+                summary["chunks"] += item["chunk_count"]
+                # Serialized by the embedding stage (or restored from cache)
+                chunk_lines.append(item["record"])
+            try:
+                append_lines(self.chunks_path, chunk_lines)
+                append_jsonl(self.evidence_path, evidence_lines)
+            except BaseException as e:
+                self._errors.append(e)
@@ -1,7 +1,11 @@
 """
 Document Parsing Worker: deterministic parser selection.
 """
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+import csv
+import html
+import io
+import re
 import time
 import os
 from runtime.execution_workers.common import evidence_record, write_json, ensure_dir
@@ -14,16 +18,29 @@ PARSER_BINDINGS = {
     "application/vnd.ms-excel": "openpyxl",
     "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": "openpyxl",
     "text/csv": "openpyxl",
+    "text/plain": "text",
+    "text/markdown": "text",
 }
 
 
+TEXT_MIMES = {"text/plain", "text/markdown", "text/html", "text/csv"}
+
+_BLOCK_TAGS = re.compile(r"</?(p|div|br|li|tr|h[1-6]|section|article|table|pre|blockquote)\b[^>]*>", re.I)
+
+
 def run_parse(execution_input: Dict[str, Any]) -> Dict[str, Any]:
+    output, ev = parse_document(execution_input)
+    _persist(execution_input.get("run_id"), execution_input.get("file_id"), output, ev)
+    return ev
+
+
+def parse_document(execution_input: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Parse without persisting; returns (output, evidence)."""
     start = time.time()
-    run_id = execution_input.get("run_id")
-    file_id = execution_input.get("file_id")
     plan = execution_input.get("execution_plan", {})
     resource_profile = plan.get("resource_profile", {})
-    mime = execution_input.get("input_file_ref", {}).get("mime", "")
+    file_ref = execution_input.get("input_file_ref", {})
+    mime = file_ref.get("mime", "")
 
     parser = PARSER_BINDINGS.get(mime)
     pipeline_steps = plan.get("pipeline_steps", [])
@@ -40,11 +57,26 @@ def run_parse(execution_input: Dict[str, Any]) -> Dict[str, Any]:
             resource_usage=resource_profile,
             start_time=start,
         )
-        _persist(run_id, file_id, output, ev)
-        return ev
+        return output, ev
+
+    try:
+        blocks = extract_blocks(mime, file_ref)
+    except (OSError, UnicodeDecodeError):
+        output = {}
+        ev = evidence_record(
+            "PARSING",
+            tool_version=parser,
+            input_obj=execution_input,
+            output_obj=output,
+            status="FAIL",
+            failure_type="DATA_CORRUPTED",
+            resource_usage=resource_profile,
+            start_time=start,
+        )
+        return output, ev
 
     output = {
-        "structured_blocks": [],
+        "structured_blocks": blocks,
         "tables": [],
         "metadata": {"parser": parser},
     }
@@ -57,8 +89,37 @@ def run_parse(execution_input: Dict[str, Any]) -> Dict[str, Any]:
         resource_usage=resource_profile,
         start_time=start,
     )
-    _persist(run_id, file_id, output, ev)
-    return ev
+    return output, ev
+
+
+def read_content(file_ref: Dict[str, Any]) -> Optional[str]:
+    """Inline `content`, else the UTF-8 text at `path`; None if neither is given."""
+    if "content" in file_ref:
+        return file_ref["content"]
+    path = file_ref.get("path")
+    if not path:
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def extract_blocks(mime: str, file_ref: Dict[str, Any]) -> List[str]:
+    """
+    Text blocks of text-like formats (paragraphs, CSV rows).
+    Binary formats are bound to external parsers and yield no blocks here.
+    """
+    if mime not in TEXT_MIMES:
+        return []
+    text = read_content(file_ref)
+    if not text:
+        return []
+    if mime == "text/csv":
+        return [", ".join(row) for row in csv.reader(io.StringIO(text)) if any(row)]
+    if mime == "text/html":
+        text = re.sub(r"(?is)<(script|style)\b.*?</\1>", "", text)
+        text = _BLOCK_TAGS.sub("\n\n", text)
+        text = html.unescape(re.sub(r"<[^>]+>", "", text))
+    return [block.strip() for block in re.split(r"\n\s*\n", text) if block.strip()]
 
 
 def _persist(run_id: str, file_id: str, output: Dict[str, Any], evidence: Dict[str, Any]):
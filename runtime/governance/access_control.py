@@ -1,14 +1,23 @@
 """
 Access Control: Agent, tool, and memory access governance.
 Explicit permission model for system resources.
+
+Decisions are served from a per-role table compiled from the permission
+lists, keyed by (resource_type, action) with exact-resource and wildcard
+entries, fronted by a bounded LRU of recent decisions. Audit records are
+batched and written by a background writer, never inline.
 """
 import os
 import json
-from typing import Dict, Any, List, Optional, Set
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Set, Tuple
 from datetime import datetime
 from dataclasses import dataclass, asdict, field
 from enum import Enum
 
+from learning.write_behind import WriteBehindBuffer
+
 
 class ResourceType(str, Enum):
     """Types of resources."""
@@ -79,11 +88,28 @@ class AccessDecision:
     
     def to_dict(self) -> Dict[str, Any]:
         result = asdict(self)
-        result["resource_type"] = self.resource_type.value
-        result["action"] = self.action.value
+        # Requests may name resource types / actions by plain string
+        result["resource_type"] = getattr(self.resource_type, "value", self.resource_type)
+        result["action"] = getattr(self.action, "value", self.action)
         return result
 
 
+@dataclass
+class _CompiledGrants:
+    """Granted permissions of one role for one (resource_type, action)."""
+    # resource_id -> (position in role.permissions, permission_id)
+    exact: Dict[str, Tuple[int, str]] = field(default_factory=dict)
+    wildcard: Optional[Tuple[int, str]] = None
+
+
+@dataclass
+class _CompiledRole:
+    """Lookup table for one role."""
+    grants: Dict[Tuple[ResourceType, ActionType], _CompiledGrants] = field(default_factory=dict)
+    # System-wide admin permission matches every request
+    admin: Optional[Tuple[int, str]] = None
+
+
 class AccessController:
     """
     Manages access control for system resources.
@@ -92,16 +118,41 @@ class AccessController:
     - Role-based access control
     - Resource-level permissions
     - Audit logging
+    
+    Roles are compiled lazily into lookup tables; mutate roles through
+    create_role / assign_role (or call invalidate() after editing a Role's
+    permission list in place) so cached decisions are dropped.
     """
     
-    def __init__(self, artifacts_dir: str = "artifacts"):
+    DECISION_CACHE_SIZE = 4096
+    
+    def __init__(
+        self,
+        artifacts_dir: str = "artifacts",
+        audit_flush_interval_s: float = 0.5
+    ):
         self.artifacts_dir = artifacts_dir
         self.acl_dir = os.path.join(artifacts_dir, "governance", "acl")
         os.makedirs(self.acl_dir, exist_ok=True)
+        self._access_log_path = os.path.join(self.acl_dir, "access_log.jsonl")
         
         self._roles: Dict[str, Role] = {}
         self._agent_roles: Dict[str, str] = {}  # agent_id -> role_id
         
+        self._compiled: Dict[str, _CompiledRole] = {}
+        # (agent_id, resource_type, resource_id, action) -> (allowed, reason, audited)
+        self._decisions: "OrderedDict[Tuple[str, Any, str, Any], Tuple[bool, str, bool]]" = OrderedDict()
+        self._decisions_lock = threading.Lock()
+        # Bumped on every role change; decisions computed before it are not cached
+        self._generation = 0
+        
+        # Audit records are appended by the background flusher thread only
+        self._audit = WriteBehindBuffer(
+            flush_interval_s=audit_flush_interval_s,
+            max_pending_records=10000,
+            inline_flush=False
+        )
+        
         self._init_default_roles()
     
     def _init_default_roles(self) -> None:
@@ -189,59 +240,124 @@ class AccessController:
         Returns:
             AccessDecision
         """
-        role_id = self._agent_roles.get(agent_id)
-        
-        if not role_id:
-            return AccessDecision(
-                allowed=False,
-                resource_type=resource_type,
-                resource_id=resource_id,
-                action=action,
-                reason=f"No role assigned to agent {agent_id}"
-            )
-        
-        role = self._roles.get(role_id)
-        
-        if not role:
-            return AccessDecision(
-                allowed=False,
-                resource_type=resource_type,
-                resource_id=resource_id,
-                action=action,
-                reason=f"Role {role_id} not found"
-            )
+        key = (agent_id, resource_type, resource_id, action)
+        with self._decisions_lock:
+            cached = self._decisions.get(key)
+            if cached is not None:
+                self._decisions.move_to_end(key)
+            generation = self._generation
         
-        # Check permissions
-        for perm in role.permissions:
-            if self._permission_matches(perm, resource_type, resource_id, action):
-                if perm.granted:
-                    decision = AccessDecision(
-                        allowed=True,
-                        resource_type=resource_type,
-                        resource_id=resource_id,
-                        action=action,
-                        reason=f"Granted by permission {perm.permission_id}"
-                    )
-                    self._log_access(agent_id, decision)
-                    return decision
+        if cached is None:
+            try:
+                resource_type_, action_ = ResourceType(resource_type), ActionType(action)
+            except ValueError:
+                cached = (False, f"Unknown resource type or action: {resource_type}/{action}", True)
+            else:
+                cached = self._decide(agent_id, resource_type_, resource_id, action_)
+                with self._decisions_lock:
+                    if generation == self._generation:
+                        self._decisions[key] = cached
+                        if len(self._decisions) > self.DECISION_CACHE_SIZE:
+                            self._decisions.popitem(last=False)
         
+        allowed, reason, audited = cached
         decision = AccessDecision(
-            allowed=False,
+            allowed=allowed,
             resource_type=resource_type,
             resource_id=resource_id,
             action=action,
-            reason=f"No matching permission in role {role_id}"
+            reason=reason
         )
-        self._log_access(agent_id, decision)
+        if audited:
+            self._log_access(agent_id, decision)
         return decision
     
+    def _decide(
+        self,
+        agent_id: str,
+        resource_type: ResourceType,
+        resource_id: str,
+        action: ActionType
+    ) -> Tuple[bool, str, bool]:
+        """
+        Evaluate a request against the compiled role table.
+        
+        Returns:
+            (allowed, reason, audited); only permission evaluations are audited
+        """
+        role_id = self._agent_roles.get(agent_id)
+        if not role_id:
+            return False, f"No role assigned to agent {agent_id}", False
+        
+        compiled = self._compiled_role(role_id)
+        if compiled is None:
+            return False, f"Role {role_id} not found", False
+        
+        # Earliest matching permission in the role's list wins, as in a scan
+        candidates = [compiled.admin]
+        grants = compiled.grants.get((resource_type, action))
+        if grants is not None:
+            candidates.append(grants.exact.get(resource_id))
+            candidates.append(grants.wildcard)
+        matches = [c for c in candidates if c is not None]
+        if matches:
+            _, permission_id = min(matches)
+            return True, f"Granted by permission {permission_id}", True
+        
+        return False, f"No matching permission in role {role_id}", True
+    
+    def _compiled_role(self, role_id: str) -> Optional[_CompiledRole]:
+        """Compile (or fetch) the lookup table for a role."""
+        compiled = self._compiled.get(role_id)
+        if compiled is not None:
+            return compiled
+        
+        role = self._roles.get(role_id)
+        if role is None:
+            return None
+        
+        compiled = _CompiledRole()
+        for position, perm in enumerate(role.permissions):
+            if not perm.granted:
+                continue
+            entry = (position, perm.permission_id)
+            if perm.action == ActionType.ADMIN and perm.resource_id == "*":
+                if compiled.admin is None:
+                    compiled.admin = entry
+                continue
+            grants = compiled.grants.setdefault(
+                (ResourceType(perm.resource_type), ActionType(perm.action)), _CompiledGrants()
+            )
+            if perm.resource_id == "*":
+                if grants.wildcard is None:
+                    grants.wildcard = entry
+            else:
+                grants.exact.setdefault(perm.resource_id, entry)
+        
+        self._compiled[role_id] = compiled
+        return compiled
+    
+    def invalidate(self, role_id: Optional[str] = None) -> None:
+        """Drop compiled tables and cached decisions (after role changes)."""
+        if role_id is None:
+            self._compiled.clear()
+        else:
+            self._compiled.pop(role_id, None)
+        self._clear_decisions()
+    
     def assign_role(self, agent_id: str, role_id: str) -> bool:
         """Assign a role to an agent."""
         if role_id not in self._roles:
             return False
         self._agent_roles[agent_id] = role_id
+        self._clear_decisions()
         return True
     
+    def _clear_decisions(self) -> None:
+        with self._decisions_lock:
+            self._decisions.clear()
+            self._generation += 1
+    
     def get_agent_permissions(self, agent_id: str) -> List[Permission]:
         """Get all permissions for an agent."""
         role_id = self._agent_roles.get(agent_id)
@@ -254,46 +370,27 @@ class AccessController:
     def create_role(self, role: Role) -> None:
         """Create a new role."""
         self._roles[role.role_id] = role
+        self.invalidate(role.role_id)
         self._save_roles()
     
-    def _permission_matches(
-        self,
-        perm: Permission,
-        resource_type: ResourceType,
-        resource_id: str,
-        action: ActionType
-    ) -> bool:
-        """Check if a permission matches a request."""
-        # Admin permission matches everything
-        if perm.action == ActionType.ADMIN and perm.resource_id == "*":
-            return True
-        
-        # Check resource type
-        if perm.resource_type != resource_type:
-            return False
-        
-        # Check resource ID (wildcard or exact)
-        if perm.resource_id != "*" and perm.resource_id != resource_id:
-            return False
-        
-        # Check action
-        if perm.action != action:
-            return False
-        
-        return True
-    
     def _log_access(self, agent_id: str, decision: AccessDecision) -> None:
-        """Log an access decision."""
-        log_path = os.path.join(self.acl_dir, "access_log.jsonl")
-        
-        log_entry = {
+        """Queue an access decision for the background audit writer."""
+        self._audit.append(self._access_log_path, {
             "agent_id": agent_id,
-            "decision": decision.to_dict(),
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        with open(log_path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(log_entry) + "\n")
+            "decision": {
+                "allowed": decision.allowed,
+                "resource_type": getattr(decision.resource_type, "value", decision.resource_type),
+                "resource_id": decision.resource_id,
+                "action": getattr(decision.action, "value", decision.action),
+                "reason": decision.reason,
+                "checked_at": decision.checked_at
+            },
+            "timestamp": decision.checked_at
+        })
+    
+    def flush_audit_log(self) -> None:
+        """Write queued audit records now (shutdown / tests)."""
+        self._audit.flush()
     
     def _save_roles(self) -> None:
         """Save roles to file."""
@@ -1,14 +1,18 @@
 """
 Guards: Prompt injection guard, cost guardrail, safety checks.
 Explicit rules for system safety.
+
+Injection and sensitive-data rules share one PatternScanner, so an input is
+scanned once and every hit is reported with its offsets.
 """
 import os
 import json
-import re
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 from dataclasses import dataclass, asdict, field
 
+from runtime.governance.pattern_scanner import PatternScanner, ScanHit, ScanRule, redact
+
 
 @dataclass
 class GuardResult:
@@ -19,6 +23,7 @@ class GuardResult:
     severity: str = "low"  # low, medium, high, critical
     blocked_content: Optional[str] = None
     remediation: Optional[str] = None
+    matches: List[Dict[str, Any]] = field(default_factory=list)
     checked_at: str = ""
     
     def __post_init__(self):
@@ -86,14 +91,14 @@ class PromptInjectionGuard:
         r"__import__",
     ]
     
+    CATEGORY = "prompt_injection"
+    
     def __init__(self, artifacts_dir: str = "artifacts"):
         self.artifacts_dir = artifacts_dir
         self.guard_dir = os.path.join(artifacts_dir, "governance", "guards")
         os.makedirs(self.guard_dir, exist_ok=True)
         
-        self._compiled_patterns = [
-            re.compile(p, re.IGNORECASE) for p in self.INJECTION_PATTERNS
-        ]
+        self._scanner = get_guard_scanner().subset([self.CATEGORY])
     
     def check(self, content: str, context: Optional[Dict[str, Any]] = None) -> GuardResult:
         """
@@ -106,19 +111,24 @@ class PromptInjectionGuard:
         Returns:
             GuardResult
         """
-        for pattern in self._compiled_patterns:
-            match = pattern.search(content)
-            if match:
-                result = GuardResult(
-                    passed=False,
-                    guard_type="prompt_injection",
-                    reason=f"Potential injection detected: {match.group()}",
-                    severity="high",
-                    blocked_content=match.group(),
-                    remediation="Remove or rephrase the flagged content"
-                )
-                self._log_detection(content, result)
-                return result
+        return self.evaluate(content, self._scanner.scan(content))
+    
+    def evaluate(self, content: str, hits: List[ScanHit]) -> GuardResult:
+        """Build the guard result from precomputed scanner hits."""
+        hits = [h for h in hits if h.category == self.CATEGORY]
+        if hits:
+            first = hits[0]
+            result = GuardResult(
+                passed=False,
+                guard_type="prompt_injection",
+                reason=f"Potential injection detected: {first.text}",
+                severity="high",
+                blocked_content=first.text,
+                remediation="Remove or rephrase the flagged content",
+                matches=[h.to_dict() for h in hits]
+            )
+            self._log_detection(content, result)
+            return result
         
         return GuardResult(
             passed=True,
@@ -133,16 +143,8 @@ class PromptInjectionGuard:
         Returns:
             Tuple of (sanitized_content, list of removed patterns)
         """
-        removed = []
-        sanitized = content
-        
-        for pattern in self._compiled_patterns:
-            matches = pattern.findall(content)
-            if matches:
-                removed.extend(matches)
-                sanitized = pattern.sub("[REDACTED]", sanitized)
-        
-        return sanitized, removed
+        hits = self._scanner.scan(content)
+        return redact(content, hits), [h.text for h in hits]
     
     def _log_detection(self, content: str, result: GuardResult) -> None:
         """Log a detection."""
@@ -340,22 +342,28 @@ class SafetyGuard:
         r"\b(api[_-]?key|token)\s*[:=]\s*\S+",
     ]
     
+    CATEGORY = "sensitive_data"
+    
     def __init__(self):
-        self._compiled_patterns = [
-            re.compile(p, re.IGNORECASE) for p in self.SENSITIVE_PATTERNS
-        ]
+        self._scanner = get_guard_scanner().subset([self.CATEGORY])
     
     def check_sensitive_data(self, content: str) -> GuardResult:
         """Check for sensitive data leakage."""
-        for pattern in self._compiled_patterns:
-            if pattern.search(content):
-                return GuardResult(
-                    passed=False,
-                    guard_type="sensitive_data",
-                    reason="Potential sensitive data detected",
-                    severity="high",
-                    remediation="Remove or redact sensitive information"
-                )
+        return self.evaluate_sensitive(self._scanner.scan(content))
+    
+    def evaluate_sensitive(self, hits: List[ScanHit]) -> GuardResult:
+        """Build the sensitive-data result from precomputed scanner hits."""
+        hits = [h for h in hits if h.category == self.CATEGORY]
+        if hits:
+            return GuardResult(
+                passed=False,
+                guard_type="sensitive_data",
+                reason="Potential sensitive data detected",
+                severity="high",
+                remediation="Remove or redact sensitive information",
+                # Offsets only: never echo the secret itself
+                matches=[{k: v for k, v in h.to_dict().items() if k != "text"} for h in hits]
+            )
         
         return GuardResult(
             passed=True,
@@ -393,6 +401,7 @@ class GuardOrchestrator:
         self.injection_guard = PromptInjectionGuard(artifacts_dir)
         self.cost_guardrail = CostGuardrail(artifacts_dir)
         self.safety_guard = SafetyGuard()
+        self._scanner = get_guard_scanner()
     
     def check_input(
         self,
@@ -408,15 +417,18 @@ class GuardOrchestrator:
         """
         results = {}
         
+        # One scan serves both the injection and sensitive-data guards
+        hits = self._scanner.scan(content)
+        
         # Check injection
-        results["prompt_injection"] = self.injection_guard.check(content)
+        results["prompt_injection"] = self.injection_guard.evaluate(content, hits)
         
         # Check cost
         if estimated_cost > 0:
             results["cost"] = self.cost_guardrail.check_budget(session_id, estimated_cost)
         
         # Check sensitive data
-        results["sensitive_data"] = self.safety_guard.check_sensitive_data(content)
+        results["sensitive_data"] = self.safety_guard.evaluate_sensitive(hits)
         
         return results
     
@@ -446,4 +458,23 @@ class GuardOrchestrator:
         return [r for r in results.values() if not r.passed]
 
 
+# ============================================================================
+# Shared scanner
+# ============================================================================
+
+_guard_scanner: Optional[PatternScanner] = None
 
+
+def get_guard_scanner() -> PatternScanner:
+    """Combined scanner over all injection and sensitive-data rules."""
+    global _guard_scanner
+    if _guard_scanner is None:
+        rules = [
+            ScanRule(f"injection_{i}", p, PromptInjectionGuard.CATEGORY)
+            for i, p in enumerate(PromptInjectionGuard.INJECTION_PATTERNS)
+        ] + [
+            ScanRule(f"sensitive_{i}", p, SafetyGuard.CATEGORY)
+            for i, p in enumerate(SafetyGuard.SENSITIVE_PATTERNS)
+        ]
+        _guard_scanner = PatternScanner(rules)
+    return _guard_scanner
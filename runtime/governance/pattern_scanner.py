@@ -0,0 +1,329 @@
+"""
+Pattern Scanner: single-pass multi-rule regex scanning for guards and PII.
+
+1. Literal prefilter: rules whose matches always start with one of a few
+   literals (derived from the pattern) share one literal trigger automaton
+   run over the lowercased text; rules are only verified at trigger positions
+2. Rules without a usable literal prefix are searched individually over the
+   same in-cache chunk (a combined backtracking alternation of
+   character-class-led rules is slower than separate searches in `re`)
+3. Every hit is reported with offsets, with per-rule non-overlapping
+   semantics (same as each rule's finditer)
+4. Chunked / streaming input: the input is read once, chunk by chunk, with a
+   carried overlap window, so multi-MB documents never need to be fully in
+   memory
+5. Category subsets are compiled lazily and cached
+"""
+import re
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Tuple
+from dataclasses import dataclass, asdict
+
+
+@dataclass(frozen=True)
+class ScanRule:
+    """
+    A single named detection rule.
+
+    `prefixes` lists literals every match starts with (case-insensitive);
+    None derives them from the pattern, () disables the literal prefilter.
+    """
+    rule_id: str
+    pattern: str
+    category: str
+    ignore_case: bool = True
+    prefixes: Optional[Tuple[str, ...]] = None
+
+
+@dataclass
+class ScanHit:
+    """One rule match with absolute character offsets."""
+    rule_id: str
+    category: str
+    start: int
+    end: int
+    text: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class PatternScanner:
+    """
+    Scans text for many regex rules in one pass over the input.
+
+    Matches longer than `overlap` characters may be truncated when they
+    straddle a chunk boundary in streaming mode.
+    """
+
+    DEFAULT_CHUNK_SIZE = 1 << 20
+    DEFAULT_OVERLAP = 1024
+    # Shorter literals trigger too often to be a useful prefilter
+    MIN_PREFIX_LEN = 2
+    # Deferred matches are carried for at most overlap * factor characters
+    MAX_CARRY_FACTOR = 64
+
+    def __init__(self, rules: Sequence[ScanRule], overlap: int = DEFAULT_OVERLAP):
+        self.rules = list(rules)
+        self.overlap = overlap
+
+        self._verifiers = [
+            re.compile(r.pattern, re.IGNORECASE if r.ignore_case else 0)
+            for r in self.rules
+        ]
+
+        # Literal-prefixed rules: (rule index, lowercase prefixes)
+        self._anchored: List[Tuple[int, Tuple[str, ...]]] = []
+        self._free: List[int] = []
+        for i, r in enumerate(self.rules):
+            prefixes = r.prefixes if r.prefixes is not None else literal_prefixes(r.pattern)
+            if prefixes and r.ignore_case and min(map(len, prefixes)) >= self.MIN_PREFIX_LEN:
+                self._anchored.append((i, tuple(p.lower() for p in prefixes)))
+            else:
+                self._free.append(i)
+
+        self._trigger = self._trigger_ci = None
+        self._max_prefix = 0
+        if self._anchored:
+            literals = sorted(
+                {p for _, prefixes in self._anchored for p in prefixes}, key=len, reverse=True
+            )
+            self._max_prefix = len(literals[0])
+            body = "|".join(re.escape(p) for p in literals)
+            self._trigger = re.compile(body)
+            self._trigger_ci = re.compile(body, re.IGNORECASE)
+
+        self._subsets: Dict[FrozenSet[str], "PatternScanner"] = {}
+
+    @property
+    def categories(self) -> List[str]:
+        return sorted({r.category for r in self.rules})
+
+    def subset(self, categories: Iterable[str]) -> "PatternScanner":
+        """Scanner restricted to the given categories (cached)."""
+        key = frozenset(categories)
+        if key >= set(self.categories):
+            return self
+        if key not in self._subsets:
+            self._subsets[key] = PatternScanner(
+                [r for r in self.rules if r.category in key], overlap=self.overlap
+            )
+        return self._subsets[key]
+
+    def scan(self, text: str) -> List[ScanHit]:
+        """Return every rule hit in `text`, ordered by start offset."""
+        hits, _ = self._scan_buffer(text, 0, len(text), 0, [0] * len(self.rules), final=True)
+        return hits
+
+    def iter_scan_chunks(self, chunks: Iterable[str]) -> Iterator[ScanHit]:
+        """
+        Scan a stream of text chunks, yielding hits as soon as they are final.
+
+        Offsets are absolute positions in the concatenated stream.
+        """
+        next_allowed = [0] * len(self.rules)
+        buffer = ""
+        buffer_offset = 0  # absolute offset of buffer[0]
+        search_from = 0    # position in buffer where scanning resumes
+
+        for chunk in chunks:
+            if not chunk:
+                continue
+            buffer += chunk
+            limit = len(buffer) - self.overlap
+            if limit <= search_from:
+                continue
+            hits, resume = self._scan_buffer(
+                buffer, search_from, limit, buffer_offset, next_allowed, final=False
+            )
+            yield from hits
+
+            # Keep one character before the resume point for \b context
+            keep_from = max(0, resume - 1)
+            buffer = buffer[keep_from:]
+            buffer_offset += keep_from
+            search_from = resume - keep_from
+
+        if buffer:
+            hits, _ = self._scan_buffer(
+                buffer, search_from, len(buffer), buffer_offset, next_allowed, final=True
+            )
+            yield from hits
+
+    def scan_chunks(self, chunks: Iterable[str]) -> List[ScanHit]:
+        """Collect all hits from a chunk stream."""
+        return list(self.iter_scan_chunks(chunks))
+
+    def scan_file(
+        self,
+        path: str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        encoding: str = "utf-8",
+        errors: str = "strict"
+    ) -> List[ScanHit]:
+        """Scan a text file in fixed-size chunks."""
+        with open(path, "r", encoding=encoding, errors=errors) as f:
+            return self.scan_chunks(iter(lambda: f.read(chunk_size), ""))
+
+    def _scan_buffer(
+        self,
+        text: str,
+        pos: int,
+        limit: int,
+        offset: int,
+        next_allowed: List[int],
+        final: bool
+    ) -> Tuple[List[ScanHit], int]:
+        """
+        Scan match start positions in [pos, limit) of `text`.
+
+        `next_allowed` holds, per rule, the absolute offset where that rule's
+        previous hit ended; it is updated in place so state carries across
+        chunks and no hit is reported twice. When not `final`, a match that
+        runs into the end of the buffer is deferred (its outcome may change
+        once more text arrives) and scanning resumes there on the next chunk.
+
+        Returns:
+            (hits ordered by start, resume position in `text`)
+        """
+        found: List[Tuple[int, int, int]] = []  # (start, rule index, end)
+        blocked = list(next_allowed)
+        size = len(text)
+        max_carry = self.overlap * self.MAX_CARRY_FACTOR
+        resume = limit
+
+        def deferred(start: int, end: int) -> bool:
+            return not final and end >= size and size - start <= max_carry
+
+        if self._trigger is not None:
+            ascii_text = text.isascii()
+            if ascii_text:
+                # Lowercasing ASCII keeps offsets aligned
+                haystack, trigger = text.lower(), self._trigger
+            else:
+                haystack, trigger = text, self._trigger_ci
+            p = pos
+            while p < resume:
+                m = trigger.search(haystack, p)
+                if m is None or m.start() >= resume:
+                    break
+                start = m.start()
+                window = None if ascii_text else text[start:start + self._max_prefix].lower()
+                for i, prefixes in self._anchored:
+                    if blocked[i] > offset + start:
+                        continue
+                    if window is None:
+                        if not haystack.startswith(prefixes, start):
+                            continue
+                    elif not window.startswith(prefixes):
+                        continue
+                    vm = self._verifiers[i].match(text, start)
+                    if vm is None:
+                        continue
+                    if deferred(start, vm.end()):
+                        resume = start
+                        break
+                    found.append((start, i, vm.end()))
+                    blocked[i] = offset + max(vm.end(), start + 1)
+                p = start + 1
+
+        for i in self._free:
+            p = max(pos, next_allowed[i] - offset)
+            for m in self._verifiers[i].finditer(text, p):
+                start = m.start()
+                if start >= resume:
+                    break
+                if deferred(start, m.end()):
+                    resume = start
+                    break
+                found.append((start, i, m.end()))
+
+        # Hits at or past a deferred position are rediscovered next chunk
+        found = sorted(h for h in found if h[0] < resume)
+        hits = []
+        for start, i, end in found:
+            next_allowed[i] = offset + max(end, start + 1)
+            rule = self.rules[i]
+            hits.append(ScanHit(
+                rule_id=rule.rule_id,
+                category=rule.category,
+                start=offset + start,
+                end=offset + end,
+                text=text[start:end]
+            ))
+        return hits, resume
+
+
+def literal_prefixes(pattern: str) -> Tuple[str, ...]:
+    """
+    Literals that every match of `pattern` starts with, or () if unknown.
+
+    Understands an optional leading \\b followed by a literal run or a
+    single group of alternatives that each begin with a literal run, which
+    covers keyword-style guard rules.
+    """
+    p = pattern[2:] if pattern.startswith("\\b") else pattern
+
+    # A top-level alternation means matches need not share a prefix
+    depth = 0
+    escaped = in_class = False
+    for ch in p:
+        if escaped:
+            escaped = False
+        elif ch == "\\":
+            escaped = True
+        elif in_class:
+            in_class = ch != "]"
+        elif ch == "[":
+            in_class = True
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "|" and depth == 0:
+            return ()
+
+    if p.startswith("("):
+        if p.startswith("(?") and not p.startswith("(?:"):
+            return ()
+        body_start = 3 if p.startswith("(?:") else 1
+        close = p.find(")")
+        body = p[body_start:close]
+        if close < 0 or "(" in body or p[close + 1:close + 2] in ("?", "*", "{"):
+            return ()
+        alternatives = body.split("|")
+    else:
+        alternatives = [p]
+
+    prefixes = []
+    for alt in alternatives:
+        m = _LITERAL_RUN.match(alt)
+        if not m:
+            return ()
+        literal = m.group()
+        if alt[m.end():m.end() + 1] in ("?", "*", "{"):
+            literal = literal[:-1]
+        if not literal:
+            return ()
+        prefixes.append(literal.lower())
+    return tuple(prefixes)
+
+
+_LITERAL_RUN = re.compile(r"[A-Za-z0-9_]+")
+
+
+def redact(text: str, hits: Iterable[ScanHit], replacement: str = "[REDACTED]") -> str:
+    """Replace the (merged) spans covered by `hits` in `text`."""
+    spans = sorted((h.start, h.end) for h in hits)
+    out: List[str] = []
+    cursor = 0
+    for start, end in spans:
+        if end <= cursor:
+            continue
+        if start > cursor:
+            out.append(text[cursor:start])
+            out.append(replacement)
+        elif not out or out[-1] != replacement:
+            out.append(replacement)
+        cursor = end
+    out.append(text[cursor:])
+    return "".join(out)
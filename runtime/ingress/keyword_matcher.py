@@ -0,0 +1,104 @@
+"""
+Keyword Matcher: single-pass multi-keyword matching for rule-based classifiers.
+
+1. All keyword literals of all groups are compiled into one Aho–Corasick
+   automaton, flattened to a DFA (per-state transition dicts with failure
+   links already resolved), so scanning is one dict lookup per character
+2. Substring semantics are the same as `keyword in text` for every keyword:
+   overlapping and nested occurrences are all reported
+3. Groups score the number of distinct keywords found, matching the
+   `sum(1 for p in patterns if p in text)` idiom it replaces
+4. Keywords may belong to several groups
+"""
+from collections import deque
+from typing import Dict, FrozenSet, Hashable, Iterable, List, Mapping, Tuple
+
+
+class KeywordMatcher:
+    """
+    Matches many keyword groups against a text in one pass.
+
+    Matching is case-sensitive; callers lowercase both keywords and text
+    when they want case-insensitive rules.
+    """
+
+    def __init__(self, groups: Mapping[Hashable, Iterable[str]]):
+        self.groups: Dict[Hashable, Tuple[str, ...]] = {
+            group: tuple(keywords) for group, keywords in groups.items()
+        }
+
+        self.keywords: List[str] = []
+        keyword_ids: Dict[str, int] = {}
+        # keyword id -> groups containing it
+        self._keyword_groups: List[List[Hashable]] = []
+        for group, keywords in self.groups.items():
+            for keyword in keywords:
+                if not keyword:
+                    continue
+                kid = keyword_ids.get(keyword)
+                if kid is None:
+                    kid = keyword_ids[keyword] = len(self.keywords)
+                    self.keywords.append(keyword)
+                    self._keyword_groups.append([])
+                if group not in self._keyword_groups[kid]:
+                    self._keyword_groups[kid].append(group)
+
+        self._delta, self._outputs = self._compile(self.keywords)
+
+    @staticmethod
+    def _compile(keywords: List[str]) -> Tuple[List[Dict[str, int]], List[Tuple[int, ...]]]:
+        """Build the trie, failure links and the flattened transition table."""
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+        for kid, keyword in enumerate(keywords):
+            state = 0
+            for ch in keyword:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = goto[state][ch] = len(goto)
+                    goto.append({})
+                    outputs.append([])
+                state = nxt
+            outputs[state].append(kid)
+
+        # Breadth-first: a state's failure target is always shallower, so its
+        # transitions are final by the time they are inherited
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])]
+        delta.extend({} for _ in range(len(goto) - 1))
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            inherited = delta[fail[state]]
+            outputs[state].extend(outputs[fail[state]])
+            table = dict(inherited)
+            for ch, nxt in goto[state].items():
+                table[ch] = nxt
+                fail[nxt] = inherited.get(ch, 0)
+                queue.append(nxt)
+            delta[state] = table
+
+        return delta, [tuple(out) for out in outputs]
+
+    def find(self, text: str) -> FrozenSet[str]:
+        """Distinct keywords occurring anywhere in `text`."""
+        return frozenset(self.keywords[kid] for kid in self._scan(text))
+
+    def counts(self, text: str) -> Dict[Hashable, int]:
+        """Number of distinct keywords of each group found in `text`."""
+        counts = dict.fromkeys(self.groups, 0)
+        for kid in self._scan(text):
+            for group in self._keyword_groups[kid]:
+                counts[group] += 1
+        return counts
+
+    def _scan(self, text: str) -> set:
+        delta = self._delta
+        outputs = self._outputs
+        found = set()
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
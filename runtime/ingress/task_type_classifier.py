@@ -1,15 +1,25 @@
 """
 Task Type Classifier: Explicit task classification for downstream routing.
 Outputs task_type.json artifact for replay and policy selection.
+
+Keyword rules (task types and features) are compiled into one keyword
+automaton scanned once per query; results for repeated queries are memoized
+in a bounded LRU, and artifacts are written behind in background batches.
 """
 import os
 import json
 import hashlib
-from typing import Dict, Any, List, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 from dataclasses import dataclass, asdict, field
 from enum import Enum
 
+from learning.write_behind import WriteBehindBuffer
+from runtime.ingress.keyword_matcher import KeywordMatcher
+
 
 class TaskType(str, Enum):
     """Primary task types."""
@@ -113,6 +123,9 @@ class TaskTypeClassifier:
     - artifacts/task_type/{run_id}.json
     """
     
+    # Memoized classifications keyed by normalized query and routing inputs
+    MEMO_SIZE = 4096
+    
     # Keyword patterns for classification
     TASK_PATTERNS = {
         TaskType.RAG_QA: [
@@ -157,6 +170,14 @@ class TaskTypeClassifier:
         ]
     }
     
+    # Keyword features extracted from the query
+    FEATURE_KEYWORDS = {
+        "has_code": ["code", "function", "class", "def", "import"],
+        "has_comparison": ["vs", "versus", "compare", "difference"],
+        "has_temporal": ["when", "date", "time", "year", "month"],
+        "has_location": ["where", "location", "place", "country"]
+    }
+    
     # Agent suggestions by task type
     AGENT_MAPPING = {
         TaskType.RAG_QA: ["data_agent", "execution_agent", "evaluation_agent"],
@@ -185,10 +206,37 @@ class TaskTypeClassifier:
         TaskType.EXTRACT: ["extractor", "parser"]
     }
     
-    def __init__(self, artifacts_dir: str = "artifacts"):
+    def __init__(self, artifacts_dir: str = "artifacts", artifact_flush_interval_s: float = 0.5):
         self.artifacts_dir = artifacts_dir
         self.task_type_dir = os.path.join(artifacts_dir, "task_type")
         os.makedirs(self.task_type_dir, exist_ok=True)
+        
+        self.artifact_flush_interval_s = artifact_flush_interval_s
+        self._matcher = self._keyword_matcher()
+        # memo key -> TaskClassification fields except run_id / classified_at
+        self._memo: "OrderedDict[Tuple[Any, ...], Dict[str, Any]]" = OrderedDict()
+        self._memo_lock = threading.Lock()
+        
+        # Artifacts are written by the background flusher thread in batches
+        self._artifacts = WriteBehindBuffer(
+            flush_interval_s=artifact_flush_interval_s,
+            inline_flush=False
+        )
+        self._last_saved_at = float("-inf")
+    
+    @classmethod
+    def _keyword_matcher(cls) -> KeywordMatcher:
+        """Keyword automaton over all task type and feature keywords (per class)."""
+        matcher = cls.__dict__.get("_compiled_matcher")
+        if matcher is None:
+            groups: Dict[Any, List[str]] = {
+                ("type", task_type): patterns for task_type, patterns in cls.TASK_PATTERNS.items()
+            }
+            for feature, keywords in cls.FEATURE_KEYWORDS.items():
+                groups[("feature", feature)] = keywords
+            matcher = KeywordMatcher(groups)
+            cls._compiled_matcher = matcher
+        return matcher
     
     def classify(
         self,
@@ -210,11 +258,64 @@ class TaskTypeClassifier:
         query = task_input.get("query", "").lower()
         intent = task_input.get("intent", "")
         
+        # Everything but run_id depends only on these inputs
+        key = (
+            query,
+            task_input.get("intent"),
+            bool(task_input.get("constraints")),
+            bool(task_input.get("is_sensitive"))
+        )
+        with self._memo_lock:
+            fields = self._memo.get(key)
+            if fields is not None:
+                self._memo.move_to_end(key)
+        
+        if fields is None:
+            fields = self._classify_fields(query, intent, task_input)
+            with self._memo_lock:
+                self._memo[key] = fields
+                if len(self._memo) > self.MEMO_SIZE:
+                    self._memo.popitem(last=False)
+        
+        classification = TaskClassification(
+            run_id=run_id,
+            task_type=fields["task_type"],
+            task_subtype=fields["task_subtype"],
+            complexity=fields["complexity"],
+            risk_level=fields["risk_level"],
+            confidence=fields["confidence"],
+            classification_method="rule_based",
+            suggested_agents=list(fields["suggested_agents"]),
+            suggested_tools=list(fields["suggested_tools"]),
+            required_capabilities=list(fields["required_capabilities"]),
+            estimated_cost=fields["estimated_cost"],
+            estimated_latency_ms=fields["estimated_latency_ms"],
+            requires_retrieval=fields["requires_retrieval"],
+            requires_generation=True,
+            requires_validation=fields["requires_validation"],
+            features=dict(fields["features"])
+        )
+        
+        # Save artifact
+        self._save_classification(classification)
+        
+        return classification
+    
+    def _classify_fields(
+        self,
+        query: str,
+        intent: str,
+        task_input: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Classify a normalized query (the memoized part of classify)."""
+        # One pass over the query scores every keyword rule
+        keyword_counts = self._matcher.counts(query)
+        
         # Extract features
-        features = self._extract_features(query, task_input)
+        features = self._extract_features(query, task_input, keyword_counts)
         
         # Classify task type
-        task_type, confidence = self._classify_type(query, intent, features)
+        task_type, confidence = self._classify_type(query, intent, features, keyword_counts)
         
         # Determine complexity
         complexity = self._assess_complexity(query, features)
@@ -240,32 +341,34 @@ class TaskTypeClassifier:
             task_type, complexity, requires_retrieval
         )
         
-        classification = TaskClassification(
-            run_id=run_id,
-            task_type=task_type,
-            task_subtype=self._determine_subtype(task_type, features),
-            complexity=complexity,
-            risk_level=risk_level,
-            confidence=confidence,
-            classification_method="rule_based",
-            suggested_agents=suggested_agents,
-            suggested_tools=suggested_tools,
-            required_capabilities=self._get_required_capabilities(task_type),
-            estimated_cost=estimated_cost,
-            estimated_latency_ms=estimated_latency,
-            requires_retrieval=requires_retrieval,
-            requires_generation=True,
-            requires_validation=requires_validation,
-            features=features
-        )
-        
-        # Save artifact
-        self._save_classification(classification)
-        
-        return classification
+        return {
+            "task_type": task_type,
+            "task_subtype": self._determine_subtype(task_type, features),
+            "complexity": complexity,
+            "risk_level": risk_level,
+            "confidence": confidence,
+            "suggested_agents": suggested_agents,
+            "suggested_tools": suggested_tools,
+            "required_capabilities": self._get_required_capabilities(task_type),
+            "estimated_cost": estimated_cost,
+            "estimated_latency_ms": estimated_latency,
+            "requires_retrieval": requires_retrieval,
+            "requires_validation": requires_validation,
+            "features": features
+        }
+    
+    def flush(self) -> None:
+        """Write all pending classification artifacts."""
+        self._artifacts.flush()
+    
+    def close(self) -> None:
+        """Flush pending artifacts and stop background tracking."""
+        self._artifacts.close()
     
     def load_classification(self, run_id: str) -> Optional[TaskClassification]:
         """Load classification from artifact."""
+        if self._artifacts.dirty:
+            self._artifacts.flush()
         path = os.path.join(self.task_type_dir, f"{run_id}.json")
         if not os.path.exists(path):
             return None
@@ -278,20 +381,23 @@ class TaskTypeClassifier:
     def _extract_features(
         self,
         query: str,
-        task_input: Dict[str, Any]
+        task_input: Dict[str, Any],
+        keyword_counts: Optional[Dict[Any, int]] = None
     ) -> Dict[str, Any]:
         """Extract features from query."""
         words = query.split()
+        if keyword_counts is None:
+            keyword_counts = self._matcher.counts(query)
         
         return {
             "query_length": len(query),
             "word_count": len(words),
             "has_question_mark": "?" in query,
             "has_numbers": any(c.isdigit() for c in query),
-            "has_code": any(kw in query for kw in ["code", "function", "class", "def", "import"]),
-            "has_comparison": any(kw in query for kw in ["vs", "versus", "compare", "difference"]),
-            "has_temporal": any(kw in query for kw in ["when", "date", "time", "year", "month"]),
-            "has_location": any(kw in query for kw in ["where", "location", "place", "country"]),
+            "has_code": keyword_counts[("feature", "has_code")] > 0,
+            "has_comparison": keyword_counts[("feature", "has_comparison")] > 0,
+            "has_temporal": keyword_counts[("feature", "has_temporal")] > 0,
+            "has_location": keyword_counts[("feature", "has_location")] > 0,
             "explicit_intent": task_input.get("intent"),
             "has_constraints": bool(task_input.get("constraints"))
         }
@@ -300,14 +406,16 @@ class TaskTypeClassifier:
         self,
         query: str,
         intent: str,
-        features: Dict[str, Any]
+        features: Dict[str, Any],
+        keyword_counts: Optional[Dict[Any, int]] = None
     ) -> tuple:
         """Classify task type with confidence."""
-        scores = {}
-        
-        for task_type, patterns in self.TASK_PATTERNS.items():
-            score = sum(1 for p in patterns if p in query)
-            scores[task_type] = score
+        if keyword_counts is None:
+            keyword_counts = self._matcher.counts(query)
+        scores = {
+            task_type: keyword_counts[("type", task_type)]
+            for task_type in self.TASK_PATTERNS
+        }
         
         # Use explicit intent if provided
         if intent:
@@ -419,10 +527,16 @@ class TaskTypeClassifier:
         return round(base_cost * mult, 4), int(base_latency * mult)
     
     def _save_classification(self, classification: TaskClassification) -> None:
-        """Save classification to artifact."""
+        """Queue the classification artifact for a batched background write."""
         path = os.path.join(self.task_type_dir, f"{classification.run_id}.json")
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(classification.to_dict(), f, indent=2, ensure_ascii=False)
+        now = time.monotonic()
+        idle = now - self._last_saved_at >= self.artifact_flush_interval_s
+        self._last_saved_at = now
+        self._artifacts.mark_dirty(path, classification.to_dict)
+        if idle:
+            # A lone classification is replayable right away; bursts are
+            # left to the flusher thread
+            self._artifacts.flush()
     
     def _dict_to_classification(self, data: Dict[str, Any]) -> TaskClassification:
         """Convert dict to TaskClassification."""
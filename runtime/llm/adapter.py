@@ -17,8 +17,18 @@ from datetime import datetime, timedelta
 
 from runtime.llm.client_factory import create_llm_client
 from runtime.config import load_effective_config
+from runtime.platform.metrics import MetricsRegistry
 import yaml
 
+_metrics = MetricsRegistry.get_default()
+LLM_CALL_SECONDS = _metrics.histogram(
+    "llm_call_duration_seconds",
+    "LLMAdapter.call latency (including retries)",
+    ("provider", "model", "outcome"),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+)
+LLM_TOKENS = _metrics.counter("llm_tokens_total", "LLM tokens used", ("model", "direction"))
+
 # optional redis limiter
 _redis_limiter = None
 try:
@@ -181,7 +191,10 @@ class CostTracker:
             return api_reported_cost
         
         # Fallback to computed cost
-        pricing = self.pricing.get(model, self.pricing.get("default"))
+        pricing = self.pricing.get(model) or self.pricing.get("default") or self.DEFAULT_PRICING["default"]
+        if isinstance(pricing, (int, float)):
+            # price_table.yaml style: flat USD price per token
+            return (input_tokens + output_tokens) * float(pricing)
         input_cost = (input_tokens / 1000) * pricing["input"]
         output_cost = (output_tokens / 1000) * pricing["output"]
         return input_cost + output_cost
@@ -224,8 +237,9 @@ class CostTracker:
 class LLMAdapter:
     """Industrial-grade LLM adapter with comprehensive production features"""
     
-    def __init__(self, config_path: str = "configs/system.yaml"):
-        self.client = create_llm_client(config_path)
+    def __init__(self, config_path: str = "configs/system.yaml", client=None):
+        # An injected client (e.g. an offline deterministic stand-in) bypasses the factory
+        self.client = client or create_llm_client(config_path)
         self.config_path = config_path
         self._last_call_ts = 0.0
         self._min_interval = 0.0
@@ -305,7 +319,38 @@ class LLMAdapter:
         - Retries with exponential backoff
         - Real cost tracking from API responses
         - Mock mode with realistic latency and error simulation
+        - Latency / outcome histogram and token counters (runtime.platform.metrics)
         """
+        start = time.perf_counter()
+        model_key = model or getattr(self.client, "model_name", "default")
+        provider = getattr(self.client, "get_provider_name", lambda: "unknown")()
+        outcome = "exception"
+        try:
+            result, meta_out = await self._call(
+                system_prompt, user_prompt, schema, meta=meta, task_id=task_id,
+                tenant_id=tenant_id, model=model, timeout=timeout
+            )
+            outcome = meta_out.get("failure_code") or "ok"
+            if meta_out.get("input_tokens"):
+                LLM_TOKENS.labels(model_key, "input").inc(meta_out["input_tokens"])
+            if meta_out.get("output_tokens"):
+                LLM_TOKENS.labels(model_key, "output").inc(meta_out["output_tokens"])
+            return result, meta_out
+        finally:
+            LLM_CALL_SECONDS.labels(provider, model_key, outcome).observe(time.perf_counter() - start)
+
+    async def _call(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        schema: Dict[str, Any],
+        meta: Dict[str, Any] = None,
+        task_id: str = None,
+        tenant_id: str = "default",
+        model: str = None,
+        timeout: float = None
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """call() without instrumentation"""
         meta = meta or {}
         now = time.time()
         call_start = time.time()
@@ -3,7 +3,9 @@ Deterministic Mock LLM Client for dev / tests.
 Produces canned JSON responses matching the requested schema.
 """
 from typing import Dict, Any, Tuple
+import re
 from runtime.llm.base_client import LLMClient
+from runtime.retrieval.hybrid_index import tokenize
 
 class MockLLMClient(LLMClient):
     """简单的 Mock LLM 实现，返回确定性输出，适合开发/测试"""
@@ -49,3 +51,59 @@ class MockLLMClient(LLMClient):
         return "mock-model"
 
 
+class ExtractiveMockLLMClient(MockLLMClient):
+    """
+    离线确定性替身：对 {"answer", "citations"} schema，从 prompt 中的证据行
+    ("[n] 文本") 抽取与问题 ("Question: ...") 重叠最多的句子作为答案；
+    其他 schema 退回 MockLLMClient 的默认值
+    """
+    MAX_SENTENCES = 2
+
+    async def _call_provider(self, system_prompt: str, user_prompt: str, schema: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+        props = (schema or {}).get("properties", {})
+        if "answer" not in props or "citations" not in props:
+            return await super()._call_provider(system_prompt, user_prompt, schema)
+
+        question, evidence = "", []
+        for line in (user_prompt or "").splitlines():
+            line = line.strip()
+            if line.startswith("Question:"):
+                question = line[len("Question:"):].strip()
+            else:
+                m = _EVIDENCE_LINE.match(line)
+                if m:
+                    evidence.append((int(m.group(1)), m.group(2)))
+
+        terms = _stems(question)
+        scored = []
+        for order, (ref, text) in enumerate(evidence):
+            for sentence in _SENTENCE_SPLIT.split(text):
+                sentence = sentence.strip()
+                if not sentence:
+                    continue
+                overlap = len(terms & _stems(sentence))
+                if overlap:
+                    scored.append((-overlap, order, ref, sentence))
+        scored.sort()
+        picked = scored[:self.MAX_SENTENCES]
+        return {
+            "answer": " ".join(sentence for _, _, _, sentence in picked),
+            "citations": sorted({ref for _, _, ref, _ in picked}),
+        }, 0
+
+    def get_model_name(self) -> str:
+        return "mock-extractive"
+
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by do does for from how in is it of on or that the this to was what when where which who why with".split()
+)
+
+
+def _stems(text: str) -> set:
+    """Content tokens truncated to 5 characters: a crude, language-agnostic stemmer"""
+    return {tok[:5] for tok in tokenize(text) if tok not in _STOPWORDS}
+
+
+_EVIDENCE_LINE = re.compile(r"^\[(\d+)\]\s*(.*)$")
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?。！？；;])\s*")
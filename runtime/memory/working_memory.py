@@ -4,12 +4,15 @@ Working Memory: 跨-Run 工作记忆
 """
 import os
 import json
+import heapq
 import hashlib
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 from dataclasses import dataclass, asdict, field
 from collections import defaultdict
 
+from learning.write_behind import WriteBehindBuffer
+
 
 @dataclass
 class PatternSignature:
@@ -63,14 +66,16 @@ class WorkingMemory:
     - decay(old_entries): 衰减旧条目
     - get_top_k_success_patterns(k): 获取成功率最高的 K 个模式
     
-    存储：artifacts/working_memory.json
+    存储：artifacts/working_memory.json（去抖写入，最多滞后 max_staleness_s）
     """
     
     def __init__(
         self,
         storage_path: str = "artifacts/working_memory.json",
         max_patterns: int = 1000,
-        decay_factor: float = 0.95
+        decay_factor: float = 0.95,
+        max_staleness_s: float = 1.0,
+        fsync: bool = False
     ):
         """
         初始化工作记忆。
@@ -79,11 +84,14 @@ class WorkingMemory:
             storage_path: 存储路径
             max_patterns: 最大模式数量
             decay_factor: 每次 decay 的衰减因子
+            max_staleness_s: 落盘最大滞后时间（秒）
+            fsync: 原子替换前是否 fsync
         """
         self.storage_path = storage_path
         self.max_patterns = max_patterns
         self.decay_factor = decay_factor
         self._patterns: Dict[str, PatternEntry] = {}
+        self._persistence = WriteBehindBuffer(flush_interval_s=max_staleness_s, fsync=fsync)
         
         # 加载现有记忆
         self._load()
@@ -265,19 +273,23 @@ class WorkingMemory:
     
     def _enforce_limit(self) -> None:
         """限制模式数量"""
-        if len(self._patterns) <= self.max_patterns:
+        to_remove = len(self._patterns) - self.max_patterns
+        if to_remove <= 0:
             return
         
-        # 按衰减权重排序，删除最低的
-        patterns = sorted(
+        # 删除衰减权重最低的（部分选择，无需全量排序）
+        lowest = heapq.nsmallest(
+            to_remove,
             self._patterns.items(),
             key=lambda x: x[1].decay_weight
         )
-        
-        to_remove = len(patterns) - self.max_patterns
-        for pattern_hash, _ in patterns[:to_remove]:
+        for pattern_hash, _ in lowest:
             del self._patterns[pattern_hash]
     
+    def flush(self) -> None:
+        """立即落盘待写入的记忆"""
+        self._persistence.flush()
+    
     def _load(self) -> None:
         """从文件加载"""
         if not os.path.exists(self.storage_path):
@@ -316,20 +328,20 @@ class WorkingMemory:
             pass
     
     def _save(self) -> None:
-        """保存到文件"""
-        os.makedirs(os.path.dirname(self.storage_path), exist_ok=True)
-        
-        data = {
-            "patterns": [e.to_dict() for e in self._patterns.values()],
+        """标记为脏，由写缓冲去抖后原子写入文件"""
+        self._persistence.mark_dirty(self.storage_path, self._snapshot)
+    
+    def _snapshot(self) -> Dict[str, Any]:
+        """序列化当前记忆"""
+        entries = list(self._patterns.values())
+        return {
+            "patterns": [e.to_dict() for e in entries],
             "summary": {
-                "total_patterns": len(self._patterns),
-                "total_runs": sum(e.total_count for e in self._patterns.values())
+                "total_patterns": len(entries),
+                "total_runs": sum(e.total_count for e in entries)
             },
             "generated_at": datetime.now().isoformat()
         }
-        
-        with open(self.storage_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
 
 
 # 全局实例
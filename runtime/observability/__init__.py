@@ -1,8 +1,9 @@
 """Observability module for execution tracing and artifact inspection"""
 
 from .tools import ExecutionTimeline, DAGVisualizer, ArtifactBrowser
+from .artifact_catalog import ArtifactCatalog, get_catalog, record_artifact
 
-__all__ = ['ExecutionTimeline', 'DAGVisualizer', 'ArtifactBrowser']
+__all__ = ['ExecutionTimeline', 'DAGVisualizer', 'ArtifactBrowser', 'ArtifactCatalog', 'get_catalog', 'record_artifact']
 
 
 
@@ -0,0 +1,503 @@
+"""
+Artifact Catalog - SQLite index of the artifacts tree
+Serves artifact listing, filtering, paging and stats without walking or
+parsing the tree on every request
+
+1. One row per file: path, type (parent directory name), run_id, size, mtime,
+   JSON validity and a preview rendered once when the file changes
+2. Directories are indexed too, so task listings and per-task file listings
+   are plain index queries
+3. Incremental refresh: a scandir pass compares (size, mtime) against the
+   index and only re-reads new or changed files; vanished entries are dropped
+4. Reads never scan: they are served from the index as it stands. Writers
+   report files via record_artifact(); start() builds the index once if it
+   has never been built and runs a watcher thread that refreshes it every
+   refresh_interval_s. The scan runs outside the catalog lock, so readers
+   only wait for the short batched writes
+5. The index lives at {artifacts_root}/.catalog/artifacts.db (WAL mode) and
+   is shared by all catalog users of the same root in this process
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+CATALOG_DIR = ".catalog"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    path TEXT PRIMARY KEY,
+    parent TEXT NOT NULL,
+    type TEXT NOT NULL,
+    file TEXT NOT NULL,
+    ext TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    valid_json INTEGER NOT NULL,
+    preview TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_artifacts_parent ON artifacts (parent);
+CREATE INDEX IF NOT EXISTS idx_artifacts_type ON artifacts (type);
+CREATE INDEX IF NOT EXISTS idx_artifacts_run ON artifacts (run_id);
+CREATE INDEX IF NOT EXISTS idx_artifacts_recent ON artifacts (ext, mtime_ns);
+CREATE TABLE IF NOT EXISTS artifact_dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_artifact_dirs_parent ON artifact_dirs (parent);
+"""
+
+
+class ArtifactCatalog:
+    """Incrementally maintained SQLite index of an artifacts directory"""
+
+    PREVIEW_CHARS = 200
+    # Larger JSON files are previewed from their raw text instead of parsed
+    MAX_PARSE_BYTES = 4 * 1024 * 1024
+    # Rows written per transaction during a refresh
+    BATCH_SIZE = 500
+
+    def __init__(
+        self,
+        artifacts_root: str = "artifacts",
+        db_path: Optional[str] = None,
+        refresh_interval_s: float = 2.0
+    ):
+        self.artifacts_root = os.path.abspath(artifacts_root)
+        self.db_path = db_path or os.path.join(self.artifacts_root, CATALOG_DIR, "artifacts.db")
+        self.refresh_interval_s = refresh_interval_s
+        self.root_type = os.path.basename(self.artifacts_root)
+
+        self._lock = threading.RLock()
+        # Serializes refreshes; held during the scan, unlike _lock
+        self._refresh_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # relative path -> (size, mtime_ns) as indexed
+        self._known: Dict[str, Tuple[int, int]] = {}
+        self._known_dirs: set = set()
+        self._indexed = False
+        self._last_refresh = float("-inf")
+
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def refresh(self, force: bool = False) -> int:
+        """
+        Bring the index in line with the filesystem.
+
+        Returns:
+            Number of rows inserted, updated or removed
+        """
+        with self._refresh_lock:
+            with self._lock:
+                if not force and time.monotonic() - self._last_refresh < self.refresh_interval_s:
+                    return 0
+                conn = self._connection()
+                if conn is None:
+                    return 0
+                known = dict(self._known)
+                known_dirs = set(self._known_dirs)
+
+            seen_files: set = set()
+            seen_dirs: set = set()
+            upserts: List[Tuple[Any, ...]] = []
+            new_dirs: List[Tuple[str, str, str]] = []
+            changes = 0
+
+            for rel_path, is_dir, size, mtime_ns in self._scan():
+                if is_dir:
+                    seen_dirs.add(rel_path)
+                    if rel_path not in known_dirs:
+                        new_dirs.append(self._dir_row(rel_path))
+                    continue
+                seen_files.add(rel_path)
+                if known.get(rel_path) != (size, mtime_ns):
+                    upserts.append(self._file_row(rel_path, size, mtime_ns))
+                    if len(upserts) >= self.BATCH_SIZE:
+                        with self._lock:
+                            changes += self._write(conn, upserts, new_dirs, [], [])
+                        upserts, new_dirs = [], []
+
+            gone_files = [p for p in known if p not in seen_files]
+            gone_dirs = [p for p in known_dirs if p not in seen_dirs]
+            with self._lock:
+                changes += self._write(conn, upserts, new_dirs, gone_files, gone_dirs)
+                if not self._indexed:
+                    conn.execute("PRAGMA user_version = 1")
+                    self._indexed = True
+                self._last_refresh = time.monotonic()
+            return changes
+
+    def record(self, path: str) -> None:
+        """Index (or drop) one file right after it was written or removed"""
+        rel_path = self._relative(path)
+        if rel_path is None:
+            return
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return
+            full_path = os.path.join(self.artifacts_root, rel_path)
+            try:
+                st = os.stat(full_path)
+            except OSError:
+                self._write(conn, [], [], [rel_path], [])
+                return
+            dirs = []
+            parent = os.path.dirname(rel_path)
+            while parent and parent not in self._known_dirs:
+                dirs.append(self._dir_row(parent))
+                parent = os.path.dirname(parent)
+            self._write(conn, [self._file_row(rel_path, st.st_size, st.st_mtime_ns)], dirs, [], [])
+
+    def start(self) -> "ArtifactCatalog":
+        """
+        Make the catalog ready to serve reads: build the index once if it has
+        never been built, then keep it fresh from the watcher thread
+        """
+        with self._lock:
+            conn = self._connection()
+            indexed = self._indexed
+        if conn is not None and not indexed:
+            self.refresh(force=True)
+        self.start_watcher()
+        return self
+
+    def start_watcher(self, interval_s: Optional[float] = None) -> None:
+        """Refresh the index from a background thread every `interval_s` (default refresh_interval_s)"""
+        if interval_s is None:
+            interval_s = self.refresh_interval_s
+        with self._lock:
+            if self._watcher is not None:
+                return
+            self._stop.clear()
+            self._watcher = threading.Thread(
+                target=self._watch, args=(interval_s,), name="artifact-catalog-watcher", daemon=True
+            )
+            self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        watcher = self._watcher
+        if watcher is None:
+            return
+        self._stop.set()
+        watcher.join(timeout=5)
+        self._watcher = None
+
+    def close(self) -> None:
+        self.stop_watcher()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self._known.clear()
+                self._known_dirs.clear()
+                self._indexed = False
+                self._last_refresh = float("-inf")
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def search(
+        self,
+        artifact_type: Optional[str] = None,
+        run_id: Optional[str] = None,
+        ext: Optional[str] = ".json",
+        valid_only: bool = True,
+        limit: int = 50,
+        offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        Artifacts matching the filters, most recently modified first.
+
+        `artifact_type` matches the parent directory name or the file name
+        (substring); `run_id` matches the derived run id or the file name.
+        """
+        where, params = self._filters(artifact_type, run_id, ext, valid_only)
+        rows = self._query(
+            "SELECT path, type, file, size, mtime_ns, preview FROM artifacts"
+            f"{where} ORDER BY mtime_ns DESC, path LIMIT ? OFFSET ?",
+            params + [limit, offset]
+        )
+        return [
+            {
+                "path": path,
+                "type": artifact_type_,
+                "file": file,
+                "size_bytes": size,
+                "modified": datetime.fromtimestamp(mtime_ns / 1e9).isoformat(),
+                "preview": preview
+            }
+            for path, artifact_type_, file, size, mtime_ns, preview in rows
+        ]
+
+    def count(
+        self,
+        artifact_type: Optional[str] = None,
+        run_id: Optional[str] = None,
+        ext: Optional[str] = ".json",
+        valid_only: bool = True
+    ) -> int:
+        """Number of artifacts matching the same filters as search()"""
+        where, params = self._filters(artifact_type, run_id, ext, valid_only)
+        rows = self._query(f"SELECT COUNT(*) FROM artifacts{where}", params)
+        return rows[0][0] if rows else 0
+
+    def stats(self, ext: Optional[str] = ".json") -> Dict[str, Any]:
+        """Totals, per-type counts and the modification time range"""
+        stats = {
+            "total_artifacts": 0,
+            "by_type": {},
+            "total_size_mb": 0.0,
+            "oldest": None,
+            "newest": None
+        }
+        where, params = self._filters(None, None, ext, False)
+        rows = self._query(
+            "SELECT type, COUNT(*), SUM(size), MIN(mtime_ns), MAX(mtime_ns) "
+            f"FROM artifacts{where} GROUP BY type",
+            params
+        )
+        if not rows:
+            return stats
+        oldest = min(r[3] for r in rows)
+        newest = max(r[4] for r in rows)
+        for artifact_type, count, size, _, _ in rows:
+            stats["by_type"][artifact_type] = count
+            stats["total_artifacts"] += count
+            stats["total_size_mb"] += (size or 0) / (1024 * 1024)
+        stats["oldest"] = datetime.fromtimestamp(oldest / 1e9).isoformat()
+        stats["newest"] = datetime.fromtimestamp(newest / 1e9).isoformat()
+        return stats
+
+    def list_dir(self, rel_dir: str) -> List[str]:
+        """Names of files and subdirectories directly under `rel_dir`"""
+        rel_dir = self._normalize(rel_dir)
+        rows = self._query(
+            "SELECT file FROM artifacts WHERE parent = ? "
+            "UNION SELECT name FROM artifact_dirs WHERE parent = ? ORDER BY 1",
+            [rel_dir, rel_dir]
+        )
+        return [r[0] for r in rows]
+
+    def list_task_ids(
+        self,
+        project_dir: str = "rag_project",
+        summaries_dir: str = os.path.join("trace_store", "summaries"),
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> List[str]:
+        """Task ids: subdirectories of `project_dir` plus *.json stems in `summaries_dir`"""
+        rows = self._query(
+            "SELECT name FROM artifact_dirs WHERE parent = ? "
+            "UNION SELECT substr(file, 1, length(file) - 5) FROM artifacts "
+            "WHERE parent = ? AND ext = '.json' ORDER BY 1 LIMIT ? OFFSET ?",
+            [
+                self._normalize(project_dir), self._normalize(summaries_dir),
+                -1 if limit is None else limit, offset
+            ]
+        )
+        return [r[0] for r in rows]
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """Open the index lazily; None while the artifacts root does not exist"""
+        if self._conn is not None:
+            return self._conn
+        if not os.path.isdir(self.artifacts_root):
+            return None
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30.0, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        self._known = {
+            path: (size, mtime_ns)
+            for path, size, mtime_ns in conn.execute("SELECT path, size, mtime_ns FROM artifacts")
+        }
+        self._known_dirs = {r[0] for r in conn.execute("SELECT path FROM artifact_dirs")}
+        self._indexed = conn.execute("PRAGMA user_version").fetchone()[0] >= 1
+        self._conn = conn
+        return conn
+
+    def _query(self, sql: str, params: List[Any]) -> List[Tuple[Any, ...]]:
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return []
+            return conn.execute(sql, params).fetchall()
+
+    def _write(
+        self,
+        conn: sqlite3.Connection,
+        upserts: List[Tuple[Any, ...]],
+        new_dirs: List[Tuple[str, str, str]],
+        gone_files: List[str],
+        gone_dirs: List[str]
+    ) -> int:
+        if not (upserts or new_dirs or gone_files or gone_dirs):
+            return 0
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", upserts
+            )
+            conn.executemany("INSERT OR IGNORE INTO artifact_dirs VALUES (?, ?, ?)", new_dirs)
+            conn.executemany("DELETE FROM artifacts WHERE path = ?", [(p,) for p in gone_files])
+            conn.executemany("DELETE FROM artifact_dirs WHERE path = ?", [(p,) for p in gone_dirs])
+        for row in upserts:
+            self._known[row[0]] = (row[6], row[7])
+        self._known_dirs.update(row[0] for row in new_dirs)
+        for path in gone_files:
+            self._known.pop(path, None)
+        self._known_dirs.difference_update(gone_dirs)
+        return len(upserts) + len(new_dirs) + len(gone_files) + len(gone_dirs)
+
+    def _scan(self) -> Iterator[Tuple[str, bool, int, int]]:
+        """Yield (relative path, is_dir, size, mtime_ns) for the whole tree"""
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            try:
+                entries = os.scandir(os.path.join(self.artifacts_root, rel_dir))
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    rel_path = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if rel_path == CATALOG_DIR:
+                                continue
+                            stack.append(rel_path)
+                            yield rel_path, True, 0, 0
+                        elif entry.is_file():
+                            st = entry.stat()
+                            yield rel_path, False, st.st_size, st.st_mtime_ns
+                    except OSError:
+                        continue
+
+    def _file_row(self, rel_path: str, size: int, mtime_ns: int) -> Tuple[Any, ...]:
+        parent, file = os.path.split(rel_path)
+        stem, ext = os.path.splitext(file)
+        artifact_type = os.path.basename(parent) if parent else self.root_type
+        # Files inside rag_project/{task_id}/ belong to that task
+        parts = parent.split(os.sep) if parent else []
+        run_id = parts[1] if len(parts) >= 2 and parts[0] == "rag_project" else stem
+        valid_json, preview = self._preview(os.path.join(self.artifacts_root, rel_path), ext, size)
+        return (
+            rel_path, parent, artifact_type, file, ext.lower(), run_id,
+            size, mtime_ns, valid_json, preview
+        )
+
+    @staticmethod
+    def _dir_row(rel_path: str) -> Tuple[str, str, str]:
+        parent, name = os.path.split(rel_path)
+        return rel_path, parent, name
+
+    def _preview(self, full_path: str, ext: str, size: int) -> Tuple[int, str]:
+        """(valid_json, preview text) for one file"""
+        limit = self.PREVIEW_CHARS
+        try:
+            if ext.lower() == ".json" and size <= self.MAX_PARSE_BYTES:
+                with open(full_path, "r", encoding="utf-8") as f:
+                    try:
+                        data = json.load(f)
+                    except ValueError:
+                        return 0, ""
+                text = str(data)
+                return 1, text[:limit] + "..." if len(text) > limit else text
+            with open(full_path, "r", encoding="utf-8", errors="replace") as f:
+                text = f.read(limit + 1)
+            valid = 1 if ext.lower() == ".json" else 0
+            return valid, text[:limit] + "..." if len(text) > limit else text
+        except OSError:
+            return 0, ""
+
+    def _filters(
+        self,
+        artifact_type: Optional[str],
+        run_id: Optional[str],
+        ext: Optional[str],
+        valid_only: bool
+    ) -> Tuple[str, List[Any]]:
+        clauses: List[str] = []
+        params: List[Any] = []
+        if ext:
+            clauses.append("ext = ?")
+            params.append(ext.lower())
+        if valid_only:
+            clauses.append("valid_json = 1")
+        if run_id:
+            clauses.append("(run_id = ? OR instr(file, ?) > 0)")
+            params += [run_id, run_id]
+        if artifact_type:
+            clauses.append("(instr(type, ?) > 0 OR instr(file, ?) > 0)")
+            params += [artifact_type, artifact_type]
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _relative(self, path: str) -> Optional[str]:
+        full_path = os.path.abspath(
+            path if os.path.isabs(path) else os.path.join(self.artifacts_root, path)
+        )
+        rel_path = os.path.relpath(full_path, self.artifacts_root)
+        if rel_path.startswith(os.pardir) or rel_path.split(os.sep)[0] == CATALOG_DIR:
+            return None
+        return rel_path
+
+    @staticmethod
+    def _normalize(rel_dir: str) -> str:
+        rel_dir = os.path.normpath(rel_dir)
+        return "" if rel_dir == "." else rel_dir
+
+    def _watch(self, interval_s: float) -> None:
+        while True:
+            try:
+                self.refresh(force=True)
+            except Exception:
+                pass
+            if self._stop.wait(interval_s):
+                return
+
+
+_catalogs: Dict[str, ArtifactCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(artifacts_root: str = "artifacts") -> ArtifactCatalog:
+    """Process-wide catalog for an artifacts root"""
+    key = os.path.abspath(artifacts_root)
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            catalog = _catalogs[key] = ArtifactCatalog(key)
+        return catalog
+
+
+def record_artifact(path: str) -> None:
+    """Report a written (or removed) file to every open catalog whose root contains it"""
+    full_path = os.path.abspath(path)
+    with _catalogs_lock:
+        catalogs = [
+            catalog for root, catalog in _catalogs.items()
+            if full_path.startswith(root + os.sep)
+        ]
+    for catalog in catalogs:
+        try:
+            catalog.record(full_path)
+        except Exception:
+            pass
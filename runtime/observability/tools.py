@@ -4,11 +4,12 @@ Provides structured access to execution history with replay capabilities
 """
 
 import json
-import os
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 from pathlib import Path
 
+from .artifact_catalog import ArtifactCatalog, get_catalog
+
 
 class ExecutionTimeline:
     """Reconstructs execution timeline from artifacts"""
@@ -138,81 +139,42 @@ class DAGVisualizer:
 
 
 class ArtifactBrowser:
-    """Browse and search artifacts across all runs"""
+    """Browse and search artifacts across all runs (served from the artifact catalog)"""
     
     def __init__(self, artifacts_base: str = "artifacts"):
         self.artifacts_base = Path(artifacts_base)
+        self._catalog: Optional[ArtifactCatalog] = None
+    
+    @property
+    def catalog(self) -> ArtifactCatalog:
+        """Shared catalog for this root; built on first use, then kept fresh by its watcher"""
+        if self._catalog is None:
+            self._catalog = get_catalog(str(self.artifacts_base)).start()
+        return self._catalog
     
     def search_artifacts(
         self, 
         artifact_type: Optional[str] = None,
         run_id: Optional[str] = None,
-        limit: int = 50
+        limit: int = 50,
+        offset: int = 0
     ) -> List[Dict[str, Any]]:
-        """Search artifacts with filters"""
-        results = []
-        
-        for root, dirs, files in os.walk(self.artifacts_base):
-            for file in files:
-                if not file.endswith('.json'):
-                    continue
-                
-                # Apply filters
-                if run_id and run_id not in file:
-                    continue
-                
-                if artifact_type:
-                    artifact_dir = os.path.basename(root)
-                    if artifact_type not in artifact_dir and artifact_type not in file:
-                        continue
-                
-                file_path = Path(root) / file
-                with open(file_path) as f:
-                    try:
-                        data = json.load(f)
-                        results.append({
-                            "path": str(file_path.relative_to(self.artifacts_base)),
-                            "type": os.path.basename(root),
-                            "file": file,
-                            "size_bytes": file_path.stat().st_size,
-                            "modified": datetime.fromtimestamp(file_path.stat().st_mtime).isoformat(),
-                            "preview": str(data)[:200] + "..." if len(str(data)) > 200 else str(data)
-                        })
-                    except json.JSONDecodeError:
-                        continue
-                
-                if len(results) >= limit:
-                    break
-        
-        return results
+        """Search JSON artifacts with filters, most recently modified first"""
+        return self.catalog.search(
+            artifact_type=artifact_type, run_id=run_id, limit=limit, offset=offset
+        )
+    
+    def count_artifacts(
+        self,
+        artifact_type: Optional[str] = None,
+        run_id: Optional[str] = None
+    ) -> int:
+        """Number of artifacts matching the search filters (for paging)"""
+        return self.catalog.count(artifact_type=artifact_type, run_id=run_id)
     
     def get_artifact_stats(self) -> Dict[str, Any]:
         """Get statistics about all artifacts"""
-        stats = {
-            "total_artifacts": 0,
-            "by_type": {},
-            "total_size_mb": 0.0,
-            "oldest": None,
-            "newest": None
-        }
-        
-        timestamps = []
-        for root, dirs, files in os.walk(self.artifacts_base):
-            artifact_type = os.path.basename(root)
-            for file in files:
-                if file.endswith('.json'):
-                    stats["total_artifacts"] += 1
-                    stats["by_type"][artifact_type] = stats["by_type"].get(artifact_type, 0) + 1
-                    
-                    file_path = Path(root) / file
-                    stats["total_size_mb"] += file_path.stat().st_size / (1024 * 1024)
-                    timestamps.append(file_path.stat().st_mtime)
-        
-        if timestamps:
-            stats["oldest"] = datetime.fromtimestamp(min(timestamps)).isoformat()
-            stats["newest"] = datetime.fromtimestamp(max(timestamps)).isoformat()
-        
-        return stats
+        return self.catalog.stats()
 
 
 # CLI interface for observability tools
@@ -1,44 +1,395 @@
 """
 Lightweight Prometheus-style metrics registry.
-Attempts to use prometheus_client if available, otherwise falls back to in-memory counters.
-This is minimal scaffolding for observability.
+No prometheus_client dependency; exposes the Prometheus text format (0.0.4).
+
+1. Labeled counters, gauges and fixed-bucket histograms
+2. Lock-free recording: every thread accumulates into its own cells, which
+   are only summed at collection time, so inc()/observe() never take a lock
+   (a shared `+=` is not atomic across threads even under the GIL)
+3. Gauges can also be backed by a callback evaluated at scrape time
+4. MetricsMiddleware: ASGI middleware recording request counts and latency
+   per route template
+5. MetricsRegistry.get_default().render() is served at /metrics
 """
-from typing import Dict
+from bisect import bisect_left
+import math
+import threading
 import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Prometheus client defaults, in seconds
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+class _ThreadCells:
+    """Per-thread accumulator cells, summed element-wise on read"""
+
+    def __init__(self, width: int):
+        self._width = width
+        self._local = threading.local()
+        self._shards: List[List[float]] = []
+        self._shards_lock = threading.Lock()
+
+    def _new_cells(self) -> List[float]:
+        cells = [0] * self._width
+        with self._shards_lock:
+            self._shards.append(cells)
+        self._local.cells = cells
+        return cells
+
+    def _totals(self) -> List[float]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        totals = [0] * self._width
+        for cells in shards:
+            for i, value in enumerate(cells):
+                totals[i] += value
+        return totals
+
 
-class InMemoryCounter:
+class _CounterChild(_ThreadCells):
     def __init__(self):
-        self._value = 0
+        super().__init__(1)
 
-    def inc(self, v: int = 1):
-        self._value += v
+    def inc(self, amount: float = 1) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        try:
+            cells = self._local.cells
+        except AttributeError:
+            cells = self._new_cells()
+        cells[0] += amount
 
-    def get(self):
+    def get(self) -> float:
+        return self._totals()[0]
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float) -> None:
+        self._value = float(value)
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.inc(-amount)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Report `function()` at collection time instead of the stored value"""
+        self._function = function
+
+    def get(self) -> float:
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception:
+                return math.nan
         return self._value
 
+
+class _HistogramChild(_ThreadCells):
+    def __init__(self, buckets: Tuple[float, ...]):
+        # One cell per finite bucket, one for +Inf, one for the sum
+        super().__init__(len(buckets) + 2)
+        self._buckets = buckets
+
+    def observe(self, value: float) -> None:
+        try:
+            cells = self._local.cells
+        except AttributeError:
+            cells = self._new_cells()
+        cells[bisect_left(self._buckets, value)] += 1
+        cells[-1] += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observe the duration of the block in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, object]:
+        """{"buckets": [(le, cumulative count)], "count": n, "sum": s}"""
+        totals = self._totals()
+        cumulative = []
+        running = 0
+        for bound, count in zip(self._buckets + (math.inf,), totals[:-1]):
+            running += count
+            cumulative.append((bound, running))
+        return {"buckets": cumulative, "count": running, "sum": totals[-1]}
+
+
+class _Metric:
+    """A metric family: one child per label-value combination"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str = "", labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **kwargs):
+        """Child for the given label values (positional or by name)"""
+        if not kwargs:
+            child = self._children.get(values)
+            if child is not None:
+                return child
+        if kwargs:
+            values = tuple(str(kwargs[name]) for name in self.labelnames)
+        else:
+            values = tuple(str(v) for v in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._new_child()
+        return child
+
+    def _unlabeled(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} is labeled; use .labels()")
+        return self.labels()
+
+    def children(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return list(self._children.items())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self._unlabeled().inc(amount)
+
+    def get(self) -> float:
+        return self._unlabeled().get()
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._unlabeled().set(value)
+
+    def inc(self, amount: float = 1) -> None:
+        self._unlabeled().inc(amount)
+
+    def dec(self, amount: float = 1) -> None:
+        self._unlabeled().dec(amount)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._unlabeled().set_function(function)
+
+    def get(self) -> float:
+        return self._unlabeled().get()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str = "",
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(b for b in buckets if b != math.inf))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._unlabeled().observe(value)
+
+    def time(self):
+        return self._unlabeled().time()
+
+    def snapshot(self) -> Dict[str, object]:
+        return self._unlabeled().snapshot()
+
+
 class MetricsRegistry:
     _default = None
+    _default_lock = threading.Lock()
 
     def __init__(self):
-        self.counters: Dict[str, InMemoryCounter] = {}
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
 
     @classmethod
     def get_default(cls):
         if cls._default is None:
-            cls._default = MetricsRegistry()
-            # pre-create common counters
-            cls._default.counters["tasks_started"] = InMemoryCounter()
-            cls._default.counters["tasks_completed"] = InMemoryCounter()
-            cls._default.counters["agent_executions_total"] = InMemoryCounter()
-            cls._default.counters["governance_decisions_total"] = InMemoryCounter()
+            with cls._default_lock:
+                if cls._default is None:
+                    registry = MetricsRegistry()
+                    # pre-create common counters
+                    registry.counter("tasks_started")
+                    registry.counter("tasks_completed")
+                    registry.counter("agent_executions_total")
+                    registry.counter("governance_decisions_total")
+                    cls._default = registry
         return cls._default
 
-    def counter(self, name: str):
-        if name not in self.counters:
-            self.counters[name] = InMemoryCounter()
-        return self.counters[name]
+    @property
+    def counters(self) -> Dict[str, Counter]:
+        return {name: m for name, m in self._metrics.items() if isinstance(m, Counter)}
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = cls(name, *args, **kwargs)
+        if not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} already registered as {metric.kind}")
+        return metric
+
+    def counter(self, name: str, documentation: str = "", labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str = "", labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str = "",
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets)
 
     def snapshot(self):
-        return {k: v.get() for k, v in self.counters.items()}
+        """Values of unlabeled counters by name"""
+        return {
+            name: metric.get()
+            for name, metric in self.counters.items()
+            if not metric.labelnames
+        }
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines: List[str] = []
+        for metric in metrics:
+            if metric.documentation:
+                lines.append(f"# HELP {metric.name} {_escape_help(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            children = metric.children()
+            if not children and not metric.labelnames:
+                children = [((), metric.labels())]
+            for values, child in sorted(children, key=lambda c: c[0]):
+                labels = list(zip(metric.labelnames, values))
+                if isinstance(child, _HistogramChild):
+                    snap = child.snapshot()
+                    for bound, count in snap["buckets"]:
+                        le = "+Inf" if bound == math.inf else _format_value(bound)
+                        lines.append(
+                            f"{metric.name}_bucket{_format_labels(labels + [('le', le)])} {count}"
+                        )
+                    lines.append(f"{metric.name}_count{_format_labels(labels)} {snap['count']}")
+                    lines.append(f"{metric.name}_sum{_format_labels(labels)} {_format_value(snap['sum'])}")
+                else:
+                    lines.append(f"{metric.name}{_format_labels(labels)} {_format_value(child.get())}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _format_labels(labels: List[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels) + "}"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording http_requests_total and
+    http_request_duration_seconds by method, route template and status.
+
+    The route template (e.g. /api/task/{task_id}) keeps label cardinality
+    bounded; unmatched paths are reported as "unmatched".
+    """
+
+    def __init__(self, app, registry: Optional[MetricsRegistry] = None):
+        self.app = app
+        registry = registry or MetricsRegistry.get_default()
+        self.requests = registry.counter(
+            "http_requests_total", "HTTP requests handled", ("method", "route", "status")
+        )
+        self.latency = registry.histogram(
+            "http_request_duration_seconds", "HTTP request latency", ("method", "route")
+        )
+        self.in_flight = registry.gauge("http_requests_in_flight", "HTTP requests being served")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
 
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
 
+        start = time.perf_counter()
+        self.in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.in_flight.dec()
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            self.latency.labels(method, template).observe(time.perf_counter() - start)
+            self.requests.labels(method, template, str(status["code"])).inc()
@@ -9,6 +9,8 @@ from datetime import datetime
 from dataclasses import dataclass, asdict
 import hashlib
 
+from runtime.observability.artifact_catalog import record_artifact
+
 @dataclass
 class TraceSummary:
     """Trace 摘要：小体积、默认加载"""
@@ -69,6 +71,7 @@ class TraceStore:
         summary.updated_at = datetime.now().isoformat()
         with open(summary_path, "w", encoding="utf-8") as f:
             json.dump(asdict(summary), f, indent=2, ensure_ascii=False)
+        record_artifact(summary_path)
         return summary_path
     
     def load_summary(self, task_id: str) -> Optional[TraceSummary]:
@@ -123,6 +126,7 @@ class TraceStore:
         blob_path = os.path.join(self.blobs_dir, f"{blob.task_id}_{blob.blob_id}.json")
         with open(blob_path, "w", encoding="utf-8") as f:
             json.dump(asdict(blob), f, indent=2, ensure_ascii=False)
+        record_artifact(blob_path)
         return blob_path
     
     def load_blob(self, task_id: str, blob_id: str) -> Optional[TraceBlob]:
@@ -0,0 +1,218 @@
+"""
+Index Builder: dense + sparse search indexes for a delivery.
+
+1. Chunks are read from the ingestion runner's chunks.jsonl records
+2. Exact duplicates (normalized text) and near-duplicates (64-bit SimHash over
+   word shingles, Hamming distance <= NEAR_DUP_BITS, candidates found by LSH
+   banding) are dropped; the first occurrence is kept
+3. The HybridIndex is written to a fresh version directory and published by
+   atomically replacing the CURRENT pointer:
+
+       {index_root}/versions/{version}/   HybridIndex.save layout
+       {index_root}/CURRENT               name of the serving version
+
+Readers resolve CURRENT and load a complete version directory; a build never
+modifies a published version, so serving processes can hot-swap without downtime.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from runtime.retrieval.hybrid_index import DEFAULT_DIM, HybridIndex, tokenize
+
+CURRENT = "CURRENT"
+VERSIONS = "versions"
+
+NEAR_DUP_BITS = 5
+SHINGLE = 3
+# 6 bands of 10-11 bits: fingerprints within NEAR_DUP_BITS always agree on at least one band
+_BANDS = [(shift, (1 << width) - 1) for shift, width in ((0, 11), (11, 11), (22, 11), (33, 11), (44, 10), (54, 10))]
+_BIT_SHIFTS = np.arange(64, dtype=np.uint64)
+
+
+def load_chunks(chunks_paths: Iterable[str]) -> List[Dict[str, Any]]:
+    """Flatten chunks.jsonl records into index chunks (file_id / embedding model kept as metadata)"""
+    chunks = []
+    for path in chunks_paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                for ch in record.get("chunks", []):
+                    metadata = dict(ch.get("source_ref", {}))
+                    metadata.setdefault("file_id", record.get("file_id"))
+                    metadata["model_id"] = record.get("model_id")
+                    chunks.append({
+                        "chunk_id": ch.get("chunk_id"),
+                        "content": ch.get("content", ""),
+                        "metadata": metadata,
+                    })
+    return chunks
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over word shingles"""
+    tokens = tokenize(text)
+    shingles = [" ".join(tokens[i:i + SHINGLE]) for i in range(max(len(tokens) - SHINGLE + 1, 1))]
+    hashes = np.frombuffer(
+        b"".join(hashlib.blake2b(sh.encode(), digest_size=8).digest() for sh in shingles), dtype=">u8"
+    ).astype(np.uint64)
+    bits = (hashes[:, None] >> _BIT_SHIFTS) & np.uint64(1)
+    votes = 2 * bits.sum(axis=0, dtype=np.int64) - len(shingles)
+    return int(np.packbits((votes > 0)[::-1]).view(">u8")[0])
+
+
+def dedupe_chunks(chunks: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """(kept chunks, {"exact": n, "near": n}) — first occurrence wins"""
+    kept: List[Dict[str, Any]] = []
+    seen_text = set()
+    fingerprints: List[int] = []
+    buckets: Dict[Tuple[int, int], List[int]] = {}
+    removed = {"exact": 0, "near": 0}
+
+    for ch in chunks:
+        norm = " ".join(ch.get("content", "").lower().split())
+        if not norm:
+            continue
+        digest = hashlib.sha256(norm.encode()).digest()
+        if digest in seen_text:
+            removed["exact"] += 1
+            continue
+        fp = simhash(norm)
+        bands = [(shift, (fp >> shift) & mask) for shift, mask in _BANDS]
+        candidates = {j for band in bands for j in buckets.get(band, ())}
+        if any(bin(fp ^ fingerprints[j]).count("1") <= NEAR_DUP_BITS for j in candidates):
+            removed["near"] += 1
+            continue
+        seen_text.add(digest)
+        for band in bands:
+            buckets.setdefault(band, []).append(len(kept))
+        fingerprints.append(fp)
+        kept.append(ch)
+    return kept, removed
+
+
+def build_index(
+    chunks: List[Dict[str, Any]],
+    index_root: str,
+    dim: int = DEFAULT_DIM,
+    keep_versions: int = 3
+) -> Dict[str, Any]:
+    """
+    Build, publish and return the manifest of a new index version.
+
+    The version name is derived from the indexed content, so rebuilding an
+    unchanged corpus republishes the existing version instead of writing a copy.
+    With no chunks left after dedup nothing is built or published: the
+    manifest has status "skipped" and names the version CURRENT still serves.
+    """
+    start = time.perf_counter()
+    kept, removed = dedupe_chunks(chunks)
+    if not kept:
+        serving = current_version(index_root)
+        return {
+            "status": "skipped",
+            "reason": "no_chunks",
+            "version": serving,
+            "path": os.path.join(index_root, VERSIONS, serving) if serving else None,
+            "content_hash": None,
+            "dim": dim,
+            "chunks_in": len(chunks),
+            "chunks_indexed": 0,
+            "duplicates_removed": removed,
+            "reused_existing_version": False,
+            "build_seconds": round(time.perf_counter() - start, 4),
+            "chunks_per_second": None,
+            "index_bytes": 0,
+            "file_bytes": {},
+            "pruned_versions": [],
+        }
+    content_hash = hashlib.sha256(
+        json.dumps([dim] + [(ch["chunk_id"], ch["content"]) for ch in kept], ensure_ascii=False).encode()
+    ).hexdigest()
+    version = f"v{content_hash[:16]}"
+    versions_dir = os.path.join(index_root, VERSIONS)
+    target = os.path.join(versions_dir, version)
+    os.makedirs(versions_dir, exist_ok=True)
+
+    reused = os.path.exists(os.path.join(target, "index_meta.json"))
+    if reused:
+        os.utime(target)
+    else:
+        staging = os.path.join(versions_dir, f".{version}.{os.getpid()}.tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        HybridIndex.from_chunks(kept, dim=dim).save(staging)
+        try:
+            os.rename(staging, target)
+        except OSError:
+            # A concurrent build published the same version first
+            shutil.rmtree(staging, ignore_errors=True)
+    publish(index_root, version)
+    elapsed = time.perf_counter() - start
+    pruned = prune_versions(index_root, keep_versions)
+
+    files = {name: os.path.getsize(os.path.join(target, name)) for name in sorted(os.listdir(target))}
+    return {
+        "status": "built",
+        "version": version,
+        "path": target,
+        "content_hash": content_hash,
+        "dim": dim,
+        "chunks_in": len(chunks),
+        "chunks_indexed": len(kept),
+        "duplicates_removed": removed,
+        "reused_existing_version": reused,
+        "build_seconds": round(elapsed, 4),
+        "chunks_per_second": round(len(chunks) / elapsed, 1) if elapsed > 0 else None,
+        "index_bytes": sum(files.values()),
+        "file_bytes": files,
+        "pruned_versions": pruned,
+    }
+
+
+def publish(index_root: str, version: str):
+    """Point CURRENT at `version` (write + os.replace: readers see the old or the new name, never a partial one)"""
+    tmp = os.path.join(index_root, f".{CURRENT}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(index_root, CURRENT))
+
+
+def current_version(index_root: str) -> Optional[str]:
+    try:
+        with open(os.path.join(index_root, CURRENT), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def resolve_index(index_root: str, version: str = "latest") -> Optional[Tuple[str, str]]:
+    """(version, directory) for "latest" (CURRENT) or a pinned version; None when absent"""
+    name = current_version(index_root) if version in (None, "", "latest") else version
+    if not name:
+        return None
+    path = os.path.join(index_root, VERSIONS, name)
+    return (name, path) if os.path.exists(os.path.join(path, "index_meta.json")) else None
+
+
+def prune_versions(index_root: str, keep: int) -> List[str]:
+    """Delete all but the `keep` newest versions; the current one is never deleted"""
+    versions_dir = os.path.join(index_root, VERSIONS)
+    current = current_version(index_root)
+    names = [n for n in os.listdir(versions_dir) if not n.startswith(".")]
+    names.sort(key=lambda n: os.path.getmtime(os.path.join(versions_dir, n)), reverse=True)
+    pruned = []
+    for name in names[max(keep, 1):]:
+        if name == current:
+            continue
+        shutil.rmtree(os.path.join(versions_dir, name), ignore_errors=True)
+        pruned.append(name)
+    return pruned
@@ -8,6 +8,9 @@ import hashlib
 from datetime import datetime
 from typing import Dict, Any
 
+from runtime.rag_delivery.index_builder import CURRENT, build_index, load_chunks
+from runtime.retrieval.hybrid_index import DEFAULT_DIM
+
 
 def _hash(obj: Any) -> str:
     return hashlib.sha256(json.dumps(obj, sort_keys=True, default=str).encode()).hexdigest()
@@ -21,6 +24,12 @@ def build_delivery(run_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
     - chunking_strategy
     - retrieval_config
     - model_routing_config
+
+    optional:
+    - chunks_paths: chunks.jsonl files written by the ingestion runner; their
+      chunks are deduplicated and indexed into index/versions/{version},
+      published through index/CURRENT. Without any chunks the index manifests
+      are marked "skipped" and CURRENT keeps pointing at the previous version
     """
     required_keys = [
         "delivery_spec",
@@ -68,9 +77,32 @@ def build_delivery(run_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
     with open(os.path.join(base_dir, "evidence_map.json"), "w", encoding="utf-8") as f:
         json.dump(evidence_map, f, indent=2, ensure_ascii=False)
 
-    # index manifests placeholders
-    vector_manifest = {"status": "not_built", "hash": _hash({"empty": True})}
-    bm25_manifest = {"status": "not_built", "hash": _hash({"empty": True})}
+    chunks_paths = payload.get("chunks_paths") or payload["data_manifest"].get("chunks_paths") or []
+    index_build = build_index(
+        load_chunks(chunks_paths),
+        index_dir,
+        dim=int(payload["retrieval_config"].get("dense_dim", DEFAULT_DIM)),
+    )
+    file_bytes = index_build["file_bytes"]
+    vector_manifest = {
+        "status": index_build["status"],
+        "hash": index_build["content_hash"],
+        "version": index_build["version"],
+        "type": "dense_hashed_ngram",
+        "dim": index_build["dim"],
+        "vectors": index_build["chunks_indexed"],
+        "bytes": file_bytes.get("dense.npy", 0),
+    }
+    bm25_manifest = {
+        "status": index_build["status"],
+        "hash": index_build["content_hash"],
+        "version": index_build["version"],
+        "type": "bm25",
+        "documents": index_build["chunks_indexed"],
+        "bytes": file_bytes.get("sparse.npz", 0) + file_bytes.get("vocab.json", 0),
+    }
+    if index_build["status"] != "built":
+        vector_manifest["reason"] = bm25_manifest["reason"] = index_build["reason"]
     with open(os.path.join(index_dir, "vector_manifest.json"), "w", encoding="utf-8") as f:
         json.dump(vector_manifest, f, indent=2, ensure_ascii=False)
     with open(os.path.join(index_dir, "bm25_manifest.json"), "w", encoding="utf-8") as f:
@@ -81,6 +113,19 @@ def build_delivery(run_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         "corpus_path": corpus_dir,
         "chunking_manifest": chunking_manifest_path,
         "index_path": index_dir,
+        "index": {
+            "status": index_build["status"],
+            "version": index_build["version"],
+            "version_path": index_build["path"],
+            "current_pointer": os.path.join(index_dir, CURRENT),
+            "chunks_in": index_build["chunks_in"],
+            "chunks_indexed": index_build["chunks_indexed"],
+            "duplicates_removed": index_build["duplicates_removed"],
+            "reused_existing_version": index_build["reused_existing_version"],
+            "build_seconds": index_build["build_seconds"],
+            "chunks_per_second": index_build["chunks_per_second"],
+            "index_bytes": index_build["index_bytes"],
+        },
         "retrieval_config": payload["retrieval_config"],
         "model_routing_config": payload["model_routing_config"],
         "evidence_map": evidence_map,
@@ -97,6 +142,7 @@ def build_delivery(run_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         "model_routing_hash": _hash(payload["model_routing_config"]),
         "delivery_bundle_hash": _hash(delivery_bundle),
         "evidence_hash": _hash(evidence_map),
+        "index_hash": index_build["content_hash"],
     }
     with open(os.path.join(base_dir, "hashes.json"), "w", encoding="utf-8") as f:
         json.dump(hashes, f, indent=2, ensure_ascii=False)
@@ -104,6 +150,7 @@ def build_delivery(run_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
     return {
         "delivery_bundle_path": delivery_bundle_path,
         "hashes": hashes,
+        "index_version": index_build["version"],
     }
 
 
@@ -12,6 +12,8 @@ from runtime.retrieval.vector_store import (
     get_vector_store,
 )
 
+from runtime.retrieval.hybrid_index import HybridIndex
+
 from runtime.retrieval.l5_retrieval import (
     RetrievalDecision,
     RetrievalPolicy,
@@ -26,6 +28,8 @@ __all__ = [
     "EvidencePackage",
     "EvidenceCollector",
     "get_vector_store",
+    # Hybrid Index
+    "HybridIndex",
     # Policy
     "RetrievalDecision",
     "RetrievalPolicy",
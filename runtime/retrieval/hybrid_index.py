@@ -0,0 +1,258 @@
+"""
+Hybrid Index: dense + sparse (BM25) retrieval over delivery chunks.
+Pure numpy; no model download, fully deterministic.
+
+1. Dense: feature-hashed character n-grams (CJK bigrams), L2-normalized float32
+   vectors; cosine similarity is a single matrix-vector product
+2. Sparse: BM25 over word tokens (CJK unigrams + bigrams) with per-term
+   postings arrays
+3. Hybrid: weighted reciprocal-rank fusion of both candidate lists
+
+On-disk layout (save / load):
+    index_meta.json   dim, bm25 params, counts
+    chunks.jsonl      one chunk per line, in row order
+    dense.npy         (n, dim) float32, memory-mapped on load
+    vocab.json        terms in posting order
+    sparse.npz        per-term offsets, concatenated postings (doc ids, tf), doc lengths
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import json
+import math
+import os
+import re
+import zlib
+
+import numpy as np
+
+DEFAULT_DIM = 256
+RRF_K = 60
+
+_WORD = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+_CJK = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased latin/numeric words plus CJK unigrams and bigrams"""
+    text = (text or "").lower()
+    tokens = _WORD.findall(text)
+    for run in _CJK.findall(text):
+        tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def _features(text: str) -> List[str]:
+    """Character trigrams of each word (with boundaries) and CJK bigrams"""
+    text = (text or "").lower()
+    feats = []
+    for word in _WORD.findall(text):
+        padded = f"#{word}#"
+        feats.append(word)
+        feats.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    for run in _CJK.findall(text):
+        feats.extend(run)
+        feats.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return feats
+
+
+def hashed_embedding(text: str, dim: int = DEFAULT_DIM) -> np.ndarray:
+    """Signed feature hashing into `dim` buckets, L2-normalized"""
+    vec = np.zeros(dim, dtype=np.float32)
+    for feat in _features(text):
+        h = zlib.crc32(feat.encode())
+        vec[h % dim] += 1.0 if (h >> 31) & 1 else -1.0
+    norm = float(np.linalg.norm(vec))
+    if norm > 0:
+        vec /= norm
+    return vec
+
+
+class HybridIndex:
+    """
+    Dense + BM25 index over a fixed list of chunks.
+
+    Chunks are dicts with at least "chunk_id" and "content"; an optional
+    "metadata" dict is used by metadata filters.
+    """
+
+    def __init__(
+        self,
+        chunks: List[Dict[str, Any]],
+        vectors: np.ndarray,
+        vocab: Dict[str, int],
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        tfs: np.ndarray,
+        doc_len: np.ndarray,
+        k1: float = 1.2,
+        b: float = 0.75
+    ):
+        self.chunks = chunks
+        self.vectors = vectors
+        self.dim = int(vectors.shape[1]) if vectors.ndim == 2 else DEFAULT_DIM
+        self.vocab = vocab
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.k1 = k1
+        self.b = b
+        self.avg_len = float(doc_len.mean()) if len(doc_len) else 0.0
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    @classmethod
+    def from_chunks(cls, chunks: Sequence[Dict[str, Any]], dim: int = DEFAULT_DIM) -> "HybridIndex":
+        chunks = list(chunks)
+        vectors = np.zeros((len(chunks), dim), dtype=np.float32)
+        postings: Dict[str, Dict[int, int]] = {}
+        doc_len = np.zeros(len(chunks), dtype=np.float32)
+        for i, ch in enumerate(chunks):
+            content = ch.get("content", "")
+            vectors[i] = hashed_embedding(content, dim)
+            tokens = tokenize(content)
+            doc_len[i] = len(tokens)
+            for tok in tokens:
+                row = postings.setdefault(tok, {})
+                row[i] = row.get(i, 0) + 1
+
+        vocab: Dict[str, int] = {}
+        offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+        ids_parts, tf_parts = [], []
+        for t, (term, row) in enumerate(sorted(postings.items())):
+            vocab[term] = t
+            offsets[t + 1] = offsets[t] + len(row)
+            ids_parts.append(np.fromiter(row.keys(), dtype=np.int32, count=len(row)))
+            tf_parts.append(np.fromiter(row.values(), dtype=np.float32, count=len(row)))
+        doc_ids = np.concatenate(ids_parts) if ids_parts else np.zeros(0, dtype=np.int32)
+        tfs = np.concatenate(tf_parts) if tf_parts else np.zeros(0, dtype=np.float32)
+        return cls(chunks, vectors, vocab, offsets, doc_ids, tfs, doc_len)
+
+    # ---- search ----
+
+    def search_dense(self, query: str, k: int) -> List[Tuple[int, float]]:
+        if not len(self.chunks):
+            return []
+        scores = self.vectors @ hashed_embedding(query, self.dim)
+        return [(i, s) for i, s in _top(scores, k) if s > 0]
+
+    def search_sparse(self, query: str, k: int) -> List[Tuple[int, float]]:
+        if not len(self.chunks):
+            return []
+        n = len(self.chunks)
+        scores = np.zeros(n, dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self.doc_len / max(self.avg_len, 1e-9))
+        for term in set(tokenize(query)):
+            t = self.vocab.get(term)
+            if t is None:
+                continue
+            start, end = self.offsets[t], self.offsets[t + 1]
+            ids = self.doc_ids[start:end]
+            tf = self.tfs[start:end]
+            df = end - start
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            # Postings hold each doc once, so fancy-index += is safe
+            scores[ids] += idf * tf * (self.k1 + 1) / (tf + norm[ids])
+        hits = _top(scores, k)
+        return [(i, s) for i, s in hits if s > 0]
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        mode: str = "hybrid",
+        dense_weight: float = 0.5,
+        candidates: Optional[int] = None,
+        filter_metadata: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Args:
+            mode: "dense" | "sparse" | "hybrid"
+            dense_weight: dense share of the fused score (hybrid only)
+            candidates: per-retriever candidate pool, default 4 × top_k
+            filter_metadata: chunk["metadata"] must match every key
+        """
+        pool = max(candidates or 4 * top_k, top_k)
+        if filter_metadata:
+            # Over-fetch so filtering still leaves top_k
+            pool = min(len(self.chunks), pool * 4)
+
+        dense = self.search_dense(query, pool) if mode in ("dense", "hybrid") else []
+        sparse = self.search_sparse(query, pool) if mode in ("sparse", "hybrid") else []
+        dense_scores = dict(dense)
+        sparse_scores = dict(sparse)
+
+        fused: Dict[int, float] = {}
+        weights = {"dense": 1.0, "sparse": 0.0} if mode == "dense" else (
+            {"dense": 0.0, "sparse": 1.0} if mode == "sparse" else {"dense": dense_weight, "sparse": 1 - dense_weight}
+        )
+        for name, hits in (("dense", dense), ("sparse", sparse)):
+            for rank, (i, _) in enumerate(hits):
+                fused[i] = fused.get(i, 0.0) + weights[name] / (RRF_K + rank + 1)
+
+        results = []
+        for i in sorted(fused, key=lambda j: (-fused[j], j)):
+            ch = self.chunks[i]
+            if filter_metadata and not all(
+                ch.get("metadata", {}).get(k) == v for k, v in filter_metadata.items()
+            ):
+                continue
+            results.append({
+                "chunk_id": ch.get("chunk_id"),
+                "content": ch.get("content", ""),
+                "metadata": ch.get("metadata", {}),
+                "score": fused[i],
+                "dense_score": dense_scores.get(i, 0.0),
+                "sparse_score": sparse_scores.get(i, 0.0),
+                "rank": len(results) + 1,
+            })
+            if len(results) >= top_k:
+                break
+        return results
+
+    # ---- persistence ----
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "chunks.jsonl"), "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(ch, ensure_ascii=False, default=str) + "\n" for ch in self.chunks)
+        np.save(os.path.join(path, "dense.npy"), np.ascontiguousarray(self.vectors, dtype=np.float32))
+        terms = sorted(self.vocab, key=self.vocab.get)
+        np.savez(
+            os.path.join(path, "sparse.npz"),
+            offsets=self.offsets, doc_ids=self.doc_ids, tfs=self.tfs, doc_len=self.doc_len
+        )
+        with open(os.path.join(path, "vocab.json"), "w", encoding="utf-8") as f:
+            json.dump(terms, f, ensure_ascii=False)
+        with open(os.path.join(path, "index_meta.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "dim": self.dim, "k1": self.k1, "b": self.b,
+                "chunks": len(self.chunks), "terms": len(terms), "postings": int(len(self.doc_ids)),
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "HybridIndex":
+        with open(os.path.join(path, "index_meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(os.path.join(path, "chunks.jsonl"), "r", encoding="utf-8") as f:
+            chunks = [json.loads(line) for line in f]
+        with open(os.path.join(path, "vocab.json"), "r", encoding="utf-8") as f:
+            vocab = {term: t for t, term in enumerate(json.load(f))}
+        vectors = np.load(os.path.join(path, "dense.npy"), mmap_mode="r")
+        sparse = np.load(os.path.join(path, "sparse.npz"))
+        return cls(
+            chunks, vectors, vocab,
+            sparse["offsets"], sparse["doc_ids"], sparse["tfs"], sparse["doc_len"],
+            k1=meta.get("k1", 1.2), b=meta.get("b", 0.75)
+        )
+
+
+def _top(scores: np.ndarray, k: int) -> List[Tuple[int, float]]:
+    """Indices and scores of the k largest entries, best first (ties by index)"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return []
+    idx = np.argpartition(-scores, k - 1)[:k]
+    idx = idx[np.lexsort((idx, -scores[idx]))]
+    return [(int(i), float(scores[i])) for i in idx]
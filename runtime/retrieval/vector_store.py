@@ -11,6 +11,8 @@ from datetime import datetime
 from pydantic import BaseModel, Field
 from dataclasses import dataclass, asdict
 
+from runtime.platform.metrics import MetricsRegistry
+
 try:
     import faiss
     FAISS_AVAILABLE = True
@@ -18,6 +20,13 @@ except ImportError:
     FAISS_AVAILABLE = False
     faiss = None
 
+SEARCH_SECONDS = MetricsRegistry.get_default().histogram(
+    "retrieval_search_duration_seconds",
+    "VectorStore.search latency",
+    ("backend",),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
 
 class Document(BaseModel):
     """A document chunk for retrieval"""
@@ -236,11 +245,13 @@ class VectorStore:
             List of retrieval results
         """
         import time
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         if not FAISS_AVAILABLE or self.index is None or len(self.documents) == 0:
             # Fallback: simple text matching
-            return self._fallback_search(query, top_k, filter_metadata)
+            results = self._fallback_search(query, top_k, filter_metadata)
+            SEARCH_SECONDS.labels("fallback").observe(time.perf_counter() - start_time)
+            return results
         
         # Generate query embedding
         query_embedding = self.embed_text(query).reshape(1, -1)
@@ -288,6 +299,7 @@ class VectorStore:
             if len(results) >= top_k:
                 break
         
+        SEARCH_SECONDS.labels("faiss").observe(time.perf_counter() - start_time)
         return results
     
     def _fallback_search(
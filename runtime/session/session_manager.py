@@ -1,14 +1,20 @@
 """
 Session Manager: Long-term session management across runs and days.
 Supports session-level memory, policy, and statistics.
+Sessions are loaded lazily through a bounded LRU cache backed by a
+file or SQLite session store (see session_store).
 """
 import os
-import json
 import hashlib
-from typing import Dict, Any, List, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass, asdict, field
 
+from runtime.session.session_store import FileSessionStore, SQLiteSessionStore, SessionStore
+
 
 @dataclass
 class SessionStats:
@@ -148,17 +154,46 @@ class SessionManager:
     - session_id ≠ run_id
     - Session-level memory, policy, stats
     - Automatic expiration and cleanup
+    - Sessions loaded on demand into a bounded LRU cache with idle TTL;
+      per-user listing and expiry sweeps use the store's compact index
+    - Run appends persisted incrementally
+    - File (default) or SQLite backend
     """
     
     DEFAULT_SESSION_TTL_HOURS = 24 * 7  # 1 week
+    DEFAULT_CACHE_SIZE = 1024
+    DEFAULT_CACHE_TTL_S = 900.0
     
-    def __init__(self, artifacts_dir: str = "artifacts"):
+    def __init__(
+        self,
+        artifacts_dir: str = "artifacts",
+        backend: str = "file",
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        cache_ttl_s: float = DEFAULT_CACHE_TTL_S
+    ):
+        """
+        Args:
+            artifacts_dir: Root artifacts directory (sessions under session/)
+            backend: "file" (JSON snapshots + run logs) or "sqlite"
+            cache_size: Sessions kept in memory
+            cache_ttl_s: Idle time after which a cached session is reloaded
+        """
         self.artifacts_dir = artifacts_dir
         self.sessions_dir = os.path.join(artifacts_dir, "session")
         os.makedirs(self.sessions_dir, exist_ok=True)
+        self.cache_size = cache_size
+        self.cache_ttl_s = cache_ttl_s
+        
+        if backend == "sqlite":
+            self._store: SessionStore = SQLiteSessionStore(os.path.join(self.sessions_dir, "sessions.db"))
+        elif backend == "file":
+            self._store = FileSessionStore(self.sessions_dir)
+        else:
+            raise ValueError(f"Unknown session backend: {backend}")
         
-        self._sessions: Dict[str, Session] = {}
-        self._load_sessions()
+        # session_id -> (session, last access monotonic time), LRU order
+        self._sessions: "OrderedDict[str, Tuple[Session, float]]" = OrderedDict()
+        self._lock = threading.RLock()
     
     def create_session(
         self,
@@ -192,15 +227,24 @@ class SessionManager:
             metadata=metadata or {}
         )
         
-        self._sessions[session_id] = session
+        self._cache_put(session)
         self._save_session(session)
         
         return session
     
     def get_session(self, session_id: str) -> Optional[Session]:
         """Get session by ID."""
-        session = self._sessions.get(session_id)
-        if session and session.is_expired():
+        session = self._cache_get(session_id)
+        if session is None:
+            data = self._store.load(session_id)
+            if data is None:
+                return None
+            try:
+                session = self._dict_to_session(data)
+            except (KeyError, TypeError):
+                return None
+            self._cache_put(session)
+        if session.is_expired():
             self._cleanup_session(session_id)
             return None
         return session
@@ -217,9 +261,10 @@ class SessionManager:
                 return session
         
         # Find active session for user
-        for s in self._sessions.values():
-            if s.user_id == user_id and not s.is_expired():
-                return s
+        for sid in self._store.user_sessions(user_id, datetime.now().isoformat()):
+            session = self.get_session(sid)
+            if session:
+                return session
         
         return self.create_session(user_id)
     
@@ -244,8 +289,17 @@ class SessionManager:
         if not session:
             return False
         
-        session.add_run(run_id, run_result)
-        self._save_session(session)
+        with self._lock:
+            session.add_run(run_id, run_result)
+            # Incremental append; the store asks for a full save to fold its log
+            record = {
+                "session_id": session.session_id,
+                "run_ids": session.run_ids,
+                "stats": session.stats.to_dict(),
+                "last_active_at": session.last_active_at
+            }
+            if self._store.append_run(record, run_id):
+                self._save_session(session)
         return True
     
     def update_session_memory(
@@ -295,60 +349,61 @@ class SessionManager:
     
     def list_user_sessions(self, user_id: str) -> List[Session]:
         """List all sessions for a user."""
-        return [
-            s for s in self._sessions.values()
-            if s.user_id == user_id and not s.is_expired()
-        ]
+        sessions = []
+        for sid in self._store.user_sessions(user_id, datetime.now().isoformat()):
+            session = self.get_session(sid)
+            if session:
+                sessions.append(session)
+        return sessions
     
     def cleanup_expired_sessions(self) -> int:
-        """Cleanup expired sessions."""
-        expired = [
-            sid for sid, s in self._sessions.items()
-            if s.is_expired()
-        ]
+        """Cleanup expired sessions (index only; session bodies are not loaded)."""
+        expired = self._store.expired_sessions(datetime.now().isoformat())
         for sid in expired:
             self._cleanup_session(sid)
         return len(expired)
     
+    def close(self) -> None:
+        """Release the backing store."""
+        self._store.close()
+    
     def _generate_session_id(self, user_id: str) -> str:
         """Generate unique session ID."""
         content = f"{user_id}:{datetime.now().isoformat()}"
         return f"sess_{hashlib.sha256(content.encode()).hexdigest()[:16]}"
     
     def _save_session(self, session: Session) -> None:
-        """Save session to artifact."""
-        path = os.path.join(self.sessions_dir, f"{session.session_id}.json")
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(session.to_dict(), f, indent=2, ensure_ascii=False)
-    
-    def _load_sessions(self) -> None:
-        """Load all sessions from artifacts."""
-        if not os.path.exists(self.sessions_dir):
-            return
-        
-        for filename in os.listdir(self.sessions_dir):
-            if filename.endswith(".json"):
-                path = os.path.join(self.sessions_dir, filename)
-                try:
-                    with open(path, "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                    session = self._dict_to_session(data)
-                    if not session.is_expired():
-                        self._sessions[session.session_id] = session
-                except (json.JSONDecodeError, IOError, KeyError):
-                    pass
+        """Save the full session to the store."""
+        with self._lock:
+            self._store.save(session.to_dict())
+    
+    def _cache_get(self, session_id: str) -> Optional[Session]:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            session, last_access = entry
+            now = time.monotonic()
+            if now - last_access > self.cache_ttl_s:
+                # Idle too long: reload so other processes' writes are seen
+                del self._sessions[session_id]
+                return None
+            self._sessions[session_id] = (session, now)
+            self._sessions.move_to_end(session_id)
+            return session
+    
+    def _cache_put(self, session: Session) -> None:
+        with self._lock:
+            self._sessions[session.session_id] = (session, time.monotonic())
+            self._sessions.move_to_end(session.session_id)
+            while len(self._sessions) > self.cache_size:
+                self._sessions.popitem(last=False)
     
     def _cleanup_session(self, session_id: str) -> None:
-        """Remove expired session."""
-        if session_id in self._sessions:
-            del self._sessions[session_id]
-        
-        path = os.path.join(self.sessions_dir, f"{session_id}.json")
-        if os.path.exists(path):
-            # Move to archive instead of delete
-            archive_dir = os.path.join(self.sessions_dir, "archived")
-            os.makedirs(archive_dir, exist_ok=True)
-            os.rename(path, os.path.join(archive_dir, f"{session_id}.json"))
+        """Remove expired session (archived, not deleted)."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._store.archive(session_id)
     
     def _dict_to_session(self, data: Dict[str, Any]) -> Session:
         """Convert dict to Session."""
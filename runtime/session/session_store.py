@@ -0,0 +1,405 @@
+"""
+Session Store: persistence backends for SessionManager.
+
+1. Sessions are loaded one at a time on demand; nothing is read at startup
+2. A compact index (session_id -> user_id, expires_at) answers per-user
+   listings and expiry sweeps without touching session bodies
+3. Run appends are persisted incrementally (one small record per run)
+   instead of rewriting the whole session
+4. Backends:
+   - FileSessionStore: {session_id}.json snapshots (legacy format) plus
+     {session_id}.runs.jsonl run logs and an append-only index.jsonl;
+     run logs are folded into the snapshot once they grow long
+   - SQLiteSessionStore: one WAL database with indexed user / expiry
+     columns and a session_runs table
+
+Stores exchange plain session dicts (Session.to_dict() format).
+"""
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class SessionStore:
+    """Backend interface used by SessionManager"""
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Full session dict, or None if unknown / archived"""
+        raise NotImplementedError
+
+    def save(self, data: Dict[str, Any]) -> None:
+        """Persist the whole session (creates it if new)"""
+        raise NotImplementedError
+
+    def append_run(self, data: Dict[str, Any], run_id: str) -> bool:
+        """
+        Persist the latest run of a session (already added in memory) and
+        its updated stats; `data` holds session_id, run_ids, stats and
+        last_active_at.
+
+        Returns True when the caller should save() the full session to
+        fold accumulated run records.
+        """
+        raise NotImplementedError
+
+    def user_sessions(self, user_id: str, now: str) -> List[str]:
+        """Unexpired session ids of a user, oldest first"""
+        raise NotImplementedError
+
+    def expired_sessions(self, now: str) -> List[str]:
+        """Ids of sessions whose expires_at is before `now`"""
+        raise NotImplementedError
+
+    def archive(self, session_id: str) -> None:
+        """Move a session out of the live set"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class FileSessionStore(SessionStore):
+    """
+    JSON files under sessions_dir.
+
+    The index is an append-only log of put/del records; it is read lazily on
+    the first index query, followed incrementally as other processes append,
+    and rewritten when mostly garbage. A directory written before the index
+    existed is indexed once by scanning the snapshots.
+    """
+
+    INDEX_FILE = "index.jsonl"
+    # Runs logged before the session snapshot is rewritten
+    RUN_LOG_COMPACT_LINES = 256
+
+    def __init__(self, sessions_dir: str):
+        self.sessions_dir = sessions_dir
+        os.makedirs(sessions_dir, exist_ok=True)
+        self.index_path = os.path.join(sessions_dir, self.INDEX_FILE)
+
+        self._lock = threading.RLock()
+        # session_id -> (user_id, expires_at); None until first needed
+        self._index: Optional[Dict[str, Tuple[str, Optional[str]]]] = None
+        self._index_offset = 0
+        self._index_inode: Optional[int] = None
+        self._index_records = 0
+        # session_id -> lines in its run log
+        self._run_log_lines: Dict[str, int] = {}
+        # session_id -> (user_id, expires_at) as last loaded / saved here
+        self._known: Dict[str, Tuple[str, Optional[str]]] = {}
+
+    # -- session bodies ----------------------------------------------------
+
+    def _snapshot_path(self, session_id: str) -> str:
+        return os.path.join(self.sessions_dir, f"{session_id}.json")
+
+    def _run_log_path(self, session_id: str) -> str:
+        return os.path.join(self.sessions_dir, f"{session_id}.runs.jsonl")
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._snapshot_path(session_id), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError, IOError):
+            return None
+
+        lines = 0
+        run_ids = data.setdefault("run_ids", [])
+        try:
+            with open(self._run_log_path(session_id), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn final line
+                    lines += 1
+                    # Records already folded into the snapshot are skipped
+                    if record["n"] <= len(run_ids):
+                        continue
+                    run_ids.append(record["run_id"])
+                    data["stats"] = record["stats"]
+                    data["last_active_at"] = record["last_active_at"]
+        except FileNotFoundError:
+            pass
+
+        with self._lock:
+            self._run_log_lines[session_id] = lines
+            self._known[session_id] = (data.get("user_id"), data.get("expires_at"))
+        return data
+
+    def save(self, data: Dict[str, Any]) -> None:
+        session_id = data["session_id"]
+        path = self._snapshot_path(session_id)
+        entry = (data["user_id"], data.get("expires_at"))
+        # The index only changes for new sessions or a new owner / expiry
+        index_changed = self._known.get(session_id) != entry or not os.path.exists(path)
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        # The snapshot now contains every logged run
+        with self._lock:
+            if self._run_log_lines.pop(session_id, 0) or os.path.exists(self._run_log_path(session_id)):
+                try:
+                    os.remove(self._run_log_path(session_id))
+                except FileNotFoundError:
+                    pass
+            self._known[session_id] = entry
+            if index_changed:
+                self._append_index({
+                    "op": "put",
+                    "session_id": session_id,
+                    "user_id": data["user_id"],
+                    "expires_at": data.get("expires_at")
+                })
+
+    def append_run(self, data: Dict[str, Any], run_id: str) -> bool:
+        session_id = data["session_id"]
+        record = {
+            "n": len(data["run_ids"]),
+            "run_id": run_id,
+            "stats": data["stats"],
+            "last_active_at": data["last_active_at"]
+        }
+        with self._lock:
+            with open(self._run_log_path(session_id), "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            lines = self._run_log_lines.get(session_id, 0) + 1
+            self._run_log_lines[session_id] = lines
+        return lines >= self.RUN_LOG_COMPACT_LINES
+
+    def archive(self, session_id: str) -> None:
+        archive_dir = os.path.join(self.sessions_dir, "archived")
+        os.makedirs(archive_dir, exist_ok=True)
+        with self._lock:
+            for path in (self._snapshot_path(session_id), self._run_log_path(session_id)):
+                if os.path.exists(path):
+                    # Move to archive instead of delete
+                    os.replace(path, os.path.join(archive_dir, os.path.basename(path)))
+            self._run_log_lines.pop(session_id, None)
+            self._known.pop(session_id, None)
+            self._append_index({"op": "del", "session_id": session_id})
+
+    # -- index ---------------------------------------------------------------
+
+    def user_sessions(self, user_id: str, now: str) -> List[str]:
+        with self._lock:
+            index = self._refresh_index()
+            return [
+                sid for sid, (uid, expires_at) in index.items()
+                if uid == user_id and not (expires_at and now > expires_at)
+            ]
+
+    def expired_sessions(self, now: str) -> List[str]:
+        with self._lock:
+            index = self._refresh_index()
+            return [
+                sid for sid, (_, expires_at) in index.items()
+                if expires_at and now > expires_at
+            ]
+
+    def _append_index(self, record: Dict[str, Any]) -> None:
+        if self._index is None and not os.path.exists(self.index_path):
+            # Build the index from legacy snapshots before the first append
+            self._refresh_index()
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _refresh_index(self) -> Dict[str, Tuple[str, Optional[str]]]:
+        """Apply index records appended since the last read (by any process)"""
+        if not os.path.exists(self.index_path):
+            self._index = self._scan_snapshots()
+            self._write_index(self._index)
+            return self._index
+
+        stat = os.stat(self.index_path)
+        if self._index is None or stat.st_ino != self._index_inode or stat.st_size < self._index_offset:
+            # First read, or the file was compacted by someone else
+            self._index = {}
+            self._index_offset = 0
+            self._index_records = 0
+            self._index_inode = stat.st_ino
+
+        if stat.st_size > self._index_offset:
+            with open(self.index_path, "rb") as f:
+                f.seek(self._index_offset)
+                chunk = f.read()
+            # Only consume complete lines
+            end = chunk.rfind(b"\n") + 1
+            for line in chunk[:end].splitlines():
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self._index_records += 1
+                if record.get("op") == "del":
+                    self._index.pop(record["session_id"], None)
+                else:
+                    self._index[record["session_id"]] = (record["user_id"], record.get("expires_at"))
+            self._index_offset += end
+
+        if self._index_records > 2 * len(self._index) + 1024:
+            self._write_index(self._index)
+        return self._index
+
+    def _scan_snapshots(self) -> Dict[str, Tuple[str, Optional[str]]]:
+        index: Dict[str, Tuple[str, Optional[str]]] = {}
+        for filename in sorted(os.listdir(self.sessions_dir)):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.sessions_dir, filename), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                index[data["session_id"]] = (data["user_id"], data.get("expires_at"))
+            except (json.JSONDecodeError, IOError, KeyError):
+                pass
+        return index
+
+    def _write_index(self, index: Dict[str, Tuple[str, Optional[str]]]) -> None:
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for sid, (user_id, expires_at) in index.items():
+                f.write(json.dumps({
+                    "op": "put", "session_id": sid, "user_id": user_id, "expires_at": expires_at
+                }, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.index_path)
+        stat = os.stat(self.index_path)
+        self._index_inode = stat.st_ino
+        self._index_offset = stat.st_size
+        self._index_records = len(index)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Sessions in a single SQLite database (WAL).
+
+    Opening the store is constant-time regardless of history; run appends
+    are one INSERT plus a stats UPDATE in a single transaction.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, timeout=30.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                last_active_at TEXT NOT NULL,
+                expires_at TEXT,
+                stats TEXT NOT NULL,
+                body TEXT NOT NULL,
+                archived INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions (user_id, archived);
+            CREATE INDEX IF NOT EXISTS idx_sessions_expiry ON sessions (archived, expires_at);
+            CREATE TABLE IF NOT EXISTS session_runs (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                run_id TEXT NOT NULL,
+                PRIMARY KEY (session_id, seq)
+            );
+        """)
+        self._conn.commit()
+
+    # Columns kept outside the JSON body
+    _COLUMNS = ("session_id", "user_id", "created_at", "last_active_at", "expires_at", "stats", "run_ids")
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT session_id, user_id, created_at, last_active_at, expires_at, stats, body "
+                "FROM sessions WHERE session_id = ? AND archived = 0",
+                (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            run_ids = [r[0] for r in self._conn.execute(
+                "SELECT run_id FROM session_runs WHERE session_id = ? ORDER BY seq", (session_id,)
+            )]
+
+        data = json.loads(row[6])
+        data.update({
+            "session_id": row[0],
+            "user_id": row[1],
+            "created_at": row[2],
+            "last_active_at": row[3],
+            "expires_at": row[4],
+            "stats": json.loads(row[5]),
+            "run_ids": run_ids
+        })
+        return data
+
+    def save(self, data: Dict[str, Any]) -> None:
+        body = {k: v for k, v in data.items() if k not in self._COLUMNS}
+        session_id = data["session_id"]
+        run_ids = data.get("run_ids", [])
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO sessions (session_id, user_id, created_at, last_active_at, "
+                "expires_at, stats, body) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (session_id) DO UPDATE SET user_id = excluded.user_id, "
+                "last_active_at = excluded.last_active_at, expires_at = excluded.expires_at, "
+                "stats = excluded.stats, body = excluded.body, archived = 0",
+                (session_id, data["user_id"], data["created_at"], data["last_active_at"],
+                 data.get("expires_at"), json.dumps(data.get("stats", {})),
+                 json.dumps(body, ensure_ascii=False))
+            )
+            # Only runs missing from the table are written
+            stored = self._conn.execute(
+                "SELECT COUNT(*) FROM session_runs WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO session_runs (session_id, seq, run_id) VALUES (?, ?, ?)",
+                [(session_id, seq, run_ids[seq]) for seq in range(stored, len(run_ids))]
+            )
+
+    def append_run(self, data: Dict[str, Any], run_id: str) -> bool:
+        session_id = data["session_id"]
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO session_runs (session_id, seq, run_id) VALUES (?, ?, ?)",
+                (session_id, len(data["run_ids"]) - 1, run_id)
+            )
+            self._conn.execute(
+                "UPDATE sessions SET stats = ?, last_active_at = ? WHERE session_id = ?",
+                (json.dumps(data["stats"]), data["last_active_at"], session_id)
+            )
+        return False
+
+    def user_sessions(self, user_id: str, now: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id FROM sessions WHERE user_id = ? AND archived = 0 "
+                "AND (expires_at IS NULL OR expires_at >= ?) ORDER BY created_at",
+                (user_id, now)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def expired_sessions(self, now: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id FROM sessions WHERE archived = 0 AND expires_at < ?", (now,)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def archive(self, session_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE sessions SET archived = 1 WHERE session_id = ?", (session_id,)
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
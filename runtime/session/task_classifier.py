@@ -1,15 +1,25 @@
 """
 Task Type Classifier: Explicit task type classification for routing.
 Outputs task_type.json artifacts for replay and policy selection.
+
+Type patterns and complexity indicators share one keyword automaton scanned
+once per query; repeated queries hit a bounded LRU memo, and artifacts are
+written behind in background batches.
 """
 import os
 import json
 import hashlib
-from typing import Dict, Any, List, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 from dataclasses import dataclass, asdict, field
 from enum import Enum
 
+from learning.write_behind import WriteBehindBuffer
+from runtime.ingress.keyword_matcher import KeywordMatcher
+
 
 class TaskType(str, Enum):
     """Supported task types."""
@@ -96,6 +106,9 @@ class TaskClassifier:
     - Used by planner, agent, and tool policy selection
     """
     
+    # Memoized classifications keyed by query and context flags
+    MEMO_SIZE = 4096
+    
     # Task type patterns
     TYPE_PATTERNS = {
         TaskType.RAG_QA: [
@@ -156,10 +169,37 @@ class TaskClassifier:
         }
     }
     
-    def __init__(self, artifacts_dir: str = "artifacts"):
+    def __init__(self, artifacts_dir: str = "artifacts", artifact_flush_interval_s: float = 0.5):
         self.artifacts_dir = artifacts_dir
         self.task_type_dir = os.path.join(artifacts_dir, "task_type")
         os.makedirs(self.task_type_dir, exist_ok=True)
+        
+        self.artifact_flush_interval_s = artifact_flush_interval_s
+        self._matcher = self._keyword_matcher()
+        # memo key -> TaskClassification fields except run_id / classified_at
+        self._memo: "OrderedDict[Tuple[Any, ...], Dict[str, Any]]" = OrderedDict()
+        self._memo_lock = threading.Lock()
+        
+        # Artifacts are written by the background flusher thread in batches
+        self._artifacts = WriteBehindBuffer(
+            flush_interval_s=artifact_flush_interval_s,
+            inline_flush=False
+        )
+        self._last_saved_at = float("-inf")
+    
+    @classmethod
+    def _keyword_matcher(cls) -> KeywordMatcher:
+        """Keyword automaton over type patterns and complexity indicators (per class)."""
+        matcher = cls.__dict__.get("_compiled_matcher")
+        if matcher is None:
+            groups: Dict[Any, List[str]] = {
+                ("type", task_type): patterns for task_type, patterns in cls.TYPE_PATTERNS.items()
+            }
+            for complexity, spec in cls.COMPLEXITY_INDICATORS.items():
+                groups[("complexity", complexity)] = spec["indicators"]
+            matcher = KeywordMatcher(groups)
+            cls._compiled_matcher = matcher
+        return matcher
     
     def classify(
         self,
@@ -179,16 +219,55 @@ class TaskClassifier:
             TaskClassification
         """
         context = context or {}
+        
+        # Everything but run_id depends only on these inputs
+        key = (query, bool(context), context.get("session_id") is not None)
+        with self._memo_lock:
+            fields = self._memo.get(key)
+            if fields is not None:
+                self._memo.move_to_end(key)
+        
+        if fields is None:
+            fields = self._classify_fields(query, context)
+            with self._memo_lock:
+                self._memo[key] = fields
+                if len(self._memo) > self.MEMO_SIZE:
+                    self._memo.popitem(last=False)
+        
+        classification = TaskClassification(
+            run_id=run_id,
+            task_type=fields["task_type"],
+            task_complexity=fields["task_complexity"],
+            confidence=fields["confidence"],
+            features=dict(fields["features"]),
+            recommended_plan=fields["recommended_plan"],
+            recommended_agents=list(fields["recommended_agents"]),
+            recommended_tools=list(fields["recommended_tools"]),
+            estimated_cost_range=fields["estimated_cost_range"],
+            estimated_latency_ms=fields["estimated_latency_ms"],
+            requires_retrieval=fields["requires_retrieval"],
+            requires_generation=fields["requires_generation"]
+        )
+        
+        # Save artifact
+        self._save_classification(classification)
+        
+        return classification
+    
+    def _classify_fields(self, query: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Classify a query (the memoized part of classify)."""
         query_lower = query.lower()
+        # One pass over the query scores every keyword rule
+        keyword_counts = self._matcher.counts(query_lower)
         
         # Extract features
         features = self._extract_features(query, context)
         
         # Classify type
-        task_type, type_confidence = self._classify_type(query_lower, features)
+        task_type, type_confidence = self._classify_type(query_lower, features, keyword_counts)
         
         # Classify complexity
-        complexity = self._classify_complexity(query, features)
+        complexity = self._classify_complexity(query, features, keyword_counts)
         
         # Generate recommendations
         recommended_plan = self._recommend_plan(task_type, complexity)
@@ -199,33 +278,37 @@ class TaskClassifier:
         cost_range = self._estimate_cost(task_type, complexity)
         latency = self._estimate_latency(task_type, complexity)
         
-        classification = TaskClassification(
-            run_id=run_id,
-            task_type=task_type,
-            task_complexity=complexity,
-            confidence=type_confidence,
-            features=features,
-            recommended_plan=recommended_plan,
-            recommended_agents=recommended_agents,
-            recommended_tools=recommended_tools,
-            estimated_cost_range=cost_range,
-            estimated_latency_ms=latency,
-            requires_retrieval=task_type in [
+        return {
+            "task_type": task_type,
+            "task_complexity": complexity,
+            "confidence": type_confidence,
+            "features": features,
+            "recommended_plan": recommended_plan,
+            "recommended_agents": recommended_agents,
+            "recommended_tools": recommended_tools,
+            "estimated_cost_range": cost_range,
+            "estimated_latency_ms": latency,
+            "requires_retrieval": task_type in [
                 TaskType.RAG_QA, TaskType.RAG_SUMMARY, TaskType.EXPLORE
             ],
-            requires_generation=task_type in [
+            "requires_generation": task_type in [
                 TaskType.RAG_QA, TaskType.RAG_SUMMARY, TaskType.GENERATE,
                 TaskType.ANALYZE, TaskType.DECIDE
             ]
-        )
-        
-        # Save artifact
-        self._save_classification(classification)
-        
-        return classification
+        }
+    
+    def flush(self) -> None:
+        """Write all pending classification artifacts."""
+        self._artifacts.flush()
+    
+    def close(self) -> None:
+        """Flush pending artifacts and stop background tracking."""
+        self._artifacts.close()
     
     def load_classification(self, run_id: str) -> Optional[TaskClassification]:
         """Load classification from artifact."""
+        if self._artifacts.dirty:
+            self._artifacts.flush()
         path = os.path.join(self.task_type_dir, f"{run_id}.json")
         if not os.path.exists(path):
             return None
@@ -273,15 +356,16 @@ class TaskClassifier:
     def _classify_type(
         self,
         query_lower: str,
-        features: Dict[str, Any]
+        features: Dict[str, Any],
+        keyword_counts: Optional[Dict[Any, int]] = None
     ) -> tuple:
         """Classify task type."""
+        if keyword_counts is None:
+            keyword_counts = self._matcher.counts(query_lower)
         scores: Dict[TaskType, float] = {t: 0.0 for t in TaskType}
         
-        for task_type, patterns in self.TYPE_PATTERNS.items():
-            for pattern in patterns:
-                if pattern in query_lower:
-                    scores[task_type] += 1.0
+        for task_type in self.TYPE_PATTERNS:
+            scores[task_type] += float(keyword_counts[("type", task_type)])
         
         # Boost based on features
         if features.get("has_question_mark"):
@@ -307,11 +391,13 @@ class TaskClassifier:
     def _classify_complexity(
         self,
         query: str,
-        features: Dict[str, Any]
+        features: Dict[str, Any],
+        keyword_counts: Optional[Dict[Any, int]] = None
     ) -> TaskComplexity:
         """Classify task complexity."""
         word_count = features.get("word_count", 0)
-        query_lower = query.lower()
+        if keyword_counts is None:
+            keyword_counts = self._matcher.counts(query.lower())
         
         for complexity in [TaskComplexity.SIMPLE, TaskComplexity.MODERATE, TaskComplexity.COMPLEX]:
             indicators = self.COMPLEXITY_INDICATORS[complexity]
@@ -319,9 +405,8 @@ class TaskClassifier:
             # Check word count
             if word_count <= indicators["max_words"]:
                 # Check for indicators
-                for indicator in indicators["indicators"]:
-                    if indicator in query_lower:
-                        return complexity
+                if keyword_counts[("complexity", complexity)]:
+                    return complexity
                 
                 # Default based on word count
                 if complexity == TaskComplexity.SIMPLE and word_count <= 10:
@@ -418,8 +503,14 @@ class TaskClassifier:
         return base
     
     def _save_classification(self, classification: TaskClassification) -> None:
-        """Save classification to artifact."""
+        """Queue the classification artifact for a batched background write."""
         path = os.path.join(self.task_type_dir, f"{classification.run_id}.json")
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(classification.to_dict(), f, indent=2, ensure_ascii=False)
+        now = time.monotonic()
+        idle = now - self._last_saved_at >= self.artifact_flush_interval_s
+        self._last_saved_at = now
+        self._artifacts.mark_dirty(path, classification.to_dict)
+        if idle:
+            # A lone classification is replayable right away; bursts are
+            # left to the flusher thread
+            self._artifacts.flush()
 
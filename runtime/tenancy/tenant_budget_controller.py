@@ -1,10 +1,29 @@
 """
 TenantBudgetController: 租户级预算控制器
 支持租户级成本跟踪、预算执行、多任务并发成本控制
+
+账本存储 (budget ledger):
+1. 多进程共享的 SQLite WAL 账本 ({artifacts_dir}/budget_ledger.db)，
+   多个 uvicorn worker 看到同一份花费与并发计数
+2. 预留 / 提交 / 释放: 任务开始时在一个 BEGIN IMMEDIATE 事务内原子地检查并预留
+   预估成本与并发槽位；任务结束时提交实际成本并释放槽位
+3. 预留额度内的成本增量先在进程内累积，按 flush_interval_s 批量写入账本；
+   超出预留的增量立即写穿，因此预算执行保持正确且不需要每次 LLM 调用都写盘
+4. 读取走进程内缓存，只有 PRAGMA data_version 表明有提交时才重新加载
+5. 周期性压缩: 回收崩溃进程遗留的预留（其未消耗的预留额度按已花费计入，
+   覆盖该进程未写入账本的缓冲增量）、校准计数器、裁剪已完成任务、
+   WAL checkpoint，并导出兼容旧格式的 budget_usage.json 快照
 """
+import atexit
 import os
 import json
-from typing import Dict, Any, Optional, List
+import socket
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Optional, List, Set, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass, asdict
 from enum import Enum
@@ -34,28 +53,114 @@ class TenantBudgetUsage:
     cost_by_category: Dict[str, float]  # llm/retrieval/storage/etc
     top_cost_tasks: List[Dict[str, Any]]
     updated_at: str
+    reserved_cost: float = 0.0  # 运行中任务尚未消耗的预留额度
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tenant_budgets (
+    tenant_id TEXT PRIMARY KEY,
+    period TEXT NOT NULL,
+    period_start TEXT NOT NULL,
+    period_end TEXT NOT NULL,
+    budget_limit REAL NOT NULL,
+    max_concurrent_runs INTEGER NOT NULL,
+    current_usage REAL NOT NULL DEFAULT 0,
+    reserved_cost REAL NOT NULL DEFAULT 0,
+    concurrent_runs INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tenant_cost_categories (
+    tenant_id TEXT NOT NULL,
+    category TEXT NOT NULL,
+    cost REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (tenant_id, category)
+);
+CREATE TABLE IF NOT EXISTS budget_reservations (
+    tenant_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    run_id TEXT,
+    started_at TEXT NOT NULL,
+    started_ts REAL NOT NULL,
+    estimated_cost REAL NOT NULL,
+    actual_cost REAL NOT NULL DEFAULT 0,
+    host TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    PRIMARY KEY (tenant_id, task_id)
+);
+CREATE TABLE IF NOT EXISTS completed_tasks (
+    tenant_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    run_id TEXT,
+    cost REAL NOT NULL,
+    completed_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_completed_tasks_cost
+    ON completed_tasks (tenant_id, cost DESC);
+"""
 
 
 class TenantBudgetController:
     """
     租户预算控制器
-    
+
     Features:
     - 租户级成本跟踪
     - 并发任务成本累计
     - 预算超限自动阻断
     - 成本预测与告警
     - 租户级成本报表
+    - 跨进程原子预留 (SQLite WAL 账本)
     """
-    
-    def __init__(self, artifacts_dir: str = "artifacts/tenants"):
+
+    TOP_COST_TASKS = 100
+
+    def __init__(
+        self,
+        artifacts_dir: str = "artifacts/tenants",
+        ledger_path: Optional[str] = None,
+        flush_interval_s: float = 0.5,
+        compaction_interval_s: float = 300.0,
+        reservation_ttl_s: float = 86400.0
+    ):
+        """
+        Args:
+            artifacts_dir: 租户配置与报表目录
+            ledger_path: 账本数据库路径，默认 {artifacts_dir}/budget_ledger.db
+            flush_interval_s: 预留额度内成本增量的最长缓冲时间
+            compaction_interval_s: 压缩周期
+            reservation_ttl_s: 超过该时长仍未结束的预留视为失效并回收
+        """
         self.artifacts_dir = artifacts_dir
         os.makedirs(artifacts_dir, exist_ok=True)
-        
-        # In-memory cache for fast access
+        self.ledger_path = ledger_path or os.path.join(artifacts_dir, "budget_ledger.db")
+        self.flush_interval_s = flush_interval_s
+        self.compaction_interval_s = compaction_interval_s
+        self.reservation_ttl_s = reservation_ttl_s
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(
+            self.ledger_path, timeout=30.0, isolation_level=None, check_same_thread=False
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+        # Read cache, invalidated by local commits and PRAGMA data_version
         self._usage_cache: Dict[str, TenantBudgetUsage] = {}
-        self._running_tasks: Dict[str, Dict[str, Any]] = {}  # task_id -> task_info
-    
+        self._data_version: Optional[int] = None
+
+        # (tenant_id, task_id) -> [cost, {category: cost}] not yet in the ledger
+        self._pending: Dict[Tuple[str, str], List[Any]] = {}
+        # (tenant_id, task_id) -> reservation headroom held by this process
+        self._headroom: Dict[Tuple[str, str], float] = {}
+        self._touched: Set[str] = set()
+        self._last_flush = time.monotonic()
+        self._last_compaction = time.monotonic()
+        self._host = socket.gethostname()
+
+        _controllers.add(self)
+
     def register_task_start(
         self,
         tenant_id: str,
@@ -64,8 +169,8 @@ class TenantBudgetController:
         estimated_cost: float = 0.0
     ) -> Dict[str, Any]:
         """
-        注册任务开始，检查预算
-        
+        注册任务开始，检查预算并原子地预留预估成本与并发槽位
+
         Returns:
             {
                 "allowed": bool,
@@ -74,50 +179,66 @@ class TenantBudgetController:
                 "budget_remaining": float
             }
         """
-        # Load or initialize usage
-        usage = self._get_usage(tenant_id)
-        
-        # Check budget
-        projected_usage = usage.current_usage + estimated_cost
-        would_exceed = projected_usage > usage.budget_limit
-        
-        # Check concurrent runs
-        concurrent_exceeded = usage.concurrent_runs >= usage.max_concurrent_runs
-        
+        key = (tenant_id, task_id)
+        estimated_cost = max(0.0, estimated_cost)
+
+        with self._transaction(tenant_id) as conn:
+            row = self._ensure_tenant(conn, tenant_id)
+            existing = conn.execute(
+                "SELECT 1 FROM budget_reservations WHERE tenant_id = ? AND task_id = ?", key
+            ).fetchone()
+
+            current_usage = row["current_usage"]
+            reserved = row["reserved_cost"]
+            concurrent_runs = row["concurrent_runs"]
+            budget_limit = row["budget_limit"]
+            max_concurrent = row["max_concurrent_runs"]
+
+            # A repeated start for a live reservation is idempotent
+            would_exceed = (
+                existing is None and current_usage + reserved + estimated_cost > budget_limit
+            )
+            concurrent_exceeded = existing is None and concurrent_runs >= max_concurrent
+
+            if not (would_exceed or concurrent_exceeded) and existing is None:
+                now = datetime.now()
+                conn.execute(
+                    "INSERT INTO budget_reservations "
+                    "(tenant_id, task_id, run_id, started_at, started_ts, estimated_cost, host, pid) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (tenant_id, task_id, run_id, now.isoformat(), time.time(),
+                     estimated_cost, self._host, os.getpid())
+                )
+                conn.execute(
+                    "UPDATE tenant_budgets SET reserved_cost = reserved_cost + ?, "
+                    "concurrent_runs = concurrent_runs + 1, updated_at = ? WHERE tenant_id = ?",
+                    (estimated_cost, now.isoformat(), tenant_id)
+                )
+                reserved += estimated_cost
+                concurrent_runs += 1
+                self._headroom[key] = estimated_cost
+
+        usage_rate = current_usage / budget_limit if budget_limit > 0 else 0.0
+        result = {
+            "budget_status": self._calculate_status(usage_rate).value,
+            "budget_remaining": max(0, budget_limit - current_usage - reserved),
+            "concurrent_runs": concurrent_runs,
+            "max_concurrent_runs": max_concurrent
+        }
+
         if would_exceed or concurrent_exceeded:
             return {
                 "allowed": False,
                 "reason": (
                     "Budget limit exceeded" if would_exceed
-                    else f"Concurrent runs limit exceeded ({usage.max_concurrent_runs})"
+                    else f"Concurrent runs limit exceeded ({max_concurrent})"
                 ),
-                "budget_status": usage.status.value,
-                "budget_remaining": max(0, usage.budget_limit - usage.current_usage),
-                "concurrent_runs": usage.concurrent_runs,
-                "max_concurrent_runs": usage.max_concurrent_runs
+                **result
             }
-        
-        # Register task
-        self._running_tasks[task_id] = {
-            "tenant_id": tenant_id,
-            "run_id": run_id,
-            "started_at": datetime.now().isoformat(),
-            "estimated_cost": estimated_cost,
-            "actual_cost": 0.0
-        }
-        
-        usage.concurrent_runs += 1
-        self._save_usage(usage)
-        
-        return {
-            "allowed": True,
-            "reason": "Budget check passed",
-            "budget_status": usage.status.value,
-            "budget_remaining": max(0, usage.budget_limit - usage.current_usage),
-            "concurrent_runs": usage.concurrent_runs,
-            "max_concurrent_runs": usage.max_concurrent_runs
-        }
-    
+
+        self._maybe_compact()
+        return {"allowed": True, "reason": "Budget check passed", **result}
+
     def record_task_cost(
         self,
         tenant_id: str,
@@ -125,102 +246,112 @@ class TenantBudgetController:
         cost_delta: float,
         cost_category: str = "other"
     ):
-        """记录任务成本增量"""
-        usage = self._get_usage(tenant_id)
-        
-        # Update total usage
-        usage.current_usage += cost_delta
-        
-        # Update category breakdown
-        if cost_category not in usage.cost_by_category:
-            usage.cost_by_category[cost_category] = 0.0
-        usage.cost_by_category[cost_category] += cost_delta
-        
-        # Update task cost
-        if task_id in self._running_tasks:
-            self._running_tasks[task_id]["actual_cost"] += cost_delta
-        
-        # Recalculate status
-        usage.usage_rate = usage.current_usage / usage.budget_limit if usage.budget_limit > 0 else 0.0
-        usage.status = self._calculate_status(usage.usage_rate)
-        usage.updated_at = datetime.now().isoformat()
-        
-        self._save_usage(usage)
-    
+        """
+        记录任务成本增量
+
+        仍在本进程预留额度内的增量只在内存中累积（其它进程看到的已提交 + 预留总额
+        不变），超出预留或无预留的增量立即写入账本。
+        """
+        key = (tenant_id, task_id)
+        with self._lock:
+            pending = self._pending.setdefault(key, [0.0, {}])
+            pending[0] += cost_delta
+            pending[1][cost_category] = pending[1].get(cost_category, 0.0) + cost_delta
+
+            headroom = self._headroom.get(key)
+            if headroom is None or cost_delta < 0 or pending[0] > headroom:
+                self._flush_pending([key])
+            elif time.monotonic() - self._last_flush >= self.flush_interval_s:
+                self.flush()
+
+        self._maybe_compact()
+
     def register_task_end(
         self,
         tenant_id: str,
         task_id: str,
         final_cost: float
     ):
-        """注册任务结束"""
-        usage = self._get_usage(tenant_id)
-        
-        if task_id in self._running_tasks:
-            task_info = self._running_tasks.pop(task_id)
-            
-            # Update top cost tasks
-            usage.top_cost_tasks.append({
-                "task_id": task_id,
-                "run_id": task_info["run_id"],
-                "cost": final_cost,
-                "completed_at": datetime.now().isoformat()
-            })
-            
-            # Keep only top 100
-            usage.top_cost_tasks = sorted(
-                usage.top_cost_tasks,
-                key=lambda x: x["cost"],
-                reverse=True
-            )[:100]
-        
-        usage.concurrent_runs = max(0, usage.concurrent_runs - 1)
-        usage.updated_at = datetime.now().isoformat()
-        
-        self._save_usage(usage)
-    
+        """注册任务结束：提交未写入的成本并释放预留与并发槽位"""
+        key = (tenant_id, task_id)
+        with self._lock:
+            pending = self._pending.pop(key, None)
+            self._headroom.pop(key, None)
+            try:
+                with self._transaction(tenant_id) as conn:
+                    self._ensure_tenant(conn, tenant_id)
+                    if pending:
+                        self._apply_cost(conn, tenant_id, task_id, pending[0], pending[1])
+                    self._release(conn, tenant_id, task_id, final_cost)
+            except Exception:
+                if pending:
+                    self._pending[key] = pending
+                raise
+
+        self._maybe_compact()
+
     def get_budget_usage(self, tenant_id: str) -> TenantBudgetUsage:
         """获取租户预算使用情况"""
         return self._get_usage(tenant_id)
-    
+
     def get_running_tasks(self, tenant_id: str) -> List[Dict[str, Any]]:
-        """获取租户当前运行中的任务"""
+        """获取租户当前运行中的任务（所有进程）"""
+        self._flush_tenant(tenant_id)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT task_id, run_id, started_at, estimated_cost, actual_cost "
+                "FROM budget_reservations WHERE tenant_id = ? ORDER BY started_ts",
+                (tenant_id,)
+            ).fetchall()
         return [
-            {**info, "task_id": task_id}
-            for task_id, info in self._running_tasks.items()
-            if info["tenant_id"] == tenant_id
+            {
+                "tenant_id": tenant_id,
+                "run_id": row["run_id"],
+                "started_at": row["started_at"],
+                "estimated_cost": row["estimated_cost"],
+                "actual_cost": row["actual_cost"],
+                "task_id": row["task_id"]
+            }
+            for row in rows
         ]
-    
+
     def reset_budget_period(self, tenant_id: str, new_limit: Optional[float] = None):
         """重置预算周期（如新的一天/月）"""
         usage = self._get_usage(tenant_id)
-        
+
         # Archive old usage
         self._archive_usage(usage)
-        
-        # Reset
-        if new_limit is not None:
-            usage.budget_limit = new_limit
-        
-        usage.current_usage = 0.0
-        usage.usage_rate = 0.0
-        usage.status = BudgetStatus.HEALTHY
-        usage.cost_by_category = {}
-        usage.top_cost_tasks = []
-        usage.period_start = datetime.now().isoformat()
-        usage.period_end = (datetime.now() + timedelta(days=1)).isoformat()
-        usage.updated_at = datetime.now().isoformat()
-        
-        self._save_usage(usage)
-    
+
+        # Reset; running reservations keep their slots and remaining headroom
+        now = datetime.now()
+        with self._transaction(tenant_id) as conn:
+            conn.execute(
+                "UPDATE tenant_budgets SET budget_limit = COALESCE(?, budget_limit), "
+                "current_usage = 0, period_start = ?, period_end = ?, updated_at = ? "
+                "WHERE tenant_id = ?",
+                (new_limit, now.isoformat(), (now + timedelta(days=1)).isoformat(),
+                 now.isoformat(), tenant_id)
+            )
+            conn.execute("DELETE FROM tenant_cost_categories WHERE tenant_id = ?", (tenant_id,))
+            conn.execute("DELETE FROM completed_tasks WHERE tenant_id = ?", (tenant_id,))
+
     def can_proceed_with_cost(
         self,
         tenant_id: str,
-        estimated_additional_cost: float
+        estimated_additional_cost: float,
+        task_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         检查是否可以继续（用于执行中的成本检查）
-        
+
+        预测值 = 已提交花费（含本进程刚写入的缓冲增量）+ 所有运行中任务的预留余额
+        + 新增成本；调用任务自己的预留余额本来就是为这笔成本准备的，因此扣除。
+
+        Args:
+            tenant_id: 租户 ID
+            estimated_additional_cost: 预计新增成本
+            task_id: 发起检查的任务，其剩余预留额度不重复计算
+
         Returns:
             {
                 "can_proceed": bool,
@@ -229,13 +360,19 @@ class TenantBudgetController:
                 "budget_remaining": float
             }
         """
+        # _get_usage writes this process's buffered deltas for the tenant first
         usage = self._get_usage(tenant_id)
-        
-        projected_usage = usage.current_usage + estimated_additional_cost
+        own_headroom = self._reservation_headroom(tenant_id, task_id) if task_id else 0.0
+
+        projected_usage = (
+            usage.current_usage + usage.reserved_cost
+            - min(own_headroom, estimated_additional_cost, usage.reserved_cost)
+            + estimated_additional_cost
+        )
         projected_rate = projected_usage / usage.budget_limit if usage.budget_limit > 0 else 0.0
-        
+
         budget_remaining = max(0, usage.budget_limit - projected_usage)
-        
+
         if projected_rate >= 1.0:
             return {
                 "can_proceed": False,
@@ -257,11 +394,11 @@ class TenantBudgetController:
                 "reason": f"Within budget (projected: {projected_rate:.1%})",
                 "budget_remaining": budget_remaining
             }
-    
+
     def generate_cost_report(self, tenant_id: str) -> Dict[str, Any]:
         """生成租户成本报表"""
         usage = self._get_usage(tenant_id)
-        
+
         report = {
             "tenant_id": tenant_id,
             "period": usage.period,
@@ -272,6 +409,7 @@ class TenantBudgetController:
             "budget": {
                 "limit": usage.budget_limit,
                 "used": usage.current_usage,
+                "reserved": usage.reserved_cost,
                 "remaining": max(0, usage.budget_limit - usage.current_usage),
                 "usage_rate": usage.usage_rate,
                 "status": usage.status.value
@@ -285,7 +423,7 @@ class TenantBudgetController:
             "running_tasks": self.get_running_tasks(tenant_id),
             "generated_at": datetime.now().isoformat()
         }
-        
+
         # Save report
         report_path = os.path.join(
             self.artifacts_dir,
@@ -293,81 +431,131 @@ class TenantBudgetController:
             f"cost_report_{datetime.now().strftime('%Y%m%d')}.json"
         )
         os.makedirs(os.path.dirname(report_path), exist_ok=True)
-        
+
         with open(report_path, "w", encoding="utf-8") as f:
             json.dump(report, f, indent=2, ensure_ascii=False)
-        
+
         return report
-    
-    def _get_usage(self, tenant_id: str) -> TenantBudgetUsage:
-        """获取或初始化租户使用情况"""
-        if tenant_id in self._usage_cache:
-            return self._usage_cache[tenant_id]
-        
-        # Try to load from disk
-        usage_path = os.path.join(self.artifacts_dir, tenant_id, "budget_usage.json")
-        if os.path.exists(usage_path):
-            try:
-                with open(usage_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    usage = TenantBudgetUsage(**data)
-                    # Convert status string to enum
-                    usage.status = BudgetStatus(usage.status)
-                    self._usage_cache[tenant_id] = usage
-                    return usage
-            except Exception:
-                pass
-        
-        # Load tenant config to get budget limits
-        tenant_config_path = os.path.join(self.artifacts_dir, f"{tenant_id}.json")
-        budget_limit = 1000.0  # Default
-        max_concurrent = 10  # Default
-        
-        if os.path.exists(tenant_config_path):
+
+    def flush(self):
+        """将本进程缓冲的成本增量写入账本"""
+        with self._lock:
+            self._flush_pending()
+
+    def compact(self):
+        """
+        压缩账本
+
+        - 回收失效预留（本机已退出进程持有的、或超过 reservation_ttl_s 的）；
+          其他进程留下的未消耗预留额度计入已用（类别 reclaimed），
+          因为该进程缓冲在额度内、尚未写入账本的增量已无法恢复
+        - 按预留表重新校准 reserved_cost / concurrent_runs，消除浮点累积误差
+        - 每个租户只保留成本最高的 TOP_COST_TASKS 个已完成任务
+        - WAL checkpoint，并为本进程写过的租户导出 budget_usage.json 快照
+        """
+        self.flush()
+        now_ts = time.time()
+        with self._lock:
+            self._last_compaction = time.monotonic()
+            with self._transaction() as conn:
+                stale_rows = [
+                    row for row in conn.execute(
+                        "SELECT tenant_id, task_id, started_ts, estimated_cost, actual_cost, host, pid "
+                        "FROM budget_reservations"
+                    )
+                    if self._is_stale_reservation(row, now_ts)
+                ]
+                stale = [(row["tenant_id"], row["task_id"]) for row in stale_rows]
+                # Unflushed deltas of another process are capped by its headroom: charge all of it
+                charges = [
+                    (row["tenant_id"], row["estimated_cost"] - row["actual_cost"])
+                    for row in stale_rows
+                    if not self._owned_by_this_process(row)
+                    and row["estimated_cost"] > row["actual_cost"]
+                ]
+                conn.executemany(
+                    "DELETE FROM budget_reservations WHERE tenant_id = ? AND task_id = ?", stale
+                )
+                now = datetime.now().isoformat()
+                conn.executemany(
+                    "UPDATE tenant_budgets SET current_usage = current_usage + ?, updated_at = ? "
+                    "WHERE tenant_id = ?",
+                    [(charge, now, tenant_id) for tenant_id, charge in charges]
+                )
+                conn.executemany(
+                    "INSERT INTO tenant_cost_categories (tenant_id, category, cost) "
+                    "VALUES (?, 'reclaimed', ?) "
+                    "ON CONFLICT (tenant_id, category) DO UPDATE SET cost = cost + excluded.cost",
+                    charges
+                )
+                for key in stale:
+                    self._headroom.pop(key, None)
+                self._touched.update(tenant_id for tenant_id, _ in charges)
+                conn.execute(
+                    "UPDATE tenant_budgets SET "
+                    "reserved_cost = COALESCE((SELECT SUM(MAX(r.estimated_cost - r.actual_cost, 0)) "
+                    "  FROM budget_reservations r WHERE r.tenant_id = tenant_budgets.tenant_id), 0), "
+                    "concurrent_runs = (SELECT COUNT(*) FROM budget_reservations r "
+                    "  WHERE r.tenant_id = tenant_budgets.tenant_id)"
+                )
+                conn.execute(
+                    "DELETE FROM completed_tasks WHERE rowid IN ("
+                    "  SELECT rowid FROM ("
+                    "    SELECT rowid, ROW_NUMBER() OVER ("
+                    "      PARTITION BY tenant_id ORDER BY cost DESC) AS rank"
+                    "    FROM completed_tasks)"
+                    "  WHERE rank > ?)",
+                    (self.TOP_COST_TASKS,)
+                )
+            self._conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            touched, self._touched = self._touched, set()
+
+        for tenant_id in touched:
             try:
-                with open(tenant_config_path, "r", encoding="utf-8") as f:
-                    tenant_data = json.load(f)
-                    budget_profile = tenant_data.get("budget_profile", {})
-                    budget_limit = budget_profile.get("max_cost_per_day", 1000.0)
-                    max_concurrent = budget_profile.get("max_concurrent_runs", 10)
+                self._export_snapshot(self._get_usage(tenant_id))
             except Exception:
                 pass
-        
-        # Initialize new usage
-        usage = TenantBudgetUsage(
-            tenant_id=tenant_id,
-            period="daily",
-            period_start=datetime.now().isoformat(),
-            period_end=(datetime.now() + timedelta(days=1)).isoformat(),
-            budget_limit=budget_limit,
-            current_usage=0.0,
-            usage_rate=0.0,
-            status=BudgetStatus.HEALTHY,
-            concurrent_runs=0,
-            max_concurrent_runs=max_concurrent,
-            cost_by_category={},
-            top_cost_tasks=[],
-            updated_at=datetime.now().isoformat()
-        )
-        
-        self._usage_cache[tenant_id] = usage
-        self._save_usage(usage)
-        
-        return usage
-    
+
+    def close(self):
+        """写入缓冲并关闭账本连接"""
+        self.flush()
+        _controllers.discard(self)
+        with self._lock:
+            self._conn.close()
+
+    def _get_usage(self, tenant_id: str) -> TenantBudgetUsage:
+        """获取或初始化租户使用情况"""
+        self._flush_tenant(tenant_id)
+        with self._lock:
+            # data_version changes whenever another connection commits
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if version != self._data_version:
+                self._usage_cache.clear()
+                self._data_version = version
+
+            usage = self._usage_cache.get(tenant_id)
+            if usage is None:
+                usage = self._load_usage(tenant_id)
+                self._usage_cache[tenant_id] = usage
+            return usage
+
     def _save_usage(self, usage: TenantBudgetUsage):
-        """保存使用情况"""
-        usage_path = os.path.join(self.artifacts_dir, usage.tenant_id, "budget_usage.json")
-        os.makedirs(os.path.dirname(usage_path), exist_ok=True)
-        
-        data = asdict(usage)
-        data["status"] = usage.status.value  # Convert enum to string
-        
-        with open(usage_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        
-        self._usage_cache[usage.tenant_id] = usage
-    
+        """
+        保存租户预算配置（限额、并发上限、周期）
+
+        成本与并发计数由账本维护，不会被内存中的快照覆盖。
+        """
+        with self._transaction(usage.tenant_id) as conn:
+            self._ensure_tenant(conn, usage.tenant_id)
+            conn.execute(
+                "UPDATE tenant_budgets SET budget_limit = ?, max_concurrent_runs = ?, "
+                "period = ?, period_start = ?, period_end = ?, updated_at = ? "
+                "WHERE tenant_id = ?",
+                (usage.budget_limit, usage.max_concurrent_runs, usage.period,
+                 usage.period_start, usage.period_end, datetime.now().isoformat(),
+                 usage.tenant_id)
+            )
+
     def _archive_usage(self, usage: TenantBudgetUsage):
         """归档旧的使用情况"""
         archive_path = os.path.join(
@@ -376,13 +564,26 @@ class TenantBudgetController:
             f"budget_archive_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         )
         os.makedirs(os.path.dirname(archive_path), exist_ok=True)
-        
+
         data = asdict(usage)
         data["status"] = usage.status.value
-        
+
         with open(archive_path, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
-    
+
+    def _export_snapshot(self, usage: TenantBudgetUsage):
+        """导出兼容旧格式的 budget_usage.json（原子替换）"""
+        usage_path = os.path.join(self.artifacts_dir, usage.tenant_id, "budget_usage.json")
+        os.makedirs(os.path.dirname(usage_path), exist_ok=True)
+
+        data = asdict(usage)
+        data["status"] = usage.status.value
+
+        tmp_path = f"{usage_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, usage_path)
+
     def _calculate_status(self, usage_rate: float) -> BudgetStatus:
         """计算预算状态"""
         if usage_rate >= 1.0:
@@ -394,6 +595,293 @@ class TenantBudgetController:
         else:
             return BudgetStatus.HEALTHY
 
+    # ------------------------------------------------------------------
+    # Ledger internals
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _transaction(self, *tenant_ids: str) -> Iterator[sqlite3.Connection]:
+        """
+        写事务 (BEGIN IMMEDIATE)：跨进程串行化，提交后失效相关租户的读缓存
+
+        本连接自己的提交不会改变 data_version，因此需要在这里显式失效。
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            if tenant_ids:
+                for tenant_id in tenant_ids:
+                    self._usage_cache.pop(tenant_id, None)
+                self._touched.update(tenant_ids)
+            else:
+                self._usage_cache.clear()
+
+    def _ensure_tenant(self, conn: sqlite3.Connection, tenant_id: str) -> sqlite3.Row:
+        """在写事务内获取租户行，不存在时从旧快照或租户配置初始化"""
+        row = conn.execute(
+            "SELECT * FROM tenant_budgets WHERE tenant_id = ?", (tenant_id,)
+        ).fetchone()
+        if row is not None:
+            return row
+
+        now = datetime.now()
+        seed = {
+            "period": "daily",
+            "period_start": now.isoformat(),
+            "period_end": (now + timedelta(days=1)).isoformat(),
+            "budget_limit": 1000.0,  # Default
+            "max_concurrent_runs": 10,  # Default
+            "current_usage": 0.0,
+            "cost_by_category": {},
+            "top_cost_tasks": [],
+        }
+
+        # Migrate a legacy budget_usage.json snapshot if one exists
+        legacy = self._read_json(os.path.join(self.artifacts_dir, tenant_id, "budget_usage.json"))
+        if legacy:
+            seed.update({k: legacy[k] for k in seed if k in legacy})
+        else:
+            # Load tenant config to get budget limits
+            tenant_data = self._read_json(os.path.join(self.artifacts_dir, f"{tenant_id}.json"))
+            budget_profile = (tenant_data or {}).get("budget_profile", {})
+            seed["budget_limit"] = budget_profile.get("max_cost_per_day", 1000.0)
+            seed["max_concurrent_runs"] = budget_profile.get("max_concurrent_runs", 10)
+
+        conn.execute(
+            "INSERT INTO tenant_budgets (tenant_id, period, period_start, period_end, "
+            "budget_limit, max_concurrent_runs, current_usage, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (tenant_id, seed["period"], seed["period_start"], seed["period_end"],
+             seed["budget_limit"], seed["max_concurrent_runs"], seed["current_usage"],
+             now.isoformat())
+        )
+        conn.executemany(
+            "INSERT INTO tenant_cost_categories (tenant_id, category, cost) VALUES (?, ?, ?)",
+            [(tenant_id, category, cost) for category, cost in seed["cost_by_category"].items()]
+        )
+        conn.executemany(
+            "INSERT INTO completed_tasks (tenant_id, task_id, run_id, cost, completed_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [
+                (tenant_id, t.get("task_id"), t.get("run_id"), t.get("cost", 0.0),
+                 t.get("completed_at", now.isoformat()))
+                for t in seed["top_cost_tasks"]
+            ]
+        )
+        return conn.execute(
+            "SELECT * FROM tenant_budgets WHERE tenant_id = ?", (tenant_id,)
+        ).fetchone()
+
+    def _load_usage(self, tenant_id: str) -> TenantBudgetUsage:
+        """从账本读取一致快照"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                row = self._conn.execute(
+                    "SELECT * FROM tenant_budgets WHERE tenant_id = ?", (tenant_id,)
+                ).fetchone()
+                categories = self._conn.execute(
+                    "SELECT category, cost FROM tenant_cost_categories WHERE tenant_id = ?",
+                    (tenant_id,)
+                ).fetchall()
+                top_tasks = self._conn.execute(
+                    "SELECT task_id, run_id, cost, completed_at FROM completed_tasks "
+                    "WHERE tenant_id = ? ORDER BY cost DESC LIMIT ?",
+                    (tenant_id, self.TOP_COST_TASKS)
+                ).fetchall()
+            finally:
+                self._conn.execute("COMMIT")
+
+            if row is None:
+                with self._transaction(tenant_id) as conn:
+                    self._ensure_tenant(conn, tenant_id)
+                return self._load_usage(tenant_id)
+
+        budget_limit = row["budget_limit"]
+        usage_rate = row["current_usage"] / budget_limit if budget_limit > 0 else 0.0
+        return TenantBudgetUsage(
+            tenant_id=tenant_id,
+            period=row["period"],
+            period_start=row["period_start"],
+            period_end=row["period_end"],
+            budget_limit=budget_limit,
+            current_usage=row["current_usage"],
+            usage_rate=usage_rate,
+            status=self._calculate_status(usage_rate),
+            concurrent_runs=row["concurrent_runs"],
+            max_concurrent_runs=row["max_concurrent_runs"],
+            cost_by_category={r["category"]: r["cost"] for r in categories},
+            top_cost_tasks=[dict(r) for r in top_tasks],
+            updated_at=row["updated_at"],
+            reserved_cost=row["reserved_cost"]
+        )
+
+    def _apply_cost(
+        self,
+        conn: sqlite3.Connection,
+        tenant_id: str,
+        task_id: str,
+        cost: float,
+        categories: Dict[str, float]
+    ):
+        """在写事务内记账：实际成本消耗预留额度，超出部分直接计入已用"""
+        reserved_delta = 0.0
+        reservation = conn.execute(
+            "SELECT estimated_cost, actual_cost FROM budget_reservations "
+            "WHERE tenant_id = ? AND task_id = ?",
+            (tenant_id, task_id)
+        ).fetchone()
+        if reservation is not None:
+            headroom = reservation["estimated_cost"] - reservation["actual_cost"]
+            reserved_delta = max(headroom - cost, 0.0) - max(headroom, 0.0)
+            conn.execute(
+                "UPDATE budget_reservations SET actual_cost = actual_cost + ? "
+                "WHERE tenant_id = ? AND task_id = ?",
+                (cost, tenant_id, task_id)
+            )
+
+        conn.execute(
+            "UPDATE tenant_budgets SET current_usage = current_usage + ?, "
+            "reserved_cost = MAX(reserved_cost + ?, 0), updated_at = ? WHERE tenant_id = ?",
+            (cost, reserved_delta, datetime.now().isoformat(), tenant_id)
+        )
+        conn.executemany(
+            "INSERT INTO tenant_cost_categories (tenant_id, category, cost) VALUES (?, ?, ?) "
+            "ON CONFLICT (tenant_id, category) DO UPDATE SET cost = cost + excluded.cost",
+            [(tenant_id, category, delta) for category, delta in categories.items()]
+        )
+
+    def _release(self, conn: sqlite3.Connection, tenant_id: str, task_id: str, final_cost: float):
+        """在写事务内释放预留与并发槽位，并登记已完成任务"""
+        reservation = conn.execute(
+            "SELECT run_id, estimated_cost, actual_cost FROM budget_reservations "
+            "WHERE tenant_id = ? AND task_id = ?",
+            (tenant_id, task_id)
+        ).fetchone()
+        if reservation is None:
+            return
+
+        now = datetime.now().isoformat()
+        headroom = max(reservation["estimated_cost"] - reservation["actual_cost"], 0.0)
+        conn.execute(
+            "DELETE FROM budget_reservations WHERE tenant_id = ? AND task_id = ?",
+            (tenant_id, task_id)
+        )
+        conn.execute(
+            "UPDATE tenant_budgets SET reserved_cost = MAX(reserved_cost - ?, 0), "
+            "concurrent_runs = MAX(concurrent_runs - 1, 0), updated_at = ? WHERE tenant_id = ?",
+            (headroom, now, tenant_id)
+        )
+        conn.execute(
+            "INSERT INTO completed_tasks (tenant_id, task_id, run_id, cost, completed_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (tenant_id, task_id, reservation["run_id"], final_cost, now)
+        )
+
+    def _flush_pending(self, keys: Optional[List[Tuple[str, str]]] = None):
+        """把缓冲的成本增量在一个事务内写入账本（keys 为 None 时写入全部）"""
+        with self._lock:
+            if keys is None:
+                keys = list(self._pending)
+                self._last_flush = time.monotonic()
+            batch = [(key, self._pending.pop(key)) for key in keys if key in self._pending]
+            if not batch:
+                return
+
+            tenants = {tenant_id for (tenant_id, _), _ in batch}
+            try:
+                with self._transaction(*tenants) as conn:
+                    for tenant_id in tenants:
+                        self._ensure_tenant(conn, tenant_id)
+                    for (tenant_id, task_id), (cost, categories) in batch:
+                        self._apply_cost(conn, tenant_id, task_id, cost, categories)
+            except Exception:
+                # Keep the deltas for the next flush
+                for key, (cost, categories) in batch:
+                    pending = self._pending.setdefault(key, [0.0, {}])
+                    pending[0] += cost
+                    for category, delta in categories.items():
+                        pending[1][category] = pending[1].get(category, 0.0) + delta
+                raise
+
+            for key, (cost, _) in batch:
+                if key in self._headroom:
+                    self._headroom[key] -= cost
+
+    def _flush_tenant(self, tenant_id: str):
+        """读之前写入该租户的缓冲增量，保证本进程读到自己的写入"""
+        with self._lock:
+            if self._pending:
+                self._flush_pending([key for key in self._pending if key[0] == tenant_id])
+
+    def _maybe_compact(self):
+        if time.monotonic() - self._last_compaction >= self.compaction_interval_s:
+            try:
+                self.compact()
+            except sqlite3.Error:
+                pass
+
+    def _is_stale_reservation(self, row: sqlite3.Row, now_ts: float) -> bool:
+        if now_ts - row["started_ts"] > self.reservation_ttl_s:
+            return True
+        if row["host"] != self._host or row["pid"] == os.getpid():
+            return False
+        return not _pid_alive(row["pid"])
+
+    def _owned_by_this_process(self, row: sqlite3.Row) -> bool:
+        return row["host"] == self._host and row["pid"] == os.getpid()
+
+    def _reservation_headroom(self, tenant_id: str, task_id: str) -> float:
+        """任务在账本中的剩余预留额度（无预留时为 0）"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT estimated_cost, actual_cost FROM budget_reservations "
+                "WHERE tenant_id = ? AND task_id = ?",
+                (tenant_id, task_id)
+            ).fetchone()
+        return max(row["estimated_cost"] - row["actual_cost"], 0.0) if row else 0.0
+
+    @staticmethod
+    def _read_json(path: str) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+
+def _pid_alive(pid: int) -> bool:
+    """本机进程是否仍存活"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+# Buffered cost deltas are written out at interpreter shutdown
+_controllers: "weakref.WeakSet[TenantBudgetController]" = weakref.WeakSet()
+
+
+def _flush_controllers():
+    for controller in list(_controllers):
+        try:
+            controller.flush()
+        except Exception:
+            pass
+
+
+atexit.register(_flush_controllers)
+
 
 # Global instance
 _global_controller: Optional[TenantBudgetController] = None
@@ -405,4 +893,3 @@ def get_tenant_budget_controller() -> TenantBudgetController:
     if _global_controller is None:
         _global_controller = TenantBudgetController()
     return _global_controller
-
@@ -0,0 +1,437 @@
+"""
+Sandbox Pool: non-blocking sandboxed process execution
+Features:
+- Async subprocess execution with streamed stdout/stderr (per-chunk callback)
+- Bounded output capture; excess output is drained, never buffered
+- Kill-on-timeout of the whole process group
+- Pre-warmed sandbox workers reused across tool calls, each bound to one
+  per-task workspace:
+  - DockerSandboxWorker: long-lived container that mounts only its workspace,
+    tool calls run via `docker exec`
+  - LocalSandboxWorker: local process stand-in with the same interface, used
+    where docker is absent
+"""
+from typing import Any, Callable, Dict, List, Optional
+from contextlib import asynccontextmanager
+import asyncio
+import codecs
+import os
+import shutil
+import signal
+import time
+import uuid
+
+
+# (stream name, decoded text chunk) -> None
+OutputCallback = Callable[[str, str], None]
+
+MAX_OUTPUT_CHARS = 1 << 20
+READ_CHUNK_BYTES = 1 << 16
+
+
+class _StreamCapture:
+    """Incrementally decodes one pipe, forwards chunks and keeps a bounded prefix"""
+
+    def __init__(self, name: str, on_output: Optional[OutputCallback], max_chars: int):
+        self.name = name
+        self.on_output = on_output
+        self.max_chars = max_chars
+        self.parts: List[str] = []
+        self.size = 0
+        self.truncated = False
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def feed(self, data: bytes, final: bool = False) -> None:
+        text = self._decoder.decode(data, final)
+        if not text:
+            return
+        if self.on_output is not None:
+            try:
+                self.on_output(self.name, text)
+            except Exception:
+                pass
+        room = self.max_chars - self.size
+        if room <= 0:
+            self.truncated = True
+            return
+        if len(text) > room:
+            text = text[:room]
+            self.truncated = True
+        self.parts.append(text)
+        self.size += len(text)
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+
+def _kill(proc: asyncio.subprocess.Process) -> None:
+    """Kill the process and everything it spawned"""
+    if proc.returncode is not None:
+        return
+    try:
+        if os.name == "posix":
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def run_streaming(
+    argv: List[str],
+    cwd: Optional[str] = None,
+    timeout_sec: float = 10.0,
+    input_data: Optional[str] = None,
+    on_output: Optional[OutputCallback] = None,
+    max_output_chars: int = MAX_OUTPUT_CHARS
+) -> Dict[str, Any]:
+    """
+    Run a command without blocking the event loop.
+
+    Returns:
+        {
+            "exit_code": int (-1 on timeout),
+            "stdout": str,
+            "stderr": str,
+            "timed_out": bool,
+            "truncated": bool,
+            "duration_ms": float
+        }
+    """
+    start = time.time()
+    proc = await asyncio.create_subprocess_exec(
+        *argv,
+        cwd=cwd,
+        stdin=asyncio.subprocess.PIPE if input_data is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=os.name == "posix"
+    )
+    stdout = _StreamCapture("stdout", on_output, max_output_chars)
+    stderr = _StreamCapture("stderr", on_output, max_output_chars)
+
+    async def pump(stream: asyncio.StreamReader, capture: _StreamCapture) -> None:
+        while True:
+            data = await stream.read(READ_CHUNK_BYTES)
+            if not data:
+                break
+            capture.feed(data)
+        capture.feed(b"", final=True)
+
+    async def feed_stdin() -> None:
+        if input_data is None:
+            return
+        try:
+            proc.stdin.write(input_data.encode("utf-8"))
+            await proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            proc.stdin.close()
+
+    timed_out = False
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(
+                pump(proc.stdout, stdout), pump(proc.stderr, stderr), feed_stdin(), proc.wait()
+            ),
+            timeout=timeout_sec
+        )
+    except asyncio.TimeoutError:
+        timed_out = True
+        _kill(proc)
+        await proc.wait()
+    except BaseException:
+        # Cancelled by the caller: never leave the process behind
+        _kill(proc)
+        raise
+
+    return {
+        "exit_code": -1 if timed_out else proc.returncode,
+        "stdout": stdout.text,
+        "stderr": stderr.text,
+        "timed_out": timed_out,
+        "truncated": stdout.truncated or stderr.truncated,
+        "duration_ms": (time.time() - start) * 1000
+    }
+
+
+class SandboxWorker:
+    """
+    A reusable sandbox bound to a single workspace.
+
+    A worker is started either bound to a workspace or unbound (pre-warmed);
+    an unbound worker is bound on its first call. Once bound it only ever runs
+    commands for that workspace, so tasks never share a sandbox.
+    """
+
+    def __init__(self, sandbox_root: str):
+        self.sandbox_root = os.path.abspath(sandbox_root)
+        self.workspace: Optional[str] = None
+        self.broken = False
+        self.uses = 0
+
+    def workspace_dir(self, workspace: str) -> str:
+        """Host directory of `workspace`; names that escape the sandbox root are rejected"""
+        path = os.path.normpath(os.path.join(self.sandbox_root, workspace))
+        if not path.startswith(self.sandbox_root + os.sep):
+            raise ValueError(f"workspace outside sandbox root: {workspace!r}")
+        return path
+
+    async def start(self, workspace: Optional[str] = None) -> None:
+        """Bring the sandbox up (called once, before the first exec); None = pre-warmed, unbound"""
+        if workspace is not None:
+            os.makedirs(self.workspace_dir(workspace), exist_ok=True)
+            self.workspace = workspace
+
+    async def bind(self, workspace: str) -> bool:
+        """Claim an unbound worker for `workspace`; False when it cannot serve it"""
+        if self.workspace is None:
+            os.makedirs(self.workspace_dir(workspace), exist_ok=True)
+            self.workspace = workspace
+        return self.workspace == workspace
+
+    async def exec(
+        self,
+        argv: List[str],
+        workspace: str,
+        timeout_sec: float,
+        input_data: Optional[str] = None,
+        on_output: Optional[OutputCallback] = None
+    ) -> Dict[str, Any]:
+        """Run `argv` with `workspace` (relative to the sandbox root) as cwd"""
+        raise NotImplementedError
+
+    async def stop(self) -> None:
+        """Tear the sandbox down"""
+
+    def _check_bound(self, workspace: str) -> None:
+        if self.workspace != workspace:
+            raise ValueError(f"sandbox bound to {self.workspace!r}, not {workspace!r}")
+
+
+class LocalSandboxWorker(SandboxWorker):
+    """Process stand-in for a warm container: each exec is a local process"""
+
+    async def exec(
+        self,
+        argv: List[str],
+        workspace: str,
+        timeout_sec: float,
+        input_data: Optional[str] = None,
+        on_output: Optional[OutputCallback] = None
+    ) -> Dict[str, Any]:
+        self._check_bound(workspace)
+        self.uses += 1
+        cwd = self.workspace_dir(workspace)
+        os.makedirs(cwd, exist_ok=True)
+        return await run_streaming(
+            argv, cwd=cwd, timeout_sec=timeout_sec, input_data=input_data, on_output=on_output
+        )
+
+
+class DockerSandboxWorker(SandboxWorker):
+    """
+    Long-lived container that mounts exactly one directory at /workspace.
+
+    Containers are started once (`sleep infinity`) and commands run through
+    `docker exec -w /workspace`. A container started for a workspace mounts
+    that workspace only; a pre-warmed one mounts a private empty directory
+    under .warm/, which its first task adopts by renaming it to the task's
+    workspace (the bind mount follows the directory). Workspaces that already
+    exist get a fresh container. No container ever sees a sibling workspace.
+
+    A timed-out exec removes the whole container, since killing the docker
+    client does not stop the process inside it; the pool then replaces the worker.
+    """
+
+    MOUNT_POINT = "/workspace"
+    WARM_DIR = ".warm"
+
+    def __init__(
+        self,
+        docker_path: str,
+        image: str,
+        sandbox_root: str,
+        cpu_limit: str = "0.5",
+        memory_limit: str = "128m",
+        seccomp_profile: Optional[str] = None
+    ):
+        super().__init__(sandbox_root)
+        self.docker_path = docker_path
+        self.image = image
+        self.cpu_limit = cpu_limit
+        self.memory_limit = memory_limit
+        self.seccomp_profile = seccomp_profile
+        self.container_name = f"sandbox_{uuid.uuid4().hex[:12]}"
+        self.host_dir: Optional[str] = None
+
+    async def start(self, workspace: Optional[str] = None) -> None:
+        if workspace is None:
+            self.host_dir = os.path.join(self.sandbox_root, self.WARM_DIR, self.container_name)
+        else:
+            self.host_dir = self.workspace_dir(workspace)
+        os.makedirs(self.host_dir, exist_ok=True)
+        cmd = [
+            self.docker_path, "run", "-d", "--rm",
+            "--name", self.container_name,
+            "--network=none",
+            "--cpus", self.cpu_limit,
+            "--memory", self.memory_limit,
+            "--read-only",
+            "--user", "1000:1000",
+            "-v", f"{self.host_dir}:{self.MOUNT_POINT}:rw",
+        ]
+        if self.seccomp_profile:
+            cmd += ["--security-opt", f"seccomp={self.seccomp_profile}"]
+        cmd += [self.image, "sleep", "infinity"]
+        result = await run_streaming(cmd, timeout_sec=60)
+        if result["exit_code"] != 0:
+            self.broken = True
+            raise RuntimeError(f"Failed to start sandbox container: {result['stderr'][:500]}")
+        self.workspace = workspace
+
+    async def bind(self, workspace: str) -> bool:
+        if self.workspace is not None:
+            return self.workspace == workspace
+        target = self.workspace_dir(workspace)
+        if os.path.lexists(target):
+            # Existing workspace content can only be reached through a container started for it
+            return False
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.rename(self.host_dir, target)
+        self.host_dir = target
+        self.workspace = workspace
+        return True
+
+    async def exec(
+        self,
+        argv: List[str],
+        workspace: str,
+        timeout_sec: float,
+        input_data: Optional[str] = None,
+        on_output: Optional[OutputCallback] = None
+    ) -> Dict[str, Any]:
+        self._check_bound(workspace)
+        self.uses += 1
+        cmd = [self.docker_path, "exec"]
+        if input_data is not None:
+            cmd.append("-i")
+        cmd += ["-w", self.MOUNT_POINT, self.container_name] + argv
+        result = await run_streaming(
+            cmd, timeout_sec=timeout_sec, input_data=input_data, on_output=on_output
+        )
+        if result["timed_out"]:
+            self.broken = True
+            await self.stop()
+        return result
+
+    async def stop(self) -> None:
+        try:
+            await run_streaming([self.docker_path, "rm", "-f", self.container_name], timeout_sec=30)
+        except Exception:
+            pass
+        if self.workspace is None and self.host_dir:
+            # Unclaimed warm directory
+            shutil.rmtree(self.host_dir, ignore_errors=True)
+
+
+class SandboxPool:
+    """
+    Fixed-size pool of warm sandbox workers.
+
+    At most `size` tool calls run at once. A call for a workspace reuses an
+    idle worker already bound to it, else claims a pre-warmed unbound one,
+    else starts a worker bound to that workspace. At most `size` workers are
+    kept idle (the least recently used are stopped); workers are replaced
+    when broken or after `max_uses` calls.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], SandboxWorker],
+        size: int = 2,
+        max_uses: int = 0
+    ):
+        self.factory = factory
+        self.size = max(1, size)
+        self.max_uses = max_uses
+        self._idle: List[SandboxWorker] = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.started = 0
+
+    def _slots(self) -> asyncio.Semaphore:
+        # Semaphores bind to the loop they first wait on
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.size)
+            self._loop = loop
+        return self._semaphore
+
+    async def _new_worker(self, workspace: Optional[str] = None) -> SandboxWorker:
+        worker = self.factory()
+        await worker.start(workspace)
+        self.started += 1
+        return worker
+
+    def _take_idle(self, workspace: str) -> Optional[SandboxWorker]:
+        """Most recently used idle worker bound to `workspace`, else an unbound one"""
+        for wanted in (workspace, None):
+            for i in range(len(self._idle) - 1, -1, -1):
+                if self._idle[i].workspace == wanted:
+                    return self._idle.pop(i)
+        return None
+
+    async def warm(self) -> None:
+        """Start unbound idle workers up to the pool size"""
+        missing = self.size - len(self._idle)
+        if missing > 0:
+            workers = await asyncio.gather(*(self._new_worker() for _ in range(missing)))
+            self._idle.extend(workers)
+
+    @asynccontextmanager
+    async def acquire(self, workspace: str):
+        async with self._slots():
+            worker = self._take_idle(workspace)
+            if worker is not None and not await worker.bind(workspace):
+                # Still warm for a workspace it can adopt
+                self._idle.insert(0, worker)
+                worker = None
+            if worker is None:
+                worker = await self._new_worker(workspace)
+            reusable = False
+            try:
+                yield worker
+                reusable = not worker.broken and not (
+                    self.max_uses and worker.uses >= self.max_uses
+                )
+            finally:
+                if reusable:
+                    self._idle.append(worker)
+                    evicted = self._idle[:-self.size]
+                    del self._idle[:-self.size]
+                    for old in evicted:
+                        await old.stop()
+                else:
+                    await worker.stop()
+
+    async def run(
+        self,
+        argv: List[str],
+        workspace: str,
+        timeout_sec: float,
+        input_data: Optional[str] = None,
+        on_output: Optional[OutputCallback] = None
+    ) -> Dict[str, Any]:
+        """Run one command on a pooled worker"""
+        async with self.acquire(workspace) as worker:
+            return await worker.exec(
+                argv, workspace, timeout_sec, input_data=input_data, on_output=on_output
+            )
+
+    async def close(self) -> None:
+        """Stop all idle workers"""
+        idle, self._idle = self._idle, []
+        await asyncio.gather(*(w.stop() for w in idle), return_exceptions=True)
@@ -3,22 +3,33 @@ Tool Dispatcher: Industrial-Grade Tool Execution Engine
 Features:
 - Parameter validation with JSON Schema
 - Permission boundaries and sandboxing
-- Tool composition (tool pipelines)
+- Tool composition (tool pipelines run as dependency graphs)
 - Execution trace generation
 - Rollback support
+- Non-blocking sandbox execution (async subprocess, streamed output,
+  kill-on-timeout) with optional warm worker pools and per-tool
+  concurrency limits
 """
 from typing import Dict, Any, Optional, List, Callable, Union, Tuple
 from enum import Enum
 from datetime import datetime
 from dataclasses import dataclass, field, asdict
+import asyncio
 import json
 import os
-import subprocess
 import tempfile
 import shutil
 import hashlib
 import uuid
 
+from runtime.tools.sandbox_pool import (
+    DockerSandboxWorker,
+    LocalSandboxWorker,
+    OutputCallback,
+    SandboxPool,
+    run_streaming,
+)
+
 
 class ToolPermission(str, Enum):
     """工具权限级别"""
@@ -42,6 +53,10 @@ class ToolExecutionStep:
     error: Optional[str] = None
     exit_code: int = 0
     execution_time_ms: float = 0.0
+    depends_on: List[str] = field(default_factory=list)
+    # Offsets from pipeline start, for the parallel timeline
+    start_offset_ms: float = 0.0
+    end_offset_ms: float = 0.0
     
     def to_dict(self) -> Dict[str, Any]:
         return asdict(self)
@@ -49,10 +64,10 @@ class ToolExecutionStep:
 
 @dataclass  
 class ToolPipeline:
-    """A pipeline of tools to execute in sequence"""
+    """A pipeline of tools; steps run in order unless they declare depends_on (see execute_pipeline)"""
     pipeline_id: str
     name: str
-    steps: List[Dict[str, Any]]  # [{tool_name, params, output_mapping}]
+    steps: List[Dict[str, Any]]  # [{tool_name, params, output_key, continue_on_error, depends_on}]
     created_at: str = field(default_factory=lambda: datetime.now().isoformat())
     
     def to_dict(self) -> Dict[str, Any]:
@@ -128,11 +143,36 @@ class ToolResult:
 class ToolDispatcher:
     """工具调度器：集中式工具调用入口"""
     
-    def __init__(self, sandbox_dir: str = "runtime/tools/sandbox"):
+    def __init__(
+        self,
+        sandbox_dir: str = "runtime/tools/sandbox",
+        warm_pool_size: int = 0,
+        max_worker_uses: int = 0,
+        max_concurrency_per_tool: Optional[int] = None,
+        pipeline_concurrency: int = 4
+    ):
+        """
+        Args:
+            sandbox_dir: Root of the per-task sandbox workspaces
+            warm_pool_size: Warm sandbox workers per image (0 = one-shot
+                `docker run` / direct local execution)
+            max_worker_uses: Recycle a warm worker after this many calls (0 = never)
+            max_concurrency_per_tool: Default per-tool concurrency limit
+                (overridden by a tool's "max_concurrency"; None = unlimited)
+            pipeline_concurrency: Default cap on concurrently running pipeline steps
+        """
         self.sandbox_dir = sandbox_dir
         os.makedirs(sandbox_dir, exist_ok=True)
+        self.warm_pool_size = warm_pool_size
+        self.max_worker_uses = max_worker_uses
+        self.max_concurrency_per_tool = max_concurrency_per_tool
+        self.pipeline_concurrency = pipeline_concurrency
         self.tool_registry: Dict[str, Dict[str, Any]] = {}
         self._register_default_tools()
+
+        self._pools: Dict[str, SandboxPool] = {}
+        self._tool_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
     
     def _register_default_tools(self):
         """注册默认工具"""
@@ -184,7 +224,8 @@ class ToolDispatcher:
         self,
         tool_name: str,
         params: Dict[str, Any],
-        task_id: str
+        task_id: str,
+        on_output: Optional[OutputCallback] = None
     ) -> ToolResult:
         """
         执行工具调用
@@ -192,7 +233,7 @@ class ToolDispatcher:
         流程：
         1. 参数校验（schema）
         2. 权限检查
-        3. 沙盒隔离执行
+        3. 沙盒隔离执行（按工具限制并发，on_output 接收流式 stdout/stderr）
         4. 结果记录
         """
         import time
@@ -231,7 +272,12 @@ class ToolDispatcher:
         
         # 4. 沙盒隔离执行
         try:
-            result = await self._execute_in_sandbox(tool_name, params, task_id, tool_def)
+            slots = self._tool_slots(tool_name, tool_def)
+            if slots is None:
+                result = await self._execute_in_sandbox(tool_name, params, task_id, tool_def, on_output)
+            else:
+                async with slots:
+                    result = await self._execute_in_sandbox(tool_name, params, task_id, tool_def, on_output)
             execution_time = (time.time() - start_time) * 1000
             
             return ToolResult(
@@ -322,116 +368,76 @@ class ToolDispatcher:
         tool_name: str,
         params: Dict[str, Any],
         task_id: str,
-        tool_def: Dict[str, Any]
+        tool_def: Dict[str, Any],
+        on_output: Optional[OutputCallback] = None
     ) -> Dict[str, Any]:
-        """在沙盒中执行工具"""
+        """在沙盒中执行工具（异步子进程，不阻塞事件循环）"""
         task_sandbox = os.path.join(self.sandbox_dir, task_id)
-        os.makedirs(task_sandbox, exist_ok=True)
+        if self.warm_pool_size <= 0:
+            # Pooled workers create (or adopt) the workspace they are bound to
+            os.makedirs(task_sandbox, exist_ok=True)
+        timeout_sec = float(tool_def.get("timeout_sec", 10))
         # Prefer docker-based sandbox if image specified and docker available
         image = tool_def.get("image")
         docker_path = shutil.which("docker")
-        if image and docker_path:
-            # Map params to a command inside the container based on tool_name
-            container_cmd = None
-            if tool_name == "file_write":
-                # write content to file inside mounted workspace
-                dest = os.path.basename(params["path"])
-                content = params["content"].replace("'", "'\"'\"'")
-                # use sh -c to write content
-                container_cmd = ["sh", "-c", f"cat > /workspace/{dest} <<'EOF'\n{content}\nEOF"]
-            elif tool_name == "file_read":
-                dest = os.path.basename(params["path"])
-                container_cmd = ["sh", "-c", f"cat /workspace/{dest} || exit 3"]
-            elif tool_name == "command_execute":
-                command = params["command"]
-                args = params.get("args", [])
-                # validate allowed commands
-                allowed = tool_def.get("allowed_commands", [])
-                if allowed and command not in allowed:
-                    return {"success": False, "error": f"Command {command} not allowed", "exit_code": -2}
-                container_cmd = [command] + args
-            else:
-                return {"success": False, "error": f"Unknown tool: {tool_name}"}
+        use_docker = bool(image and docker_path)
+
+        if use_docker or self.warm_pool_size > 0:
+            # Map params to a command run inside the task workspace
+            sandbox_cmd = self._sandbox_command(tool_name, params, tool_def)
+            if "error" in sandbox_cmd:
+                return sandbox_cmd
 
-            # Prepare docker run args
-            cpu_limit = str(tool_def.get("cpu_limit", 0.5))
-            mem_limit = str(tool_def.get("memory_limit", "128m"))
-            timeout_sec = int(tool_def.get("timeout_sec", 10))
+            if use_docker:
+                rejection = self._check_image_policy(image)
+                if rejection:
+                    return rejection
 
-            # run docker with mounted workspace
-            host_workspace = task_sandbox
             try:
-                start = datetime.now()
-                # security: enforce non-root user inside container
-                docker_cmd = [
-                    docker_path, "run", "--rm",
-                    "--network=none",
-                    "--cpus", cpu_limit,
-                    "--memory", mem_limit,
-                    "--read-only",
-                    "--user", "1000:1000",
-                    "-v", f"{host_workspace}:/workspace:rw",
-                ]
-                # optional seccomp profile
-                seccomp_profile = os.environ.get("SANDBOX_SECCOMP_PROFILE")
-                if seccomp_profile and os.path.exists(seccomp_profile):
-                    docker_cmd += ["--security-opt", f"seccomp={seccomp_profile}"]
-                # image allowlist enforcement (optional)
-                allowed_images_env = os.environ.get("SANDBOX_ALLOWED_IMAGES")
-                if allowed_images_env:
-                    allowed_images = [i.strip() for i in allowed_images_env.split(",") if i.strip()]
-                    if image not in allowed_images:
-                        return {"success": False, "error": f"Image {image} not allowed by SANDBOX_ALLOWED_IMAGES", "exit_code": -3}
-                # optional image signature enforcement
-                require_signed = os.environ.get("SANDBOX_REQUIRE_SIGNED_IMAGES", "false").lower() == "true"
-                if require_signed:
-                    try:
-                        from runtime.tools.image_signing import verify_image_signed
-                        if not verify_image_signed(image):
-                            return {"success": False, "error": f"Image {image} not signed", "exit_code": -4}
-                    except Exception:
-                        return {"success": False, "error": "Image signing check failed", "exit_code": -5}
-
-                docker_cmd.append(image)
-                docker_cmd += (container_cmd if isinstance(container_cmd, list) else [container_cmd])
-                proc = subprocess.run(docker_cmd, capture_output=True, text=True, timeout=timeout_sec)
-                duration_ms = (datetime.now() - start).total_seconds() * 1000
-                stdout = proc.stdout
-                stderr = proc.stderr
-                exit_code = proc.returncode
-                success = exit_code == 0
-                # Trim large outputs for trace
-                out_summary = stdout[:2000] if stdout else ""
-                err_summary = stderr[:2000] if stderr else ""
-                return {
-                    "success": success,
-                    "output": out_summary,
-                    "error": err_summary if not success else None,
-                    "exit_code": exit_code,
-                    "execution_time_ms": duration_ms
-                }
-            except subprocess.TimeoutExpired:
-                # Try to best-effort kill container (best-effort)
-                return {"success": False, "error": "Command timeout", "exit_code": -1}
+                if self.warm_pool_size > 0:
+                    # Warm worker: docker exec into a long-lived container, or
+                    # the local process stand-in when docker is absent
+                    pool = self._get_pool(tool_def, docker_path if use_docker else None)
+                    result = await pool.run(
+                        sandbox_cmd["argv"],
+                        task_id,
+                        timeout_sec,
+                        input_data=sandbox_cmd.get("input"),
+                        on_output=on_output
+                    )
+                else:
+                    result = await self._docker_run_once(
+                        docker_path, image, task_sandbox, sandbox_cmd, tool_def, timeout_sec, on_output
+                    )
             except Exception as e:
                 return {"success": False, "error": str(e), "exit_code": -1}
 
+            if result["timed_out"]:
+                return {"success": False, "error": "Command timeout", "exit_code": -1}
+            success = result["exit_code"] == 0
+            # Trim large outputs for trace
+            return {
+                "success": success,
+                "output": result["stdout"][:2000],
+                "error": result["stderr"][:2000] if not success else None,
+                "exit_code": result["exit_code"],
+                "execution_time_ms": result["duration_ms"]
+            }
+
         # Fallback to previous local behavior
         if tool_name == "file_write":
             path = params["path"]
             content = params["content"]
             # 确保路径在允许范围内
             full_path = os.path.join(task_sandbox, os.path.basename(path))
-            with open(full_path, "w", encoding="utf-8") as f:
-                f.write(content)
+            await asyncio.to_thread(self._write_text, full_path, content)
             return {"success": True, "output": f"File written: {full_path}"}
         
         elif tool_name == "file_read":
             path = params["path"]
             full_path = os.path.join(task_sandbox, os.path.basename(path))
             if os.path.exists(full_path):
-                with open(full_path, "r", encoding="utf-8") as f:
-                    content = f.read()
+                content = await asyncio.to_thread(self._read_text, full_path)
                 return {"success": True, "output": content}
             else:
                 return {"success": False, "error": f"File not found: {full_path}"}
@@ -441,26 +447,188 @@ class ToolDispatcher:
             args = params.get("args", [])
             # 在沙盒目录中执行
             try:
-                result = subprocess.run(
+                result = await run_streaming(
                     [command] + args,
                     cwd=task_sandbox,
-                    capture_output=True,
-                    text=True,
-                    timeout=10
+                    timeout_sec=timeout_sec,
+                    on_output=on_output
                 )
+                if result["timed_out"]:
+                    return {"success": False, "error": "Command timeout", "exit_code": -1}
                 return {
-                    "success": result.returncode == 0,
-                    "output": result.stdout,
-                    "error": result.stderr if result.returncode != 0 else None,
-                    "exit_code": result.returncode
+                    "success": result["exit_code"] == 0,
+                    "output": result["stdout"],
+                    "error": result["stderr"] if result["exit_code"] != 0 else None,
+                    "exit_code": result["exit_code"]
                 }
-            except subprocess.TimeoutExpired:
-                return {"success": False, "error": "Command timeout", "exit_code": -1}
             except Exception as e:
                 return {"success": False, "error": str(e), "exit_code": -1}
         
         return {"success": False, "error": f"Unknown tool: {tool_name}"}
 
+    def _sandbox_command(
+        self,
+        tool_name: str,
+        params: Dict[str, Any],
+        tool_def: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Map a tool call to {"argv": [...], "input": Optional[str]} run with the
+        task workspace as working directory, or an error result.
+        """
+        if tool_name == "file_write":
+            # Content is streamed through stdin, never interpolated into the shell
+            dest = os.path.basename(params["path"])
+            return {"argv": ["sh", "-c", 'cat > "$1"', "sh", dest], "input": params["content"]}
+        elif tool_name == "file_read":
+            dest = os.path.basename(params["path"])
+            return {"argv": ["sh", "-c", 'cat "$1" || exit 3', "sh", dest]}
+        elif tool_name == "command_execute":
+            command = params["command"]
+            # validate allowed commands
+            allowed = tool_def.get("allowed_commands", [])
+            if allowed and command not in allowed:
+                return {"success": False, "error": f"Command {command} not allowed", "exit_code": -2}
+            return {"argv": [command] + list(params.get("args", []))}
+        return {"success": False, "error": f"Unknown tool: {tool_name}"}
+
+    def _check_image_policy(self, image: str) -> Optional[Dict[str, Any]]:
+        """Image allowlist / signature enforcement; returns an error result or None"""
+        # image allowlist enforcement (optional)
+        allowed_images_env = os.environ.get("SANDBOX_ALLOWED_IMAGES")
+        if allowed_images_env:
+            allowed_images = [i.strip() for i in allowed_images_env.split(",") if i.strip()]
+            if image not in allowed_images:
+                return {"success": False, "error": f"Image {image} not allowed by SANDBOX_ALLOWED_IMAGES", "exit_code": -3}
+        # optional image signature enforcement
+        require_signed = os.environ.get("SANDBOX_REQUIRE_SIGNED_IMAGES", "false").lower() == "true"
+        if require_signed:
+            try:
+                from runtime.tools.image_signing import verify_image_signed
+                if not verify_image_signed(image):
+                    return {"success": False, "error": f"Image {image} not signed", "exit_code": -4}
+            except Exception:
+                return {"success": False, "error": "Image signing check failed", "exit_code": -5}
+        return None
+
+    @staticmethod
+    def _seccomp_profile() -> Optional[str]:
+        seccomp_profile = os.environ.get("SANDBOX_SECCOMP_PROFILE")
+        if seccomp_profile and os.path.exists(seccomp_profile):
+            return seccomp_profile
+        return None
+
+    async def _docker_run_once(
+        self,
+        docker_path: str,
+        image: str,
+        task_sandbox: str,
+        sandbox_cmd: Dict[str, Any],
+        tool_def: Dict[str, Any],
+        timeout_sec: float,
+        on_output: Optional[OutputCallback]
+    ) -> Dict[str, Any]:
+        """One-shot `docker run --rm`; the named container is removed on timeout"""
+        container_name = f"sandbox_{uuid.uuid4().hex[:12]}"
+        # security: enforce non-root user inside container
+        docker_cmd = [
+            docker_path, "run", "--rm",
+            "--name", container_name,
+            "--network=none",
+            "--cpus", str(tool_def.get("cpu_limit", 0.5)),
+            "--memory", str(tool_def.get("memory_limit", "128m")),
+            "--read-only",
+            "--user", "1000:1000",
+            "-v", f"{os.path.abspath(task_sandbox)}:/workspace:rw",
+            "-w", "/workspace",
+        ]
+        if sandbox_cmd.get("input") is not None:
+            docker_cmd.append("-i")
+        # optional seccomp profile
+        seccomp_profile = self._seccomp_profile()
+        if seccomp_profile:
+            docker_cmd += ["--security-opt", f"seccomp={seccomp_profile}"]
+        docker_cmd.append(image)
+        docker_cmd += sandbox_cmd["argv"]
+
+        result = await run_streaming(
+            docker_cmd,
+            timeout_sec=timeout_sec,
+            input_data=sandbox_cmd.get("input"),
+            on_output=on_output
+        )
+        if result["timed_out"]:
+            # Killing the docker client leaves the container running
+            await run_streaming([docker_path, "rm", "-f", container_name], timeout_sec=30)
+        return result
+
+    def _get_pool(self, tool_def: Dict[str, Any], docker_path: Optional[str]) -> SandboxPool:
+        """Warm pool per (image, resource limits); local stand-in without docker"""
+        image = tool_def.get("image", "")
+        cpu_limit = str(tool_def.get("cpu_limit", 0.5))
+        memory_limit = str(tool_def.get("memory_limit", "128m"))
+        key = f"{image}|{cpu_limit}|{memory_limit}" if docker_path else "local"
+        if key not in self._pools:
+            if docker_path:
+                seccomp_profile = self._seccomp_profile()
+                factory = lambda: DockerSandboxWorker(
+                    docker_path, image, self.sandbox_dir,
+                    cpu_limit=cpu_limit,
+                    memory_limit=memory_limit,
+                    seccomp_profile=seccomp_profile
+                )
+            else:
+                factory = lambda: LocalSandboxWorker(self.sandbox_dir)
+            self._pools[key] = SandboxPool(
+                factory, size=self.warm_pool_size, max_uses=self.max_worker_uses
+            )
+        return self._pools[key]
+
+    async def warm_sandbox_pool(self, tool_names: Optional[List[str]] = None):
+        """Pre-start warm sandbox workers for the given (default: all) tools"""
+        if self.warm_pool_size <= 0:
+            return
+        docker_path = shutil.which("docker")
+        pools = []
+        for name in tool_names or list(self.tool_registry):
+            tool_def = self.tool_registry.get(name)
+            if tool_def is None:
+                continue
+            use_docker = bool(tool_def.get("image") and docker_path)
+            pool = self._get_pool(tool_def, docker_path if use_docker else None)
+            if pool not in pools:
+                pools.append(pool)
+        await asyncio.gather(*(pool.warm() for pool in pools))
+
+    async def close(self):
+        """Stop all warm sandbox workers"""
+        pools, self._pools = list(self._pools.values()), {}
+        await asyncio.gather(*(pool.close() for pool in pools), return_exceptions=True)
+
+    def _tool_slots(self, tool_name: str, tool_def: Dict[str, Any]) -> Optional[asyncio.Semaphore]:
+        """Per-tool concurrency limit (tool_def["max_concurrency"] or dispatcher default)"""
+        limit = tool_def.get("max_concurrency", self.max_concurrency_per_tool)
+        if not limit:
+            return None
+        # Semaphores bind to the loop they first wait on
+        loop = asyncio.get_running_loop()
+        if self._slots_loop is not loop:
+            self._tool_semaphores = {}
+            self._slots_loop = loop
+        if tool_name not in self._tool_semaphores:
+            self._tool_semaphores[tool_name] = asyncio.Semaphore(limit)
+        return self._tool_semaphores[tool_name]
+
+    @staticmethod
+    def _write_text(path: str, content: str):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    @staticmethod
+    def _read_text(path: str) -> str:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
     # =========================================================================
     # TOOL COMPOSITION: Pipeline Execution
     # =========================================================================
@@ -469,15 +637,31 @@ class ToolDispatcher:
         self,
         pipeline: ToolPipeline,
         task_id: str,
-        initial_context: Optional[Dict[str, Any]] = None
+        initial_context: Optional[Dict[str, Any]] = None,
+        max_concurrency: Optional[int] = None
     ) -> Tuple[ToolExecutionTrace, Dict[str, Any]]:
         """
-        Execute a pipeline of tools in sequence.
+        Execute a pipeline of tools as a dependency graph.
+        
+        By default a step keeps its list position: it waits for every
+        earlier step. A step that declares "depends_on" (even an empty list)
+        opts into parallelism and only waits for the latest earlier steps
+        whose output_key it lists there or references through a "${...}"
+        template. Ready steps run concurrently, up to max_concurrency at a
+        time, and the results match sequential execution:
+        - each step sees exactly the outputs of its producers
+        - a failed step without continue_on_error stops every later step:
+          those not started never start, those still running are
+          cancelled and recorded as failed, and none of them (not even one
+          that opted out of ordering and already finished) contributes
+          outputs
+        - final outputs are assembled in step order
         
         Args:
             pipeline: The pipeline definition
             task_id: Task ID for tracking
             initial_context: Initial context/variables for the pipeline
+            max_concurrency: Concurrently running steps (default: pipeline_concurrency)
             
         Returns:
             Tuple of (execution_trace, final_outputs)
@@ -492,51 +676,105 @@ class ToolDispatcher:
         )
         
         context = initial_context or {}
-        final_outputs = {}
+        limit = max(1, max_concurrency or self.pipeline_concurrency)
+        plan = self._plan_pipeline(pipeline.steps)
+        
+        outputs: Dict[int, Any] = {}
+        step_records: Dict[int, ToolExecutionStep] = {}
+        completed: set = set()
+        pending = list(range(len(plan)))
+        running: Dict[asyncio.Task, int] = {}
+        stop_at = len(plan)  # steps at or after this index never start
         all_success = True
         
-        for i, step_def in enumerate(pipeline.steps):
-            tool_name = step_def.get("tool_name")
-            params_template = step_def.get("params", {})
-            output_key = step_def.get("output_key", f"step_{i}_output")
-            continue_on_error = step_def.get("continue_on_error", False)
+        async def run_step(i: int) -> ToolResult:
+            node = plan[i]
+            # Producers' outputs shadow the initial context, exactly as in sequential order
+            step_context = dict(context)
+            for key, producer in node["refs"].items():
+                step_context[key] = outputs.get(producer)
+            resolved_params = self._resolve_params(node["params"], step_context)
             
-            # Resolve parameters from context
-            resolved_params = self._resolve_params(params_template, context)
-            
-            step_id = f"step_{i}_{tool_name}"
             step_start = time.time()
-            
             step = ToolExecutionStep(
-                step_id=step_id,
-                tool_name=tool_name,
+                step_id=node["step_id"],
+                tool_name=node["tool_name"],
                 params=resolved_params,
-                started_at=datetime.now().isoformat()
+                started_at=datetime.now().isoformat(),
+                depends_on=[plan[d]["step_id"] for d in sorted(node["deps"])],
+                start_offset_ms=(step_start - pipeline_start) * 1000
             )
+            step_records[i] = step
             
             # Execute the tool
-            result = await self.execute(tool_name, resolved_params, task_id)
+            try:
+                result = await self.execute(node["tool_name"], resolved_params, task_id)
+            except asyncio.CancelledError:
+                step.completed_at = datetime.now().isoformat()
+                step.end_offset_ms = (time.time() - pipeline_start) * 1000
+                step.success = False
+                step.error = "cancelled: an earlier step failed"
+                raise
             
             step_end = time.time()
             step.completed_at = datetime.now().isoformat()
+            step.end_offset_ms = (step_end - pipeline_start) * 1000
             step.execution_time_ms = (step_end - step_start) * 1000
             step.success = result.success
             step.output = result.output
             step.error = result.error
             step.exit_code = result.exit_code
-            
-            trace.steps.append(step)
-            
-            # Store output in context for subsequent steps
-            context[output_key] = result.output
-            final_outputs[output_key] = result.output
-            
-            if not result.success:
-                all_success = False
-                if not continue_on_error:
+            return result
+        
+        try:
+            while pending or running:
+                # Start every ready step, lowest index first, up to the cap
+                for i in list(pending):
+                    if len(running) >= limit:
+                        break
+                    if i >= stop_at:
+                        pending.remove(i)
+                        continue
+                    if plan[i]["deps"] <= completed:
+                        pending.remove(i)
+                        running[asyncio.ensure_future(run_step(i))] = i
+                
+                if not running:
                     break
+                
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for future in sorted(done, key=running.get):
+                    i = running.pop(future)
+                    if i >= stop_at:
+                        continue
+                    result = future.result()
+                    outputs[i] = result.output
+                    completed.add(i)
+                    if not result.success:
+                        all_success = False
+                        if not plan[i]["continue_on_error"]:
+                            stop_at = min(stop_at, i + 1)
+                
+                # Later steps that started early would never have run in sequence
+                cancelled = [future for future, i in running.items() if i >= stop_at]
+                for future in cancelled:
+                    future.cancel()
+                    running.pop(future)
+                if cancelled:
+                    await asyncio.gather(*cancelled, return_exceptions=True)
+                for i in [i for i in outputs if i >= stop_at]:
+                    del outputs[i]
+        finally:
+            for future in running:
+                future.cancel()
+        
+        # Store outputs in step order so later producers win, as in sequence
+        final_outputs = {}
+        for i in sorted(outputs):
+            final_outputs[plan[i]["output_key"]] = outputs[i]
         
         pipeline_end = time.time()
+        trace.steps = [step_records[i] for i in sorted(step_records)]
         trace.completed_at = datetime.now().isoformat()
         trace.success = all_success
         trace.total_execution_time_ms = (pipeline_end - pipeline_start) * 1000
@@ -547,6 +785,55 @@ class ToolDispatcher:
         
         return trace, final_outputs
     
+    def _plan_pipeline(self, steps: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Derive the step dependency graph.
+        
+        Each "${key}" reference (and each key in "depends_on") binds to the
+        latest earlier step with that output_key; keys no earlier step
+        produces come from the initial context. Steps without "depends_on"
+        also wait for every earlier step not already awaited transitively.
+        """
+        plan = []
+        producers: Dict[str, int] = {}  # output_key -> latest producing step
+        ancestors: List[set] = []  # step -> every step it waits for, transitively
+        for i, step_def in enumerate(steps):
+            tool_name = step_def.get("tool_name")
+            params_template = step_def.get("params", {})
+            
+            refs = {}
+            for key in self._template_refs(params_template) + list(step_def.get("depends_on") or []):
+                if key in producers:
+                    refs[key] = producers[key]
+            deps = set(refs.values())
+            if "depends_on" not in step_def:
+                covered = set().union(*ancestors)
+                deps |= {j for j in range(i) if j not in covered}
+            ancestors.append(deps.union(*(ancestors[d] for d in deps)))
+            
+            output_key = step_def.get("output_key", f"step_{i}_output")
+            plan.append({
+                "step_id": f"step_{i}_{tool_name}",
+                "tool_name": tool_name,
+                "params": params_template,
+                "output_key": output_key,
+                "continue_on_error": step_def.get("continue_on_error", False),
+                "refs": refs,
+                "deps": deps
+            })
+            producers[output_key] = i
+        return plan
+    
+    def _template_refs(self, value: Any) -> List[str]:
+        """Context keys referenced by "${...}" templates (see _resolve_value)"""
+        if isinstance(value, str) and value.startswith("${") and value.endswith("}"):
+            return [value[2:-1]]
+        elif isinstance(value, dict):
+            return [ref for v in value.values() for ref in self._template_refs(v)]
+        elif isinstance(value, list):
+            return [ref for v in value for ref in self._template_refs(v)]
+        return []
+    
     def _resolve_params(
         self,
         params_template: Dict[str, Any],
@@ -626,7 +913,8 @@ class ToolDispatcher:
                 {
                     "tool_name": "file_read",
                     "params": {"path": "${source_path}"},
-                    "output_key": "raw_content"
+                    "output_key": "raw_content",
+                    "depends_on": []
                 },
                 {
                     "tool_name": "file_write",
@@ -634,7 +922,8 @@ class ToolDispatcher:
                         "path": "${output_path}",
                         "content": "${raw_content}"
                     },
-                    "output_key": "write_result"
+                    "output_key": "write_result",
+                    "depends_on": ["raw_content"]
                 }
             ]
         )
@@ -651,7 +940,8 @@ class ToolDispatcher:
                         "args": ["-p", "${artifact_dir}"]
                     },
                     "output_key": "mkdir_result",
-                    "continue_on_error": True
+                    "continue_on_error": True,
+                    "depends_on": []
                 },
                 {
                     "tool_name": "file_write",
@@ -659,7 +949,9 @@ class ToolDispatcher:
                         "path": "${artifact_path}",
                         "content": "${artifact_content}"
                     },
-                    "output_key": "write_result"
+                    "output_key": "write_result",
+                    # The directory must exist first; no "${}" reference implies this ordering
+                    "depends_on": ["mkdir_result"]
                 }
             ]
         )
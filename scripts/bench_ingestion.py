@@ -0,0 +1,123 @@
+"""
+IngestionRunner benchmark: throughput on a synthetic corpus by process count.
+
+Generates a corpus of markdown documents once, then ingests it with each
+process count and prints docs/s and the speedup over one process.
+With --incremental, also ingests through an IngestionCache: a cold run, an
+unchanged re-run and a re-run with --changed percent of the files edited.
+
+    python scripts/bench_ingestion.py --documents 10000 --processes 1 2 4 8
+    python scripts/bench_ingestion.py --documents 10000 --processes 4 --incremental
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from runtime.execution_workers.ingestion_cache import IngestionCache
+from runtime.execution_workers.ingestion_runner import IngestionRunner
+
+PLAN = {
+    "pipeline_steps": ["parse", "chunk", "embed"],
+    "chunking_strategy_id": "fixed_size_v1",
+    "embedding_model_id": "mock-embed-v1",
+    "chunk_size": 512,
+    "chunk_overlap": 50,
+}
+
+WORDS = (
+    "retrieval evidence delivery pipeline agent policy tenant budget chunk "
+    "index embedding governance replay trace cost latency quality document"
+).split()
+
+
+def make_corpus(root: str, documents: int, paragraphs: int, seed: int = 7):
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(documents):
+        path = os.path.join(root, f"doc_{i:05d}.md")
+        text = "\n\n".join(
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 120)))
+            for _ in range(paragraphs)
+        )
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        corpus.append({"file_id": f"doc_{i:05d}", "input_file_ref": {"mime": "text/markdown", "path": path}})
+    return corpus
+
+
+def bench_incremental(workdir: str, corpus, args):
+    cache = IngestionCache(os.path.join(workdir, "cache.db"))
+    processes = args.processes[-1]
+
+    def run(label: str):
+        runner = IngestionRunner(
+            f"bench_{label}", PLAN, artifacts_dir=os.path.join(workdir, "out"),
+            processes=processes, batch_size=args.batch_size, cache=cache
+        )
+        return runner.run(corpus)
+
+    print(f"\nincremental (processes={processes})")
+    print(f"{'run':>10} {'seconds':>8} {'vs cold':>8} {'parse hits':>10} {'doc hits':>8}")
+    cold = run("cold")
+    runs = [("cold", cold), ("unchanged", run("unchanged"))]
+
+    edited = max(1, int(len(corpus) * args.changed / 100))
+    for doc in random.Random(11).sample(corpus, edited):
+        with open(doc["input_file_ref"]["path"], "a", encoding="utf-8") as f:
+            f.write(" edited")
+    runs.append((f"{args.changed:g}% edit", run("changed")))
+
+    for label, summary in runs:
+        hits = summary["cache_hits"]
+        print(
+            f"{label:>10} {summary['elapsed_s']:>8.2f} {summary['elapsed_s'] / cold['elapsed_s']:>8.1%} "
+            f"{hits['PARSING']:>10} {hits['EMBEDDING']:>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--documents", type=int, default=10000)
+    parser.add_argument("--paragraphs", type=int, default=8)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--incremental", action="store_true")
+    parser.add_argument("--changed", type=float, default=1.0, help="percent of files edited")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_ingestion_")
+    try:
+        corpus_dir = os.path.join(workdir, "corpus")
+        os.makedirs(corpus_dir)
+        corpus = make_corpus(corpus_dir, args.documents, args.paragraphs)
+        print(f"cpu_count={os.cpu_count()} documents={args.documents}")
+        print(f"{'processes':>9} {'seconds':>8} {'docs/s':>8} {'speedup':>8} {'chunks':>8}")
+
+        baseline = None
+        for processes in args.processes:
+            runner = IngestionRunner(
+                f"bench_p{processes}", PLAN,
+                artifacts_dir=os.path.join(workdir, "out"),
+                processes=processes, batch_size=args.batch_size
+            )
+            summary = runner.run(corpus)
+            baseline = baseline or summary["docs_per_s"]
+            print(
+                f"{processes:>9} {summary['elapsed_s']:>8.2f} {summary['docs_per_s']:>8.0f} "
+                f"{summary['docs_per_s'] / baseline:>8.2f} {summary['chunks']:>8}"
+            )
+
+        if args.incremental:
+            bench_incremental(workdir, corpus, args)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
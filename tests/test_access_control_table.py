@@ -0,0 +1,119 @@
+"""
+Access control: compiled decision table, decision cache invalidation, background audit writer
+"""
+import json
+import threading
+
+from learning.write_behind import WriteBehindBuffer
+from runtime.governance.access_control import (
+    AccessController,
+    ActionType,
+    Permission,
+    ResourceType,
+    Role,
+)
+
+
+def test_compiled_table_matches_permission_scan(tmp_path):
+    controller = AccessController(artifacts_dir=str(tmp_path))
+
+    allowed = controller.check_access("data_agent", ResourceType.TOOL, "retriever", ActionType.EXECUTE)
+    assert allowed.allowed and allowed.reason == "Granted by permission data_tool_exec"
+
+    denied = controller.check_access("data_agent", ResourceType.TOOL, "shell", ActionType.EXECUTE)
+    assert not denied.allowed
+    assert denied.reason == "No matching permission in role data_agent"
+
+    wildcard = controller.check_access("orchestrator_agent", ResourceType.TOOL, "shell", ActionType.EXECUTE)
+    assert wildcard.reason == "Granted by permission orch_tool_exec"
+
+    unknown = controller.check_access("ghost", ResourceType.DATA, "x", ActionType.READ)
+    assert unknown.reason == "No role assigned to agent ghost"
+
+    # Plain string resource types / actions resolve to the same entries
+    assert controller.check_access("data_agent", "data", "docs", "read").allowed
+
+    # Unknown names are denied, not raised
+    bogus = controller.check_access("orchestrator_agent", "tool", "shell", "launch")
+    assert bogus.allowed is False and bogus.reason.startswith("Unknown resource type or action")
+    assert bogus.to_dict()["action"] == "launch"
+
+
+def test_earliest_permission_wins_and_admin_matches_everything(tmp_path):
+    controller = AccessController(artifacts_dir=str(tmp_path))
+    controller.create_role(Role("mixed", "Mixed", "", [
+        Permission("revoked", ResourceType.DATA, "docs", ActionType.READ, granted=False),
+        Permission("any_read", ResourceType.DATA, "*", ActionType.READ),
+        Permission("docs_read", ResourceType.DATA, "docs", ActionType.READ),
+    ]))
+    controller.assign_role("agent_1", "mixed")
+    assert controller.check_access("agent_1", ResourceType.DATA, "docs", ActionType.READ).reason == \
+        "Granted by permission any_read"
+
+    controller.assign_role("agent_1", "admin")
+    decision = controller.check_access("agent_1", ResourceType.MEMORY, "m", ActionType.DELETE)
+    assert decision.allowed and decision.reason == "Granted by permission admin_all"
+
+
+def test_role_changes_invalidate_cached_decisions(tmp_path):
+    controller = AccessController(artifacts_dir=str(tmp_path))
+    controller.assign_role("agent_1", "readonly")
+    assert not controller.check_access("agent_1", ResourceType.DATA, "d", ActionType.WRITE).allowed
+
+    controller.create_role(Role("readonly", "Read Write", "", [
+        Permission("rw", ResourceType.DATA, "*", ActionType.WRITE),
+    ]))
+    assert controller.check_access("agent_1", ResourceType.DATA, "d", ActionType.WRITE).allowed
+
+    controller.assign_role("agent_1", "data_agent")
+    assert not controller.check_access("agent_1", ResourceType.DATA, "d", ActionType.WRITE).allowed
+
+
+def test_audit_records_are_written_off_the_calling_thread(tmp_path, monkeypatch):
+    writer_threads = []
+    original = WriteBehindBuffer._append_records
+
+    def tracking_append(self, path, batch):
+        writer_threads.append(threading.current_thread())
+        original(self, path, batch)
+
+    monkeypatch.setattr(WriteBehindBuffer, "_append_records", tracking_append)
+
+    controller = AccessController(artifacts_dir=str(tmp_path), audit_flush_interval_s=3600)
+    for i in range(100):
+        controller.check_access("data_agent", ResourceType.DATA, f"doc_{i % 5}", ActionType.READ)
+    controller.check_access("ghost", ResourceType.DATA, "doc", ActionType.READ)  # not audited
+    assert threading.current_thread() not in writer_threads
+
+    controller.flush_audit_log()
+    with open(tmp_path / "governance" / "acl" / "access_log.jsonl", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert len(records) == 100
+    assert records[0]["decision"]["resource_type"] == "data"
+    assert records[0]["decision"]["allowed"] is True
+
+
+def test_decision_cache_is_safe_across_threads(tmp_path):
+    controller = AccessController(artifacts_dir=str(tmp_path))
+    controller.DECISION_CACHE_SIZE = 8
+    errors = []
+
+    def hammer(worker):
+        try:
+            for i in range(3000):
+                decision = controller.check_access(
+                    "data_agent", ResourceType.TOOL, f"tool_{(i * 7 + worker) % 20}", ActionType.EXECUTE
+                )
+                assert decision.allowed is False
+                if i % 500 == 0:
+                    controller.assign_role("data_agent", "data_agent")
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=hammer, args=(w,)) for w in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert len(controller._decisions) <= 8
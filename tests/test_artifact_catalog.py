@@ -0,0 +1,140 @@
+"""
+ArtifactCatalog: incremental SQLite index behind ArtifactBrowser and ArtifactDataSource
+"""
+import json
+import os
+import time
+from datetime import datetime
+
+from runtime.cognitive_ui.data_source import ArtifactDataSource
+from runtime.observability.artifact_catalog import ArtifactCatalog
+from runtime.observability.tools import ArtifactBrowser
+from runtime.platform.trace_store import TraceStore, TraceSummary
+
+
+def _write(root, rel_path, data):
+    path = root / rel_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(data if isinstance(data, str) else json.dumps(data))
+    return path
+
+
+def _bump_mtime(path):
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+def test_refresh_only_reparses_changed_files(tmp_path, monkeypatch):
+    for i in range(20):
+        _write(tmp_path, f"eval/run_{i}.json", {"run_id": f"run_{i}", "quality": i})
+    _write(tmp_path, "eval/broken.json", "{ invalid")
+    catalog = ArtifactCatalog(str(tmp_path), refresh_interval_s=3600)
+    assert catalog.refresh(force=True) == 22  # 21 files + eval/
+
+    parsed = []
+    original = ArtifactCatalog._preview
+    monkeypatch.setattr(
+        ArtifactCatalog, "_preview",
+        lambda self, path, ext, size: parsed.append(path) or original(self, path, ext, size)
+    )
+    changed = _write(tmp_path, "eval/run_3.json", {"run_id": "run_3", "quality": 99})
+    _bump_mtime(changed)
+    (tmp_path / "eval" / "run_4.json").unlink()
+    assert catalog.refresh(force=True) == 2
+    assert parsed == [str(changed)]
+
+    # Reads never scan; they are served from the index as-is
+    _write(tmp_path, "eval/run_new.json", {})
+    assert catalog.count(artifact_type="eval") == 19
+    catalog.record(str(tmp_path / "eval" / "run_new.json"))
+    assert catalog.count(artifact_type="eval") == 20
+
+    # A reopened catalog starts from the persisted index
+    catalog.close()
+    reopened = ArtifactCatalog(str(tmp_path), refresh_interval_s=3600)
+    parsed.clear()
+    assert reopened.refresh(force=True) == 0
+    assert parsed == []
+
+
+def test_browser_search_paging_and_stats(tmp_path):
+    for i in range(30):
+        path = _write(tmp_path, f"goals/run_{i:02d}_plan.json", {"step": "x" * (300 if i == 0 else 1)})
+        os.utime(path, (1_700_000_000 + i, 1_700_000_000 + i))
+    _write(tmp_path, "eval/run_05.json", {"quality_score": 0.9})
+    _write(tmp_path, "eval/notes.txt", "ignored")
+
+    browser = ArtifactBrowser(str(tmp_path))
+    first_page = browser.search_artifacts(artifact_type="goals", limit=10)
+    second_page = browser.search_artifacts(artifact_type="goals", limit=10, offset=10)
+    assert [a["file"] for a in first_page][:2] == ["run_29_plan.json", "run_28_plan.json"]
+    assert {a["file"] for a in first_page}.isdisjoint(a["file"] for a in second_page)
+    assert browser.count_artifacts(artifact_type="goals") == 30
+
+    hits = browser.search_artifacts(run_id="run_05")
+    assert sorted(a["path"] for a in hits) == [
+        os.path.join("eval", "run_05.json"), os.path.join("goals", "run_05_plan.json")
+    ]
+    oldest = browser.search_artifacts(artifact_type="goals", limit=1, offset=29)[0]
+    assert oldest["preview"].endswith("...") and len(oldest["preview"]) == 203
+
+    stats = browser.get_artifact_stats()
+    assert stats["total_artifacts"] == 31
+    assert stats["by_type"] == {"goals": 30, "eval": 1}
+    assert stats["oldest"] == datetime.fromtimestamp(1_700_000_000).isoformat()
+
+
+def test_watcher_picks_up_new_files(tmp_path):
+    _write(tmp_path, "eval/a.json", {})
+    catalog = ArtifactCatalog(str(tmp_path))
+    catalog.start_watcher(interval_s=0.05)
+    try:
+        _write(tmp_path, "eval/b.json", {})
+        deadline = time.time() + 5
+        while catalog.count() < 2 and time.time() < deadline:
+            time.sleep(0.05)
+        assert catalog.count() == 2
+    finally:
+        catalog.close()
+
+
+def test_data_source_lists_from_index_and_reuses_parsed_files(tmp_path, monkeypatch):
+    for i in range(5):
+        _write(tmp_path, f"rag_project/task_{i}/delivery_manifest.json", {"executed_agents": ["Data"]})
+    _write(tmp_path, "trace_store/summaries/task_9.json", {"state": "completed"})
+    (tmp_path / "rag_project" / "task_0" / "extra").mkdir()
+
+    source = ArtifactDataSource(artifacts_root=str(tmp_path))
+    assert source.list_tasks() == [f"task_{i}" for i in range(5)] + ["task_9"]
+    assert source.list_tasks(limit=2, offset=4) == ["task_4", "task_9"]
+    assert source._list_artifacts("task_0") == ["delivery_manifest.json", "extra"]
+
+    assert source.load_task_summary("task_1")["agents_executed"] == ["Data"]
+    opened = []
+    real_open = open
+    monkeypatch.setattr("builtins.open", lambda *a, **k: opened.append(a[0]) or real_open(*a, **k))
+    assert source.load_task_summary("task_1")["agents_executed"] == ["Data"]
+    assert opened == []
+
+    # A rewritten file is parsed again
+    path = _write(tmp_path, "rag_project/task_1/delivery_manifest.json", {"executed_agents": ["Eval"]})
+    _bump_mtime(path)
+    assert source.load_task_summary("task_1")["agents_executed"] == ["Eval"]
+
+
+def test_writers_update_the_index_without_a_scan(tmp_path, monkeypatch):
+    _write(tmp_path, "trace_store/summaries/task_0.json", {"state": "completed"})
+    source = ArtifactDataSource(artifacts_root=str(tmp_path))
+    assert source.list_tasks() == ["task_0"]
+    catalog = source.catalog
+    assert catalog._watcher is not None
+    catalog.stop_watcher()
+
+    def no_scan(self):
+        raise AssertionError("reads must not scan the tree")
+
+    monkeypatch.setattr(ArtifactCatalog, "_scan", no_scan)
+    TraceStore(base_dir=str(tmp_path / "trace_store")).save_summary(TraceSummary(task_id="task_1", state="running"))
+    assert source.list_tasks() == ["task_0", "task_1"]
+    assert ArtifactDataSource(artifacts_root=str(tmp_path)).list_tasks() == ["task_0", "task_1"]
+    catalog.close()
@@ -0,0 +1,185 @@
+"""
+ControlPlane: persisted fenced leases, indexed worker selection, heartbeat expiry, work stealing
+"""
+import multiprocessing
+import queue as queue_module
+import time
+
+from runtime.distributed.control_plane import ControlPlane
+
+
+def _plane(tmp_path, **kwargs):
+    return ControlPlane(artifacts_path=str(tmp_path), **kwargs)
+
+
+def test_selects_least_loaded_capable_worker(tmp_path):
+    cp = _plane(tmp_path)
+    cp.register_worker("h", 1, ["rag"], max_concurrent_tasks=2, worker_id="rag1")
+    cp.register_worker("h", 2, ["rag", "gpu"], max_concurrent_tasks=2, worker_id="gpu1")
+    cp.register_worker("h", 3, ["rag"], max_concurrent_tasks=2, worker_id="rag2")
+
+    gpu_lease = cp.schedule_task({"task_id": "g1"}, required_capabilities=["gpu"])
+    assert cp.leases[gpu_lease].worker_id == "gpu1"
+    owners = [cp.leases[cp.schedule_task({"task_id": f"r{i}"})].worker_id for i in range(4)]
+    # rag1 and rag2 are empty, gpu1 already holds one task
+    assert sorted(owners[:2]) == ["rag1", "rag2"]
+    assert cp.workers["gpu1"].status == "busy"
+
+    # No gpu capacity left: the task waits and is dispatched when a slot frees
+    assert cp.schedule_task({"task_id": "g2"}, required_capabilities=["gpu"]) is None
+    assert cp.get_stats()["tasks"]["pending"] == 1
+    cp.complete_task(gpu_lease, {"ok": True})
+    assert [l.task_id for l in cp.leases_for_worker("gpu1")][-1] == "g2"
+    assert cp.get_stats()["tasks"]["pending"] == 0
+
+
+def test_leases_survive_restart_with_fencing(tmp_path):
+    cp = _plane(tmp_path)
+    cp.register_worker("h", 1, [], max_concurrent_tasks=1, worker_id="w1")
+    first = cp.schedule_task({"task_id": "t1"})
+    assert cp.schedule_task({"task_id": "t2"}) is None
+    token = cp.leases[first].fencing_token
+    cp.close()
+
+    restarted = _plane(tmp_path)
+    assert restarted.leases[first].fencing_token == token
+    assert restarted.workers["w1"].current_tasks == ["t1"]
+    assert restarted.get_stats()["tasks"]["pending"] == 1
+
+    assert not restarted.complete_task(first, {}, fencing_token=token - 1)
+    assert restarted.complete_task(first, {}, fencing_token=token)
+    assert restarted.get_lease(first).status == "completed"
+    second = restarted.leases_for_worker("w1")[0]
+    assert second.task_id == "t2" and second.fencing_token > token
+
+
+def test_missed_heartbeats_requeue_to_live_workers(tmp_path):
+    cp = _plane(tmp_path, heartbeat_timeout=0.05)
+    cp.register_worker("h", 1, [], max_concurrent_tasks=5, worker_id="dead")
+    stale = [cp.schedule_task({"task_id": f"t{i}"}) for i in range(3)]
+    cp.register_worker("h", 2, [], max_concurrent_tasks=5, worker_id="alive")
+
+    time.sleep(0.1)
+    cp.heartbeat("alive")
+    summary = cp.tick()
+    assert summary["offline_workers"] == ["dead"]
+    assert sorted(l.task_id for l in cp.leases_for_worker("alive")) == ["t0", "t1", "t2"]
+    assert not cp.complete_task(stale[0], {})
+
+    # A worker that comes back starts empty and takes new work again
+    assert cp.heartbeat("dead")
+    assert cp.workers["dead"].status == "idle"
+
+
+def test_idle_worker_steals_unstarted_leases(tmp_path):
+    cp = _plane(tmp_path)
+    cp.register_worker("h", 1, ["rag"], max_concurrent_tasks=10, worker_id="busy")
+    leases = [cp.schedule_task({"task_id": f"t{i}"}) for i in range(6)]
+    cp.start_task(leases[0], cp.leases[leases[0]].fencing_token)
+    cp.register_worker("h", 2, ["rag"], max_concurrent_tasks=10, worker_id="idle")
+
+    assert cp.rebalance() == 3
+    assert len(cp.workers["busy"].current_tasks) == 3
+    assert len(cp.workers["idle"].current_tasks) == 3
+    # The started task stays, the newest ones move
+    assert leases[0] in cp.leases
+    assert cp.get_lease(leases[-1]).status == "stolen"
+    assert not cp.complete_task(leases[-1], {})
+    assert cp.get_stats()["statistics"]["total_tasks_stolen"] == 3
+
+
+def test_regranted_leases_require_the_fencing_token(tmp_path):
+    cp = _plane(tmp_path, heartbeat_timeout=0.05)
+    cp.register_worker("h", 1, [], max_concurrent_tasks=5, worker_id="dead")
+    cp.schedule_task({"task_id": "t0"})
+    cp.register_worker("h", 2, [], max_concurrent_tasks=5, worker_id="alive")
+
+    time.sleep(0.1)
+    cp.heartbeat("alive")
+    cp.tick()
+    [lease] = cp.leases_for_worker("alive")
+    assert lease.attempt == 2
+
+    # Without the token, or from another worker, the re-granted lease is untouched
+    assert not cp.start_task(lease.lease_id)
+    assert not cp.complete_task(lease.lease_id, {})
+    assert not cp.complete_task(lease.lease_id, {}, lease.fencing_token, worker_id="dead")
+    assert cp.get_lease(lease.lease_id).status == "leased"
+    assert cp.complete_task(lease.lease_id, {}, lease.fencing_token, worker_id="alive")
+
+
+def _simulated_worker(worker_id, inbox, outbox, work_s):
+    """Heartbeat, start and finish leases pushed by the control plane"""
+    while True:
+        outbox.put(("heartbeat", worker_id, None, None))
+        try:
+            message = inbox.get(timeout=0.02)
+        except queue_module.Empty:
+            continue
+        if message is None:
+            return
+        lease_id, token = message
+        outbox.put(("start", worker_id, lease_id, token))
+        time.sleep(work_s)
+        outbox.put(("complete", worker_id, lease_id, token))
+
+
+def test_simulated_worker_processes_with_crash_and_restart(tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    outbox = ctx.Queue()
+    inboxes = {f"w{i}": ctx.Queue() for i in range(3)}
+    procs = {
+        wid: ctx.Process(target=_simulated_worker, args=(wid, inbox, outbox, 0.01), daemon=True)
+        for wid, inbox in inboxes.items()
+    }
+
+    cp = _plane(tmp_path, heartbeat_timeout=0.3)
+    for wid in procs:
+        cp.register_worker("localhost", 0, ["rag"], max_concurrent_tasks=3, worker_id=wid)
+    for proc in procs.values():
+        proc.start()
+    task_ids = [f"t{i}" for i in range(40)]
+    for task_id in task_ids:
+        cp.schedule_task({"task_id": task_id}, required_capabilities=["rag"])
+
+    completed = {}
+    sent = set()
+    killed = restarted = False
+    deadline = time.monotonic() + 30
+    while len(completed) < len(task_ids) and time.monotonic() < deadline:
+        for wid, inbox in inboxes.items():
+            for lease in cp.leases_for_worker(wid):
+                if lease.lease_id not in sent:
+                    sent.add(lease.lease_id)
+                    inbox.put((lease.lease_id, lease.fencing_token))
+        try:
+            kind, wid, lease_id, token = outbox.get(timeout=0.01)
+        except queue_module.Empty:
+            kind = None
+        if kind == "heartbeat" and procs[wid].is_alive():
+            cp.heartbeat(wid)
+        elif kind == "start":
+            cp.start_task(lease_id, token)
+        elif kind == "complete":
+            task_id = cp.leases[lease_id].task_id if lease_id in cp.leases else None
+            if cp.complete_task(lease_id, {"by": wid}, fencing_token=token):
+                assert task_id not in completed
+                completed[task_id] = wid
+
+        if not killed and len(completed) >= 5:
+            procs["w0"].kill()
+            killed = True
+        if killed and not restarted and len(completed) >= 20:
+            cp.close()
+            cp = _plane(tmp_path, heartbeat_timeout=0.3)
+            restarted = True
+        cp.tick()
+
+    for wid, inbox in inboxes.items():
+        inbox.put(None)
+    for proc in procs.values():
+        proc.join(timeout=5)
+
+    assert sorted(completed) == sorted(task_ids)
+    assert cp.workers["w0"].status == "offline"
+    assert not cp.leases
@@ -0,0 +1,90 @@
+"""
+DataAgent: streaming file validation, result cache and inline validation without re-serialization
+"""
+import asyncio
+import hashlib
+import json
+import os
+
+from runtime.agents.data_agent import DataAgent
+
+
+def _agent(chunk_size: int = 64) -> DataAgent:
+    agent = DataAgent()
+    agent.CHUNK_SIZE = chunk_size
+    agent.SCHEMA_SAMPLE_CHARS = 128
+    return agent
+
+
+def test_file_validation_streams_in_chunks(tmp_path):
+    path = tmp_path / "notes.log"
+    body = ("lorem ipsum " * 200) + "reach me at someone@example.com\n" + ("dolor " * 200)
+    path.write_bytes(body.encode("utf-8"))
+
+    result = asyncio.run(_agent()._validate_file_source(str(path), "t1"))
+
+    assert result.valid
+    assert result.data_hash == hashlib.sha256(body.encode("utf-8")).hexdigest()[:16]
+    assert "email" in result.pii_types  # straddles 64-byte chunk boundaries
+    assert result.schema_detected["type"] == "text"
+    assert result.schema_detected["length"] == len(body)
+    assert result.schema_detected["sampled"] is True
+
+
+def test_file_validation_is_cached_by_size_and_mtime(tmp_path, monkeypatch):
+    path = tmp_path / "data.json"
+    path.write_text(json.dumps({"a": 1, "b": [1, 2, 3]}), encoding="utf-8")
+    agent = _agent()
+
+    calls = []
+    original = agent._scan_file_source
+    monkeypatch.setattr(agent, "_scan_file_source", lambda p: calls.append(p) or original(p))
+
+    first = asyncio.run(agent._validate_file_source(str(path), "t1"))
+    second = asyncio.run(agent._validate_file_source(str(path), "t2"))
+    assert len(calls) == 1
+    assert second.to_dict() == first.to_dict()
+    assert first.schema_detected == {"type": "json", "format": "object", "keys": ["a", "b"]}
+
+    path.write_text(json.dumps([{"a": 1}] * 50), encoding="utf-8")
+    os.utime(path, ns=(1, 1))
+    third = asyncio.run(agent._validate_file_source(str(path), "t3"))
+    assert len(calls) == 2
+    assert third.schema_detected == {"type": "json", "format": "array", "sampled": True}
+
+
+def test_file_read_does_not_block_event_loop(tmp_path):
+    path = tmp_path / "big.txt"
+    path.write_bytes(b"plain text line\n" * 200_000)
+    agent = _agent(chunk_size=4096)
+
+    async def main():
+        ticks = 0
+        done = asyncio.Event()
+
+        async def ticker():
+            nonlocal ticks
+            while not done.is_set():
+                ticks += 1
+                await asyncio.sleep(0)
+
+        task = asyncio.create_task(ticker())
+        result = await agent._validate_file_source(str(path), "t1")
+        done.set()
+        await task
+        return result, ticks
+
+    result, ticks = asyncio.run(main())
+    assert result.valid
+    assert ticks > 1
+
+
+def test_inline_data_hash_matches_serialized_form():
+    data = {"rows": [{"contact": "someone@example.com"}, {"note": None}]}
+
+    result = asyncio.run(_agent()._validate_inline_data(data, "t1"))
+
+    expected = hashlib.sha256(json.dumps(data, ensure_ascii=False).encode()).hexdigest()[:16]
+    assert result.data_hash == expected
+    assert result.pii_types == ["email"]
+    assert result.schema_detected == {"type": "json", "format": "object", "keys": ["rows"]}
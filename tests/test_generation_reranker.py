@@ -0,0 +1,96 @@
+"""
+Generation reranker: vectorized batch scoring, trained weights, buffered result log
+"""
+import json
+import random
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from generation.generation_reranker import FEATURES, GenerationReranker, LinearScoringModel
+
+
+def _candidate(cid, content, cost=0.0, quality=0.5):
+    return SimpleNamespace(candidate_id=cid, content=content, estimated_cost=cost, estimated_quality=quality)
+
+
+def test_features_and_single_rerank(tmp_path):
+    reranker = GenerationReranker(artifacts_path=str(tmp_path))
+    short = _candidate("short", "ok", cost=0.05, quality=0.4)
+    cited = _candidate("cited", "Because of [1] the refund applies within thirty days of the purchase date", quality=0.9)
+
+    features = reranker.extract_features([short, cited], [{"documents": []}, {"documents": []}])
+    assert features.shape == (2, len(FEATURES))
+    np.testing.assert_allclose(features[0], [(0.01 + 0.7) / 2, 0.6, (0.5 + 0.16) / 2, 0.4])
+    np.testing.assert_allclose(features[1], [(min(1, len(cited.content) / 200) + 1.0) / 2, 1.0, 1.0, 0.9])
+    # Without documents evidence coverage is neutral
+    assert reranker.extract_features([cited], [{}])[0, 0] == 0.5
+
+    result = reranker.rerank([short, cited], {"documents": []})
+    assert result.chosen_candidate.candidate_id == "cited"
+    assert [c.rank for c in result.rejected_candidates] == [2]
+    assert abs(result.chosen_candidate.score.total_score - reranker.score(cited, {"documents": []}).total_score) < 1e-12
+
+
+def test_batch_matches_single_and_is_fast(tmp_path):
+    random.seed(7)
+    words = "because the refund policy therefore since based on [1] evidence shows within days".split()
+    requests = [
+        ([
+            _candidate(f"r{r}c{j}", " ".join(random.choice(words) for _ in range(random.randint(1, 60))),
+                       cost=random.choice([0.0, 0.001, 0.02, 0.2]), quality=random.random())
+            for j in range(8)
+        ], {"documents": [1]} if r % 3 else {})
+        for r in range(1000)
+    ]
+    reranker = GenerationReranker(artifacts_path=str(tmp_path))
+
+    start = time.perf_counter()
+    batch = reranker.rerank_batch(requests)
+    assert time.perf_counter() - start < 1.0
+    assert len(batch) == 1000
+
+    for r in (0, 1, 500, 999):
+        single = reranker.rerank(*requests[r])
+        full = batch.result(r)
+        assert [c.candidate_id for c in batch.ranking(r)] == \
+            [single.chosen_candidate.candidate_id] + [c.candidate_id for c in single.rejected_candidates]
+        assert full.chosen_candidate.score == single.chosen_candidate.score
+        assert batch.chosen(r).candidate_id == full.chosen_candidate.candidate_id
+
+    # Ties keep generation order
+    tie = [_candidate("a", "same"), _candidate("b", "same")]
+    assert [c.candidate_id for c in reranker.rerank_batch([(tie, {})]).ranking(0)] == ["a", "b"]
+
+
+def test_trained_scoring_model(tmp_path):
+    reranker = GenerationReranker(artifacts_path=str(tmp_path / "default"))
+    cheap = _candidate("cheap", "short answer", cost=0.0, quality=0.2)
+    good = _candidate("good", "short answer", cost=0.09, quality=0.95)
+    assert reranker.rerank([cheap, good], {}).chosen_candidate.candidate_id == "cheap"
+
+    # Feedback says observed quality tracks model confidence only
+    rng = np.random.default_rng(0)
+    features = rng.random((200, len(FEATURES)))
+    model = LinearScoringModel.fit(features, features[:, 3], version="feedback-v1")
+    assert model.weights["confidence"] > 0.95 and abs(model.weights["cost_efficiency"]) < 0.05
+
+    path = str(tmp_path / "model.json")
+    model.save(path)
+    trained = GenerationReranker(artifacts_path=str(tmp_path / "trained"), scoring_model=path)
+    assert trained.scoring_model.version == "feedback-v1"
+    assert trained.rerank([cheap, good], {}).chosen_candidate.candidate_id == "good"
+
+
+def test_results_go_to_buffered_log(tmp_path):
+    reranker = GenerationReranker(artifacts_path=str(tmp_path), log_flush_interval_s=60)
+    requests = [([_candidate(f"{r}a", "x"), _candidate(f"{r}b", "because [1] y")], {}) for r in range(3)]
+    reranker.rerank_batch(requests)
+    assert list(tmp_path.glob("*.json")) == []
+
+    reranker.flush()
+    with open(tmp_path / "rerank_log.jsonl", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [r["chosen"] for r in records] == ["0b", "1b", "2b"]
+    assert records[0]["ranking"] == ["0b", "0a"] and records[0]["model_version"] == "default"
@@ -0,0 +1,127 @@
+"""
+Delivery index build: dedup, versioned publish and hot reload by the online engine
+"""
+import json
+import os
+
+from backend.online.pipeline import OnlineQueryEngine, run_online_query
+from runtime.execution_workers.ingestion_runner import IngestionRunner
+from runtime.rag_delivery.index_builder import build_index, current_version, dedupe_chunks
+from runtime.rag_delivery.worker import build_delivery
+
+PLAN = {
+    "pipeline_steps": ["parse", "chunk", "embed"],
+    "chunking_strategy_id": "fixed_size_v1",
+    "embedding_model_id": "mock-embed-v1",
+    "chunk_size": 200,
+    "chunk_overlap": 20,
+}
+
+BASE = (
+    "The quarterly report shows revenue grew by twelve percent compared with last year, "
+    "driven by strong demand in the enterprise segment and new customer acquisition across all regions."
+)
+
+
+def _ingest(tmp_path, run_id, texts):
+    corpus = tmp_path / run_id
+    corpus.mkdir()
+    documents = []
+    for i, text in enumerate(texts):
+        path = corpus / f"doc{i}.md"
+        path.write_text(text)
+        documents.append({"file_id": f"doc{i}", "input_file_ref": {"mime": "text/markdown", "path": str(path)}})
+    runner = IngestionRunner(run_id, PLAN, artifacts_dir=str(tmp_path / "ingest"), processes=0)
+    runner.run(documents)
+    return runner.chunks_path
+
+
+def _payload(chunks_path):
+    return {
+        "delivery_spec": {"audience": "test"},
+        "data_manifest": {"files": [{"file_id": "doc0"}]},
+        "chunking_strategy": {"version": "v1"},
+        "retrieval_config": {"topk": 3},
+        "model_routing_config": {"embedding": "mock"},
+        "chunks_paths": [chunks_path],
+    }
+
+
+def test_dedupe_exact_and_near_duplicates():
+    chunks = [
+        {"chunk_id": "a", "content": BASE},
+        {"chunk_id": "b", "content": BASE.upper()},
+        {"chunk_id": "c", "content": BASE[:-1] + " worldwide."},
+        {"chunk_id": "d", "content": "Shipping is free for orders above fifty dollars placed before noon."},
+    ]
+    kept, removed = dedupe_chunks(chunks)
+    assert [ch["chunk_id"] for ch in kept] == ["a", "d"]
+    assert removed == {"exact": 1, "near": 1}
+
+
+def test_delivery_builds_versioned_indexes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    chunks_path = _ingest(tmp_path, "r1", [BASE, BASE, "Refunds are accepted within 30 days of purchase."])
+    res = build_delivery("d1", _payload(chunks_path))
+
+    with open(res["delivery_bundle_path"], encoding="utf-8") as f:
+        bundle = json.load(f)
+    stats = bundle["index"]
+    assert stats["chunks_in"] == 3 and stats["chunks_indexed"] == 2
+    assert stats["duplicates_removed"]["exact"] == 1
+    assert stats["index_bytes"] > 0 and stats["chunks_per_second"] > 0
+    index_root = bundle["index_path"]
+    assert current_version(index_root) == res["index_version"] == stats["version"]
+    with open(os.path.join(index_root, "vector_manifest.json"), encoding="utf-8") as f:
+        assert json.load(f)["status"] == "built"
+
+    result = run_online_query("general", "refund days", index_dir=index_root)
+    assert "30 days" in result["answer"]
+    assert result["trace"]["index_version"] == stats["version"]
+
+    # Rebuilding unchanged content republishes the same version
+    again = build_delivery("d1", _payload(chunks_path))
+    assert again["index_version"] == res["index_version"]
+
+
+def test_engine_hot_swaps_published_version(tmp_path):
+    root = str(tmp_path / "index")
+    first = build_index([{"chunk_id": "a", "content": "Refunds are accepted within 30 days."}], root)
+    engine = OnlineQueryEngine(index_root=root)
+    pinned = OnlineQueryEngine(index_root=root, index_version=first["version"])
+    assert engine.index_version == first["version"]
+    before = run_online_query("general", "refund days", engine=engine)
+    assert "30 days" in before["answer"]
+
+    second = build_index([{"chunk_id": "b", "content": "Refunds are accepted within 14 days."}], root)
+    assert second["version"] != first["version"]
+    after = run_online_query("general", "refund days", engine=engine)
+    assert after["trace"]["index_version"] == second["version"]
+    assert after["trace"]["cache"] == "miss"
+    assert "14 days" in after["answer"]
+    # A pinned engine keeps serving its version
+    assert "30 days" in run_online_query("general", "refund days", engine=pinned)["answer"]
+
+    # Old versions are pruned, the current one never is
+    for i in range(4):
+        build_index([{"chunk_id": f"x{i}", "content": f"Filler document number {i}."}], root, keep_versions=2)
+    assert len(os.listdir(os.path.join(root, "versions"))) == 2
+    assert engine.refresh() is True
+
+
+def test_empty_build_keeps_the_serving_version(tmp_path, monkeypatch):
+    root = str(tmp_path / "index")
+    first = build_index([{"chunk_id": "a", "content": "Refunds are accepted within 30 days."}], root)
+    skipped = build_index([{"chunk_id": "blank", "content": "   "}], root)
+    assert skipped["status"] == "skipped" and skipped["chunks_indexed"] == 0
+    assert skipped["version"] == first["version"] == current_version(root)
+
+    # A delivery without chunks leaves its published index alone
+    monkeypatch.chdir(tmp_path)
+    chunks_path = _ingest(tmp_path, "r1", [BASE])
+    built = build_delivery("d1", _payload(chunks_path))
+    empty = build_delivery("d1", dict(_payload(chunks_path), chunks_paths=[]))
+    index_root = os.path.join("artifacts", "rag_delivery", "d1", "index")
+    assert empty["index_version"] == built["index_version"] == current_version(index_root)
+    with open(os.path.join(index_root, "vector_manifest.json"), encoding="utf-8") as f:
+        assert json.load(f)["status"] == "skipped"
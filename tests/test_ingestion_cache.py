@@ -0,0 +1,95 @@
+"""
+Ingestion cache: content-addressed reuse of parse / chunk / embedding outputs
+"""
+import json
+
+from runtime.execution_workers.ingestion_cache import IngestionCache
+from runtime.execution_workers.ingestion_runner import IngestionRunner
+
+PLAN = {
+    "pipeline_steps": ["parse", "chunk", "embed"],
+    "chunking_strategy_id": "fixed_size_v1",
+    "embedding_model_id": "mock-embed-v1",
+    "chunk_size": 120,
+    "chunk_overlap": 20,
+}
+
+
+def _corpus(tmp_path, n=12):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    documents = []
+    for i in range(n):
+        path = corpus / f"doc{i}.md"
+        path.write_text("\n\n".join(f"Doc {i} paragraph {p} " + "words " * 15 for p in range(5)))
+        documents.append({"file_id": f"doc{i}", "input_file_ref": {"mime": "text/markdown", "path": str(path)}})
+    documents.append({"file_id": "inline", "input_file_ref": {"mime": "text/plain", "content": "Inline text"}})
+    documents.append({"file_id": "bad", "input_file_ref": {"mime": "image/png", "path": "x.png"}})
+    return documents
+
+
+def _run(tmp_path, run_id, documents, plan=PLAN, cache=None):
+    runner = IngestionRunner(
+        run_id, plan, artifacts_dir=str(tmp_path / "out"), processes=0, batch_size=4, cache=cache
+    )
+    summary = runner.run(documents)
+    with open(runner.chunks_path, encoding="utf-8") as f:
+        records = sorted((json.loads(line) for line in f), key=lambda r: r["file_id"])
+    with open(runner.evidence_path, encoding="utf-8") as f:
+        evidence = [json.loads(line) for line in f]
+    return summary, records, evidence
+
+
+def test_unchanged_corpus_is_served_from_cache(tmp_path):
+    documents = _corpus(tmp_path)
+    cache = IngestionCache(str(tmp_path / "cache.db"))
+    _, expected, _ = _run(tmp_path, "plain", documents)
+
+    cold, records, _ = _run(tmp_path, "cold", documents, cache=cache)
+    assert records == expected
+    assert cold["cache_hits"] == {"PARSING": 0, "CHUNKING": 0, "EMBEDDING": 0}
+    assert cold["reused_embeddings"] == 0
+
+    warm, records, evidence = _run(tmp_path, "warm", documents, cache=cache)
+    assert records == expected
+    assert warm["succeeded"] == 13 and warm["failed"] == 1
+    assert warm["chunks"] == cold["chunks"]
+    assert warm["cache_hits"]["PARSING"] == warm["cache_hits"]["EMBEDDING"] == 13
+    # Cached evidence is replayed and marked; failures are never cached
+    assert all(ev["cache_hit"] for ev in evidence if ev["file_id"] != "bad")
+    assert [ev["cache_hit"] for ev in evidence if ev["file_id"] == "bad"] == [False]
+
+    # A new cache object on the same file keeps the content hash memo and entries
+    assert IngestionCache(cache.db_path).stats()["EMBEDDING"] == 13
+
+
+def test_changes_invalidate_only_affected_stages(tmp_path):
+    documents = _corpus(tmp_path)
+    cache = IngestionCache(str(tmp_path / "cache.db"))
+    _run(tmp_path, "base", documents, cache=cache)
+
+    # One edited file: only it is reparsed; its untouched leading chunks keep their embeddings
+    path = documents[3]["input_file_ref"]["path"]
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(" edited")
+    summary, records, evidence = _run(tmp_path, "edited", documents, cache=cache)
+    assert summary["cache_hits"]["PARSING"] == 12
+    assert summary["cache_hits"]["EMBEDDING"] == 12
+    assert 0 < summary["reused_embeddings"] < summary["chunks"]
+    assert [ev["cache_hit"] for ev in evidence if ev["file_id"] == "doc3"] == [False, False, False]
+    assert records == _run(tmp_path, "edited_plain", documents)[1]
+
+    # New chunking config: parse outputs are reused, chunks and documents are rebuilt
+    plan = dict(PLAN, chunk_size=200)
+    summary, records, _ = _run(tmp_path, "rechunked", documents, plan=plan, cache=cache)
+    assert summary["cache_hits"]["PARSING"] == 13
+    assert summary["cache_hits"]["CHUNKING"] == 0
+    assert records == _run(tmp_path, "rechunked_plain", documents, plan=plan)[1]
+
+    # New embedding model: parsing and chunking are untouched
+    plan = dict(PLAN, embedding_model_id="mock-embed-v2")
+    summary, records, _ = _run(tmp_path, "reembedded", documents, plan=plan, cache=cache)
+    assert summary["cache_hits"]["CHUNKING"] == 13
+    assert summary["cache_hits"]["EMBEDDING"] == 0
+    assert summary["reused_embeddings"] == 0
+    assert records == _run(tmp_path, "reembedded_plain", documents, plan=plan)[1]
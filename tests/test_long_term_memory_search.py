@@ -0,0 +1,112 @@
+"""
+Long-term memory store: cosine similarity recall, FTS5 tag/content search, index sync
+"""
+import numpy as np
+
+from memory.long_term.memory_store import LongTermMemoryStore, MemoryEntry, PatternMemory
+
+
+def _entry(memory_id, embedding, memory_type="pattern", tags=None, importance=1.0, content=None):
+    return MemoryEntry(
+        memory_id=memory_id,
+        memory_type=memory_type,
+        content=content or {"note": memory_id},
+        embedding=list(embedding),
+        importance_score=importance,
+        tags=tags or [],
+    )
+
+
+def test_similarity_recall_matches_bruteforce(tmp_path):
+    store = LongTermMemoryStore(memory_dir=str(tmp_path))
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(200, 16))
+    for i, v in enumerate(vectors):
+        store.store(_entry(f"m{i}", v, tags=["even" if i % 2 == 0 else "odd"]))
+
+    query = rng.normal(size=16)
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(normed @ (query / np.linalg.norm(query))))[:5]
+
+    hits = store.search_similar(list(query), limit=5)
+    assert [e.memory_id for e, _ in hits] == [f"m{i}" for i in expected]
+    assert hits[0][1] >= hits[-1][1]
+
+    # Filters are applied inside the scan: still `limit` results
+    even_hits = store.search_similar(list(query), limit=5, tags=["even"])
+    assert len(even_hits) == 5
+    assert all(int(e.memory_id[1:]) % 2 == 0 for e, _ in even_hits)
+    assert store.search_similar(list(query), limit=5, memory_type="behavior") == []
+
+
+def test_index_stays_in_sync_with_table(tmp_path):
+    store = LongTermMemoryStore(memory_dir=str(tmp_path))
+    store.store(_entry("a", [1.0, 0.0], importance=0.005))
+    store.store(_entry("b", [0.9, 0.1]))
+    store.store(_entry("c", [0.0, 1.0]))
+
+    assert [e.memory_id for e, _ in store.search_similar([1.0, 0.0], limit=1)] == ["a"]
+    assert store.prune(min_importance=0.01) == 1
+    assert [e.memory_id for e, _ in store.search_similar([1.0, 0.0], limit=1)] == ["b"]
+
+    store.apply_decay(0.5)
+    assert store.search_similar([1.0, 0.0], limit=5, min_importance=0.9) == []
+
+    # Re-opening the store rebuilds the index from SQLite
+    store.close()
+    reopened = LongTermMemoryStore(memory_dir=str(tmp_path))
+    assert [e.memory_id for e, _ in reopened.search_similar([0.0, 1.0], limit=2)] == ["c", "b"]
+
+
+def test_tag_and_text_search_use_exact_tokens(tmp_path):
+    store = LongTermMemoryStore(memory_dir=str(tmp_path))
+    pattern_mem = PatternMemory(store)
+    pattern_mem.store_pattern("sig_1", {"task_type": "rag_qa"}, "success", importance=0.5,
+                              embedding=[1.0, 0.0, 0.0])
+    pattern_mem.store_pattern("sig_2", {"task_type": "rag_qa_long"}, "failure",
+                              embedding=[0.0, 1.0, 0.0])
+    pattern_mem.store_pattern("sig_3", {"task_type": "rag_qa", "hint": "use reranker"}, "failure",
+                              importance=0.9, embedding=[0.0, 0.0, 1.0])
+
+    by_tag = pattern_mem.get_similar_patterns("rag_qa")
+    assert [e.content["signature"] for e in by_tag] == ["sig_3", "sig_1"]
+
+    by_vector = pattern_mem.get_similar_patterns("rag_qa", embedding=[0.9, 0.0, 0.1])
+    assert [e.content["signature"] for e in by_vector] == ["sig_1", "sig_3"]
+
+    both = store.search_by_tags(["rag_qa", "failure"])
+    assert [e.content["signature"] for e in both] == ["sig_3"]
+    either = store.search_by_tags(["rag_qa_long", "success"], match_all=False)
+    assert {e.content["signature"] for e in either} == {"sig_1", "sig_2"}
+
+    assert [e.content["signature"] for e in store.search_text("reranker")] == ["sig_3"]
+
+
+def test_tags_match_exactly_regardless_of_search_backend(tmp_path):
+    store = LongTermMemoryStore(memory_dir=str(tmp_path))
+    store.store(_entry("plain", [1.0, 0.0], tags=["success"]))
+    store.store(_entry("phrase", [0.9, 0.1], tags=["partial success"]))
+    store.store(_entry("upper", [0.8, 0.2], tags=["SUCCESS"]))
+    store.store(_entry("both", [0.7, 0.3], tags=["partial success", "rag_qa"]))
+
+    assert [e.memory_id for e in store.search_by_tags(["success"])] == ["plain"]
+    assert {e.memory_id for e in store.search_by_tags(["partial success"])} == {"phrase", "both"}
+    assert [e.memory_id for e in store.search_by_tags(["SUCCESS"])] == ["upper"]
+    assert store.search_by_tags(["partial"]) == []
+    assert [e.memory_id for e in store.search_by_tags(["partial success", "rag_qa"])] == ["both"]
+    assert {e.memory_id for e in store.search_by_tags(["success", "SUCCESS"], match_all=False)} == {"plain", "upper"}
+    assert [e.memory_id for e, _ in store.search_similar([1.0, 0.0], limit=5, tags=["success"])] == ["plain"]
+
+    pattern_mem = PatternMemory(store)
+    pattern_mem.store_pattern("sig_a", {"task_type": "Report Writing"}, "success", embedding=[1.0, 0.0])
+    pattern_mem.store_pattern("sig_b", {"task_type": "report writing"}, "success", embedding=[1.0, 0.0])
+    assert [e.content["signature"] for e in pattern_mem.get_similar_patterns("report writing")] == ["sig_b"]
+    assert [e.content["signature"] for e in pattern_mem.get_similar_patterns(
+        "Report Writing", embedding=[1.0, 0.0])] == ["sig_a"]
+
+    # A store created before the tag table existed is backfilled on open
+    store._conn.execute("DELETE FROM memory_tags")
+    store._conn.commit()
+    store.close()
+    reopened = LongTermMemoryStore(memory_dir=str(tmp_path))
+    assert {e.memory_id for e in reopened.search_by_tags(["partial success"])} == {"phrase", "both"}
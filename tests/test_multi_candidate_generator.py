@@ -0,0 +1,152 @@
+"""
+Multi-candidate generation: concurrent fan-out, caps, hedging and early stop
+"""
+import asyncio
+import time
+
+from generation.generation_reranker import GenerationReranker
+from generation.multi_candidate_generator import MultiCandidateGenerator
+
+CONTEXT = {"documents": [{"content": "Refunds are accepted within 30 days."}]}
+
+
+class FakeAdapter:
+    """Latency per temperature; the first call for a slow temperature stalls, retries are fast"""
+
+    def __init__(self, delays, stall=None, cost=0.01, confidence=0.7):
+        self.delays = delays
+        self.stall = set(stall or ())
+        self.cost = cost
+        self.confidence = confidence
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+
+    async def call(self, system_prompt, user_prompt, schema, meta=None, task_id=None):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        temp = meta["temperature"]
+        try:
+            if temp in self.stall:
+                self.stall.discard(temp)
+                await asyncio.sleep(5)
+            await asyncio.sleep(self.delays.get(temp, 0.05))
+        finally:
+            self.active -= 1
+        return (
+            {"response": f"Because refunds are accepted within 30 days, answer at {temp} [1].",
+             "confidence": self.confidence},
+            {"cost": self.cost, "llm_used": True, "fallback_used": False},
+        )
+
+
+def _generator(tmp_path, adapter, **kwargs):
+    generator = MultiCandidateGenerator(artifacts_path=str(tmp_path / "gen"), **kwargs)
+    generator.llm_adapter = adapter
+    return generator
+
+
+def test_every_strategy_fans_out_concurrently(tmp_path):
+    for strategy in ("temperature_sampling", "prompt_variations", "model_ensemble", "parallel_diverse"):
+        adapter = FakeAdapter({}, cost=0.0)
+        adapter.delays = {t: 0.2 for t in (0.2, 0.3, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)}
+        generator = _generator(tmp_path, adapter, hedge_after_ms=0)
+        start = time.perf_counter()
+        result = generator.generate_candidates("refund window?", CONTEXT, num_candidates=3, strategy=strategy)
+        elapsed = time.perf_counter() - start
+        assert len(result.candidates) == 3
+        assert adapter.peak == 3
+        # Close to one call, far below three sequential ones
+        assert elapsed < 0.45, strategy
+        assert result.wall_clock_ms < result.total_latency_ms
+
+
+def test_concurrency_and_cost_caps(tmp_path):
+    adapter = FakeAdapter({t: 0.05 for t in (0.3, 0.6, 0.9, 1.0)})
+    generator = _generator(tmp_path, adapter, max_concurrency=2, hedge_after_ms=0)
+    result = generator.generate_candidates("q", CONTEXT, num_candidates=4, strategy="parallel_diverse")
+    assert len(result.candidates) == 4 and adapter.peak == 2
+
+    adapter = FakeAdapter({t: 0.05 for t in (0.3, 0.6, 0.9, 1.0)}, cost=0.05)
+    generator = _generator(tmp_path, adapter, max_concurrency=1, max_cost_per_request=0.08, hedge_after_ms=0)
+    result = generator.generate_candidates("q", CONTEXT, num_candidates=4, strategy="parallel_diverse")
+    assert len(result.candidates) == 2
+    assert result.skipped_candidates == 2
+    assert result.total_cost <= 0.1
+
+
+def test_cost_cap_applies_before_the_concurrent_fan_out(tmp_path):
+    adapter = FakeAdapter({t: 0.05 for t in (0.3, 0.6, 0.9, 1.0)}, cost=0.05)
+    generator = _generator(tmp_path, adapter, max_concurrency=8, max_cost_per_request=0.08,
+                           hedge_after_ms=0, estimated_call_cost=0.05)
+    result = generator.generate_candidates("q", CONTEXT, num_candidates=4, strategy="parallel_diverse")
+    # All four would start at once with nothing spent yet; only two fit the cap
+    assert adapter.calls == 2 and result.skipped_candidates == 2
+    assert result.total_cost <= 0.1
+
+    # Without a fixed estimate, the cost of earlier calls is used
+    generator.estimated_call_cost = None
+    adapter.calls = 0
+    result = generator.generate_candidates("q", CONTEXT, num_candidates=4, strategy="parallel_diverse")
+    assert adapter.calls == 2 and len(result.candidates) == 2
+
+
+def test_hedged_request_beats_stalled_call(tmp_path):
+    adapter = FakeAdapter({0.2: 0.05, 0.5: 0.05, 0.8: 0.05}, stall={0.5})
+    generator = _generator(tmp_path, adapter, hedge_after_ms=100)
+    start = time.perf_counter()
+    result = generator.generate_candidates("q", CONTEXT, num_candidates=3)
+    assert time.perf_counter() - start < 1.0
+    assert len(result.candidates) == 3
+    assert result.hedged_requests == 1
+    assert [c.metadata.get("hedged", False) for c in result.candidates] == [False, True, False]
+    # The cancelled primary cost nothing; the winning duplicate is counted once
+    assert abs(result.total_cost - 0.03) < 1e-9
+
+
+def test_queueing_for_a_slot_does_not_trigger_hedging(tmp_path):
+    adapter = FakeAdapter({t: 0.08 for t in (0.3, 0.6, 0.9)})
+    generator = _generator(tmp_path, adapter, max_concurrency=1, hedge_after_ms=100)
+    result = generator.generate_candidates("q", CONTEXT, num_candidates=3, strategy="parallel_diverse")
+    # Later candidates wait well over 100 ms for the single slot, but each call is fast
+    assert len(result.candidates) == 3
+    assert result.hedged_requests == 0 and adapter.calls == 3
+
+
+def test_losing_hedge_is_awaited_before_returning(tmp_path):
+    adapter = FakeAdapter({0.2: 0.05}, stall={0.2})
+    generator = _generator(tmp_path, adapter, hedge_after_ms=100)
+    spec = generator._generate_temperature_variants("q", CONTEXT, 1)[0]
+    state = {"spent": 0.0, "in_flight": 0, "hedged": 0, "hedge_cost": 0.0, "skipped": 0, "early_stopped": False}
+
+    async def caller():
+        candidate = await generator._hedged_candidate(spec, state)
+        return candidate, adapter.active
+
+    candidate, still_running = asyncio.run(caller())
+    assert candidate.metadata["hedged"] is True and state["hedged"] == 1
+    # The stalled primary has finished cancelling by the time the winner is returned
+    assert still_running == 0
+
+
+def test_early_stop_on_reranker_threshold(tmp_path):
+    adapter = FakeAdapter({0.2: 0.05, 0.5: 2.0, 0.8: 2.0}, confidence=0.95)
+    generator = _generator(tmp_path, adapter, hedge_after_ms=0)
+    reranker = GenerationReranker(artifacts_path=str(tmp_path / "rerank"))
+    start = time.perf_counter()
+    result = generator.generate_candidates(
+        "q", CONTEXT, num_candidates=3, reranker=reranker, confidence_threshold=0.8
+    )
+    assert time.perf_counter() - start < 1.0
+    assert result.early_stopped is True
+    assert [c.candidate_id for c in result.candidates] == ["temp_0.2_0"]
+
+
+def test_sync_entry_inside_running_loop(tmp_path):
+    generator = _generator(tmp_path, FakeAdapter({}), hedge_after_ms=0)
+
+    async def caller():
+        return generator.generate_candidates("q", CONTEXT, num_candidates=2)
+
+    assert len(asyncio.run(caller()).candidates) == 2
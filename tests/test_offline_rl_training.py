@@ -0,0 +1,88 @@
+"""
+OfflineRLAgent: columnar replay buffer, vectorized training, trace-index loader
+"""
+import json
+import os
+
+import numpy as np
+
+from learning.offline_rl import OfflineRLAgent, load_trace_experiences
+from learning.replay_buffer import ReplayBuffer
+
+
+def test_replay_buffer_ring_semantics():
+    buffer = ReplayBuffer(capacity=4, state_dim=2)
+    for i in range(6):
+        buffer.append(np.full(2, i), i % 3, float(i), np.zeros(2), False)
+
+    assert len(buffer) == 4
+    # Oldest surviving transition is #2
+    assert buffer[0][2] == 2.0
+    assert buffer[-1][2] == 5.0
+
+    buffer.extend(np.ones((10, 2)), np.arange(10) % 3, np.arange(10, dtype=float))
+    assert len(buffer) == 4
+    assert sorted(buffer.valid_rewards.tolist()) == [6.0, 7.0, 8.0, 9.0]
+
+
+def test_vectorized_training_prefers_rewarding_action(tmp_path):
+    agent = OfflineRLAgent(buffer_size=50_000, learning_rate=0.01, artifacts_path=str(tmp_path))
+    rng = np.random.default_rng(0)
+    n = 20_000
+    actions = rng.integers(0, 3, size=n)
+    rewards = np.where(actions == 1, 0.9, 0.2).astype(np.float32)
+    agent.add_experiences(rng.random((n, agent.state_dim)), actions, rewards)
+
+    result = agent.train(batch_size=1024, num_epochs=3, full_pass=True, seed=0)
+
+    assert result["updates"] == 3 * n
+    assert agent.select_action_policy(np.zeros(agent.state_dim)) == "parallel"
+    assert sum(agent.q_counts.values()) == 3 * n
+
+
+def test_single_transition_update_path(tmp_path):
+    agent = OfflineRLAgent(artifacts_path=str(tmp_path))
+    state = np.zeros(agent.state_dim)
+    out = agent.update({"state": state, "action": "sequential", "reward": 1.0, "done": True})
+
+    assert out["updated"] is True
+    assert agent.q_values["sequential"] != 0.0
+    assert len(agent.replay_buffer) == 1
+
+
+def test_load_experiences_from_trace_index(tmp_path):
+    trace_dir = tmp_path / "trace_store"
+    (trace_dir / "summaries").mkdir(parents=True)
+    (trace_dir / "index").mkdir()
+
+    with open(trace_dir / "index" / "tasks_index.jsonl", "w", encoding="utf-8") as index:
+        for i in range(30):
+            task_id = f"task_{i}"
+            summary = {
+                "task_id": task_id,
+                "state": "COMPLETED" if i % 2 else "FAILED",
+                "current_plan_path_type": ["normal", "degraded", "other"][i % 3],
+                "cost_summary": {"total": 0.5},
+                "result_summary": {},
+                "created_at": "2025-01-01T10:00:00",
+            }
+            with open(trace_dir / "summaries" / f"{task_id}.json", "w", encoding="utf-8") as f:
+                json.dump(summary, f)
+            index.write(json.dumps({"task_id": task_id}) + "\n")
+
+    action_map = {"normal": "sequential", "degraded": "parallel"}
+    states, actions, rewards = load_trace_experiences(
+        trace_dir=str(trace_dir), action_map=action_map, shard_size=7
+    )
+    assert states.shape == (20, 15)
+    assert set(actions.tolist()) == {0, 1}
+
+    parallel = load_trace_experiences(
+        trace_dir=str(trace_dir), action_map=action_map, shard_size=7, num_workers=2
+    )
+    assert np.array_equal(parallel[1], actions)
+    assert np.allclose(parallel[2], rewards)
+
+    agent = OfflineRLAgent(artifacts_path=str(tmp_path / "rl"))
+    assert agent.load_from_trace_index(str(trace_dir), action_map=action_map) == 20
+    assert len(agent.replay_buffer) == 20
@@ -0,0 +1,132 @@
+"""
+Online query engine: hybrid retrieval, generation, latency budgets and degradation
+"""
+import asyncio
+
+from backend.online.pipeline import OnlineQueryEngine, run_online_query
+from runtime.retrieval.hybrid_index import HybridIndex
+
+CHUNKS = [
+    {"chunk_id": "c1", "content": "Refunds are accepted within 30 days of purchase. Keep the receipt.",
+     "metadata": {"source": "policy"}},
+    {"chunk_id": "c2", "content": "Shipping is free for orders above 50 dollars.", "metadata": {"source": "policy"}},
+    {"chunk_id": "c3", "content": "The store opens at 9 am and closes at 6 pm on weekdays.",
+     "metadata": {"source": "faq"}},
+    {"chunk_id": "c4", "content": "退款需要在购买后30天内申请，并提供收据。", "metadata": {"source": "policy"}},
+    {"chunk_id": "c5", "content": "Refunds are accepted within 30 days of purchase. Keep the receipt.",
+     "metadata": {"source": "mirror"}},
+]
+
+
+class SlowAdapter:
+    async def call(self, system_prompt, user_prompt, schema, meta=None, **kwargs):
+        await asyncio.sleep(1)
+        return {"answer": "late", "citations": [1]}, {"fallback_used": False}
+
+
+def test_hybrid_index_roundtrip(tmp_path):
+    index = HybridIndex.from_chunks(CHUNKS)
+    assert index.search("refund window days", top_k=1)[0]["chunk_id"] in {"c1", "c5"}
+    assert index.search("退款 收据", top_k=1, mode="sparse")[0]["chunk_id"] == "c4"
+    filtered = index.search("refund", top_k=3, filter_metadata={"source": "faq"})
+    assert filtered and all(h["metadata"]["source"] == "faq" for h in filtered)
+
+    index.save(str(tmp_path / "idx"))
+    loaded = HybridIndex.load(str(tmp_path / "idx"))
+    assert loaded.search("when does the store open", top_k=2) == index.search("when does the store open", top_k=2)
+
+
+def test_answers_with_citations_and_timings():
+    engine = OnlineQueryEngine(index=HybridIndex.from_chunks(CHUNKS), index_version="v1")
+    result = run_online_query("general", "How many days do I have for refunds?", engine=engine)
+
+    assert "30 days" in result["answer"]
+    assert result["verification"]["passed"] is True
+    assert result["citations"] and result["citations"][0]["chunk_id"] in {"c1", "c5"}
+    # Duplicate chunks are packed once
+    assert len({c["text"] for c in result["citations"]}) == len(result["citations"])
+    assert {"classify", "retrieve", "pack", "generate", "verify", "total"} <= set(result["timings_ms"])
+    assert result["trace"]["generation"] == "llm"
+    assert result["trace"]["index_version"] == "v1"
+    assert result["trace"]["hitl_triggered"] is False
+
+    again = run_online_query("general", "how many days do I have for refunds?", engine=engine)
+    assert again["trace"]["cache"] == "hit"
+    assert again["answer"] == result["answer"]
+
+
+def test_degradation_ladder_under_tight_budget():
+    engine = OnlineQueryEngine(
+        index=HybridIndex.from_chunks(CHUNKS), index_version="v1",
+        stage_estimates_ms={"generate": 2000.0}
+    )
+    result = run_online_query("general", "refund days", explicit_risk_tier="R2", engine=engine)
+    assert result["trace"]["degradations"][:2] == ["skip_rerank", "shrink_top_k"]
+    assert result["trace"]["rerank_executed"] == "none"
+    assert result["trace"]["top_k"] < 6
+    assert "rerank" not in result["timings_ms"]
+
+
+def test_stale_cache_and_generation_timeout():
+    index = HybridIndex.from_chunks(CHUNKS)
+    warm = OnlineQueryEngine(index=index, index_version="v1")
+    first = run_online_query("general", "refund days", engine=warm)
+    assert first["trace"]["cache"] == "miss"
+
+    # Same engine after an index swap: the cached answer is only served as a degradation
+    warm.index_version = "v2"
+    warm.stage_ms["generate"] = 10000.0
+    result = run_online_query("general", "refund days", engine=warm)
+    assert result["trace"]["cache"] == "stale"
+    assert result["trace"]["degradations"][-1] == "answer_from_cache"
+    assert result["answer"] == first["answer"]
+
+    # A generation that overruns the budget falls back to an extractive answer
+    slow = OnlineQueryEngine(index=index, index_version="v1", llm_adapter=SlowAdapter(), budgets_ms={"R1": 50})
+    result = run_online_query("general", "store opening hours", engine=slow)
+    assert result["trace"]["generation"] == "extractive"
+    assert "generation_timeout" in result["trace"]["degradations"]
+    assert result["timings_ms"]["total"] < 500
+    assert result["citations"]
+
+
+def test_insufficient_evidence_by_tier():
+    engine = OnlineQueryEngine(index=HybridIndex.from_chunks(CHUNKS), index_version="v1")
+    low = run_online_query("general", "zebra migration", engine=engine)
+    assert low["citations"] == [] and low["trace"]["hitl_triggered"] is False
+
+    high = run_online_query("finance", "zebra migration", engine=engine)
+    assert high["answer"] == "" and high["trace"]["hitl_triggered"] is True
+
+
+def test_sync_entry_inside_running_loop():
+    engine = OnlineQueryEngine(index=HybridIndex.from_chunks(CHUNKS), index_version="v1")
+
+    async def caller():
+        return run_online_query("general", "refund days", engine=engine)
+
+    assert asyncio.run(caller())["verification"]["passed"] is True
+
+
+def test_cache_key_includes_filters_and_request_options():
+    chunks = [
+        {"chunk_id": "a", "content": "The alpha refund window is 30 days.", "metadata": {"tenant": "alpha"}},
+        {"chunk_id": "b", "content": "The beta refund window is 14 days.", "metadata": {"tenant": "beta"}},
+    ]
+    engine = OnlineQueryEngine(index=HybridIndex.from_chunks(chunks), index_version="v1")
+
+    alpha = run_online_query("general", "refund window", explicit_risk_tier="R3",
+                             filters={"tenant": "alpha"}, engine=engine)
+    beta = run_online_query("general", "refund window", explicit_risk_tier="R3",
+                            filters={"tenant": "beta"}, engine=engine)
+    assert beta["trace"]["cache"] == "miss"
+    assert "14 days" in beta["answer"] and "30 days" not in beta["answer"]
+    assert {c["chunk_id"] for c in beta["citations"]} == {"b"}
+    assert {c["chunk_id"] for c in alpha["citations"]} == {"a"}
+
+    again = run_online_query("general", "refund window", explicit_risk_tier="R3",
+                             filters={"tenant": "alpha"}, engine=engine)
+    assert again["trace"]["cache"] == "hit" and again["answer"] == alpha["answer"]
+    other_mode = run_online_query("general", "refund window", explicit_risk_tier="R3", mode="fast",
+                                  filters={"tenant": "alpha"}, engine=engine)
+    assert other_mode["trace"]["cache"] == "miss"
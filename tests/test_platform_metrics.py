@@ -0,0 +1,96 @@
+"""
+Platform metrics: labeled counters/gauges/histograms, text exposition, instrumentation
+"""
+import asyncio
+import threading
+
+from fastapi.testclient import TestClient
+
+from runtime.dispatcher.task_queue import InMemoryTaskQueue, QueuedTask, QUEUE_EVENTS, QUEUE_WAIT_SECONDS
+from runtime.platform.metrics import CONTENT_TYPE, MetricsRegistry
+
+
+def test_counters_are_exact_under_threads():
+    registry = MetricsRegistry()
+    counter = registry.counter("jobs_total", "Jobs", ("kind",))
+
+    def work():
+        for _ in range(10000):
+            counter.labels("a").inc()
+            counter.labels(kind="b").inc(2)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert counter.labels("a").get() == 80000
+    assert counter.labels("b").get() == 160000
+    assert registry.counter("jobs_total") is counter
+
+
+def test_render_text_format():
+    registry = MetricsRegistry()
+    registry.counter("plain_total", "Plain counter").inc(3)
+    registry.gauge("depth", "Queue depth").set(2.5)
+    hist = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        hist.labels('/a"b').observe(value)
+
+    text = registry.render()
+    assert "# HELP plain_total Plain counter\n# TYPE plain_total counter\nplain_total 3\n" in text
+    assert "depth 2.5\n" in text
+    assert 'latency_seconds_bucket{route="/a\\"b",le="0.1"} 2\n' in text
+    assert 'latency_seconds_bucket{route="/a\\"b",le="1.0"} 3\n' in text
+    assert 'latency_seconds_bucket{route="/a\\"b",le="+Inf"} 4\n' in text
+    assert 'latency_seconds_count{route="/a\\"b"} 4\n' in text
+    assert 'latency_seconds_sum{route="/a\\"b"} 3.65\n' in text
+
+    try:
+        registry.gauge("plain_total")
+        assert False, "kind mismatch should raise"
+    except ValueError:
+        pass
+
+
+def test_gauge_function_and_default_counters():
+    registry = MetricsRegistry()
+    gauge = registry.gauge("items")
+    gauge.set_function(lambda: 7)
+    assert "items 7.0" in registry.render()
+
+    default = MetricsRegistry.get_default()
+    assert "tasks_started" in default.snapshot()
+
+
+def test_task_queue_is_instrumented(tmp_path):
+    async def scenario():
+        queue = InMemoryTaskQueue(artifacts_dir=str(tmp_path))
+        task = QueuedTask(
+            task_id="t1", run_id="r1", tenant_id="default",
+            node_id="n1", agent_name="Product", context={}
+        )
+        await queue.enqueue(task)
+        dequeued = await queue.dequeue("w1", timeout=1)
+        await queue.ack(dequeued.task_id, {"ok": True})
+
+    enqueued = QUEUE_EVENTS.labels("enqueued").get()
+    acked = QUEUE_EVENTS.labels("acked").get()
+    waits = QUEUE_WAIT_SECONDS.labels("5").snapshot()["count"]
+    asyncio.run(scenario())
+    assert QUEUE_EVENTS.labels("enqueued").get() == enqueued + 1
+    assert QUEUE_EVENTS.labels("acked").get() == acked + 1
+    assert QUEUE_WAIT_SECONDS.labels("5").snapshot()["count"] == waits + 1
+
+
+def test_metrics_endpoint_and_middleware():
+    from backend.main import app
+
+    client = TestClient(app)
+    assert client.get("/api/health").status_code == 200
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == CONTENT_TYPE
+    assert 'http_requests_total{method="GET",route="/api/health",status="200"}' in response.text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/api/health",le="+Inf"}' in response.text
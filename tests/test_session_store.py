@@ -0,0 +1,113 @@
+"""
+SessionManager: lazy LRU/TTL cache, compact index, incremental run appends
+"""
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from runtime.session.session_manager import SessionManager
+from runtime.session.session_store import FileSessionStore
+
+RUN = {"success": True, "cost": 0.1, "latency_ms": 100, "quality_score": 0.8}
+
+
+@pytest.fixture(params=["file", "sqlite"])
+def backend(request):
+    return request.param
+
+
+def test_runs_persist_incrementally_and_reload(tmp_path, backend):
+    manager = SessionManager(artifacts_dir=str(tmp_path), backend=backend)
+    session = manager.create_session("u1")
+    for i in range(5):
+        assert manager.add_run_to_session(session.session_id, f"run_{i}", RUN)
+    manager.update_session_memory(session.session_id, preference_key="tone", preference_value="brief")
+
+    reloaded = SessionManager(artifacts_dir=str(tmp_path), backend=backend)
+    assert reloaded._sessions == {}  # nothing loaded at startup
+    loaded = reloaded.get_session(session.session_id)
+    assert loaded.run_ids == [f"run_{i}" for i in range(5)]
+    assert loaded.stats.total_runs == 5
+    assert loaded.memory.preferences["tone"]["value"] == "brief"
+    assert [s.session_id for s in reloaded.list_user_sessions("u1")] == [session.session_id]
+    assert reloaded.list_user_sessions("u2") == []
+
+
+def test_file_backend_appends_run_log_and_folds_it(tmp_path, monkeypatch):
+    monkeypatch.setattr(FileSessionStore, "RUN_LOG_COMPACT_LINES", 4)
+    manager = SessionManager(artifacts_dir=str(tmp_path))
+    session = manager.create_session("u1")
+    snapshot = tmp_path / "session" / f"{session.session_id}.json"
+    run_log = tmp_path / "session" / f"{session.session_id}.runs.jsonl"
+
+    for i in range(3):
+        manager.add_run_to_session(session.session_id, f"run_{i}", RUN)
+    # The snapshot is untouched; runs went to the log
+    assert json.loads(snapshot.read_text())["run_ids"] == []
+    assert len(run_log.read_text().splitlines()) == 3
+
+    manager.add_run_to_session(session.session_id, "run_3", RUN)
+    assert not run_log.exists()
+    assert len(json.loads(snapshot.read_text())["run_ids"]) == 4
+
+    # A log left behind by a crash during folding is not applied twice
+    run_log.write_text(json.dumps({
+        "n": 4, "run_id": "run_3", "stats": {"total_runs": 4}, "last_active_at": "x"
+    }) + "\n")
+    loaded = SessionManager(artifacts_dir=str(tmp_path)).get_session(session.session_id)
+    assert loaded.run_ids == ["run_0", "run_1", "run_2", "run_3"]
+
+
+def test_cache_is_bounded_lru_with_idle_ttl(tmp_path, backend):
+    manager = SessionManager(artifacts_dir=str(tmp_path), backend=backend, cache_size=2)
+    ids = [manager.create_session(f"u{i}").session_id for i in range(3)]
+    assert list(manager._sessions) == ids[1:]
+
+    assert manager.get_session(ids[0]).user_id == "u0"
+    assert list(manager._sessions) == [ids[2], ids[0]]
+
+    manager.cache_ttl_s = 0.0
+    cached = manager._sessions[ids[0]][0]
+    assert manager.get_session(ids[0]) is not cached  # reloaded from the store
+
+
+def test_cleanup_uses_index_and_archives(tmp_path, backend):
+    manager = SessionManager(artifacts_dir=str(tmp_path), backend=backend)
+    live = manager.create_session("u1")
+    stale = manager.create_session("u1", metadata={"n": 2})
+    # Expire one session in the store only (not loaded in this manager)
+    data = manager._store.load(stale.session_id)
+    data["expires_at"] = (datetime.now() - timedelta(hours=1)).isoformat()
+    manager._store.save(data)
+
+    fresh = SessionManager(artifacts_dir=str(tmp_path), backend=backend)
+    assert [s.session_id for s in fresh.list_user_sessions("u1")] == [live.session_id]
+    assert fresh.cleanup_expired_sessions() == 1
+    assert stale.session_id not in fresh._sessions
+    assert fresh.get_session(stale.session_id) is None
+    assert fresh.cleanup_expired_sessions() == 0
+    if backend == "file":
+        assert (tmp_path / "session" / "archived" / f"{stale.session_id}.json").exists()
+    assert fresh.get_or_create_session("u1").session_id == live.session_id
+
+
+def test_legacy_session_directory_is_indexed_once(tmp_path):
+    sessions_dir = tmp_path / "session"
+    sessions_dir.mkdir()
+    expires = (datetime.now() + timedelta(days=1)).isoformat()
+    for i in range(3):
+        (sessions_dir / f"sess_{i}.json").write_text(json.dumps({
+            "session_id": f"sess_{i}", "user_id": "legacy", "created_at": "t",
+            "last_active_at": "t", "expires_at": expires, "run_ids": ["r"],
+        }))
+
+    manager = SessionManager(artifacts_dir=str(tmp_path))
+    assert len(manager.list_user_sessions("legacy")) == 3
+    assert os.path.exists(sessions_dir / "index.jsonl")
+
+    # Another process's create is picked up incrementally
+    other = SessionManager(artifacts_dir=str(tmp_path))
+    created = other.create_session("legacy")
+    assert created.session_id in {s.session_id for s in manager.list_user_sessions("legacy")}
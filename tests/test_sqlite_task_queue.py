@@ -0,0 +1,148 @@
+"""
+SQLiteTaskQueue: shared multi-process queue with leases, fencing and dead letters
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from runtime.dispatcher.task_queue import QueuedTask, SQLiteTaskQueue, create_task_queue
+
+
+def _task(task_id, priority=5, **kwargs):
+    return QueuedTask(
+        task_id=task_id, run_id="r1", tenant_id="default", node_id="n1",
+        agent_name="Product", context={}, priority=priority, **kwargs
+    )
+
+
+def _worker_process(db_path, out_dir, crash_ids):
+    """Drain the queue; die (no ack) the first time a crash task is seen."""
+    async def run():
+        queue = SQLiteTaskQueue(db_path, visibility_timeout=0.5, poll_interval=0.01)
+        idle_since = None
+        while True:
+            task = await queue.dequeue(f"pid{os.getpid()}", timeout=0.2)
+            if task is None:
+                if await queue.get_queue_size() == 0:
+                    idle_since = idle_since or time.monotonic()
+                    if time.monotonic() - idle_since > 1.0:
+                        return
+                continue
+            idle_since = None
+            marker = os.path.join(out_dir, f"crashed_{task.task_id}")
+            if task.task_id in crash_ids and not os.path.exists(marker):
+                open(marker, "w").close()
+                os._exit(1)
+            if await queue.ack(task.task_id, {"by": os.getpid()}, lease_token=task.lease_token):
+                with open(os.path.join(out_dir, f"acks_{os.getpid()}.txt"), "a") as f:
+                    f.write(task.task_id + "\n")
+
+    asyncio.run(run())
+
+
+def test_workers_process_every_task_exactly_once_despite_crashes(tmp_path):
+    db_path = str(tmp_path / "queue.db")
+    queue = SQLiteTaskQueue(db_path)
+    task_ids = [f"t{i}" for i in range(60)]
+    for task_id in task_ids:
+        assert asyncio.run(queue.enqueue(_task(task_id, max_retries=3)))
+    crash_ids = {"t5", "t30"}
+
+    ctx = multiprocessing.get_context("fork")
+    workers = [
+        ctx.Process(target=_worker_process, args=(db_path, str(tmp_path), crash_ids))
+        for _ in range(4)
+    ]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(timeout=60)
+    assert sorted(w.exitcode for w in workers).count(1) == len(crash_ids)
+
+    acked = []
+    for name in os.listdir(tmp_path):
+        if name.startswith("acks_"):
+            acked.extend((tmp_path / name).read_text().split())
+    assert sorted(acked) == sorted(task_ids)
+
+    for task_id in task_ids:
+        status = asyncio.run(queue.get_task_status(task_id))
+        assert status["status"] == "completed"
+        assert status["deliveries"] == (2 if task_id in crash_ids else 1)
+
+
+def test_priorities_and_stale_lease_fencing(tmp_path):
+    db_path = str(tmp_path / "queue.db")
+
+    async def scenario():
+        first = SQLiteTaskQueue(db_path, visibility_timeout=0.05)
+        second = SQLiteTaskQueue(db_path, visibility_timeout=30)
+        await first.enqueue(_task("low", priority=7))
+        await first.enqueue(_task("high", priority=1))
+        assert not await first.enqueue(_task("high"))
+
+        taken = await first.dequeue("w1", timeout=0)
+        assert taken.task_id == "high"
+        await asyncio.sleep(0.1)
+
+        # The lease expired, so the task is redelivered ahead of "low"
+        # (one priority step down) and the first worker's late ack is rejected
+        retaken = await second.dequeue("w2", timeout=0)
+        assert retaken.task_id == "high" and retaken.retry_count == 1
+        assert not await first.ack("high", {"by": "w1"}, lease_token=taken.lease_token)
+        assert await second.ack("high", {"by": "w2"}, lease_token=retaken.lease_token)
+        status = await second.get_task_status("high")
+        return status
+
+    status = asyncio.run(scenario())
+    assert status["result"] == {"by": "w2"}
+
+
+def test_dead_letters_and_requeue(tmp_path):
+    async def scenario():
+        queue = create_task_queue("sqlite", db_path=str(tmp_path / "queue.db"))
+        await queue.enqueue(_task("t1", max_retries=2))
+
+        task = await queue.dequeue("w", timeout=0)
+        assert await queue.nack(task.task_id, "first", lease_token=task.lease_token)
+        task = await queue.dequeue("w", timeout=0)
+        assert await queue.nack(task.task_id, "second", lease_token=task.lease_token)
+        assert await queue.dequeue("w", timeout=0) is None
+        assert await queue.get_queue_size() == 0
+
+        dead = queue.dead_letters()
+        assert [(d["task"]["task_id"], d["error"]) for d in dead] == [("t1", "second")]
+        assert (await queue.get_task_status("t1"))["status"] == "failed"
+
+        assert queue.requeue_dead_letter("t1")
+        task = await queue.dequeue("w", timeout=0)
+        assert task.retry_count == 0
+        assert await queue.ack(task.task_id, {}, lease_token=task.lease_token)
+        assert queue.dead_letters() == []
+
+    asyncio.run(scenario())
+
+
+def test_stale_worker_in_same_process_cannot_ack(tmp_path):
+    async def scenario():
+        queue = SQLiteTaskQueue(str(tmp_path / "queue.db"), visibility_timeout=0.05)
+        await queue.enqueue(_task("t1"))
+
+        stale = await queue.dequeue("w1", timeout=0)
+        await asyncio.sleep(0.1)
+        # Same queue object: the lease expired and another worker took the task
+        fresh = await queue.dequeue("w2", timeout=0)
+        assert fresh.task_id == "t1" and fresh.lease_token == stale.lease_token + 1
+
+        assert not await queue.ack("t1", {"by": "w1"}, lease_token=stale.lease_token)
+        assert not await queue.nack("t1", "late", lease_token=stale.lease_token)
+        with pytest.raises(ValueError):
+            await queue.ack("t1", {"by": "?"})
+        assert await queue.ack("t1", {"by": "w2"}, lease_token=fresh.lease_token)
+        return await queue.get_task_status("t1")
+
+    status = asyncio.run(scenario())
+    assert status["status"] == "completed" and status["result"] == {"by": "w2"}
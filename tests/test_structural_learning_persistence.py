@@ -0,0 +1,128 @@
+"""
+Structural / tenant learning: bounded streaming state + write-behind persistence
+"""
+import json
+import os
+
+from learning.streaming_stats import StreamingStats
+from learning.structural_learning import (
+    StructuralCreditAssignment,
+    StructuralFeatureExtractor,
+    StructuralLearner,
+    StructuralRewardComputer,
+)
+from learning.tenant_learning import TenantLearningController
+
+
+def _record_run(learner: StructuralLearner, run_id: str, success: bool = True):
+    nodes = [
+        {"node_id": "n1", "agent_name": "Product"},
+        {"node_id": "n2", "agent_name": "Execution"},
+    ]
+    edges = [("n1", "n2")]
+    vector = StructuralFeatureExtractor.extract(nodes, edges)
+    reward = StructuralRewardComputer().compute(
+        run_id=run_id,
+        dag_id="dag_1",
+        execution_result={"success": success, "quality_score": 0.8},
+        dag_features=vector,
+    )
+    credit = StructuralCreditAssignment(
+        run_id=run_id,
+        node_credits={},
+        edge_credits={},
+        agent_type_credits={},
+        topology_credit=0.0,
+        assignment_rationale="test",
+    )
+    learner.record_execution("general", vector, reward, credit)
+    return vector
+
+
+def test_streaming_stats_matches_exact_moments():
+    values = [0.1, 0.5, 0.9, 0.3, 0.7] * 40
+    stats = StreamingStats.from_values(values, reservoir_size=8)
+
+    mean = sum(values) / len(values)
+    variance = sum((v - mean) ** 2 for v in values) / (len(values) - 1)
+    assert stats.count == len(values)
+    assert abs(stats.mean - mean) < 1e-9
+    assert abs(stats.variance - variance) < 1e-9
+    assert len(stats.reservoir) == 8
+    assert stats.min_value == 0.1 and stats.max_value == 0.9
+
+    restored = StreamingStats.from_dict(json.loads(json.dumps(stats.to_dict())))
+    assert restored.count == stats.count
+    assert restored.reservoir == stats.reservoir
+
+
+def test_structural_learner_state_is_bounded_and_buffered(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    learner = StructuralLearner(artifacts_dir="structural", flush_interval_s=3600)
+
+    for i in range(500):
+        vector = _record_run(learner, f"run_{i}", success=i % 2 == 0)
+
+    stats = learner.topology_rewards[vector.topology_hash]
+    assert stats.count == 500
+    assert len(stats.reservoir) <= stats.reservoir_size
+
+    # Only the leading-edge write reached disk; later runs are coalesced
+    state_path = os.path.join("structural", "structural_learning_state.json")
+    with open(state_path, encoding="utf-8") as f:
+        assert json.load(f)["topology_rewards"][vector.topology_hash]["count"] == 1
+
+    learner.flush()
+    with open(state_path, encoding="utf-8") as f:
+        state = json.load(f)
+    assert state["topology_rewards"][vector.topology_hash]["count"] == 500
+    assert os.path.exists(os.path.join("structural", "structural_policy.json"))
+
+    with open(os.path.join("structural", "execution_records.jsonl"), encoding="utf-8") as f:
+        assert sum(1 for _ in f) == 500
+
+    # Reload restores streaming state
+    reloaded = StructuralLearner(artifacts_dir="structural", flush_interval_s=3600)
+    assert reloaded.topology_rewards[vector.topology_hash].count == 500
+    assert reloaded.recommend_structure("general", [], "general")["confidence"] == 1.0
+
+
+def test_structural_learner_migrates_legacy_reward_lists(tmp_path):
+    state_path = tmp_path / "structural_learning_state.json"
+    state_path.write_text(json.dumps({
+        "topology_rewards": {"abc": [0.2, 0.4, 0.6]},
+        "agent_combo_rewards": {"('Product',)": [1.0]},
+        "task_type_structure_map": {"general": {"abc": 0.4}},
+    }))
+
+    learner = StructuralLearner(artifacts_dir=str(tmp_path), flush_interval_s=3600)
+    assert learner.topology_rewards["abc"].count == 3
+    assert abs(learner.topology_rewards["abc"].mean - 0.4) < 1e-9
+
+
+def test_tenant_learning_write_behind(tmp_path):
+    controller = TenantLearningController(artifacts_dir=str(tmp_path), flush_interval_s=3600)
+
+    for i in range(200):
+        controller.record_execution(
+            tenant_id="tenant_a",
+            task_type="qa",
+            strategy_id="s1" if i % 2 else "s2",
+            agents_used=["Product", "Execution"],
+            success=True,
+            cost=0.1,
+            latency_ms=100,
+            quality_score=0.9,
+        )
+
+    knowledge = controller.local_knowledge["tenant_a"]
+    assert knowledge.sample_count == 200
+    assert knowledge.strategy_rewards["s1"].count == 100
+    assert not (tmp_path / "tenant_a_knowledge.json").exists()
+    with open(tmp_path / "tenant_a_profile.json", encoding="utf-8") as f:
+        assert json.load(f)["total_runs"] == 0
+
+    controller.flush()
+    reloaded = TenantLearningController(artifacts_dir=str(tmp_path), flush_interval_s=3600)
+    assert reloaded.profiles["tenant_a"].total_runs == 200
+    assert reloaded.local_knowledge["tenant_a"].strategy_rewards["s2"].count == 100
@@ -0,0 +1,78 @@
+"""
+Task classification: single-pass keyword automaton, LRU memo, batched artifacts
+"""
+import json
+import random
+
+from runtime.ingress.keyword_matcher import KeywordMatcher
+from runtime.ingress.task_type_classifier import TaskType, TaskTypeClassifier
+from runtime.session.task_classifier import TaskClassifier, TaskComplexity
+
+
+def test_matcher_counts_match_substring_semantics():
+    rng = random.Random(7)
+    for _ in range(300):
+        keywords = ["".join(rng.choice("abc") for _ in range(rng.randint(1, 4))) for _ in range(8)]
+        groups = {"left": keywords[:5], "right": keywords[3:]}
+        text = "".join(rng.choice("abcd") for _ in range(30))
+        expected = {g: sum(1 for k in set(ks) if k in text) for g, ks in groups.items()}
+        assert KeywordMatcher(groups).counts(text) == expected
+
+    matcher = KeywordMatcher({"x": ["find", "find all", "all"], "y": ["vs"]})
+    # Nested and overlapping keywords are all reported
+    assert matcher.find("find all files") == {"find", "find all", "all"}
+    assert matcher.counts("nothing here") == {"x": 0, "y": 0}
+
+
+def test_ingress_classification_is_memoized_per_query(tmp_path):
+    classifier = TaskTypeClassifier(artifacts_dir=str(tmp_path))
+    first = classifier.classify("run_1", {"query": "Compare A vs B"})
+    assert first.task_type == TaskType.COMPARE
+    assert first.features["has_comparison"] is True
+
+    first.features["mutated"] = True
+    second = classifier.classify("run_2", {"query": "compare a VS b"})
+    assert len(classifier._memo) == 1
+    assert second.run_id == "run_2"
+    assert "mutated" not in second.features
+
+    # Routing inputs outside the query are part of the key
+    sensitive = classifier.classify("run_3", {"query": "compare a vs b", "is_sensitive": True})
+    assert sensitive.risk_level.value == "high"
+
+    classifier.MEMO_SIZE = 2
+    classifier.classify("run_4", {"query": "summarize this"})
+    assert len(classifier._memo) == 2
+
+
+def test_artifacts_are_batched_and_flushed(tmp_path):
+    classifier = TaskTypeClassifier(artifacts_dir=str(tmp_path), artifact_flush_interval_s=60)
+    task_dir = tmp_path / "task_type"
+
+    # The first write after a quiet period goes straight to disk
+    classifier.classify("run_0", {"query": "what is rag?"})
+    assert (task_dir / "run_0.json").exists()
+
+    for i in range(1, 50):
+        classifier.classify(f"run_{i}", {"query": f"explain item {i}"})
+    assert not (task_dir / "run_49.json").exists()
+
+    # Loading a pending classification flushes the batch first
+    loaded = classifier.load_classification("run_49")
+    assert loaded.task_type == TaskType.RAG_QA
+    assert len(list(task_dir.glob("*.json"))) == 50
+    assert json.loads((task_dir / "run_7.json").read_text())["run_id"] == "run_7"
+    classifier.close()
+
+
+def test_session_classifier_uses_shared_matcher(tmp_path):
+    classifier = TaskClassifier(artifacts_dir=str(tmp_path))
+    result = classifier.classify("run_1", "Give me a quick summary")
+    assert result.task_type.value == "rag_summary"
+    assert result.task_complexity == TaskComplexity.SIMPLE
+
+    again = classifier.classify("run_2", "Give me a quick summary", {"session_id": "s1"})
+    assert again.features["session_context"] is True
+    assert len(classifier._memo) == 2
+    classifier.flush()
+    assert classifier.load_classification("run_2").run_id == "run_2"
@@ -0,0 +1,89 @@
+"""
+InMemoryTaskQueue: heap ordering, write-ahead log, checkpoint and replay
+"""
+import asyncio
+import json
+import os
+
+from runtime.dispatcher.task_queue import InMemoryTaskQueue, QueuedTask, TaskPriority
+
+
+def _task(task_id, priority=TaskPriority.NORMAL, **kwargs):
+    return QueuedTask(
+        task_id=task_id, run_id="r1", tenant_id="default", node_id="n1",
+        agent_name="Product", context={"i": task_id}, priority=priority, **kwargs
+    )
+
+
+def test_priority_then_fifo_order(tmp_path):
+    async def scenario():
+        queue = InMemoryTaskQueue(artifacts_dir=str(tmp_path))
+        for task_id, priority in [("a", 5), ("b", 1), ("c", 5), ("d", 9), ("e", 1)]:
+            assert await queue.enqueue(_task(task_id, priority))
+        assert not await queue.enqueue(_task("a"))
+        assert await queue.get_queue_size() == 5
+        order = [(await queue.dequeue("w", timeout=0.1)).task_id for _ in range(5)]
+        assert await queue.dequeue("w", timeout=0.01) is None
+        return order
+
+    assert asyncio.run(scenario()) == ["b", "e", "a", "c", "d"]
+
+
+def test_restart_replays_wal_and_requeues_in_flight(tmp_path):
+    async def before_crash():
+        queue = InMemoryTaskQueue(artifacts_dir=str(tmp_path))
+        for i in range(5):
+            await queue.enqueue(_task(f"t{i}"))
+        done = await queue.dequeue("w")
+        await queue.ack(done.task_id, {"ok": True})
+        await queue.dequeue("w")  # in flight when the process dies
+        retried = await queue.dequeue("w")
+        await queue.nack(retried.task_id, "boom")
+        # No close(): simulate a crash, the state lives only in the WAL
+
+    async def after_restart():
+        queue = InMemoryTaskQueue(artifacts_dir=str(tmp_path))
+        assert await queue.get_queue_size() == 4
+        assert (await queue.get_task_status("t1"))["status"] == "pending"
+        assert await queue.get_task_status("t0") is None
+        order = []
+        while True:
+            task = await queue.dequeue("w", timeout=0.01)
+            if task is None:
+                break
+            order.append((task.task_id, task.priority, task.retry_count))
+        return order
+
+    asyncio.run(before_crash())
+    assert (tmp_path / "queue.wal").stat().st_size > 0
+    assert asyncio.run(after_restart()) == [
+        ("t1", 5, 0), ("t3", 5, 0), ("t4", 5, 0), ("t2", 6, 1)
+    ]
+
+
+def test_checkpoint_truncates_wal_and_skips_applied_records(tmp_path):
+    async def fill():
+        queue = InMemoryTaskQueue(artifacts_dir=str(tmp_path), checkpoint_every=10)
+        for i in range(25):
+            await queue.enqueue(_task(f"t{i}"))
+        return queue
+
+    queue = asyncio.run(fill())
+    state = json.loads((tmp_path / "queue_state.json").read_text())
+    with open(tmp_path / "queue.wal") as f:
+        wal_lines = f.readlines()
+    # The interval grows with the number of live tasks: one checkpoint after
+    # the 10th record, the next one is due only after 25 more
+    assert state["wal_seq"] == 10
+    assert len(wal_lines) == 15
+
+    # A checkpoint written before the WAL was truncated must not double-apply,
+    # and a torn final record is ignored
+    queue.close()
+    with open(tmp_path / "queue.wal", "w") as f:
+        f.writelines(wal_lines)
+        f.write('{"op": "enqueue", "task": {"task_')
+    reopened = InMemoryTaskQueue(artifacts_dir=str(tmp_path))
+    assert asyncio.run(reopened.get_queue_size()) == 25
+    reopened.close()
+    assert os.path.getsize(tmp_path / "queue.wal") == 0
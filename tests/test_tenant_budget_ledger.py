@@ -0,0 +1,212 @@
+"""
+TenantBudgetController: shared SQLite ledger with reserve / commit / release
+"""
+import json
+import multiprocessing
+import os
+
+from runtime.tenancy.tenant_budget_controller import BudgetStatus, TenantBudgetController
+
+
+def _controller(tmp_path, **kwargs) -> TenantBudgetController:
+    kwargs.setdefault("flush_interval_s", 3600)
+    return TenantBudgetController(artifacts_dir=str(tmp_path), **kwargs)
+
+
+def _set_limits(controller, tenant_id, budget_limit=None, max_concurrent_runs=None):
+    usage = controller._get_usage(tenant_id)
+    if budget_limit is not None:
+        usage.budget_limit = budget_limit
+    if max_concurrent_runs is not None:
+        usage.max_concurrent_runs = max_concurrent_runs
+    controller._save_usage(usage)
+
+
+def test_reservation_counts_against_budget(tmp_path):
+    controller = _controller(tmp_path)
+    _set_limits(controller, "t1", budget_limit=100.0)
+
+    assert controller.register_task_start("t1", "a", "run_a", estimated_cost=60.0)["allowed"]
+    # Reserved-but-unspent cost blocks a second large task
+    denied = controller.register_task_start("t1", "b", "run_b", estimated_cost=50.0)
+    assert denied["allowed"] is False
+    assert "Budget limit exceeded" in denied["reason"]
+    assert denied["budget_remaining"] == 40.0
+
+    # Releasing the reservation frees the headroom
+    controller.record_task_cost("t1", "a", 10.0, "llm")
+    controller.register_task_end("t1", "a", final_cost=10.0)
+    usage = controller.get_budget_usage("t1")
+    assert usage.current_usage == 10.0
+    assert usage.reserved_cost == 0.0
+    assert usage.concurrent_runs == 0
+    assert usage.top_cost_tasks[0]["task_id"] == "a"
+    assert controller.register_task_start("t1", "b", "run_b", estimated_cost=50.0)["allowed"]
+
+    # Repeated start of a live task does not take a second slot
+    again = controller.register_task_start("t1", "b", "run_b", estimated_cost=50.0)
+    assert again["allowed"] is True
+    assert again["concurrent_runs"] == 1
+
+
+def test_costs_within_reservation_are_buffered(tmp_path):
+    worker = _controller(tmp_path)
+    observer = _controller(tmp_path)
+
+    worker.register_task_start("t1", "task", "run", estimated_cost=5.0)
+    for _ in range(4):
+        worker.record_task_cost("t1", "task", 1.0, "llm")
+
+    # Not yet in the ledger, but the reservation already covers it
+    seen = observer.get_budget_usage("t1")
+    assert seen.current_usage == 0.0
+    assert seen.current_usage + seen.reserved_cost == 5.0
+    assert observer.get_running_tasks("t1")[0]["actual_cost"] == 0.0
+
+    # The writer always reads its own costs
+    assert worker.get_budget_usage("t1").current_usage == 4.0
+    assert observer.get_budget_usage("t1").current_usage == 4.0
+
+    # An overrun is written through immediately
+    worker.record_task_cost("t1", "task", 3.0, "retrieval")
+    seen = observer.get_budget_usage("t1")
+    assert seen.current_usage == 7.0
+    assert seen.reserved_cost == 0.0
+    assert seen.cost_by_category == {"llm": 4.0, "retrieval": 3.0}
+    assert seen.status == BudgetStatus.HEALTHY
+
+
+def test_mid_run_check_counts_reservations_and_buffered_costs(tmp_path):
+    controller = _controller(tmp_path)
+    _set_limits(controller, "t1", budget_limit=100.0)
+    controller.register_task_start("t1", "other", "run", estimated_cost=50.0)
+    controller.register_task_start("t1", "mine", "run", estimated_cost=20.0)
+    controller.record_task_cost("t1", "mine", 15.0, "llm")
+
+    # 15 spent (still buffered) + 50 reserved by the other task; the 5 left in mine covers half of 10
+    check = controller.can_proceed_with_cost("t1", 10.0, task_id="mine")
+    assert check["action"] == "continue" and check["budget_remaining"] == 25.0
+    # Without the caller's own headroom the cost is projected on top of it
+    assert controller.can_proceed_with_cost("t1", 10.0)["budget_remaining"] == 20.0
+    assert controller.can_proceed_with_cost("t1", 30.0, task_id="mine")["action"] == "degrade"
+    assert controller.can_proceed_with_cost("t1", 40.0, task_id="mine")["can_proceed"] is False
+
+
+def test_reset_keeps_running_reservations(tmp_path):
+    controller = _controller(tmp_path)
+    controller.register_task_start("t1", "task", "run", estimated_cost=2.0)
+    controller.record_task_cost("t1", "task", 5.0, "llm")
+
+    controller.reset_budget_period("t1", new_limit=50.0)
+    usage = controller.get_budget_usage("t1")
+    assert usage.budget_limit == 50.0
+    assert usage.current_usage == 0.0
+    assert usage.cost_by_category == {}
+    assert usage.concurrent_runs == 1
+    assert any(name.startswith("budget_archive_") for name in os.listdir(tmp_path / "t1"))
+
+
+def test_legacy_snapshot_is_migrated(tmp_path):
+    legacy_dir = tmp_path / "t1"
+    legacy_dir.mkdir()
+    (legacy_dir / "budget_usage.json").write_text(json.dumps({
+        "tenant_id": "t1",
+        "period": "daily",
+        "period_start": "2024-01-01T00:00:00",
+        "period_end": "2024-01-02T00:00:00",
+        "budget_limit": 200.0,
+        "current_usage": 42.0,
+        "usage_rate": 0.21,
+        "status": "healthy",
+        "concurrent_runs": 3,
+        "max_concurrent_runs": 4,
+        "cost_by_category": {"llm": 42.0},
+        "top_cost_tasks": [{"task_id": "old", "run_id": "r", "cost": 42.0, "completed_at": "x"}],
+        "updated_at": "2024-01-01T00:00:00",
+    }))
+
+    usage = _controller(tmp_path).get_budget_usage("t1")
+    assert usage.budget_limit == 200.0
+    assert usage.current_usage == 42.0
+    assert usage.max_concurrent_runs == 4
+    # Slots held by a previous process are not carried over
+    assert usage.concurrent_runs == 0
+    assert usage.cost_by_category == {"llm": 42.0}
+    assert usage.top_cost_tasks[0]["task_id"] == "old"
+
+
+def _abandon_reservation(artifacts_dir):
+    controller = TenantBudgetController(artifacts_dir=artifacts_dir)
+    controller.register_task_start("t1", "orphan", "run", estimated_cost=30.0)
+    os._exit(0)
+
+
+def test_compaction_reclaims_dead_reservations(tmp_path):
+    controller = _controller(tmp_path)
+    controller.TOP_COST_TASKS = 3
+
+    proc = multiprocessing.get_context("fork").Process(
+        target=_abandon_reservation, args=(str(tmp_path),)
+    )
+    proc.start()
+    proc.join(timeout=30)
+
+    usage = controller.get_budget_usage("t1")
+    assert usage.concurrent_runs == 1
+    assert usage.reserved_cost == 30.0
+
+    for i in range(5):
+        controller.register_task_start("t1", f"done_{i}", "run", estimated_cost=1.0)
+        controller.register_task_end("t1", f"done_{i}", final_cost=float(i))
+    controller.register_task_start("t1", "live", "run", estimated_cost=1.0)
+
+    controller.compact()
+    usage = controller.get_budget_usage("t1")
+    assert usage.concurrent_runs == 1
+    assert usage.reserved_cost == 1.0
+    assert [t["task_id"] for t in controller.get_running_tasks("t1")] == ["live"]
+    assert [t["cost"] for t in usage.top_cost_tasks] == [4.0, 3.0, 2.0]
+    # The dead process's unconsumed reservation is charged, not forgotten
+    assert usage.current_usage == 30.0
+    assert usage.cost_by_category == {"reclaimed": 30.0}
+
+    with open(tmp_path / "t1" / "budget_usage.json", encoding="utf-8") as f:
+        assert json.load(f)["concurrent_runs"] == 1
+
+
+def _reserve_worker(artifacts_dir, worker_id, attempts, results):
+    controller = TenantBudgetController(artifacts_dir=artifacts_dir, flush_interval_s=3600)
+    allowed = 0
+    for i in range(attempts):
+        task_id = f"w{worker_id}_{i}"
+        if controller.register_task_start("shared", task_id, task_id, estimated_cost=10.0)["allowed"]:
+            allowed += 1
+            for _ in range(5):
+                controller.record_task_cost("shared", task_id, 1.0, "llm")
+    controller.flush()
+    results.put(allowed)
+
+
+def test_reservations_are_atomic_across_processes(tmp_path):
+    controller = _controller(tmp_path)
+    # Concurrency is the binding limit for slots, budget for reserved cost
+    _set_limits(controller, "shared", budget_limit=1000.0, max_concurrent_runs=12)
+
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    workers = [
+        ctx.Process(target=_reserve_worker, args=(str(tmp_path), w, 10, results))
+        for w in range(6)
+    ]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join(timeout=60)
+    allowed = sum(results.get(timeout=10) for _ in workers)
+
+    usage = controller.get_budget_usage("shared")
+    assert allowed == 12
+    assert usage.concurrent_runs == 12
+    assert usage.current_usage == 60.0
+    assert usage.reserved_cost == 60.0
+    assert len(controller.get_running_tasks("shared")) == 12
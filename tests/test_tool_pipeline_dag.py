@@ -0,0 +1,197 @@
+"""
+ToolDispatcher.execute_pipeline: dependency-graph execution of tool pipelines
+"""
+import asyncio
+
+import pytest
+
+from runtime.tools.tool_dispatcher import ToolDispatcher, ToolResult
+
+
+@pytest.fixture
+def dispatcher(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return ToolDispatcher(sandbox_dir=str(tmp_path / "sandbox"))
+
+
+def _fake_execute(dispatcher, delays, failures=()):
+    """Replace tool execution: each step echoes its params after a delay"""
+    log = []
+
+    async def execute(tool_name, params, task_id, on_output=None):
+        name = params["name"]
+        log.append(("start", name))
+        await asyncio.sleep(delays.get(name, 0.05))
+        log.append(("end", name))
+        if name in failures:
+            return ToolResult(tool_name, success=False, error=f"{name} failed", exit_code=1)
+        return ToolResult(tool_name, success=True, output={"from": name, "params": params})
+
+    dispatcher.execute = execute
+    return log
+
+
+def _step(name, output_key, continue_on_error=False, depends_on=(), **params):
+    """A step that opts into parallelism (depends_on=None keeps list order)"""
+    step = {
+        "tool_name": "fake",
+        "params": {"name": name, **params},
+        "output_key": output_key,
+        "continue_on_error": continue_on_error,
+    }
+    if depends_on is not None:
+        step["depends_on"] = list(depends_on)
+    return step
+
+
+def test_independent_steps_run_concurrently(dispatcher):
+    _fake_execute(dispatcher, {"a": 0.2, "b": 0.2, "c": 0.05})
+    pipeline = dispatcher.create_pipeline("fanout", [
+        _step("a", "out_a", src="${source}"),
+        _step("b", "out_b", src="${source}"),
+        _step("c", "out_c", left="${out_a}", right={"nested": ["${out_b}"]}),
+    ])
+
+    trace, outputs = asyncio.run(dispatcher.execute_pipeline(pipeline, "t1", {"source": "doc"}))
+
+    assert trace.success
+    a, b, c = trace.steps
+    assert a.depends_on == [] and b.depends_on == []
+    assert c.depends_on == [a.step_id, b.step_id]
+    # a and b overlap; c starts after both finish
+    assert b.start_offset_ms < a.end_offset_ms
+    assert c.start_offset_ms >= max(a.end_offset_ms, b.end_offset_ms)
+    assert trace.total_execution_time_ms < 380
+
+    assert a.params["src"] == "doc"
+    assert c.params["left"]["from"] == "a"
+    assert c.params["right"]["nested"][0]["from"] == "b"
+    assert list(outputs) == ["out_a", "out_b", "out_c"]
+    assert trace.to_dict()["steps"][2]["depends_on"] == [a.step_id, b.step_id]
+
+
+def test_concurrency_cap(dispatcher):
+    log = _fake_execute(dispatcher, {})
+    pipeline = dispatcher.create_pipeline("wide", [_step(f"s{i}", f"o{i}") for i in range(6)])
+
+    asyncio.run(dispatcher.execute_pipeline(pipeline, "t1", max_concurrency=2))
+
+    active = peak = 0
+    for event, _ in log:
+        active += 1 if event == "start" else -1
+        peak = max(peak, active)
+    assert peak == 2
+
+
+def test_references_bind_to_latest_earlier_producer(dispatcher):
+    # s2 redefines "value" while s1 (its reader) may still be running
+    _fake_execute(dispatcher, {"s0": 0.01, "s1": 0.1, "s2": 0.01})
+    pipeline = dispatcher.create_pipeline("shadow", [
+        _step("s0", "value"),
+        _step("s1", "read", v="${value}"),
+        _step("s2", "value"),
+        _step("s3", "read_again", v="${value}"),
+    ])
+
+    trace, outputs = asyncio.run(dispatcher.execute_pipeline(pipeline, "t1"))
+
+    steps = {s.step_id.split("_")[1]: s for s in trace.steps}
+    assert steps["1"].params["v"]["from"] == "s0"
+    assert steps["3"].params["v"]["from"] == "s2"
+    assert outputs["value"]["from"] == "s2"
+
+
+def test_failure_stops_later_steps_unless_continue_on_error(dispatcher):
+    _fake_execute(dispatcher, {"bad": 0.01, "slow": 0.1}, failures={"bad", "soft"})
+    pipeline = dispatcher.create_pipeline("errors", [
+        _step("soft", "o_soft", continue_on_error=True),
+        _step("uses_soft", "o_uses", v="${o_soft}"),
+        _step("slow", "o_slow"),
+        _step("bad", "o_bad"),
+        _step("after", "o_after"),
+    ])
+
+    trace, outputs = asyncio.run(dispatcher.execute_pipeline(pipeline, "t1", max_concurrency=3))
+
+    ran = [s.params["name"] for s in trace.steps]
+    assert trace.success is False
+    # Dependents of a continue_on_error failure still run; nothing after "bad" starts
+    assert ran == ["soft", "uses_soft", "slow", "bad"]
+    assert outputs["o_soft"] is None
+    assert "o_after" not in outputs
+
+
+def test_steps_without_depends_on_keep_list_order(dispatcher):
+    log = _fake_execute(dispatcher, {"mkdir": 0.1, "write": 0.01, "read": 0.01, "side": 0.01})
+    pipeline = dispatcher.create_pipeline("ordered", [
+        _step("mkdir", "o_mkdir", depends_on=None),
+        _step("write", "o_write", depends_on=None),
+        _step("side", "o_side"),
+        _step("read", "o_read", depends_on=None),
+    ])
+
+    trace, _ = asyncio.run(dispatcher.execute_pipeline(pipeline, "t1"))
+
+    mkdir, write, side, read = trace.steps
+    assert write.depends_on == [mkdir.step_id]
+    assert side.depends_on == []
+    # read waits for both branches that precede it
+    assert read.depends_on == [write.step_id, side.step_id]
+    assert log.index(("end", "mkdir")) < log.index(("start", "write"))
+    assert log.index(("start", "side")) < log.index(("end", "mkdir"))
+    assert log.index(("start", "read")) > max(log.index(("end", "write")), log.index(("end", "side")))
+
+
+def test_failure_cancels_later_steps_already_running(dispatcher):
+    log = _fake_execute(dispatcher, {"bad": 0.05, "early": 0.01, "long": 0.5}, failures={"bad"})
+    pipeline = dispatcher.create_pipeline("cancel", [
+        _step("bad", "o_bad"),
+        _step("early", "o_early"),
+        _step("long", "o_long"),
+    ])
+
+    trace, outputs = asyncio.run(dispatcher.execute_pipeline(pipeline, "t1"))
+
+    assert trace.success is False
+    assert ("end", "long") not in log
+    assert trace.steps[2].success is False and trace.steps[2].error.startswith("cancelled")
+    assert trace.total_execution_time_ms < 400
+    assert list(outputs) == ["o_bad"]
+
+
+def test_predefined_pipeline_runs_in_sandbox(dispatcher, tmp_path, monkeypatch):
+    import runtime.tools.tool_dispatcher as module
+    monkeypatch.setattr(module.shutil, "which", lambda name: None)
+    (tmp_path / "sandbox" / "t1").mkdir(parents=True)
+    (tmp_path / "sandbox" / "t1" / "in.txt").write_text("hello")
+
+    pipeline = dispatcher.get_rag_ingestion_pipeline()
+    trace, outputs = asyncio.run(dispatcher.execute_pipeline(
+        pipeline, "t1", {"source_path": "artifacts/in.txt", "output_path": "artifacts/out.txt"}
+    ))
+
+    assert trace.success
+    assert trace.steps[1].depends_on == [trace.steps[0].step_id]
+    assert (tmp_path / "sandbox" / "t1" / "out.txt").read_text() == "hello"
+
+
+def test_artifact_pipeline_writes_after_mkdir(dispatcher):
+    log = []
+
+    async def execute(tool_name, params, task_id, on_output=None):
+        log.append(("start", tool_name))
+        await asyncio.sleep(0.1 if tool_name == "command_execute" else 0.01)
+        log.append(("end", tool_name))
+        return ToolResult(tool_name, success=True, output="ok")
+
+    dispatcher.execute = execute
+    pipeline = dispatcher.get_artifact_generation_pipeline()
+    assert all("depends_on" in step for step in pipeline.steps)
+    trace, _ = asyncio.run(dispatcher.execute_pipeline(pipeline, "t1", {
+        "artifact_dir": "out", "artifact_path": "out/a.txt", "artifact_content": "x"
+    }))
+
+    assert trace.success
+    assert trace.steps[1].depends_on == [trace.steps[0].step_id]
+    assert log == [("start", "command_execute"), ("end", "command_execute"),
+                   ("start", "file_write"), ("end", "file_write")]
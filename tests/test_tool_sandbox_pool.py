@@ -0,0 +1,231 @@
+"""
+ToolDispatcher sandbox: async subprocesses, warm worker pool, per-tool limits
+"""
+import asyncio
+import os
+import time
+
+import pytest
+
+from runtime.tools import tool_dispatcher as dispatcher_module
+from runtime.tools import sandbox_pool as pool_module
+from runtime.tools.sandbox_pool import DockerSandboxWorker, LocalSandboxWorker, SandboxPool, run_streaming
+from runtime.tools.tool_dispatcher import ToolDispatcher
+
+
+@pytest.fixture
+def no_docker(monkeypatch):
+    monkeypatch.setattr(dispatcher_module.shutil, "which", lambda name: None)
+
+
+def test_run_streaming_streams_and_kills_process_group():
+    chunks = []
+
+    async def scenario():
+        ok = await run_streaming(
+            ["sh", "-c", "echo one; echo two >&2; echo three"],
+            on_output=lambda stream, text: chunks.append((stream, text)),
+        )
+        start = time.monotonic()
+        # The background child holds the pipes open; it must die with the group
+        slow = await run_streaming(["sh", "-c", "sleep 30 & echo started; wait"], timeout_sec=0.5)
+        return ok, slow, time.monotonic() - start
+
+    ok, slow, elapsed = asyncio.run(scenario())
+    assert ok["exit_code"] == 0
+    assert ok["stdout"] == "one\nthree\n"
+    assert ok["stderr"] == "two\n"
+    assert "".join(t for s, t in chunks if s == "stdout") == "one\nthree\n"
+
+    assert slow["timed_out"] is True
+    assert slow["exit_code"] == -1
+    assert slow["stdout"] == "started\n"
+    assert elapsed < 5
+
+
+def test_run_streaming_bounds_captured_output():
+    async def scenario():
+        return await run_streaming(
+            ["sh", "-c", "head -c 200000 /dev/zero | tr '\\0' x"], max_output_chars=1000
+        )
+
+    result = asyncio.run(scenario())
+    assert result["exit_code"] == 0
+    assert len(result["stdout"]) == 1000
+    assert result["truncated"] is True
+
+
+def test_sandbox_execution_does_not_block_event_loop(tmp_path, no_docker):
+    dispatcher = ToolDispatcher(sandbox_dir=str(tmp_path))
+    dispatcher.tool_registry["command_execute"]["allowed_commands"].append("sleep")
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        result = await dispatcher.execute(
+            "command_execute", {"command": "sleep", "args": ["0.5"]}, "task_1"
+        )
+        task.cancel()
+        return result, ticks
+
+    result, ticks = asyncio.run(scenario())
+    assert result.success
+    assert ticks >= 20
+
+
+def test_warm_pool_reuses_local_workers(tmp_path, no_docker):
+    dispatcher = ToolDispatcher(sandbox_dir=str(tmp_path), warm_pool_size=2)
+    content = "it's\nEOF\n$HOME `x`\n"
+
+    async def scenario():
+        await dispatcher.warm_sandbox_pool()
+        write = await dispatcher.execute(
+            "file_write", {"path": "artifacts/out.txt", "content": content}, "task_1"
+        )
+        read = await dispatcher.execute("file_read", {"path": "artifacts/out.txt"}, "task_1")
+        echoes = await asyncio.gather(*(
+            dispatcher.execute("command_execute", {"command": "echo", "args": [str(i)]}, f"task_{i}")
+            for i in range(10)
+        ))
+        missing = await dispatcher.execute("file_read", {"path": "artifacts/none.txt"}, "task_1")
+        await dispatcher.close()
+        return write, read, echoes, missing
+
+    write, read, echoes, missing = asyncio.run(scenario())
+    assert write.success
+    # Content goes through stdin, never through the shell
+    assert read.success and read.output == content
+    assert (tmp_path / "task_1" / "out.txt").read_text() == content
+    assert [r.output for r in echoes] == [f"{i}\n" for i in range(10)]
+    assert missing.success is False and missing.exit_code == 3
+    assert dispatcher._pools == {}
+
+
+def test_pool_caps_workers_and_recycles(tmp_path):
+    started = []
+
+    def factory():
+        worker = LocalSandboxWorker(str(tmp_path))
+        started.append(worker)
+        return worker
+
+    pool = SandboxPool(factory, size=2, max_uses=3)
+
+    async def scenario():
+        results = await asyncio.gather(*(
+            pool.run(["sh", "-c", "sleep 0.05; pwd"], "ws", timeout_sec=5) for _ in range(8)
+        ))
+        await pool.close()
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(r["stdout"].strip() == str(tmp_path / "ws") for r in results)
+    # Never more than `size` live workers; each retired after max_uses calls
+    assert len(started) >= 3
+    assert all(w.uses <= 3 for w in started)
+
+
+def test_per_tool_concurrency_limit(tmp_path, no_docker):
+    dispatcher = ToolDispatcher(sandbox_dir=str(tmp_path))
+    dispatcher.tool_registry["file_read"]["max_concurrency"] = 2
+    active = peak = 0
+
+    async def fake_sandbox(tool_name, params, task_id, tool_def, on_output=None):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.02)
+        active -= 1
+        return {"success": True, "output": "ok"}
+
+    dispatcher._execute_in_sandbox = fake_sandbox
+
+    async def scenario():
+        return await asyncio.gather(*(
+            dispatcher.execute("file_read", {"path": "artifacts/x"}, f"t{i}") for i in range(6)
+        ))
+
+    results = asyncio.run(scenario())
+    assert all(r.success for r in results)
+    assert peak == 2
+
+
+class FakeDocker:
+    """`docker run -v` / `docker exec` stand-in; mounts are tracked by inode, like a bind mount"""
+
+    def __init__(self):
+        self.mounts = {}
+        self.real_run = run_streaming
+
+    def dir_of(self, name, root):
+        inode = self.mounts[name]
+        for dirpath, _, _ in os.walk(root):
+            if os.stat(dirpath).st_ino == inode:
+                return dirpath
+        raise AssertionError(f"mount of {name} vanished")
+
+    async def __call__(self, argv, cwd=None, timeout_sec=10.0, input_data=None, on_output=None, **kwargs):
+        if argv[1] == "run":
+            mounts = [argv[i + 1] for i, a in enumerate(argv) if a == "-v"]
+            assert len(mounts) == 1 and mounts[0].endswith(":/workspace:rw")
+            self.mounts[argv[argv.index("--name") + 1]] = os.stat(mounts[0].split(":")[0]).st_ino
+            return {"exit_code": 0, "stdout": "", "stderr": "", "timed_out": False, "truncated": False,
+                    "duration_ms": 0.0}
+        if argv[1] == "exec":
+            rest = argv[2:]
+            if rest[0] == "-i":
+                rest = rest[1:]
+            assert rest[:2] == ["-w", "/workspace"]
+            return await self.real_run(rest[3:], cwd=self.dir_of(rest[2], self.root), timeout_sec=timeout_sec,
+                                       input_data=input_data, on_output=on_output)
+        return {"exit_code": 0, "stdout": "", "stderr": "", "timed_out": False, "truncated": False,
+                "duration_ms": 0.0}
+
+
+def test_docker_workers_only_mount_their_own_workspace(tmp_path, monkeypatch):
+    fake = FakeDocker()
+    fake.root = str(tmp_path)
+    monkeypatch.setattr(pool_module, "run_streaming", fake)
+    monkeypatch.setattr(dispatcher_module.shutil, "which", lambda name: "/usr/bin/docker")
+    dispatcher = ToolDispatcher(sandbox_dir=str(tmp_path), warm_pool_size=2)
+    (tmp_path / "task_b").mkdir()
+    (tmp_path / "task_b" / "secret.txt").write_text("b-only")
+
+    async def scenario():
+        await dispatcher.warm_sandbox_pool(["file_write"])
+        write_a = await dispatcher.execute("file_write", {"path": "artifacts/a.txt", "content": "a"}, "task_a")
+        write_b = await dispatcher.execute("file_write", {"path": "artifacts/b.txt", "content": "b"}, "task_b")
+        peek = await dispatcher.execute("file_read", {"path": "../task_b/secret.txt"}, "task_a")
+        pool = dispatcher._pools[next(iter(dispatcher._pools))]
+        bound = {w.workspace: fake.dir_of(w.container_name, str(tmp_path)) for w in pool._idle if w.workspace}
+        await dispatcher.close()
+        return write_a, write_b, peek, bound
+
+    write_a, write_b, peek, bound = asyncio.run(scenario())
+    assert write_a.success and write_b.success
+    # task_a adopted a pre-warmed container; task_b already existed and got its own container
+    assert (tmp_path / "task_a" / "a.txt").read_text() == "a"
+    assert (tmp_path / "task_b" / "b.txt").read_text() == "b"
+    # Each container's only mount is its own workspace, never the sandbox root
+    assert bound == {"task_a": str(tmp_path / "task_a"), "task_b": str(tmp_path / "task_b")}
+    assert os.stat(tmp_path).st_ino not in fake.mounts.values()
+    assert peek.success is False
+
+    worker = DockerSandboxWorker("/usr/bin/docker", "alpine", str(tmp_path))
+
+    async def misuse():
+        await worker.start("task_a")
+        with pytest.raises(ValueError):
+            await worker.exec(["cat", "secret.txt"], "task_b", timeout_sec=5)
+        assert await worker.bind("task_b") is False
+        with pytest.raises(ValueError):
+            await worker.start("../outside")
+
+    asyncio.run(misuse())
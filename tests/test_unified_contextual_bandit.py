@@ -0,0 +1,76 @@
+"""
+UnifiedContextualBanditPolicy: incremental (Sherman-Morrison) LinUCB + batch scoring
+"""
+import numpy as np
+
+from learning.unified_policy import (
+    Action,
+    PolicyFactory,
+    PolicyParadigm,
+    Reward,
+    State,
+    UnifiedContextualBanditPolicy,
+)
+
+
+def _state(i: int) -> State:
+    task_types = ["retrieve", "analyze", "build", "qa", "summarize"]
+    return State(
+        state_id=f"s{i}",
+        task_type=task_types[i % 5],
+        task_complexity="moderate",
+        recent_success_rate=(i % 7) / 7,
+        remaining_budget=(i % 3) / 3,
+        query_features={"len": (i % 11) / 11},
+    )
+
+
+def _reward(value: float) -> Reward:
+    return Reward(
+        reward_id="r",
+        task_success=1.0,
+        quality_score=value,
+        user_satisfaction_proxy=value,
+        cost_efficiency=value,
+        latency_efficiency=value,
+        total_reward=value,
+    )
+
+
+def test_incremental_inverse_matches_direct_inverse(tmp_path):
+    actions = ["a", "b", "c"]
+    policy = UnifiedContextualBanditPolicy("p", actions, artifacts_dir=str(tmp_path))
+
+    for i in range(60):
+        policy.update(_state(i), Action(action_id=f"x{i}", strategy_id=actions[i % 3]), _reward((i % 5) / 5))
+
+    for k, action_id in enumerate(actions):
+        A_inv = np.linalg.inv(policy.A[k])
+        assert np.allclose(policy.A_inv[k], A_inv, atol=1e-8)
+        assert np.allclose(policy.theta[k], A_inv @ policy.b[k], atol=1e-8)
+
+
+def test_batch_selection_matches_single_selection(tmp_path):
+    actions = ["a", "b", "c", "d"]
+    policy = UnifiedContextualBanditPolicy("p", actions, alpha=0.5, artifacts_dir=str(tmp_path))
+    for i in range(40):
+        policy.update(_state(i), Action(action_id=f"x{i}", strategy_id=actions[i % 4]), _reward(0.9 if i % 4 == 2 else 0.1))
+
+    states = [_state(i) for i in range(25)]
+    batch = [a.strategy_id for a in policy.select_actions(states)]
+    single = [policy.select_action(s).strategy_id for s in states]
+    assert batch == single
+    assert policy.select_actions([]) == []
+
+
+def test_save_and_load_restores_inverse(tmp_path):
+    actions = ["a", "b"]
+    policy = UnifiedContextualBanditPolicy("linucb", actions, artifacts_dir=str(tmp_path))
+    for i in range(10):
+        policy.update(_state(i), Action(action_id=f"x{i}", strategy_id=actions[i % 2]), _reward(0.5))
+    policy.save()
+
+    loaded = PolicyFactory.load("linucb", artifacts_dir=str(tmp_path))
+    assert loaded.paradigm == PolicyParadigm.CONTEXTUAL_BANDIT
+    assert np.allclose(loaded.A_inv, policy.A_inv, atol=1e-8)
+    assert np.allclose(loaded.theta, policy.theta, atol=1e-8)
@@ -0,0 +1,183 @@
+"""
+Workbench run store: SQLite pagination / filters, concurrent updates, streamed uploads
+"""
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.api import workbench
+from backend.api.workbench_store import WorkbenchStore
+
+
+def _client(tmp_path, monkeypatch, max_upload=None):
+    monkeypatch.setattr(workbench, "WORKBENCH_ROOT", str(tmp_path))
+    monkeypatch.setattr(workbench, "UPLOAD_CHUNK_BYTES", 1024)
+    if max_upload is not None:
+        monkeypatch.setattr(workbench, "MAX_UPLOAD_BYTES", max_upload)
+    app = FastAPI()
+    app.include_router(workbench.router, prefix="/api")
+    return TestClient(app)
+
+
+def test_list_runs_pages_and_filters(tmp_path):
+    store = WorkbenchStore(str(tmp_path / "wb.db"))
+    for i in range(25):
+        store.create_run({
+            "id": f"run-{i:02d}", "project_id": "p1" if i % 2 else "p2", "type": "query",
+            "status": "failed" if i % 5 == 0 else "completed",
+            "created_at": f"2026-01-01T00:{i:02d}:00",
+        })
+
+    seen, cursor = [], None
+    while True:
+        page, cursor, total = store.list_runs(limit=10, cursor=cursor)
+        seen += [r["id"] for r in page]
+        if cursor is None:
+            break
+    assert total == 25
+    assert seen == [f"run-{i:02d}" for i in reversed(range(25))]
+
+    failed, _, total = store.list_runs(status="failed")
+    assert total == 5 and [r["id"] for r in failed] == ["run-20", "run-15", "run-10", "run-05", "run-00"]
+    window, _, _ = store.list_runs(project_id="p1", since="2026-01-01T00:10:00", until="2026-01-01T00:15:00")
+    assert [r["id"] for r in window] == ["run-13", "run-11"]
+
+
+def test_concurrent_updates_are_not_lost(tmp_path):
+    store = WorkbenchStore(str(tmp_path / "wb.db"))
+    store.create_run({"id": "r", "status": "processing", "counter": 0, "logs": ["created"]})
+
+    def bump(n):
+        other = WorkbenchStore(str(tmp_path / "wb.db"))
+        for _ in range(n):
+            other.update_run("r", mutate=lambda run: run.update(counter=run["counter"] + 1), log="bump")
+
+    threads = [threading.Thread(target=bump, args=(25,)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    run = store.get_run("r")
+    assert run["counter"] == 100
+    assert run["logs"] == ["created"] + ["bump"] * 100
+    assert store.update_run("missing", {"status": "x"}) is None
+
+
+def test_legacy_json_is_imported_once(tmp_path, monkeypatch):
+    (tmp_path / "projects.json").write_text(json.dumps({"p1": {"id": "p1", "name": "old"}}))
+    (tmp_path / "runs.json").write_text(json.dumps({
+        "r1": {"id": "r1", "project_id": "p1", "type": "ingest", "status": "completed",
+               "created_at": "2025-12-01T10:00:00", "logs": ["Saved file"]},
+    }))
+    client = _client(tmp_path, monkeypatch)
+    assert client.get("/api/projects").json()["p1"]["name"] == "old"
+    assert client.get("/api/runs/r1/logs").json() == {"logs": ["Saved file"]}
+    res = client.get("/api/runs", params={"project_id": "p1", "limit": 1})
+    assert list(res.json()) == ["r1"] and res.headers["X-Total-Count"] == "1"
+    assert "X-Next-Cursor" not in res.headers
+    assert client.get("/api/runs", params={"since": "yesterday"}).status_code == 400
+
+
+def test_upload_streams_hashes_and_caps(tmp_path, monkeypatch):
+    client = _client(tmp_path, monkeypatch, max_upload=10_000)
+    project_id = client.post("/api/projects", data={"name": "demo"}).json()["id"]
+
+    payload = bytes(range(256)) * 30
+    run = client.post(
+        f"/api/projects/{project_id}/ingest", files={"file": ("../notes.bin", payload)}
+    ).json()
+    assert run["status"] == "completed"
+    assert run["size_bytes"] == len(payload)
+    assert run["sha256"] == hashlib.sha256(payload).hexdigest()
+    assert run["file_path"].endswith(f"{run['id']}-notes.bin")
+    with open(run["file_path"], "rb") as f:
+        assert f.read() == payload
+
+    res = client.post(f"/api/projects/{project_id}/ingest", files={"file": ("big.bin", b"x" * 10_001)})
+    assert res.status_code == 413
+    failed = client.get("/api/runs", params={"status": "failed"}).json()
+    assert len(failed) == 1 and next(iter(failed.values()))["error"] == "upload_too_large"
+    project_dir = tmp_path / "projects" / project_id
+    assert sorted(p.name for p in project_dir.iterdir()) == [f"{run['id']}-notes.bin"]
+
+    query = client.post(f"/api/projects/{project_id}/query", data={"query": "q"}).json()
+    assert client.get(f"/api/runs/{query['id']}").json()["answer"] == query["answer"]
+    assert client.post("/api/projects/nope/ingest", files={"file": ("a", b"a")}).status_code == 404
+
+
+def _asgi_upload(app, path, chunks, headers):
+    """POST `chunks` one ASGI message at a time; returns (status, number of body messages the app pulled)"""
+    pulled, sent = [], {}
+    messages = iter(chunks)
+
+    async def receive():
+        chunk = next(messages, None)
+        if chunk is None:
+            return {"type": "http.request", "body": b"", "more_body": False}
+        pulled.append(len(chunk))
+        return {"type": "http.request", "body": chunk, "more_body": True}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            sent["status"] = message["status"]
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(k.encode(), v.encode()) for k, v in headers.items()],
+        "client": ("test", 1), "server": ("test", 80),
+    }
+    asyncio.run(app(scope, receive, send))
+    return sent["status"], len(pulled)
+
+
+def test_oversized_upload_stops_reading_the_body(tmp_path, monkeypatch):
+    client = _client(tmp_path, monkeypatch, max_upload=10)
+    project_id = client.post("/api/projects", data={"name": "demo"}).json()["id"]
+    boundary = "wb-boundary"
+    head = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"big.bin\"\r\n"
+            "Content-Type: application/octet-stream\r\n\r\n").encode()
+    chunks = [head] + [b"x" * 65536] * 80 + [f"\r\n--{boundary}--\r\n".encode()]
+    headers = {"content-type": f"multipart/form-data; boundary={boundary}"}
+    path = f"/api/projects/{project_id}/ingest"
+
+    status, pulled = _asgi_upload(client.app, path, chunks, headers)
+    assert status == 413
+    # ~5 MB offered; reading stopped at the first block past the cap
+    assert pulled == 2
+    assert list((tmp_path / "projects" / project_id).iterdir()) == []
+
+    # A declared Content-Length over the cap is refused before any of the body is read
+    status, pulled = _asgi_upload(client.app, path, chunks, dict(headers, **{"content-length": "5300000"}))
+    assert status == 413 and pulled == 0
+    assert len(client.get("/api/runs", params={"type": "ingest"}).json()) == 1
+
+
+def test_store_writes_wait_off_the_event_loop(tmp_path, monkeypatch):
+    client = _client(tmp_path, monkeypatch)
+    client.get("/api/projects")
+    blocker = sqlite3.connect(str(tmp_path / "workbench.db"), isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=client.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            write = asyncio.create_task(http.post("/api/projects", data={"name": "waits"}))
+            start = time.perf_counter()
+            await asyncio.sleep(0.2)
+            lag = time.perf_counter() - start
+            pending = not write.done()
+            blocker.execute("COMMIT")
+            return lag, pending, await write
+
+    lag, pending, res = asyncio.run(scenario())
+    # The loop kept running while the write waited for the database lock
+    assert lag < 1.0 and pending
+    assert res.status_code == 200 and res.json()["name"] == "waits"
@@ -0,0 +1,108 @@
+"""
+Write-behind persistence: debounce, bounded staleness, atomic rename, shutdown flush
+"""
+import json
+import time
+
+from learning.bandit_selector import BanditSelector
+from learning.write_behind import WriteBehindBuffer, flush_all
+from runtime.memory.working_memory import WorkingMemory
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_buffer_coalesces_and_flushes_within_staleness_bound(tmp_path):
+    path = tmp_path / "state.json"
+    state = {"n": 0}
+    buffer = WriteBehindBuffer(flush_interval_s=0.2)
+
+    for i in range(1, 101):
+        state["n"] = i
+        buffer.mark_dirty(str(path), lambda: dict(state))
+
+    # Leading-edge write only
+    assert _read(path) == {"n": 1}
+    assert buffer.dirty
+
+    # Background flusher issues the trailing write within the bound
+    deadline = time.monotonic() + 3.0
+    while _read(path)["n"] != 100 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert _read(path) == {"n": 100}
+    assert not buffer.dirty
+    assert not (tmp_path / "state.json.tmp").exists()
+
+
+def test_fsync_and_flush_all(tmp_path):
+    buffer = WriteBehindBuffer(flush_interval_s=3600, fsync=True)
+    buffer.mark_dirty(str(tmp_path / "a.json"), lambda: {"v": 1})
+    buffer.mark_dirty(str(tmp_path / "a.json"), lambda: {"v": 2})
+    buffer.append(str(tmp_path / "log.jsonl"), {"event": 1})
+
+    flush_all()
+    assert _read(tmp_path / "a.json") == {"v": 2}
+    assert (tmp_path / "log.jsonl").read_text().count("\n") == 1
+
+
+def test_bandit_selector_debounces_reward_writes(tmp_path):
+    state_path = tmp_path / "bandit.json"
+    bandit = BanditSelector(state_path=str(state_path), max_staleness_s=3600)
+    bandit.register_arm("a")
+    for _ in range(50):
+        bandit.update_reward("a", 1.0)
+
+    assert _read(state_path)["total_pulls"] == 0
+    bandit.flush()
+    assert _read(state_path)["total_pulls"] == 50
+
+    reloaded = BanditSelector(state_path=str(state_path))
+    assert reloaded.state.arms["a"].pulls == 50
+
+
+def test_working_memory_debounces_records(tmp_path):
+    storage_path = tmp_path / "working_memory.json"
+    memory = WorkingMemory(storage_path=str(storage_path), max_patterns=3, max_staleness_s=3600)
+
+    for i in range(10):
+        signature = memory.build_pattern_signature_from_run(
+            tool_sequence=[f"tool_{i}"], planner_choice="normal"
+        )
+        memory.record(signature, outcome="success")
+
+    assert len(memory.get_all_patterns()) == 3
+    assert _read(storage_path)["summary"]["total_runs"] == 1
+
+    memory.flush()
+    assert _read(storage_path)["summary"]["total_patterns"] == 3
+
+
+def test_failed_writes_are_kept_for_the_next_flush(tmp_path, monkeypatch, caplog):
+    buffer = WriteBehindBuffer(flush_interval_s=3600, max_pending_records=2)
+    log_path, state_path = str(tmp_path / "log.jsonl"), str(tmp_path / "state.json")
+    real_append, real_write = WriteBehindBuffer._append_records, WriteBehindBuffer._write_snapshot
+
+    def disk_full(self, path, data):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(WriteBehindBuffer, "_append_records", disk_full)
+    monkeypatch.setattr(WriteBehindBuffer, "_write_snapshot", disk_full)
+    buffer.mark_dirty(state_path, lambda: {"v": 1})
+    buffer.append(log_path, {"event": 1})
+    buffer.append(log_path, {"event": 2})
+    buffer.flush()
+    assert buffer.dirty and "No space left on device" in caplog.text
+    # While failing, a full backlog waits for the interval instead of retrying at once
+    assert buffer.next_deadline() > time.monotonic()
+
+    monkeypatch.setattr(WriteBehindBuffer, "_append_records", real_append)
+    monkeypatch.setattr(WriteBehindBuffer, "_write_snapshot", real_write)
+    buffer.append(log_path, {"event": 3})
+    buffer.flush()
+    assert not buffer.dirty
+    assert _read(state_path) == {"v": 1}
+    with open(log_path, encoding="utf-8") as f:
+        assert [json.loads(line)["event"] for line in f] == [1, 2, 3]
+    buffer.close()